@@ -0,0 +1,236 @@
+"""
+Alta masiva de usuarios desde un archivo CSV o Excel.
+
+Cada fila del archivo es un operador. Las filas se validan juntas: los campos de
+cada una, los duplicados dentro del archivo y, con una consulta por bloque
+(FMREDatabase.usernames_existentes / emails_existentes), los usuarios y correos ya
+registrados. Las filas válidas se crean en una sola transacción
+(FMREDatabase.crear_usuarios_lote) y sus credenciales se encolan juntas en el buzón
+de salida (EmailSender.send_user_credentials_lote), que las envía por una sola
+conexión SMTP. El resultado es un renglón por fila del archivo.
+
+Si una fila no trae contraseña se genera una temporal.
+"""
+import csv
+import io
+import re
+import secrets
+import string
+import unicodedata
+
+# Encabezado del archivo (en mayúsculas y sin acentos) → campo de users
+COLUMNAS = {
+    'USUARIO': 'username',
+    'USERNAME': 'username',
+    'NOMBRE': 'full_name',
+    'NOMBRE COMPLETO': 'full_name',
+    'FULL NAME': 'full_name',
+    'EMAIL': 'email',
+    'CORREO': 'email',
+    'CORREO ELECTRONICO': 'email',
+    'TELEFONO': 'phone',
+    'PHONE': 'phone',
+    'ROL': 'role',
+    'ROLE': 'role',
+    'CONTRASENA': 'password',
+    'PASSWORD': 'password',
+    'SISTEMA': 'sistema_preferido',
+    'SISTEMA PREFERIDO': 'sistema_preferido',
+}
+OBLIGATORIAS = ('username', 'full_name', 'email')
+ROLES = {
+    'operator': 'operator',
+    'operador': 'operator',
+    'admin': 'admin',
+    'administrador': 'admin',
+}
+ENCABEZADOS_PLANTILLA = ['USUARIO', 'NOMBRE COMPLETO', 'EMAIL', 'TELEFONO', 'ROL', 'SISTEMA PREFERIDO', 'CONTRASEÑA']
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _normalizar_encabezado(encabezado):
+    """Encabezado en mayúsculas, sin acentos y con espacios en lugar de guiones bajos"""
+    texto = unicodedata.normalize('NFD', str(encabezado).strip().upper().replace('_', ' '))
+    return ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+
+
+def _texto(valor):
+    """Celda como texto sin espacios; vacías, NaN y None quedan en ''"""
+    if valor is None:
+        return ''
+    texto = str(valor).strip()
+    return '' if texto.lower() == 'nan' else texto
+
+
+def leer_archivo(contenido, nombre_archivo):
+    """
+    Lee las filas de un archivo CSV o Excel
+
+    Args:
+        contenido (bytes): Contenido del archivo
+        nombre_archivo (str): Nombre, para distinguir CSV de Excel por la extensión
+
+    Returns:
+        list: dicts con los campos de users reconocidos (las columnas desconocidas se
+        ignoran) y 'fila', el número de renglón en el archivo contando el encabezado
+    """
+    if nombre_archivo.lower().endswith('.csv'):
+        texto = contenido.decode('utf-8-sig')
+        try:
+            dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(io.StringIO(texto), dialecto)
+        encabezados = next(lector, [])
+        renglones = list(lector)
+    else:
+        import pandas as pd
+        df = pd.read_excel(io.BytesIO(contenido), dtype=str)
+        encabezados = list(df.columns)
+        renglones = df.values.tolist()
+
+    campos = [COLUMNAS.get(_normalizar_encabezado(e)) for e in encabezados]
+    filas = []
+    for numero, renglon in enumerate(renglones, start=2):
+        fila = {}
+        for campo, valor in zip(campos, renglon):
+            if campo and not fila.get(campo):
+                fila[campo] = _texto(valor)
+        # Renglones vacíos al final de una hoja de cálculo
+        if any(fila.values()):
+            fila['fila'] = numero
+            filas.append(fila)
+    return filas
+
+
+def plantilla_csv():
+    """Plantilla CSV con los encabezados y un renglón de ejemplo"""
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(ENCABEZADOS_PLANTILLA)
+    escritor.writerow(['xe1abc', 'Nombre Apellido', 'xe1abc@ejemplo.mx', '', 'operator', 'ASL', ''])
+    return salida.getvalue().encode('utf-8-sig')
+
+
+def generar_password():
+    """Contraseña temporal que cumple utils.validate_password"""
+    from utils import validate_password
+
+    alfabeto = string.ascii_letters + string.digits + '!@#$%&*-_=+?'
+    while True:
+        password = ''.join(secrets.choice(alfabeto) for _ in range(12))
+        if validate_password(password)[0]:
+            return password
+
+
+def validar(db, filas):
+    """
+    Valida las filas y prepara los usuarios a crear
+
+    Args:
+        db (FMREDatabase): Base de datos
+        filas (list): Filas de leer_archivo
+
+    Returns:
+        tuple: (usuarios, errores) donde usuarios es una lista de (índice de fila, dict
+        para crear_usuarios_lote, contraseña generada o None) y errores {índice: mensaje}
+    """
+    from utils import validate_password
+
+    errores = {}
+    vistos_usuario = {}
+    vistos_email = {}
+    for i, fila in enumerate(filas):
+        faltantes = [campo for campo in OBLIGATORIAS if not fila.get(campo)]
+        if faltantes:
+            errores[i] = f"Faltan campos obligatorios: {', '.join(faltantes)}"
+            continue
+        if not _EMAIL.match(fila['email']):
+            errores[i] = f"Correo electrónico no válido: {fila['email']}"
+            continue
+        if fila.get('role') and fila['role'].lower() not in ROLES:
+            errores[i] = f"Rol no válido: {fila['role']} (operator o admin)"
+            continue
+        if fila.get('password'):
+            valida, mensaje = validate_password(fila['password'])
+            if not valida:
+                errores[i] = mensaje
+                continue
+        if fila['username'] in vistos_usuario:
+            errores[i] = f"Usuario repetido en el archivo (fila {vistos_usuario[fila['username']]})"
+            continue
+        if fila['email'].lower() in vistos_email:
+            errores[i] = f"Correo repetido en el archivo (fila {vistos_email[fila['email'].lower()]})"
+            continue
+        vistos_usuario[fila['username']] = fila['fila']
+        vistos_email[fila['email'].lower()] = fila['fila']
+
+    candidatas = [i for i in range(len(filas)) if i not in errores]
+    usuarios_registrados = db.usernames_existentes(filas[i]['username'] for i in candidatas)
+    emails_registrados = db.emails_existentes(filas[i]['email'] for i in candidatas)
+
+    usuarios = []
+    for i in candidatas:
+        fila = filas[i]
+        if fila['username'] in usuarios_registrados:
+            errores[i] = f"El nombre de usuario '{fila['username']}' ya existe"
+            continue
+        if fila['email'] in emails_registrados:
+            errores[i] = f"El correo electrónico '{fila['email']}' ya está registrado"
+            continue
+        generada = None if fila.get('password') else generar_password()
+        usuarios.append((i, {
+            'username': fila['username'],
+            'password': fila.get('password') or generada,
+            'full_name': fila['full_name'],
+            'email': fila['email'],
+            'phone': fila.get('phone') or None,
+            'role': ROLES[fila['role'].lower()] if fila.get('role') else 'operator',
+            'sistema_preferido': fila.get('sistema_preferido') or None,
+        }, generada))
+    return usuarios, errores
+
+
+def dar_de_alta(db, email_sender, filas, enviar_correos=True):
+    """
+    Crea los usuarios válidos de un archivo y encola sus credenciales
+
+    Args:
+        db (FMREDatabase): Base de datos
+        email_sender (EmailSender): Servicio de correo
+        filas (list): Filas de leer_archivo
+        enviar_correos (bool): Encolar los correos de bienvenida
+
+    Returns:
+        list: Un dict por fila con fila (número de renglón en el archivo), usuario,
+        email, resultado ('Creado' o 'Error') y detalle
+    """
+    usuarios, errores = validar(db, filas)
+    creados = db.crear_usuarios_lote([usuario for _, usuario, _ in usuarios])
+
+    detalles = {}
+    correos = []
+    for (i, usuario, generada), (user_id, error) in zip(usuarios, creados):
+        if error:
+            errores[i] = error
+            continue
+        detalles[i] = "Contraseña temporal generada" if generada else "Contraseña del archivo"
+        correos.append((i, usuario))
+
+    if enviar_correos and correos:
+        try:
+            email_sender.send_user_credentials_lote([(usuario, usuario['password']) for _, usuario in correos])
+            for i, _ in correos:
+                detalles[i] += "; correo en cola de envío"
+        except Exception as e:
+            for i, _ in correos:
+                detalles[i] += f"; no se pudo encolar el correo: {e}"
+
+    return [{
+        'fila': fila['fila'],
+        'usuario': fila.get('username', ''),
+        'email': fila.get('email', ''),
+        'resultado': 'Error' if i in errores else 'Creado',
+        'detalle': errores.get(i) or detalles.get(i, ''),
+    } for i, fila in enumerate(filas)]
@@ -3,93 +3,42 @@ import sqlite3
 import time
 import secrets
 import string
-from time_utils import format_datetime, get_current_cdmx_time
-import hashlib
+from time_utils import format_series, get_current_cdmx_time
 from datetime import datetime, timedelta
 import pytz
 from database import FMREDatabase
 from auth import AuthManager
-from email_sender import EmailSender
+from email_sender import EmailSender, iniciar_buzon
 import utils
 import re
-import io
-import unicodedata
-import json
-from pathlib import Path
-import plotly.express as px
-import plotly.graph_objects as go
+import logging
 from utils import show_gestion_estaciones
+import metrics
 
-db = FMREDatabase()
-auth = AuthManager(db)
-
-MEXICO_STATE_COORDS = {
-    "aguascalientes": (21.8853, -102.2916),
-    "baja california": (30.8406, -115.2838),
-    "baja california sur": (24.1426, -110.3128),
-    "campeche": (19.8301, -90.5349),
-    "chiapas": (16.7520, -93.1167),
-    "chihuahua": (28.6320, -106.0691),
-    "ciudad de mexico": (19.4326, -99.1332),
-    "coahuila": (27.0587, -101.7068),
-    "colima": (19.1223, -104.0072),
-    "durango": (24.0277, -104.6532),
-    "guanajuato": (21.0190, -101.2574),
-    "guerrero": (17.4392, -99.5451),
-    "hidalgo": (20.1011, -98.7624),
-    "jalisco": (20.6597, -103.3496),
-    "mexico": (19.2832, -99.6557),
-    "estado de mexico": (19.2832, -99.6557),
-    "michoacan": (19.5665, -101.7068),
-    "morelos": (18.6813, -99.1013),
-    "nayarit": (21.7514, -104.8455),
-    "nuevo leon": (25.5922, -99.9962),
-    "oaxaca": (17.0732, -96.7266),
-    "puebla": (19.0413, -98.2062),
-    "queretaro": (20.5888, -100.3899),
-    "quintana roo": (19.1817, -88.4791),
-    "san luis potosi": (22.1565, -100.9855),
-    "sinaloa": (24.8091, -107.3940),
-    "sonora": (29.0729, -110.9559),
-    "tabasco": (17.8409, -92.6189),
-    "tamaulipas": (24.2669, -98.8363),
-    "tlaxcala": (19.3182, -98.2374),
-    "veracruz": (19.1738, -96.1342),
-    "yucatan": (20.7099, -89.0943),
-    "zacatecas": (22.7709, -102.5833),
-    "extranjero": (21.0, -89.0),
-}
+# plotly, pandas, reportlab y openpyxl/xlsxwriter se importan dentro de las páginas
+# que los usan, para que la pantalla de inicio de sesión no pague su carga.
 
-GEOJSON_STATE_ALIASES = {
-    "cdmx": "ciudad de mexico",
-    "ciudad de mexico": "ciudad de mexico",
-    "distrito federal": "ciudad de mexico",
-    "coahuila": "coahuila de zaragoza",
-    "coahuila de zaragoza": "coahuila de zaragoza",
-    "estado de mexico": "mexico",
-    "mexico": "mexico",
-    "michoacan": "michoacan",
-    "michoacan de ocampo": "michoacan",
-    "veracruz": "veracruz de ignacio de la llave",
-    "veracruz de ignacio de la llave": "veracruz de ignacio de la llave",
-}
+@st.cache_resource
+def _get_database():
+    """Instancia compartida de la base de datos; el esquema se verifica una vez por proceso"""
+    return FMREDatabase()
 
-def _normalizar_estado_nombre(nombre_estado: str) -> str:
-    if not nombre_estado:
-        return ""
+metrics.configurar_logging()
+metrics.iniciar_exportador()
+logger = logging.getLogger('qms.app')
 
-    texto = unicodedata.normalize('NFKD', str(nombre_estado))
-    texto = "".join(c for c in texto if not unicodedata.combining(c))
-    return texto.strip().lower()
+db = _get_database()
+auth = AuthManager(db)
+# Envía en segundo plano los correos que quedaron en el buzón (email_sender.py)
+iniciar_buzon(db)
 
 @st.cache_resource
-def _load_mexico_states_geojson() -> dict | None:
-    geojson_path = Path("data/mexico_states.geojson")
-    if not geojson_path.exists():
-        return None
+def _load_mexico_states_geojson(nivel: str = "media") -> tuple[dict, dict] | None:
+    """GeoJSON de estados del nivel pedido, cargado una vez por proceso (ver reportes_calculo.cargar_mapa_estados)"""
+    import reportes_calculo
 
     try:
-        return json.loads(geojson_path.read_text(encoding="utf-8"))
+        return reportes_calculo.cargar_mapa_estados(nivel)
     except Exception as exc:
         st.warning(f"No se pudo cargar el archivo GeoJSON de estados: {exc}")
         return None
@@ -149,6 +98,7 @@ def show_sidebar():
             auth.logout()
             st.rerun()
 
+@metrics.medir('pagina')
 def show_home():
     """Muestra la página de inicio"""
     st.title("Bienvenido al Sistema de Gestión de QSOs")
@@ -169,7 +119,7 @@ def show_gestion_usuarios():
     email_service = st.session_state.email_service
     
     # Tabs para organizar funcionalidades
-    tab1, tab2 = st.tabs(["📋 Lista de Usuarios", "➕ Crear Usuario"])
+    tab1, tab2, tab3 = st.tabs(["📋 Lista de Usuarios", "➕ Crear Usuario", "📥 Alta Masiva"])
     
     with tab1:
         st.subheader("Lista de Usuarios")
@@ -178,7 +128,10 @@ def show_gestion_usuarios():
         users = db.get_all_users()
         
         if users is not None and len(users) > 0:
-            for user in users:
+            # Las fechas de todos los usuarios se formatean juntas
+            creados = format_series([user.get('created_at') for user in users]).tolist()
+            ultimos_accesos = format_series([user.get('last_login') for user in users]).tolist()
+            for user, creado, ultimo_acceso in zip(users, creados, ultimos_accesos):
                 with st.expander(f"👤 {user.get('username', 'N/A')} ({user.get('role', 'operator')})", 
                               expanded=st.session_state.get(f"editing_user_{user['id']}", False)):
                     col1, col2 = st.columns(2)
@@ -190,8 +143,8 @@ def show_gestion_usuarios():
                         status_emoji = "✔️" if user.get('is_active', 0) else "❌"
                         status_text = "Activo" if user.get('is_active', 0) else "Inactivo"
                         st.write(f"**Estado:** {status_emoji} {status_text}")
-                        st.write(f"**Creado:** {format_datetime(user.get('created_at'))}")
-                        st.write(f"**Último inicio de sesión:** {format_datetime(user.get('last_login'))}")
+                        st.write(f"**Creado:** {creado}")
+                        st.write(f"**Último inicio de sesión:** {ultimo_acceso}")
                     
                     with col2:
                         # Botón para editar usuario
@@ -215,7 +168,7 @@ def show_gestion_usuarios():
                                 
                                 # Enviar el correo de bienvenida
                                 if email_service.send_user_credentials(user, temp_password):
-                                    st.success(f"✅ Correo de bienvenida reenviado a {user.get('email', '')}")
+                                    st.success(f"✅ Correo de bienvenida en cola de envío a {user.get('email', '')}")
                                     st.warning("⚠️ Se generó una nueva contraseña temporal. El usuario deberá cambiarla al iniciar sesión.")
 
                                 else:
@@ -299,9 +252,8 @@ def show_gestion_usuarios():
                                             
                                             # Cambiar contraseña si se solicitó
                                             if change_password:
-                                                import hashlib
-                                                password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-                                                db.change_password(user['username'], password_hash)
+                                                # change_password genera el hash
+                                                db.change_password(user['username'], new_password)
                                             
                                             st.success("✅ Usuario actualizado exitosamente")
                                             import time
@@ -384,7 +336,7 @@ def show_gestion_usuarios():
                                     }
                                     
                                     if email_service.send_user_credentials(user_data, new_password):
-                                        st.success("📧 Email de bienvenida enviado")
+                                        st.success("📧 Email de bienvenida en cola de envío")
                                     else:
                                         st.warning("⚠️ Usuario creado pero no se pudo enviar el email de bienvenida")
                                     
@@ -399,6 +351,81 @@ def show_gestion_usuarios():
                 else:
                     st.error("❌ Por favor completa todos los campos")
 
+    with tab3:
+        _show_alta_masiva_usuarios(email_service)
+
+def _show_alta_masiva_usuarios(email_service):
+    """Crea usuarios desde un archivo CSV o Excel (ver alta_usuarios.py)"""
+    import alta_usuarios
+
+    st.subheader("Alta Masiva de Usuarios")
+    st.info("""
+    **Columnas del archivo:**
+    - `USUARIO`, `NOMBRE COMPLETO` y `EMAIL` (obligatorias)
+    - `TELEFONO`, `ROL` (operator o admin), `SISTEMA PREFERIDO` y `CONTRASEÑA` (opcionales)
+
+    Si una fila no trae contraseña se genera una temporal. Las credenciales se envían por correo.
+    """)
+    st.download_button(
+        label="📥 Descargar Plantilla",
+        data=alta_usuarios.plantilla_csv(),
+        file_name="plantilla_usuarios.csv",
+        mime="text/csv"
+    )
+
+    uploaded_file = st.file_uploader("Selecciona un archivo CSV o Excel", type=["csv", "xlsx", "xls"],
+                                     key="alta_masiva_archivo")
+    if uploaded_file is None:
+        st.session_state.pop('alta_masiva_resultados', None)
+        return
+
+    try:
+        filas = alta_usuarios.leer_archivo(uploaded_file.getvalue(), uploaded_file.name)
+    except Exception as e:
+        st.error(f"❌ No se pudo leer el archivo: {str(e)}")
+        return
+
+    if not filas:
+        st.warning("El archivo no tiene filas con las columnas esperadas")
+        return
+
+    import pandas as pd
+
+    # Los resultados se conservan entre reruns mientras sigue cargado el mismo archivo
+    clave_archivo = (uploaded_file.name, uploaded_file.size)
+    resultados = None
+    if st.session_state.get('alta_masiva_resultados', (None,))[0] == clave_archivo:
+        resultados = st.session_state.alta_masiva_resultados[1]
+    if resultados is None:
+        vista_previa = pd.DataFrame(filas).drop(columns=['password', 'fila'], errors='ignore')
+        st.dataframe(vista_previa.head(10), hide_index=True)
+        st.caption(f"Total de filas en el archivo: {len(filas)}")
+
+        enviar_correos = st.checkbox("Enviar credenciales por correo", value=True)
+        if st.button("✅ Crear usuarios", type="primary"):
+            with st.spinner("Creando usuarios..."):
+                resultados = alta_usuarios.dar_de_alta(db, email_service, filas, enviar_correos)
+            st.session_state.alta_masiva_resultados = (clave_archivo, resultados)
+        else:
+            return
+
+    df_resultados = pd.DataFrame(resultados)
+    creados = int((df_resultados['resultado'] == 'Creado').sum())
+    st.success(f"✅ {creados} de {len(df_resultados)} usuarios creados")
+    if creados < len(df_resultados):
+        st.warning(f"⚠️ {len(df_resultados) - creados} filas con errores")
+    st.dataframe(
+        df_resultados.rename(columns={'fila': 'Fila', 'usuario': 'Usuario', 'email': 'Email',
+                                      'resultado': 'Resultado', 'detalle': 'Detalle'}),
+        hide_index=True
+    )
+    st.download_button(
+        label="📥 Descargar resultado",
+        data=df_resultados.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig'),
+        file_name="alta_masiva_usuarios.csv",
+        mime="text/csv"
+    )
+
 # Variable para almacenar la pestaña activa
 if 'active_tab' not in st.session_state:
     st.session_state.active_tab = "👥 Usuarios"
@@ -407,6 +434,7 @@ if 'active_tab' not in st.session_state:
 def set_active_tab(tab_name):
     st.session_state.active_tab = tab_name
 
+@metrics.medir('pagina')
 def show_gestion():
     """Muestra el panel de gestión con pestañas para diferentes secciones"""
     st.title("🔧 Gestión")
@@ -676,6 +704,7 @@ def show_crear_evento():
                     del st.session_state['editing_evento']
                 st.rerun()
 
+@metrics.medir('pagina')
 def show_reports():
     """Muestra la sección de reportes con análisis completo"""
     st.title("📊 Reportes y Análisis")
@@ -708,6 +737,7 @@ def show_reports():
     with tab6:
         show_evento_report()
 
+@metrics.medir('pagina')
 def show_actividad_general_report():
     """Muestra reporte de actividad general con filtros"""
     st.subheader("📈 Reporte de Actividad General")
@@ -734,73 +764,13 @@ def show_actividad_general_report():
         return
 
     try:
-        # Convertir fechas para consulta
-        fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
-        fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
+        import reportes_calculo
 
-        # Obtener estadísticas generales
-        reportes, estadisticas = db.get_reportes_por_fecha_rango(fecha_inicio_str, fecha_fin_str)
-
-        actividad_por_fecha = None
-        df_actividad = None
-        dia_mas_activo_label = "Sin datos"
-        dia_mas_activo_delta = None
-        dia_menos_activo_label = "Sin datos"
-        dia_menos_activo_delta = None
-
-        # Preparar datos de actividad diaria
-        if reportes:
-            import pandas as pd
-            df_actividad = pd.DataFrame([{
-                'Fecha': r.get('fecha_reporte', ''),
-                'Indicativo': r.get('indicativo', ''),
-                'Sistema': r.get('sistema', ''),
-                'Zona': r.get('zona', ''),
-                'Estado': r.get('estado', '')
-            } for r in reportes])
-
-            def _parse_fecha(valor: str | None) -> pd.Timestamp | None:
-                if not valor:
-                    return None
-
-                valor = str(valor).strip()
-
-                formatos = [
-                    '%d/%m/%Y %H:%M:%S',
-                    '%d/%m/%Y',
-                    '%Y-%m-%d %H:%M:%S',
-                    '%Y-%m-%d',
-                ]
-
-                for fmt in formatos:
-                    try:
-                        return datetime.strptime(valor, fmt)
-                    except ValueError:
-                        continue
-
-                return None
-
-            df_actividad['Fecha'] = df_actividad['Fecha'].apply(_parse_fecha)
-            df_actividad = df_actividad.dropna(subset=['Fecha'])
-            df_actividad['Dia'] = df_actividad['Fecha'].dt.strftime('%Y-%m-%d')
-
-            # Agrupar por día usando fecha_reporte
-            actividad_por_fecha = (
-                df_actividad
-                .groupby('Dia')
-                .size()
-                .reset_index(name='Reportes')
-                .sort_values('Dia')
-            )
-
-            if not actividad_por_fecha.empty:
-                dia_mas_activo = actividad_por_fecha.loc[actividad_por_fecha['Reportes'].idxmax()]
-                dia_mas_activo_label = dia_mas_activo['Dia']
-                dia_mas_activo_delta = f"{int(dia_mas_activo['Reportes'])} reportes"
-
-                dia_menos_activo = actividad_por_fecha.loc[actividad_por_fecha['Reportes'].idxmin()]
-                dia_menos_activo_label = dia_menos_activo['Dia']
-                dia_menos_activo_delta = f"{int(dia_menos_activo['Reportes'])} reportes"
+        datos = _datos_reporte(
+            ('datos_actividad', fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d'), db.get_version_datos('reportes')),
+            lambda: reportes_calculo.datos_actividad_general(db, fecha_inicio, fecha_fin)
+        )
+        estadisticas = datos['estadisticas']
 
         # Mostrar métricas principales
         col1, col2, col3, col4, col5 = st.columns(5)
@@ -816,13 +786,14 @@ def show_actividad_general_report():
             st.metric("Días de Período", dias_con_actividad)
 
         with col4:
-            st.metric("Día con más reportes", dia_mas_activo_label, dia_mas_activo_delta)
+            st.metric("Día con más reportes", *datos['dia_mas_activo'])
 
         with col5:
-            st.metric("Día con menos reportes", dia_menos_activo_label, dia_menos_activo_delta)
+            st.metric("Día con menos reportes", *datos['dia_menos_activo'])
 
         # Gráfico de actividad por día
-        if reportes:
+        if datos['num_reportes']:
+            actividad_por_fecha = datos['actividad_por_fecha']
             st.subheader("📅 Actividad por Día")
 
             # Gráfico de barras
@@ -833,12 +804,28 @@ def show_actividad_general_report():
 
             # Tabla de resumen
             st.subheader("📋 Resumen por Sistema")
-            resumen_sistemas = df_actividad['Sistema'].value_counts()
-            st.dataframe(resumen_sistemas)
+            st.dataframe(datos['resumen_sistemas'])
 
     except Exception as e:
         st.error(f"Error al cargar el reporte: {str(e)}")
 
+def _datos_reporte(clave, calcular):
+    """Datos de una página de reportes desde figure_cache; calcular() solo corre si no están en caché"""
+    import figure_cache
+
+    return figure_cache.obtener_datos(clave, calcular)
+
+def _mostrar_figura(clave, construir):
+    """Muestra una figura de Plotly desde figure_cache; construir() solo corre si no está en caché"""
+    import figure_cache
+
+    figura, avisos = figure_cache.obtener_figura(clave, construir)
+    if figura is not None:
+        st.plotly_chart(figura, width='stretch')
+    for tipo, texto in avisos:
+        getattr(st, tipo)(texto)
+
+@metrics.medir('pagina')
 def show_geografico_report():
     """Muestra análisis geográfico por zonas y estados"""
     st.subheader("🌍 Análisis Geográfico")
@@ -865,330 +852,79 @@ def show_geografico_report():
         return
 
     try:
-        # Convertir fechas para consulta
+        import reportes_calculo
+
         fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
         fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
 
-        # Obtener datos geográficos
-        reportes, estadisticas = db.get_reportes_por_fecha_rango(fecha_inicio_str, fecha_fin_str)
-
-        if reportes:
-            import pandas as pd
-            
-            # Mapeo de nombres alternativos de estados
-            MAPEO_ESTADOS = {
-                'México': 'Estado de México',
-                'MEXICO': 'Estado de México',
-                'MEX': 'Estado de México',
-                'mexico': 'Estado de México',
-                'mex': 'Estado de México'
-            }
-            
-            df_geografico = pd.DataFrame([{
-                'Indicativo': r.get('indicativo', ''),
-                'Estado': r.get('estado', ''),
-                'Ciudad': r.get('ciudad', ''),
-                'Zona': r.get('zona', ''),
-                'Sistema': r.get('sistema', '')
-            } for r in reportes])
-            
-            # Estandarizar los nombres de los estados antes de cualquier procesamiento
-            df_geografico['Estado'] = df_geografico['Estado'].fillna('Desconocido').str.strip()
-            df_geografico['Estado'] = df_geografico['Estado'].apply(
-                lambda x: MAPEO_ESTADOS.get(x, x) if x in MAPEO_ESTADOS else x
-            )
-            
-            # Normalizar los nombres de los estados para comparación
-            df_geografico['estado_norm'] = df_geografico['Estado'].apply(_normalizar_estado_nombre)
-
-            st.subheader("🗺️ Mapa de Reportes por Estado")
-
-            if px is None:
-                st.info("Instala la librería `plotly` para visualizar el mapa interactivo (pip install plotly).")
-            else:
-                estado_label_map = {}
-                for norm, original in zip(df_geografico['estado_norm'], df_geografico['Estado']):
-                    if norm and norm not in estado_label_map:
-                        estado_label_map[norm] = original
-
-                df_estados_validos = df_geografico[df_geografico['estado_norm'] != '']
-
-                conteo_por_estado = (
-                    df_estados_validos
-                    .groupby('estado_norm')
-                    .size()
-                    .reset_index(name='reportes')
-                )
-
-                if conteo_por_estado.empty:
-                    st.info("No hay estados válidos para graficar en el mapa.")
-                else:
-                    conteo_por_estado['Estado'] = conteo_por_estado['estado_norm'].apply(
-                        lambda s: estado_label_map.get(s, 'Desconocido')
-                    )
-                    conteo_por_estado['lat'] = conteo_por_estado['estado_norm'].map(
-                        lambda s: MEXICO_STATE_COORDS.get(s, (None, None))[0]
-                    )
-                    conteo_por_estado['lon'] = conteo_por_estado['estado_norm'].map(
-                        lambda s: MEXICO_STATE_COORDS.get(s, (None, None))[1]
-                    )
-
-                    conteo_valido = conteo_por_estado.dropna(subset=['lat', 'lon'])
-
-                    geojson_data = _load_mexico_states_geojson() if go is not None else None
-                    render_fallback_scatter = True
-
-                    if geojson_data and go is not None:
-                        geojson_name_map = {}
-                        for feature in geojson_data.get('features', []):
-                            nombre_estado = feature.get('properties', {}).get('state_name')
-                            if not nombre_estado:
-                                continue
-                            geo_norm = _normalizar_estado_nombre(nombre_estado)
-                            geojson_name_map[geo_norm] = nombre_estado
-
-                        if not geojson_name_map:
-                            st.warning("El archivo GeoJSON no contiene estados válidos para graficar.")
-                        else:
-                            conteo_por_estado = conteo_por_estado.copy()
-                            conteo_por_estado['geo_norm'] = conteo_por_estado['estado_norm'].map(
-                                lambda s: GEOJSON_STATE_ALIASES.get(s, s)
-                            )
-
-                            conteo_por_estado['geo_norm'] = conteo_por_estado['geo_norm'].where(
-                                conteo_por_estado['geo_norm'].isin(geojson_name_map.keys())
-                            )
-
-                            unmatched_states = (
-                                conteo_por_estado[conteo_por_estado['geo_norm'].isna()][['Estado']]
-                                .drop_duplicates()
-                            )
-
-                            geo_df = (
-                                pd.DataFrame(
-                                    [
-                                        {
-                                            'geo_norm': norm,
-                                            'feature_name': original,
-                                        }
-                                        for norm, original in geojson_name_map.items()
-                                    ]
-                                )
-                                .drop_duplicates(subset='geo_norm')
-                            )
-
-                            choropleth_df = geo_df.merge(
-                                conteo_por_estado[['geo_norm', 'Estado', 'reportes']],
-                                on='geo_norm',
-                                how='left'
-                            )
-                            choropleth_df['reportes'] = choropleth_df['reportes'].fillna(0)
-                            choropleth_df['Estado'] = choropleth_df['Estado'].fillna(choropleth_df['feature_name'])
-
-                            render_fallback_scatter = False
-                            fig = go.Figure()
-
-                            fig.add_trace(go.Choropleth(
-                                geojson=geojson_data,
-                                featureidkey="properties.state_name",
-                                locations=choropleth_df['feature_name'],
-                                z=choropleth_df['reportes'],
-                                zmin=0,
-                                colorscale=[
-                                    [0.0, "#f2f2f2"],   # very low -> light gray
-                                    [0.15, "#e0e0e0"],
-                                    [0.35, "#c8e6c9"],  # light green tint
-                                    [0.6, "#81c784"],   # medium green
-                                    [0.8, "#43a047"],   # darker green
-                                    [1.0, "#1b5e20"]    # highest -> deep green
-                                ],
-                                colorbar_title="Reportes",
-                                marker_line_color="rgb(120, 120, 120)",
-                                marker_line_width=0.8,
-                                hovertext=[
-                                    f"{row.Estado}<br>Reportes: {int(row.reportes)}"
-                                    for row in choropleth_df.itertuples()
-                                ],
-                                hoverinfo="text"
-                            ))
-
-                            if not conteo_valido.empty:
-                                tamaño_base = 12
-                                fig.add_trace(go.Scattergeo(
-                                    lat=conteo_valido['lat'],
-                                    lon=conteo_valido['lon'],
-                                    text=[
-                                        f"{row.Estado}<br>Reportes: {row.reportes}"
-                                        for row in conteo_valido.itertuples()
-                                    ],
-                                    hoverinfo="text",
-                                    mode="markers",
-                                    marker=dict(
-                                        size=conteo_valido['reportes'].clip(lower=1) * 2 + tamaño_base,
-                                        color="rgba(33, 76, 229, 0.65)",
-                                        line=dict(color="rgba(15, 40, 160, 0.8)", width=1.5)
-                                    ),
-                                    name="Reportes"
-                                ))
-
-                            fig.update_geos(
-                                fitbounds="locations",
-                                visible=False,
-                                showcountries=True,
-                                countrycolor="rgb(90, 90, 90)",
-                                showland=True,
-                                landcolor="rgb(235, 235, 235)",
-                                showsubunits=True,
-                                subunitcolor="rgb(150, 150, 150)",
-                                subunitwidth=0.8,
-                                showcoastlines=True,
-                                coastlinecolor="rgb(120, 120, 120)"
-                            )
-                            fig.update_layout(
-                                margin=dict(l=0, r=0, t=0, b=0),
-                                height=600
-                            )
+        # Los datos y las gráficas dependen de los reportes y de la relación estado-zona (tabla qth)
+        version_datos = (db.get_version_datos('reportes'), db.get_version_datos('qth'))
 
-                            st.plotly_chart(fig, use_container_width=True)
-
-                            if not unmatched_states.empty:
-                                st.caption(
-                                    "⚠️ Estados sin coincidencia en el GeoJSON: "
-                                    + ", ".join(sorted(unmatched_states['Estado'].unique()))
-                                )
-
-                    if render_fallback_scatter:
-                        if conteo_valido.empty:
-                            st.warning("No se pudieron ubicar coordenadas para los estados reportados.")
-                        else:
-                            fig = px.scatter_geo(
-                                conteo_valido,
-                                lat='lat',
-                                lon='lon',
-                                size='reportes',
-                                size_max=40,
-                                color='reportes',
-                                hover_name='Estado',
-                                hover_data={'reportes': True, 'lat': False, 'lon': False},
-                                projection='natural earth'
-                            )
+        # Obtener datos geográficos (solo si no están en caché)
+        datos = _datos_reporte(
+            ('datos_geografico', fecha_inicio_str, fecha_fin_str, version_datos),
+            lambda: reportes_calculo.datos_geografico(db, fecha_inicio, fecha_fin)
+        )
 
-                            fig.update_geos(
-                                scope='north america',
-                                center=dict(lat=23.0, lon=-102.0),
-                                projection_scale=5.0,
-                                showland=True,
-                                landcolor='rgb(235, 235, 235)',
-                                showcountries=True,
-                                countrycolor='rgb(204, 204, 204)',
-                                showsubunits=True,
-                                subunitcolor='rgb(160, 160, 160)',
-                                subunitwidth=1,
-                                showcoastlines=True,
-                                coastlinecolor='rgb(150, 150, 150)'
-                            )
-                            fig.update_layout(
-                                coloraxis_colorbar=dict(title='Reportes'),
-                                margin=dict(l=0, r=0, t=0, b=0)
-                            )
+        if datos['num_reportes']:
+            df_geografico = datos['df_geografico']
 
-                            st.plotly_chart(fig, use_container_width=True)
+            st.subheader("🗺️ Mapa de Reportes por Estado")
 
-                estados_sin_coordenadas = conteo_por_estado[conteo_por_estado[['lat', 'lon']].isna().any(axis=1)]
-                if not estados_sin_coordenadas.empty:
-                    st.caption(
-                        "⚠️ Estados sin coordenadas mapeadas: "
-                        + ", ".join(sorted(estados_sin_coordenadas['Estado'].unique()))
-                    )
+            # Menos detalle = figura más ligera para conexiones lentas
+            nivel_mapa = st.radio(
+                "Detalle del mapa",
+                ['baja', 'media', 'alta'],
+                index=1,
+                format_func=str.capitalize,
+                horizontal=True,
+                key="geo_nivel_mapa"
+            )
 
-            # Estandarizar los nombres de los estados antes de buscar la zona
-            df_geografico['Estado'] = df_geografico['Estado'].apply(
-                lambda x: MAPEO_ESTADOS.get(x, x) if pd.notna(x) and x != '' else x
+            _mostrar_figura(
+                ('geografico_mapa', fecha_inicio_str, fecha_fin_str, nivel_mapa, version_datos),
+                lambda: reportes_calculo.figura_mapa_estados(df_geografico, _load_mexico_states_geojson(nivel_mapa))
             )
-            
-            # Obtener el mapeo de estados a zonas desde la base de datos
-            estados_zonas = db.get_estados_zonas()
-            
-            # Mostrar estados que no tienen zona asignada (solo para depuración)
-            estados_unicos = df_geografico['Estado'].unique()
-            estados_sin_zona = [e for e in estados_unicos if e not in estados_zonas and pd.notna(e) and e != '']
-            
+
+            estados_sin_zona = datos['estados_sin_zona']
             if estados_sin_zona:
                 st.warning(f"⚠️ Los siguientes estados no tienen zona asignada y aparecerán como 'DESCONOCIDA': {', '.join(estados_sin_zona)}")
-                
+
                 # Mostrar registros problemáticos para depuración
-                registros_problematicos = df_geografico[df_geografico['Estado'].isin(estados_sin_zona)]
                 with st.expander("Ver registros problemáticos"):
                     st.write("Registros con estados sin zona asignada (se mostrarán como 'DESCONOCIDA'):")
-                    st.dataframe(registros_problematicos[['Indicativo', 'Estado', 'Ciudad']])
-            
-            # Agregar la zona a cada reporte basado en el estado
-            df_geografico['Zona'] = df_geografico['Estado'].map(
-                lambda x: estados_zonas.get(x, 'DESCONOCIDA') if pd.notna(x) and x != '' else 'DESCONOCIDA'
-            )
-            
-            # Calcular conteo de zonas para la sección de zonas más activas
-            zonas_count = df_geografico['Zona'].value_counts()
-            
+                    st.dataframe(datos['registros_problematicos'][['Indicativo', 'Estado', 'Ciudad']])
+
             # Sección de Distribución Detallada
             st.subheader("📋 Distribución Detallada", divider='rainbow')
-            
+
             # Mostrar tablas en 4 columnas
             cols = st.columns(4)
-            
-            # Definir las zonas en el orden deseado
-            zonas_orden = ['XE1', 'XE2', 'XE3', 'EXT']
-            
+
             # Mostrar cada zona en su propia columna
-            for idx, zona in enumerate(zonas_orden):
+            for idx, (zona, titulo, total_reportes, conteo_estados) in enumerate(datos['por_zona']):
                 with cols[idx % 4]:
-                    # Filtrar reportes de esta zona
-                    if zona == 'EXT':
-                        # Para EXT, incluir también 'Extranjero' si existe
-                        df_zona = df_geografico[df_geografico['Zona'].isin(['EXT', 'Extranjero'])]
-                        titulo = 'Zona Extranjera'
-                    else:
-                        df_zona = df_geografico[df_geografico['Zona'] == zona]
-                        titulo = f'Zona {zona}'
-                    
-                    if not df_zona.empty:
-                        # Contar reportes totales para esta zona
-                        total_reportes = len(df_zona)
-                        
+                    if total_reportes:
                         # Mostrar encabezado de zona con el total
                         st.markdown(f"**{titulo}**  \n*{total_reportes} reportes*")
-                        
-                        # Contar reportes por estado en esta zona
-                        if zona != 'EXT':  # Para zonas que no son EXT, mostrar el desglose
-                            # Filtrar solo los estados que pertenecen a esta zona según la tabla qth
-                            estados_en_zona = [estado for estado, z in estados_zonas.items() if z == zona]
-                            df_zona_filtrado = df_geografico[df_geografico['Estado'].isin(estados_en_zona)]
-                            
-                            if not df_zona_filtrado.empty:
-                                conteo_estados = df_zona_filtrado['Estado'].value_counts()
-                                st.dataframe(
-                                    conteo_estados.rename('Reportes'),
-                                    use_container_width=True,
-                                    height=min(300, 50 + len(conteo_estados) * 35)
-                                )
+
+                        # Desglose por estado (no aplica para EXT)
+                        if conteo_estados is not None:
+                            st.dataframe(
+                                conteo_estados.rename('Reportes'),
+                                use_container_width=True,
+                                height=min(300, 50 + len(conteo_estados) * 35)
+                            )
                     else:
                         st.markdown(f"**{titulo}**  \n*0 reportes*")
                         st.write("Sin reportes")
 
             # Sección de Zonas Más Activas
             st.subheader("🏆 Zonas Más Activas", divider='rainbow')
-            top_zonas = zonas_count.head(5)
-            
-            # Crear un DataFrame para mostrar la tabla
-            df_top_zonas = pd.DataFrame({
-                'Zona': top_zonas.index,
-                'Reportes': top_zonas.values,
-                'Porcentaje': (top_zonas.values / len(df_geografico) * 100).round(1).astype(str) + '%'
-            })
-            
+
             # Mostrar la tabla con estilos
             st.dataframe(
-                df_top_zonas,
+                datos['df_top_zonas'],
                 column_config={
                     'Zona': 'Zona',
                     'Reportes': st.column_config.NumberColumn('Reportes'),
@@ -1197,89 +933,30 @@ def show_geografico_report():
                 hide_index=True,
                 use_container_width=True
             )
-            
+
             # Sección de Gráficos de Barras
             st.subheader("📊 Reportes por Zona y Estado", divider='rainbow')
-            
+
             # Gráficos en columnas
             col1, col2 = st.columns(2)
-            
+
+            zonas_count = datos['zonas_count']
             with col1:
                 st.markdown("#### 📍 Reportes por Zona")
                 if not zonas_count.empty:
-                    # Crear un DataFrame con los datos
-                    df_zonas = zonas_count.reset_index()
-                    df_zonas.columns = ['Zona', 'Cantidad']
-                    
-                    # Generar colores únicos para cada barra
-                    n_colors = len(df_zonas)
-                    colors = px.colors.qualitative.Plotly[:n_colors]
-                    
-                    # Crear el gráfico con colores personalizados
-                    fig = px.bar(
-                        df_zonas, 
-                        x='Zona', 
-                        y='Cantidad',
-                        color='Zona',
-                        color_discrete_sequence=colors,
-                        title='Reportes por Zona'
+                    _mostrar_figura(
+                        ('geografico_zonas', fecha_inicio_str, fecha_fin_str, version_datos),
+                        lambda: reportes_calculo.figura_reportes_por_zona(zonas_count)
                     )
-                    
-                    # Mejorar el diseño
-                    fig.update_layout(
-                        showlegend=False,
-                        xaxis_title='Zona',
-                        yaxis_title='Cantidad de Reportes',
-                        xaxis_tickangle=-45
-                    )
-                    
-                    # Mostrar el gráfico
-                    st.plotly_chart(fig, use_container_width=True)
                 else:
                     st.info("No hay datos de zonas para mostrar")
-            
+
             with col2:
                 st.markdown("#### 🏙️ Reportes por Estado")
-                estados_count = df_geografico['Estado'].value_counts().head(10)  # Tomar solo los 10 primeros
-                if not estados_count.empty:
-                    # Crear un DataFrame con los datos
-                    df_estados = estados_count.reset_index()
-                    df_estados.columns = ['Estado', 'Cantidad']
-                    
-                    # Generar colores únicos para cada barra
-                    n_colors = len(df_estados)
-                    colors = px.colors.qualitative.Dark24[:n_colors]  # Usar una paleta diferente
-                    
-                    # Crear el gráfico con colores personalizados
-                    fig = px.bar(
-                        df_estados, 
-                        x='Estado', 
-                        y='Cantidad',
-                        color='Estado',
-                        color_discrete_sequence=colors,
-                        title='Top 10 Estados con más Reportes',
-                        text='Cantidad'
-                    )
-                    
-                    # Mejorar el diseño
-                    fig.update_layout(
-                        showlegend=False,
-                        xaxis_title='Estado',
-                        yaxis_title='Cantidad de Reportes',
-                        xaxis_tickangle=-45,
-                        height=500  # Altura fija para mejor visualización
-                    )
-                    
-                    # Mostrar los valores en las barras
-                    fig.update_traces(
-                        textposition='outside',
-                        textfont_size=12
-                    )
-                    
-                    # Mostrar el gráfico
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No hay datos de estados para mostrar")
+                _mostrar_figura(
+                    ('geografico_estados', fecha_inicio_str, fecha_fin_str, version_datos),
+                    lambda: reportes_calculo.figura_reportes_por_estado(df_geografico)
+                )
 
         else:
             st.info("No hay datos para el período seleccionado")
@@ -1287,6 +964,7 @@ def show_geografico_report():
     except Exception as e:
         st.error(f"Error al cargar el análisis geográfico: {str(e)}")
 
+@metrics.medir('pagina')
 def show_sistemas_report():
     """Muestra análisis por sistemas de radio"""
     st.subheader("📡 Análisis por Sistemas de Radio")
@@ -1313,161 +991,87 @@ def show_sistemas_report():
         return
 
     try:
-        # Convertir fechas para consulta
+        import reportes_calculo
+
         fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
         fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
 
-        # Obtener datos de sistemas
-        reportes, estadisticas = db.get_reportes_por_fecha_rango(fecha_inicio_str, fecha_fin_str)
+        version_datos = db.get_version_datos('reportes')
 
-        if reportes:
-            import pandas as pd
-            df_sistemas = pd.DataFrame([{
-                'Indicativo': r.get('indicativo', ''),
-                'Sistema': r.get('sistema', ''),
-                'Zona': r.get('zona', ''),
-                'Estado': r.get('estado', ''),
-                'Señal': r.get('senal', 0)
-            } for r in reportes])
+        # Obtener datos de sistemas (solo si no están en caché)
+        datos = _datos_reporte(
+            ('datos_sistemas', fecha_inicio_str, fecha_fin_str, version_datos),
+            lambda: reportes_calculo.datos_sistemas(db, fecha_inicio, fecha_fin)
+        )
+
+        if datos['num_reportes']:
+            sistemas_count = datos['sistemas_count']
+            senal_por_sistema = datos['senal_por_sistema']
 
             # Análisis por sistema - Versión vertical
             st.subheader("📊 Uso de Sistemas", divider='rainbow')
-            
-            # Gráfico de barras con Plotly para mejor personalización
-            if px is not None:
-                # Primera sección: Uso de Sistemas
-                st.markdown("#### 📋 Distribución de Reportes por Sistema")
-                sistemas_count = df_sistemas['Sistema'].value_counts().reset_index()
-                sistemas_count.columns = ['Sistema', 'Reportes']
-                
-                # Calcular porcentajes
-                total = sistemas_count['Reportes'].sum()
-                sistemas_count['Porcentaje'] = (sistemas_count['Reportes'] / total * 100).round(1).astype(str) + '%'
-                
-                # Ordenar por cantidad de reportes
-                sistemas_count = sistemas_count.sort_values('Reportes', ascending=False)
-                
-                # Crear gráfico de barras
-                fig1 = px.bar(
-                    sistemas_count,
-                    x='Sistema',
-                    y='Reportes',
-                    color='Sistema',
-                    title='Reportes por Sistema',
-                    labels={'Reportes': 'Número de Reportes', 'Sistema': 'Sistema'},
-                    text='Reportes',
-                    color_discrete_sequence=px.colors.qualitative.Plotly
-                )
-                
-                # Mejorar el diseño del gráfico
-                fig1.update_traces(
-                    textposition='outside',
-                    marker_line_color='rgb(8,48,107)',
-                    marker_line_width=1.5,
-                    opacity=0.8
-                )
-                
-                fig1.update_layout(
-                    showlegend=False,
-                    xaxis_tickangle=-45,
-                    margin=dict(l=0, r=0, t=40, b=60),
-                    height=400
-                )
-                
-                st.plotly_chart(fig1, use_container_width=True)
-                
-                # Mostrar tabla con porcentajes
-                st.dataframe(
-                    sistemas_count[['Sistema', 'Reportes', 'Porcentaje']],
-                    column_config={
-                        'Sistema': 'Sistema',
-                        'Reportes': st.column_config.NumberColumn('Reportes'),
-                        'Porcentaje': 'Porcentaje'
-                    },
-                    hide_index=True,
-                    use_container_width=True
-                )
-                
-                # Espaciador
-                st.markdown("---")
-                
-                # Segunda sección: Calidad de Señal
-                st.markdown("#### 📡 Calidad de Señal por Sistema")
-                
-                # Calcular promedio de señal por sistema
-                senal_por_sistema = df_sistemas.groupby('Sistema')['Señal'].agg(['mean', 'count']).reset_index()
-                senal_por_sistema.columns = ['Sistema', 'Promedio Señal', 'Muestras']
-                senal_por_sistema = senal_por_sistema.sort_values('Promedio Señal', ascending=False)
-                
-                # Crear gráfico de barras para la señal
-                fig2 = px.bar(
-                    senal_por_sistema,
-                    x='Sistema',
-                    y='Promedio Señal',
-                    color='Sistema',
-                    title='Promedio de Calidad de Señal',
-                    labels={'Promedio Señal': 'Señal Promedio (0-10)', 'Sistema': 'Sistema'},
-                    text_auto='.1f',
-                    color_discrete_sequence=px.colors.qualitative.Pastel1
-                )
-                
-                # Mejorar el diseño del gráfico
-                fig2.update_traces(
-                    textposition='outside',
-                    marker_line_color='rgb(8,48,107)',
-                    marker_line_width=1.5,
-                    opacity=0.8
-                )
-                
-                fig2.update_layout(
-                    showlegend=False,
-                    xaxis_tickangle=-45,
-                    yaxis_range=[0, 10],  # Asumiendo que la señal va de 0 a 10
-                    margin=dict(l=0, r=0, t=40, b=60),
-                    height=400
-                )
-                
-                st.plotly_chart(fig2, use_container_width=True)
-                
-                # Mostrar tabla con promedios
-                st.dataframe(
-                    senal_por_sistema[['Sistema', 'Promedio Señal', 'Muestras']],
-                    column_config={
-                        'Sistema': 'Sistema',
-                        'Promedio Señal': st.column_config.NumberColumn('Señal Promedio (0-10)', format='%.1f'),
-                        'Muestras': 'Muestras'
-                    },
-                    hide_index=True,
-                    use_container_width=True
-                )
-            else:
-                # Fallback a gráficos simples si no hay Plotly
-                st.bar_chart(df_sistemas['Sistema'].value_counts())
-                st.bar_chart(df_sistemas.groupby('Sistema')['Señal'].mean())
+
+            # Primera sección: Uso de Sistemas
+            st.markdown("#### 📋 Distribución de Reportes por Sistema")
+
+            _mostrar_figura(
+                ('sistemas_uso', fecha_inicio_str, fecha_fin_str, version_datos),
+                lambda: reportes_calculo.figura_uso_sistemas(sistemas_count)
+            )
+
+            # Mostrar tabla con porcentajes
+            st.dataframe(
+                sistemas_count[['Sistema', 'Reportes', 'Porcentaje']],
+                column_config={
+                    'Sistema': 'Sistema',
+                    'Reportes': st.column_config.NumberColumn('Reportes'),
+                    'Porcentaje': 'Porcentaje'
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+            # Espaciador
+            st.markdown("---")
+
+            # Segunda sección: Calidad de Señal
+            st.markdown("#### 📡 Calidad de Señal por Sistema")
+
+            _mostrar_figura(
+                ('sistemas_senal', fecha_inicio_str, fecha_fin_str, version_datos),
+                lambda: reportes_calculo.figura_senal_sistemas(senal_por_sistema)
+            )
+
+            # Mostrar tabla con promedios
+            st.dataframe(
+                senal_por_sistema[['Sistema', 'Promedio Señal', 'Muestras']],
+                column_config={
+                    'Sistema': 'Sistema',
+                    'Promedio Señal': st.column_config.NumberColumn('Señal Promedio (0-10)', format='%.1f'),
+                    'Muestras': 'Muestras'
+                },
+                hide_index=True,
+                use_container_width=True
+            )
 
             # Análisis HF específico
-            if 'HF' in df_sistemas['Sistema'].values:
+            if datos['hay_hf']:
                 st.subheader("📻 Análisis HF Detallado")
-                df_hf = df_sistemas[df_sistemas['Sistema'] == 'HF']
-
-                if not df_hf.empty:
-                    col_hf1, col_hf2 = st.columns(2)
+                col_hf1, col_hf2 = st.columns(2)
 
-                    with col_hf1:
-                        st.write("**Modos HF más usados:**")
-                        modos_hf = df_hf['Modo'].value_counts() if 'Modo' in df_hf.columns else {}
-                        if not modos_hf.empty:
-                            st.bar_chart(modos_hf)
-                        else:
-                            st.info("No hay datos de modos HF")
+                with col_hf1:
+                    st.write("**Modos HF más usados:**")
+                    if not datos['modos_hf'].empty:
+                        st.bar_chart(datos['modos_hf'])
+                    else:
+                        st.info("No hay datos de modos HF")
 
-                    with col_hf2:
-                        st.write("**Potencias HF más usadas:**")
-                        potencias_hf = df_hf['Potencia'].value_counts() if 'Potencia' in df_hf.columns else {}
-                        if not potencias_hf.empty:
-                            st.bar_chart(potencias_hf)
-                        else:
-                            st.info("No hay datos de potencias HF")
+                with col_hf2:
+                    st.write("**Potencias HF más usadas:**")
+                    if not datos['potencias_hf'].empty:
+                        st.bar_chart(datos['potencias_hf'])
+                    else:
+                        st.info("No hay datos de potencias HF")
 
         else:
             st.info("No hay datos para el período seleccionado")
@@ -1475,6 +1079,7 @@ def show_sistemas_report():
     except Exception as e:
         st.error(f"Error al cargar el análisis de sistemas: {str(e)}")
 
+@metrics.medir('pagina')
 def show_tendencias_report():
     """Muestra análisis de tendencias a lo largo del tiempo"""
     st.subheader("📊 Análisis de Tendencias")
@@ -1508,29 +1113,16 @@ def show_tendencias_report():
         return
 
     try:
-        # Convertir fechas para consulta
-        fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
-        fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
+        import reportes_calculo
 
-        # Obtener datos para tendencias
-        reportes, estadisticas = db.get_reportes_por_fecha_rango(fecha_inicio_str, fecha_fin_str)
-
-        if reportes:
-            import pandas as pd
-            df_tendencias = pd.DataFrame([{
-                'Fecha': r.get('fecha_reporte', ''),
-                'Indicativo': r.get('indicativo', ''),
-                'Sistema': r.get('sistema', ''),
-                'Zona': r.get('zona', '')
-            } for r in reportes])
-
-            # Convertir fecha a datetime correctamente
-            # Las fechas vienen de la BD en formato datetime completo, no dd/mm/yyyy
-            df_tendencias['Fecha'] = pd.to_datetime(df_tendencias['Fecha'], format='mixed', dayfirst=True)
+        # Obtener datos para tendencias (solo si no están en caché)
+        datos = _datos_reporte(
+            ('datos_tendencias', fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d'), db.get_version_datos('reportes')),
+            lambda: reportes_calculo.datos_tendencias(db, fecha_inicio, fecha_fin)
+        )
 
-            # Agrupar por semana
-            df_tendencias['Semana'] = df_tendencias['Fecha'].dt.to_period('W').astype(str)
-            tendencia_semanal = df_tendencias.groupby('Semana').size().reset_index(name='Reportes')
+        if datos['num_reportes']:
+            tendencia_semanal = datos['tendencia_semanal']
 
             # Gráfico de tendencia
             st.subheader("📈 Tendencia de Actividad (por semana)")
@@ -1539,23 +1131,19 @@ def show_tendencias_report():
             # Análisis de crecimiento
             st.subheader("📊 Análisis de Crecimiento")
 
-            # Calcular crecimiento semanal
-            if len(tendencia_semanal) > 1:
-                crecimiento = tendencia_semanal['Reportes'].pct_change() * 100
-                crecimiento_promedio = crecimiento.mean()
-
+            # Crecimiento semanal (requiere al menos dos semanas)
+            if datos['crecimiento_promedio'] is not None:
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    st.metric("Crecimiento Promedio Semanal", f"{crecimiento_promedio:.1f}%")
+                    st.metric("Crecimiento Promedio Semanal", f"{datos['crecimiento_promedio']:.1f}%")
 
                 with col2:
-                    total_crecimiento = (tendencia_semanal['Reportes'].iloc[-1] / tendencia_semanal['Reportes'].iloc[0] - 1) * 100
-                    st.metric("Crecimiento Total del Período", f"{total_crecimiento:.1f}%")
+                    st.metric("Crecimiento Total del Período", f"{datos['crecimiento_total']:.1f}%")
 
             # Top estaciones más activas
             st.subheader("🏆 Estaciones Más Activas")
-            top_estaciones = df_tendencias['Indicativo'].value_counts().head(10)
+            top_estaciones = datos['top_estaciones']
 
             # Crear columnas para mostrar
             cols = st.columns(min(2, len(top_estaciones)))
@@ -1571,6 +1159,7 @@ def show_tendencias_report():
     except Exception as e:
         st.error(f"Error al cargar el análisis de tendencias: {str(e)}")
 
+@metrics.medir('pagina')
 def show_comparativos_report():
     """Muestra análisis comparativos entre diferentes períodos"""
     st.subheader("⚖️ Análisis Comparativos")
@@ -1635,77 +1224,42 @@ def show_comparativos_report():
         return
 
     try:
-        # Obtener datos para ambos períodos
-        p1_inicio_str = p1_fecha_inicio.strftime('%Y-%m-%d')
-        p1_fin_str = p1_fecha_fin.strftime('%Y-%m-%d')
-        p1_reportes, p1_estadisticas = db.get_reportes_por_fecha_rango(p1_inicio_str, p1_fin_str)
-
-        p2_inicio_str = p2_fecha_inicio.strftime('%Y-%m-%d')
-        p2_fin_str = p2_fecha_fin.strftime('%Y-%m-%d')
-        p2_reportes, p2_estadisticas = db.get_reportes_por_fecha_rango(p2_inicio_str, p2_fin_str)
-
-        # Crear dataframes para comparación
-        import pandas as pd
-
-        if p1_reportes and p2_reportes:
-            df_p1 = pd.DataFrame([{
-                'Indicativo': r.get('indicativo', ''),
-                'Sistema': r.get('sistema', ''),
-                'Zona': r.get('zona', ''),
-                'Estado': r.get('estado', '')
-            } for r in p1_reportes])
-
-            df_p2 = pd.DataFrame([{
-                'Indicativo': r.get('indicativo', ''),
-                'Sistema': r.get('sistema', ''),
-                'Zona': r.get('zona', ''),
-                'Estado': r.get('estado', '')
-            } for r in p2_reportes])
+        import reportes_calculo
+
+        # Obtener datos para ambos períodos (solo si no están en caché)
+        datos = _datos_reporte(
+            ('datos_comparativos',
+             *(fecha.strftime('%Y-%m-%d') for fecha in (p1_fecha_inicio, p1_fecha_fin, p2_fecha_inicio, p2_fecha_fin)),
+             db.get_version_datos('reportes')),
+            lambda: reportes_calculo.datos_comparativos(db, p1_fecha_inicio, p1_fecha_fin, p2_fecha_inicio, p2_fecha_fin)
+        )
 
+        if datos:
             # Comparación de métricas
             st.subheader("📊 Comparación de Métricas")
 
             col1, col2, col3, col4 = st.columns(4)
 
             with col1:
-                p1_total = p1_estadisticas.get('total_reportes', 0)
-                p2_total = p2_estadisticas.get('total_reportes', 0)
-                st.metric("Total Reportes", f"{p1_total} vs {p2_total}")
+                st.metric("Total Reportes", f"{datos['p1_total']} vs {datos['p2_total']}")
 
             with col2:
-                p1_estaciones = p1_estadisticas.get('estaciones_unicas', 0)
-                p2_estaciones = p2_estadisticas.get('estaciones_unicas', 0)
-                st.metric("Estaciones Únicas", f"{p1_estaciones} vs {p2_estaciones}")
+                st.metric("Estaciones Únicas", f"{datos['p1_estaciones']} vs {datos['p2_estaciones']}")
 
             with col3:
-                variacion_reportes = ((p2_total - p1_total) / max(p1_total, 1)) * 100
-                st.metric("Variación Reportes", f"{variacion_reportes:.1f}%")
+                st.metric("Variación Reportes", f"{datos['variacion_reportes']:.1f}%")
 
             with col4:
-                variacion_estaciones = ((p2_estaciones - p1_estaciones) / max(p1_estaciones, 1)) * 100
-                st.metric("Variación Estaciones", f"{variacion_estaciones:.1f}%")
+                st.metric("Variación Estaciones", f"{datos['variacion_estaciones']:.1f}%")
 
             # Comparación por sistemas
             st.subheader("📡 Comparación por Sistemas")
-
-            p1_sistemas = df_p1['Sistema'].value_counts()
-            p2_sistemas = df_p2['Sistema'].value_counts()
-
-            # Crear dataframe comparativo
-            df_comparativo = pd.DataFrame({
-                'Período 1': p1_sistemas,
-                'Período 2': p2_sistemas
-            }).fillna(0)
-
-            st.bar_chart(df_comparativo)
+            st.bar_chart(datos['df_comparativo'])
 
             # Nuevas estaciones
             st.subheader("🆕 Nuevas Estaciones")
-            estaciones_p1 = set(df_p1['Indicativo'])
-            estaciones_p2 = set(df_p2['Indicativo'])
-
-            nuevas = estaciones_p2 - estaciones_p1
-            perdidas = estaciones_p1 - estaciones_p2
+            nuevas = datos['nuevas']
+            perdidas = datos['perdidas']
 
             col1, col2 = st.columns(2)
 
@@ -1725,8 +1279,46 @@ def show_comparativos_report():
             st.info("No hay datos suficientes para la comparación")
 
     except Exception as e:
-        st.error(f"Error al cargar el análisis comparativo: {str(e)}")
+        st.error(f"Error al cargar el análisis comparativo: {str(e)}")
+
+def _mostrar_descarga_pdf_evento(clave_pdf):
+    """Muestra el botón de descarga del PDF del evento o espera a que termine de generarse"""
+    import reportes_pdf
+
+    trabajo = reportes_pdf.obtener_trabajo(clave_pdf)
+    if trabajo is None:
+        return
+
+    if not trabajo.done():
+        _esperar_pdf_evento(clave_pdf)
+        return
+
+    try:
+        pdf_bytes = trabajo.result()
+    except Exception as e:
+        st.error(f"Error al generar el PDF: {str(e)}")
+        del st.session_state['pdf_evento_clave']
+        return
+
+    st.download_button(
+        label="⬇️ Descargar PDF",
+        data=pdf_bytes,
+        file_name=f"reporte_{clave_pdf[0]}_{clave_pdf[1]}.pdf",
+        mime="application/pdf",
+        use_container_width=True
+    )
+
+@st.fragment(run_every=1.0)
+def _esperar_pdf_evento(clave_pdf):
+    """Revisa cada segundo el trabajo del PDF; solo este fragmento se vuelve a ejecutar"""
+    import reportes_pdf
+
+    trabajo = reportes_pdf.obtener_trabajo(clave_pdf)
+    if trabajo is None or trabajo.done():
+        st.rerun()
+    st.info("⏳ Generando PDF...")
 
+@metrics.medir('pagina')
 def show_evento_report():
     """Muestra reportes por evento específico con estadísticas y exportación"""
     st.subheader("📅 Reportes por Evento")
@@ -1765,8 +1357,10 @@ def show_evento_report():
             # Convertir fecha para consulta
             fecha_str = fecha_evento.strftime('%Y-%m-%d')
 
-            # Obtener reportes para el evento y fecha específicos
-            reportes, estadisticas = db.get_reportes_por_fecha_rango(fecha_str, fecha_str)
+            # Obtener reportes para el evento y fecha específicos junto con la versión de
+            # la tabla reportes (misma transacción), que identifica el PDF en caché
+            reportes, version_reportes = db.get_reportes_del_dia(fecha_str)
+            reportes.sort(key=lambda r: r.get('fecha_reporte') or '', reverse=True)
 
             # Filtrar solo los reportes del evento seleccionado
             reportes_evento = [r for r in reportes if r.get('tipo_reporte') == evento_seleccionado]
@@ -1791,6 +1385,7 @@ def show_evento_report():
                     'evento': evento_seleccionado,
                     'fecha': fecha_str,
                     'reportes': reportes_evento,
+                    'version_reportes': version_reportes,
                     'df_evento': df_evento,
                     'usuario': st.session_state.get('user', {})
                 }
@@ -1868,34 +1463,22 @@ def show_evento_report():
 
         with col1:
             if st.button("📊 Excel", use_container_width=True):
-                # Crear Excel con información detallada
-                buffer = io.BytesIO()
-
-                with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                    # Hoja principal con estadísticas
-                    stats_df = pd.DataFrame({
-                        'Métrica': ['Evento', 'Fecha', 'Total Reportes', 'Estaciones Únicas',
-                                  'Zona Más Reportada', 'Sistema Más Usado', 'Generado por'],
-                        'Valor': [datos['evento'], datos['fecha'], len(datos['reportes']),
-                                estaciones_unicas, zona_mas_reportada, sistema_mas_usado,
-                                f"{indicativo_usuario} - {nombre_usuario}"]
-                    })
-                    stats_df.to_excel(writer, sheet_name='Estadísticas', index=False)
-
-                    # Hoja con datos detallados
-                    datos['df_evento'].to_excel(writer, sheet_name='Datos Detallados', index=False)
-
-                    # Hoja con distribución por zona
-                    df_zonas.to_excel(writer, sheet_name='Por Zona', index=False)
+                # Crear Excel con información detallada; el detalle se lee directo del cursor
+                import exportacion
+                import reportes_pdf
 
-                    # Hoja con distribución por sistema
-                    df_sistemas.to_excel(writer, sheet_name='Por Sistema', index=False)
-
-                buffer.seek(0)
+                datos_reporte = reportes_pdf.datos_evento(
+                    datos['evento'], datos['fecha'], datos['reportes'], f"{indicativo_usuario} - {nombre_usuario}"
+                )
+                ruta = exportacion.exportar_evento(
+                    db, datos['evento'], datetime.strptime(datos['fecha'], '%Y-%m-%d').date(),
+                    exportacion.estadisticas_evento(datos_reporte), datos_reporte['zonas'], datos_reporte['sistemas'],
+                    formato='xlsx'
+                )
 
                 st.download_button(
                     label="⬇️ Descargar Excel",
-                    data=buffer,
+                    data=exportacion.leer_y_borrar(ruta),
                     file_name=f"reporte_{datos['evento']}_{datos['fecha']}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     use_container_width=True
@@ -1904,10 +1487,15 @@ def show_evento_report():
         with col2:
             if st.button("📄 CSV", use_container_width=True):
                 # Crear CSV con datos principales
-                csv_data = datos['df_evento'].to_csv(index=False, encoding='utf-8')
+                import exportacion
+
+                ruta = exportacion.exportar_evento(
+                    db, datos['evento'], datetime.strptime(datos['fecha'], '%Y-%m-%d').date(),
+                    [], [], [], formato='csv'
+                )
                 st.download_button(
                     label="⬇️ Descargar CSV",
-                    data=csv_data,
+                    data=exportacion.leer_y_borrar(ruta),
                     file_name=f"reporte_{datos['evento']}_{datos['fecha']}.csv",
                     mime="text/csv",
                     use_container_width=True
@@ -1915,680 +1503,19 @@ def show_evento_report():
 
         with col3:
             if st.button("📋 PDF", use_container_width=True):
-                # Generar PDF con información detallada
-                from reportlab.lib import colors
-                from reportlab.lib.pagesizes import letter, A4, landscape
-                from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image, Frame, PageTemplate, HRFlowable, NextPageTemplate, BaseDocTemplate
-                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-                from reportlab.lib.units import inch
-                from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
-                from reportlab.pdfgen.canvas import Canvas
-                import textwrap
-                import os
-
-                # Crear buffer para el PDF
-                buffer = io.BytesIO()
-
-                # Función para crear el encabezado ultra compacto
-                def create_header(canvas, doc, **kwargs):
-                    canvas.saveState()
-                    
-                    # Configuración de márgenes y tamaños
-                    logo_size = 0.2 * inch  # Logo muy pequeño
-                    top_margin = 0  # Sin margen superior
-                    
-                    # Texto del encabezado - todo en una sola línea compacta
-                    canvas.setFont('Helvetica', 4)  # Fuente más pequeña y normal (no negrita)
-                    canvas.setFillColor(colors.HexColor('#333333'))  # Gris oscuro para mejor legibilidad
-                    
-                    # Texto en una sola línea: Evento | Fecha | Página
-                    fecha_formateada = datetime.strptime(datos['fecha'], '%Y-%m-%d').strftime('%d/%m/%y')
-                    # Acortar el nombre del evento a 15 caracteres máximo
-                    evento = (datos['evento'][:12] + '...') if len(datos['evento']) > 15 else datos['evento']
-                    header_text = f"{evento} | {fecha_formateada} | {canvas.getPageNumber()}"
-                    
-                    # Posición del texto (arriba a la izquierda)
-                    text_x = doc.leftMargin
-                    text_y = A4[1] - 0.15 * inch  # Muy pegado al borde superior
-                    
-                    # Logo pequeño en la esquina superior derecha
-                    logo_path = os.path.join(os.path.dirname(__file__), 'assets', 'LogoFMRE_small.png')
-                    if os.path.exists(logo_path):
-                        logo = Image(logo_path, width=logo_size, height=logo_size)
-                        logo.drawOn(canvas, A4[0] - doc.rightMargin - logo_size, A4[1] - logo_size - top_margin)
-                    
-                    # Dibujar el texto
-                    canvas.drawString(text_x, text_y, header_text)
-                    
-                    # Línea divisoria muy fina
-                    line_y = text_y - 0.1 * inch
-                    canvas.setStrokeColor(colors.HexColor('#CCCCCC'))  # Línea gris claro
-                    canvas.setLineWidth(0.1)
-                    canvas.line(doc.leftMargin, line_y, A4[0] - doc.rightMargin, line_y)
-                    
-                    # Ajustar el margen superior del contenido
-                    doc.topMargin = 0.15 * inch  # Mínimo espacio necesario
-                    
-                    canvas.restoreState()
-                    
-                    # Llamar al método onPage de la plantilla si existe
-                    if hasattr(doc, 'onPage'):
-                        doc.onPage(canvas, doc)
-
-                # Función para agregar el encabezado a cada página
-                def add_header_footer(canvas, doc):
-                    # Guardar el estado del canvas
-                    canvas.saveState()
-                    
-                    # Configuración de márgenes y tamaños
-                    logo_size = 0.2 * inch
-                    
-                    # Texto del encabezado
-                    canvas.setFont('Helvetica', 4)
-                    canvas.setFillColor(colors.HexColor('#333333'))
-                    
-                    # Texto en una sola línea: Evento | Fecha | Página
-                    fecha_formateada = datetime.strptime(datos['fecha'], '%Y-%m-%d').strftime('%d/%m/%y')
-                    evento = (datos['evento'][:12] + '...') if len(datos['evento']) > 15 else datos['evento']
-                    
-                    # Texto del encabezado (sin logo)
-                    header_text = f"{evento} | {fecha_formateada} | Página {canvas.getPageNumber()}"
-                    canvas.drawString(doc.leftMargin, doc.height + doc.bottomMargin + 5, header_text)
-                    
-                    # Línea divisoria
-                    canvas.setStrokeColor(colors.HexColor('#CCCCCC'))
-                    canvas.setLineWidth(0.1)
-                    canvas.line(doc.leftMargin, doc.bottomMargin + 2, 
-                              doc.width + doc.leftMargin, doc.bottomMargin + 2)
-                    
-                    # Restaurar el estado del canvas
-                    canvas.restoreState()
-                
-                # Crear una clase de documento personalizada que ignora los cambios de plantilla
-                class SimpleDocTemplateNoTemplates(SimpleDocTemplate):
-                    def handle_nextPageTemplate(self, *args, **kwargs):
-                        # Ignorar cualquier intento de cambiar la plantilla
-                        pass
-                
-                # Crear el documento PDF con nuestra clase personalizada
-                doc = SimpleDocTemplateNoTemplates(
-                    buffer,
-                    pagesize=letter,
-                    rightMargin=72,
-                    leftMargin=72,
-                    topMargin=36,  # Espacio para el encabezado
-                    bottomMargin=36
-                )
-                
-                # Inicializar la historia como una lista normal
-                story = []
-
-                # Estilos compactos
-                styles = getSampleStyleSheet()
-
-                # Estilo para el título principal (más compacto)
-                title_style = ParagraphStyle(
-                    'CustomTitle',
-                    parent=styles['Heading1'],
-                    fontSize=16,
-                    spaceAfter=8,
-                    textColor=colors.HexColor('#1f4e79'),
-                    alignment=1
-                )
-
-                # Estilo para el subtítulo (más compacto)
-                subtitle_style = ParagraphStyle(
-                    'CustomSubtitle',
-                    parent=styles['Heading2'],
-                    fontSize=12,
-                    spaceAfter=5,
-                    textColor=colors.HexColor('#2c5f2d'),
-                    alignment=1
-                )
-
-                # Estilo para información general (más compacto)
-                info_style = ParagraphStyle(
-                    'InfoStyle',
-                    parent=styles['Normal'],
-                    fontSize=10,
-                    spaceAfter=3,
-                    textColor=colors.HexColor('#333333'),
-                    alignment=0
-                )
-
-                # Estilo para secciones con formato de oración
-                section_style = ParagraphStyle(
-                    'SectionStyle',
-                    parent=styles['Normal'],
-                    fontSize=12,
-                    fontName='Helvetica-Bold',
-                    spaceBefore=0,
-                    spaceAfter=0,   # Controlamos el espacio con Spacer
-                    leading=12,     # Mismo que el tamaño de fuente
-                    textColor=colors.HexColor('#1f4e79'),
-                    leftIndent=0,
-                    rightIndent=0,
-                    textTransform='none'  # Asegura que no se aplique mayúsculas
-                )
-
-                normal_style = styles['Normal']
-
-                # Contenido del PDF
-                story = []
-                
-                # Primera página en retrato
-                story.append(NextPageTemplate('Portrait'))
-
-                # Información del evento (más compacta)
-                event_info = [
-                    f"<b>Evento:</b> {datos['evento']} | <b>Fecha:</b> {datos['fecha']}",
-                    f"<b>Generado por:</b> {indicativo_usuario} - {nombre_usuario} | <b>Fecha de generación:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                ]
-
-                for info in event_info:
-                    story.append(Paragraph(info, info_style))
-
-                story.append(Spacer(1, 10))
-
-                # Estadísticas principales con mejor formato
-                story.append(Paragraph("Estadísticas del evento", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                stats_data = [
-                    ['Métrica', 'Valor', 'Detalles'],
-                    ['Total de Reportes', str(len(datos['reportes'])), f"Participantes activos: {len(datos['reportes'])}"],
-                    ['Estaciones Únicas', str(estaciones_unicas), f"Diferentes estaciones que reportaron"],
-                    ['Zona Más Reportada', zona_mas_reportada, f"Concentración geográfica principal"],
-                    ['Sistema Más Usado', sistema_mas_usado, f"Tecnología de radio predominante"],
-                    ['Cobertura Geográfica', f"{datos['df_evento']['Estado'].nunique()} estados", f"Alcance territorial del evento"]
-                ]
-
-                # Crear la tabla directamente con los datos
-                stats_table = Table(stats_data)
-                stats_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),  # Tamaño de fuente 10pt
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Espaciado reducido
-                    ('TOPPADDING', (0, 0), (-1, 0), 4),  # Espaciado superior añadido
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#333333')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),  # Tamaño de fuente reducido
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6')),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 3)  # Espaciado reducido
-                ]))
-                story.append(stats_table)
-                # Título con formato de oración
-                story.append(Paragraph("Distribución por zona geográfica", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                zonas_data = [['Zona', 'Cantidad', 'Porcentaje', 'Participación']]
-                for _, row in df_zonas.iterrows():
-                    zonas_data.append([
-                        str(row['Zona']),
-                        str(int(row['Cantidad'])),
-                        f"{row['Porcentaje']:.1f}%",
-                        "●" * min(int(row['Cantidad']), 10)
-                    ])
-
-                zonas_table = Table(zonas_data)
-                zonas_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5f2d')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),  # Tamaño de fuente 10pt
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Espaciado reducido
-                    ('TOPPADDING', (0, 0), (-1, 0), 4),  # Espaciado superior añadido
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f8f0')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#2c5f2d')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),  # Tamaño de fuente reducido
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#90EE90')),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 3)  # Espaciado reducido
-                ]))
-                story.append(zonas_table)
-# Título con formato de oración
-                story.append(Paragraph("Principales estados participantes", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                # Calcular los 3 estados con más reportes
-                estados_count = datos['df_evento']['Estado'].value_counts()
-                top_estados = estados_count.head(3)
-
-                estados_data = [['Estado', 'Reportes', 'Porcentaje', 'Participación']]
-                for estado, cantidad in top_estados.items():
-                    if estado and estado.strip():
-                        porcentaje = (cantidad / len(datos['df_evento']) * 100)
-                        estados_data.append([
-                            str(estado),
-                            str(int(cantidad)),
-                            f"{porcentaje:.1f}%",
-                            "●" * min(int(cantidad), 12)
-                        ])
-
-                if len(estados_data) > 1:
-                    estados_table = Table(estados_data)
-                    estados_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DC143C')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 10),  # Tamaño de fuente reducido
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Espaciado reducido
-                        ('TOPPADDING', (0, 0), (-1, 0), 4),  # Espaciado superior añadido
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF0F0')),
-                        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#DC143C')),
-                        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                        ('FONTSIZE', (0, 1), (-1, -1), 8),  # Tamaño de fuente reducido
-                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#FFB6C1')),
-                        ('BOTTOMPADDING', (0, 1), (-1, -1), 3)  # Espaciado reducido
-                    ]))
-                    story.append(estados_table)
-    # Título con formato de oración
-                story.append(Paragraph("Distribución por sistema de radio", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                sistemas_data = [['Sistema', 'Cantidad', 'Porcentaje', 'Uso']]
-                for _, row in df_sistemas.iterrows():
-                    sistemas_data.append([
-                        str(row['Sistema']),
-                        str(int(row['Cantidad'])),
-                        f"{row['Porcentaje']:.1f}%",
-                        "●" * min(int(row['Cantidad']), 8)
-                    ])
-
-                sistemas_table = Table(sistemas_data)
-                sistemas_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8B4513')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 9),  # Tamaño de fuente reducido a 9pt
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Espaciado reducido
-                    ('TOPPADDING', (0, 0), (-1, 0), 4),  # Espaciado superior añadido
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF8DC')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#8B4513')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),  # Tamaño de fuente reducido
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DEB887')),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 3)  # Espaciado reducido
-                ]))
-                story.append(sistemas_table)
-
-                # Generar el PDF con la historia
-                try:
-                    doc.build(story, onFirstPage=add_header_footer, onLaterPages=add_header_footer)
-                except Exception as e:
-                    st.error(f"Error al generar el PDF: {str(e)}")
-
-                # Estilos personalizados
-                styles = getSampleStyleSheet()
-
-                # Estilo para el título principal
-                title_style = ParagraphStyle(
-                    'CustomTitle',
-                    parent=styles['Heading1'],
-                    fontSize=20,  # Reducido de 28
-                    spaceAfter=15,  # Reducido de 20
-                    textColor=colors.HexColor('#1f4e79'),  # Azul FMRE
-                    alignment=1  # Centrado
-                )
-
-                # Estilo para el subtítulo
-                subtitle_style = ParagraphStyle(
-                    'CustomSubtitle',
-                    parent=styles['Heading2'],
-                    fontSize=14,  # Reducido de 18
-                    spaceAfter=10,  # Reducido de 15
-                    textColor=colors.HexColor('#2c5f2d'),  # Verde FMRE
-                    alignment=1  # Centrado
-                )
-
-                # Estilo para información general (más compacto)
-                info_style = ParagraphStyle(
-                    'InfoStyle',
-                    parent=styles['Normal'],
-                    fontSize=10,
-                    spaceAfter=4,  # Reducido de 10 a 4 puntos
-                    textColor=colors.HexColor('#333333'),
-                    alignment=1,  # Centrado
-                    leading=12    # Interlineado reducido
-                )
-
-                # Estilo para secciones con formato de oración
-                section_style = ParagraphStyle(
-                    'SectionStyle',
-                    parent=styles['Normal'],
-                    fontSize=12,
-                    fontName='Helvetica-Bold',
-                    spaceBefore=0,
-                    spaceAfter=0,   # Controlamos el espacio con Spacer
-                    leading=12,     # Mismo que el tamaño de fuente
-                    textColor=colors.HexColor('#1f4e79'),
-                    leftIndent=0,
-                    rightIndent=0,
-                    textTransform='none'  # Asegura que no se aplique mayúsculas
-                )
-
-                normal_style = styles['Normal']
-
-                # Inicializar la historia
-                story = []
-
-                # Encabezado compacto con logo y título
-                logo_path = os.path.join(os.path.dirname(__file__), 'assets', 'LogoFMRE_medium.png')
-                
-                # Estilo de párrafo para el encabezado
-                header_style = ParagraphStyle(
-                    'HeaderStyle',
-                    fontName='Helvetica-Bold',
-                    fontSize=11,  # Aumentado a 11 puntos
-                    leading=13,   # Interlineado ajustado
-                    spaceBefore=0,
-                    spaceAfter=0,
-                    alignment=TA_CENTER,
-                    textColor=colors.HexColor('#006400'),
-                    leftIndent=0,
-                    rightIndent=0
-                )
-
-                # Verificar si el logo existe
-                if os.path.exists(logo_path):
-                    # Crear tabla para el encabezado con tamaño reducido
-                    # Tabla con logo y texto, manteniendo proporciones
-                    header_data = [
-                        [
-                            Image(logo_path, width=0.8*inch, height=0.8*inch, kind='proportional'),
-                            Paragraph("FEDERACIÓN MEXICANA DE RADIOEXPERIMENTADORES", header_style)
-                        ]
-                    ]
-
-                    # Crear tabla con borde para el encabezado
-                    header_table = Table(header_data, 
-                                     colWidths=[1.0*inch, 5*inch],  # Anchos de columna fijos
-                                     rowHeights=[0.7*inch])  # Altura reducida para el encabezado
-                    header_table.setStyle(TableStyle([
-                        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                        ('ALIGN', (1, 0), (1, 0), 'CENTER'),
-                        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),  # Reducido de 8 a 6
-                        ('TOPPADDING', (0, 0), (-1, -1), 6),     # Reducido de 8 a 6
-                        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                        ('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#2c3e50')),
-                        ('FONTSIZE', (0, 0), (-1, -1), 10),  # Tamaño de fuente reducido
-                        # Borde sutil alrededor del encabezado
-                        ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#DDDDDD')),
-                        # Línea vertical entre el logo y el texto
-                        ('LINEAFTER', (0, 0), (0, 0), 0.5, colors.HexColor('#DDDDDD')),
-                        # Fondo ligeramente coloreado
-                        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F8F9FA'))
-                    ]))
-                    # Añadir espacio antes del encabezado con borde
-                    story.append(Spacer(1, 6))
-                    # Añadir el encabezado con borde
-                    story.append(header_table)
-                    # Espacio después del encabezado
-                    story.append(Spacer(1, 6))
-                else:
-                    # Si no hay logo, solo el título centrado
-                    story.append(Paragraph("FEDERACIÓN MEXICANA DE RADIOEXPERIMENTADORES", 
-                                        style=ParagraphStyle(
-                                            'HeaderNoLogo',
-                                            fontName='Helvetica-Bold',
-                                            fontSize=8,
-                                            alignment=TA_CENTER,
-                                            spaceAfter=2
-                                        )))
-                    story.append(Spacer(1, 2))  # Espacio mínimo después del encabezado sin logo
-
-                # Información del evento
-                story.append(Paragraph(f"<b>Evento:</b> {datos['evento']}", info_style))
-                story.append(Paragraph(f"<b>Fecha del Evento:</b> {datos['fecha']}", info_style))
-                story.append(Paragraph(f"<b>Fecha de Generación:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", info_style))
-                story.append(Paragraph(f"<b>Generado por:</b> {indicativo_usuario} - {nombre_usuario}", info_style))
-                story.append(Spacer(1, 2))  # Espacio reducido después de la información
-
-                # Línea divisoria más delgada
-                story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#CCCCCC')))
-                # Título con formato de oración
-                story.append(Paragraph("Estadísticas del evento", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                stats_data = [
-                    ['Métrica', 'Valor', 'Detalles'],
-                    ['Total de Reportes', str(len(datos['reportes'])), f"Participantes activos: {len(datos['reportes'])}"],
-                    ['Estaciones Únicas', str(estaciones_unicas), f"Diferentes estaciones que reportaron"],
-                    ['Zona Más Reportada', zona_mas_reportada, f"Concentración geográfica principal"],
-                    ['Sistema Más Usado', sistema_mas_usado, f"Tecnología de radio predominante"],
-                    ['Cobertura Geográfica', f"{datos['df_evento']['Estado'].nunique()} estados", f"Alcance territorial del evento"]
-                ]
-
-                stats_table = Table(stats_data)
-                stats_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),  # Reducido de 14 a 10
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Reducido de 12 a 6
-                    ('TOPPADDING', (0, 0), (-1, 0), 4),  # Añadido padding superior
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#333333')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),  # Reducido de 10 a 8
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6')),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 3)  # Reducido de 8 a 3
-                ]))
-                story.append(stats_table)
-                story.append(Spacer(1, 25))
-
-                # Distribución por Zona con mejor formato
-                story.append(Paragraph("Distribución por zona geográfica", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                zonas_data = [['Zona', 'Cantidad', 'Porcentaje', 'Participación']]
-                for _, row in df_zonas.iterrows():
-                    zonas_data.append([
-                        str(row['Zona']),
-                        str(int(row['Cantidad'])),
-                        f"{row['Porcentaje']:.1f}%",
-                        "●" * min(int(row['Cantidad']), 10)  # Indicador visual
-                    ])
-
-                zonas_table = Table(zonas_data)
-                zonas_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5f2d')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),  # Tamaño de fuente 10pt
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Espaciado reducido
-                    ('TOPPADDING', (0, 0), (-1, 0), 4),  # Espaciado superior añadido
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f8f0')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#2c5f2d')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),  # Tamaño de fuente reducido
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#90EE90')),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 3)  # Espaciado reducido
-                ]))
-                story.append(zonas_table)
-                story.append(Spacer(1, 20))
-
-                # Principales Estados de México
-                story.append(Paragraph("Principales estados participantes", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                # Calcular los 3 estados con más reportes
-                estados_count = datos['df_evento']['Estado'].value_counts()
-                top_estados = estados_count.head(3)
-
-                estados_data = [['Estado', 'Reportes', 'Porcentaje', 'Participación']]
-                for estado, cantidad in top_estados.items():
-                    if estado and estado.strip():  # Solo incluir estados no vacíos
-                        porcentaje = (cantidad / len(datos['df_evento']) * 100)
-                        estados_data.append([
-                            str(estado),
-                            str(int(cantidad)),
-                            f"{porcentaje:.1f}%",
-                            "●" * min(int(cantidad), 12)  # Indicador visual
-                        ])
-
-                # Solo agregar la tabla si hay estados
-                if len(estados_data) > 1:
-                    estados_table = Table(estados_data)
-                    estados_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DC143C')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 10),  # Tamaño de fuente 10pt
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Reducido de 10 a 6
-                        ('TOPPADDING', (0, 0), (-1, 0), 4),  # Añadido padding superior
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF0F0')),
-                        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#DC143C')),
-                        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                        ('FONTSIZE', (0, 1), (-1, -1), 9),  # Mantenido en 9
-                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#FFB6C1')),
-                        ('BOTTOMPADDING', (0, 1), (-1, -1), 4)  # Reducido de 6 a 4
-                    ]))
-                    story.append(estados_table)
-                    story.append(Spacer(1, 20))
-
-                # Distribución por Sistema con mejor formato
-                story.append(Paragraph("Distribución por sistema de radio", section_style))
-                story.append(Spacer(1, 8))  # Espacio después del título
-
-                sistemas_data = [['Sistema', 'Cantidad', 'Porcentaje', 'Uso']]
-                for _, row in df_sistemas.iterrows():
-                    sistemas_data.append([
-                        str(row['Sistema']),
-                        str(int(row['Cantidad'])),
-                        f"{row['Porcentaje']:.1f}%",
-                        "●" * min(int(row['Cantidad']), 8)  # Indicador visual
-                    ])
-
-                sistemas_table = Table(sistemas_data)
-                sistemas_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#8B4513')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),  # Reducido de 12 a 10
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),  # Reducido de 10 a 6
-                    ('TOPPADDING', (0, 0), (-1, 0), 4),  # Añadido padding superior
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#FFF8DC')),
-                    ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#8B4513')),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),  # Mantenido en 9
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#DEB887')),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 4)  # Reducido de 6 a 4
-                ]))
-                story.append(sistemas_table)
-
-                # Pie de página más elegante
-                story.append(Spacer(1, 30))
-                
-                # Crear una tabla de una celda para la línea divisoria que ocupe todo el ancho
-                from reportlab.platypus import Table
-                
-                # Calcular el ancho disponible (ancho de página - márgenes)
-                page_width = A4[0]  # Ancho de la hoja A4 en puntos (595.2755905511812)
-                available_width = page_width - doc.leftMargin - doc.rightMargin
-                
-                # Crear una tabla de una celda con borde inferior
-                line_table = Table([[None]], colWidths=[available_width])
-                line_table.setStyle(TableStyle([
-                    ('LINEBELOW', (0, 0), (0, 0), 0.5, colors.HexColor('#CCCCCC')),
-                    ('BOTTOMPADDING', (0, 0), (0, 0), 10)
-                ]))
-                
-                story.append(line_table)
-                story.append(Spacer(1, 5))
-                
-                # Texto del pie de página centrado
-                footer_style = ParagraphStyle(
-                    'FooterStyle',
-                    parent=info_style,
-                    alignment=TA_CENTER,
-                    spaceAfter=0,
-                    spaceBefore=0
-                )
-                
-                story.append(Paragraph("Federación Mexicana de Radioexperimentadores, A.C.", footer_style))
-                story.append(Paragraph("Reporte generado automáticamente por el Sistema QMS", footer_style))
-                story.append(Paragraph(f"© {datetime.now().year} FMRE - Todos los derechos reservados", footer_style))
-
-                # Agregar página de reporte de actividad en horizontal
-                story.append(PageBreak())
-                story.append(NextPageTemplate('Landscape'))
-                
-                # Título de la segunda página
-                story.append(Paragraph("Reporte de Actividad", section_style))
-                story.append(Spacer(1, 12))
-                
-                # Aquí puedes agregar el contenido de la segunda página
-                # Por ejemplo, una tabla con los reportes
-                if len(datos['reportes']) > 0:
-                    # Crear tabla con los reportes
-                    reportes_data = [['Indicativo', 'Estado', 'Ciudad', 'Zona', 'Sistema', 'Frecuencia', 'Modo']]
-                    for reporte in datos['reportes']:
-                        reportes_data.append([
-                            reporte.get('indicativo', ''),
-                            reporte.get('estado', ''),
-                            reporte.get('ciudad', ''),
-                            reporte.get('zona', ''),
-                            reporte.get('sistema', ''),
-                            reporte.get('frecuencia', ''),
-                            reporte.get('modo', '')
-                        ])
-                    
-                    # Crear tabla con los reportes
-                    reportes_table = Table(reportes_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 0.8*inch, 1.2*inch, 0.8*inch, 0.8*inch])
-                    reportes_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, 0), 8),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-                        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#333333')),
-                        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                        ('FONTSIZE', (0, 1), (-1, -1), 7),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6')),
-                        ('BOTTOMPADDING', (0, 1), (-1, -1), 3)
-                    ]))
-                    story.append(reportes_table)
-                
-                # Pie de página para la segunda página
-                story.append(Spacer(1, 10))
-                story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#CCCCCC')))
-                story.append(Spacer(1, 5))
-                story.append(Paragraph("Federación Mexicana de Radioexperimentadores, A.C. - Reporte de Actividad", footer_style))
-
-                # Generar el PDF
-                try:
-                    doc.build(story, onFirstPage=create_header, onLaterPages=create_header)
-                except Exception as e:
-                    st.error(f"Error al generar el PDF: {str(e)}")
-                    return None
+                # El PDF se genera en un proceso aparte y se guarda en caché por
+                # (evento, fecha, versión de los reportes con que se generó el reporte, usuario)
+                import reportes_pdf
 
-                # Posicionar el buffer al inicio
-                buffer.seek(0)
+                clave_pdf = (datos['evento'], datos['fecha'], datos['version_reportes'], indicativo_usuario)
+                reportes_pdf.solicitar_pdf_evento(clave_pdf, reportes_pdf.datos_evento(
+                    datos['evento'], datos['fecha'], datos['reportes'], f"{indicativo_usuario} - {nombre_usuario}"
+                ))
+                st.session_state.pdf_evento_clave = clave_pdf
 
-                # Botón de descarga
-                st.download_button(
-                    label="⬇️ Descargar PDF",
-                    data=buffer,
-                    file_name=f"reporte_{datos['evento']}_{datos['fecha']}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            clave_pdf = st.session_state.get('pdf_evento_clave')
+            if clave_pdf and clave_pdf[:2] == (datos['evento'], datos['fecha']):
+                _mostrar_descarga_pdf_evento(clave_pdf)
 
         # Información adicional
         st.subheader("ℹ️ Información del Reporte")
@@ -2616,12 +1543,13 @@ def show_evento_report():
     else:
         st.info(f"No hay reportes para el evento '{evento_seleccionado}' en la fecha {fecha_evento.strftime('%Y-%m-%d')}")
 
+@metrics.medir('pagina')
 def show_settings():
     """Muestra la configuración del sistema"""
     st.title("⚙️ Configuración del Sistema")
     
     # Pestañas para las diferentes configuraciones
-    tab1, tab2, tab3 = st.tabs(["Correo Electrónico", "Opciones del Sistema", "Consulta SQL"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Correo Electrónico", "Opciones del Sistema", "Consulta SQL", "📈 Métricas"])
     
     with tab1:
         st.header("Configuración SMTP")
@@ -2670,7 +1598,7 @@ def show_settings():
                     # Probar conexión
                     with st.spinner("Probando conexión con el servidor SMTP..."):
                         email_sender = EmailSender(db)
-                        server_conn, _ = email_sender.get_smtp_connection()
+                        server_conn, _ = email_sender.get_smtp_connection(test_config)
                         server_conn.quit()
                         st.success("Conexión exitosa con el servidor SMTP")
                         
@@ -2697,21 +1625,70 @@ def show_settings():
                     
                 except Exception as e:
                     st.error(f"❌ Error al guardar la configuración: {str(e)}")
+
+        st.subheader("📤 Buzón de salida")
+        estado_buzon = db.get_estado_buzon_correos()
+        col_pend, col_env, col_fall = st.columns(3)
+        col_pend.metric("Pendientes", estado_buzon.get('pendiente', 0) + estado_buzon.get('enviando', 0))
+        col_env.metric("Enviados", estado_buzon.get('enviado', 0))
+        col_fall.metric("Fallidos", estado_buzon.get('fallido', 0))
+        if estado_buzon.get('ultimo_error'):
+            st.caption(f"Último error: {estado_buzon['ultimo_error']}")
+        if estado_buzon.get('fallido', 0) and st.button("🔁 Reintentar fallidos"):
+            reintentados, descartados = EmailSender(db).reintentar_fallidos()
+            st.success(f"✅ {reintentados} correos devueltos al buzón "
+                       "(las credenciales se reenvían con una contraseña temporal nueva)")
+            if descartados:
+                st.info(f"ℹ️ {descartados} correos de credenciales descartados: el usuario ya inició sesión, "
+                        "está inactivo o ya no existe")
     
     with tab2:
         st.header("Opciones del Sistema")
         st.write("Configuración general del sistema.")
         # Aquí puedes agregar más opciones de configuración en el futuro
-    
+
+        st.subheader("🗄️ Archivo Anual de Reportes")
+        st.caption("Mueve los años cerrados a archivos reportes_AAAA.db para mantener ligera la tabla activa. "
+                   "Los años archivados se consultan en modo solo lectura cuando un rango de fechas los incluye.")
+
+        try:
+            anios_archivados = db.get_anios_archivados()
+            anio_actual = get_current_cdmx_time().year
+            anios_cerrados = [anio for anio in db.get_anios_con_reportes() if anio < anio_actual]
+
+            st.write(f"**Años archivados:** {', '.join(str(a) for a in anios_archivados) if anios_archivados else 'Ninguno'}")
+
+            if anios_cerrados:
+                col_anio, col_boton = st.columns([2, 1])
+                with col_anio:
+                    anio_archivar = st.selectbox("Año a archivar", anios_cerrados, key="anio_archivar")
+                with col_boton:
+                    st.write("")
+                    if st.button("🗄️ Archivar año", key="btn_archivar_anio", width='stretch'):
+                        with st.spinner(f"Archivando reportes de {anio_archivar}..."):
+                            archivados = db.archivar_reportes_anio(anio_archivar)
+                        st.success(f"✅ Se archivaron {archivados} reportes de {anio_archivar}")
+                        time.sleep(1)
+                        st.rerun()
+            else:
+                st.info("No hay años cerrados pendientes de archivar.")
+        except Exception as e:
+            st.error(f"❌ Error en el archivo anual de reportes: {str(e)}")
+
     with tab3:
         st.header("Consulta SQL Directa")
-        st.warning("⚠️ ADVERTENCIA: Esta herramienta permite ejecutar consultas SQL directamente en la base de datos. "
-                  "Úsala con precaución, ya que las consultas pueden modificar o eliminar datos.")
+        st.info("ℹ️ Las consultas se ejecutan en una conexión de solo lectura: no pueden modificar datos. "
+                "Cada consulta tiene un tiempo límite y un máximo de filas; detener la página cancela la consulta en curso.")
         
         # Área para escribir la consulta SQL
         query = st.text_area("Escribe tu consulta SQL aquí", height=150,
                            placeholder="Ejemplo: SELECT * FROM radioexperimentadores LIMIT 10;")
         
+        # Límites de ejecución
+        col_limite1, col_limite2 = st.columns(2)
+        max_filas = col_limite1.number_input("Máximo de filas", min_value=1, max_value=100000, value=1000, step=100)
+        tiempo_limite = col_limite2.number_input("Tiempo límite (segundos)", min_value=1, max_value=120, value=10)
+        
         # Opciones de ejecución
         col1, col2 = st.columns(2)
         
@@ -2720,36 +1697,71 @@ def show_settings():
             if not query.strip():
                 st.warning("Por favor, ingresa una consulta SQL válida.")
             else:
+                import threading
+                from concurrent.futures import ThreadPoolExecutor
+                
+                cancelar = threading.Event()
+                executor = ThreadPoolExecutor(max_workers=1)
+                progreso = st.empty()
                 try:
-                    # Ejecutar la consulta
-                    with db.get_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute(query)
-                        
-                        # Obtener los resultados
-                        results = cursor.fetchall()
-                        
-                        # Mostrar resultados si es una consulta SELECT
-                        if query.strip().upper().startswith('SELECT'):
-                            if results:
-                                # Obtener nombres de columnas
-                                column_names = [description[0] for description in cursor.description]
-                                
-                                # Mostrar resultados en una tabla
-                                st.dataframe(results, width='stretch', 
-                                           column_config={col: st.column_config.TextColumn(col) for col in column_names})
-                                
-                                # Mostrar conteo de resultados
-                                st.success(f"Consulta ejecutada correctamente. Se encontraron {len(results)} registros.")
-                            else:
-                                st.info("La consulta no devolvió resultados.")
-                        else:
-                            # Para consultas que no son SELECT (INSERT, UPDATE, DELETE, etc.)
-                            conn.commit()
-                            st.success(f"Operación completada exitosamente. Filas afectadas: {cursor.rowcount}")
-                            
+                    futuro = executor.submit(
+                        db.ejecutar_consulta_solo_lectura, query, int(max_filas), float(tiempo_limite), cancelar
+                    )
+                    inicio = time.time()
+                    # Si el usuario detiene o vuelve a ejecutar la página, Streamlit interrumpe el
+                    # script en la siguiente actualización y el bloque finally cancela la consulta
+                    while not futuro.done():
+                        progreso.caption(f"⏳ Ejecutando consulta... {time.time() - inicio:.1f} s")
+                        time.sleep(0.2)
+                    progreso.empty()
+                    st.session_state.consulta_sql_resultado = futuro.result()
+                    st.session_state.consulta_sql_pagina = 1
                 except Exception as e:
+                    progreso.empty()
+                    st.session_state.pop('consulta_sql_resultado', None)
                     st.error(f"Error al ejecutar la consulta: {str(e)}")
+                finally:
+                    cancelar.set()
+                    executor.shutdown(wait=False)
+        
+        # Resultados de la última consulta, paginados
+        resultado = st.session_state.get('consulta_sql_resultado')
+        if resultado:
+            filas = resultado['filas']
+            resumen = f"⏱️ {resultado['duracion_ms']:.1f} ms · {len(filas):,} registros"
+            if resultado['truncado']:
+                resumen += f" (resultado truncado a {len(filas):,} filas)"
+            st.caption(resumen)
+            
+            if resultado['plan']:
+                with st.expander("🔍 Plan de ejecución (EXPLAIN QUERY PLAN)"):
+                    niveles = {0: -1}
+                    lineas = []
+                    for id_nodo, padre, _, detalle in resultado['plan']:
+                        niveles[id_nodo] = niveles.get(padre, -1) + 1
+                        lineas.append("    " * niveles[id_nodo] + detalle)
+                    st.code("\n".join(lineas), language=None)
+            
+            if not resultado['columnas']:
+                st.success("Consulta ejecutada correctamente.")
+            elif not filas:
+                st.info("La consulta no devolvió resultados.")
+            else:
+                import pandas as pd
+                
+                col_pag1, col_pag2 = st.columns(2)
+                filas_por_pagina = col_pag1.selectbox("Filas por página", [25, 50, 100, 250], index=1,
+                                                      key="consulta_sql_por_pagina")
+                total_paginas = max(1, -(-len(filas) // filas_por_pagina))
+                if st.session_state.get('consulta_sql_pagina', 1) > total_paginas:
+                    st.session_state.consulta_sql_pagina = total_paginas
+                pagina = col_pag2.number_input("Página", min_value=1, max_value=total_paginas,
+                                               key="consulta_sql_pagina")
+                
+                desde = (pagina - 1) * filas_por_pagina
+                df_pagina = pd.DataFrame(filas[desde:desde + filas_por_pagina], columns=resultado['columnas'])
+                st.dataframe(df_pagina, width='stretch', hide_index=True)
+                st.caption(f"Página {pagina} de {total_paginas}")
         
         # Botón para obtener información de las tablas
         if col2.button("Mostrar Tablas"):
@@ -2788,6 +1800,68 @@ def show_settings():
             except Exception as e:
                 st.error(f"Error al obtener información de la base de datos: {str(e)}")
 
+    with tab4:
+        st.header("Métricas de Rendimiento")
+        st.info("ℹ️ Tiempos de los métodos de la base de datos y de las páginas desde que inició este proceso. "
+                "Con varios procesos, cada uno lleva sus propias métricas (ver QMS_METRICS_FILE en metrics.py).")
+
+        if not metrics.HABILITADO:
+            st.warning("La instrumentación está desactivada (QMS_METRICS=0).")
+        else:
+            resumen_metricas = metrics.resumen()
+            if not resumen_metricas:
+                st.info("Todavía no hay mediciones.")
+            else:
+                import pandas as pd
+
+                df_metricas = pd.DataFrame(resumen_metricas).rename(columns={
+                    'tipo': 'Tipo', 'nombre': 'Función', 'llamadas': 'Llamadas', 'errores': 'Errores',
+                    'filas': 'Filas', 'promedio_ms': 'Promedio (ms)', 'p50_ms': 'p50 (ms)',
+                    'p95_ms': 'p95 (ms)', 'total_s': 'Total (s)',
+                })
+                st.dataframe(df_metricas, width='stretch', hide_index=True)
+
+            texto_prometheus = metrics.exportar_prometheus()
+            st.download_button(
+                "📥 Descargar en formato Prometheus",
+                data=texto_prometheus,
+                file_name="qms_metrics.prom",
+                mime="text/plain",
+            )
+            with st.expander("Formato de texto de Prometheus"):
+                st.code(texto_prometheus, language=None)
+
+        st.subheader("Consultas SQL lentas")
+        import consultas_lentas
+
+        if consultas_lentas.ACTIVO:
+            st.caption(f"Registro activo: sentencias de más de {consultas_lentas.UMBRAL_MS:g} ms "
+                       f"en {consultas_lentas.RUTA_LOG}")
+        else:
+            st.caption("El registro de consultas lentas está desactivado (se activa con QMS_SQL_TRACE=1 y "
+                       "QMS_SQL_UMBRAL_MS). Se muestra lo que haya quedado en el archivo de registro.")
+
+        peores = consultas_lentas.peores_consultas()
+        if not peores:
+            st.info("No hay consultas lentas registradas.")
+        else:
+            import pandas as pd
+
+            st.dataframe(
+                pd.DataFrame(peores)[['sql', 'veces', 'total_ms', 'promedio_ms', 'max_ms', 'filas_max', 'origen', 'ultima']]
+                .rename(columns={
+                    'sql': 'SQL', 'veces': 'Veces', 'total_ms': 'Total (ms)', 'promedio_ms': 'Promedio (ms)',
+                    'max_ms': 'Máximo (ms)', 'filas_max': 'Filas (máx.)', 'origen': 'Origen', 'ultima': 'Última',
+                }),
+                width='stretch',
+                hide_index=True,
+            )
+            for i, consulta in enumerate(peores[:5], start=1):
+                with st.expander(f"{i}. {consulta['max_ms']:.0f} ms — {consulta['sql'][:80]}"):
+                    st.code(consulta['sql'], language='sql')
+                    if consulta['plan']:
+                        st.code("\n".join(consulta['plan']), language=None)
+
 # def show_toma_reportes():
 #     """Muestra la sección de Toma de Reportes"""
 #     st.title("📝 Toma de Reportes")
@@ -3848,6 +2922,7 @@ def show_settings():
 #             else:
 #                 st.info("No hay reportes registrados para el día de hoy.")
 
+@metrics.medir('pagina')
 def show_toma_reportes():
     """Muestra la sección de Toma de Reportes con el flujo solicitado."""
     import pandas as pd
@@ -4124,7 +3199,7 @@ def show_toma_reportes():
                     updated_user = db.get_user_by_id(st.session_state.user["id"])
                     if updated_user:
                         st.session_state.user.update(updated_user)
-                        print(f"[DEBUG] Sesión actualizada: {st.session_state.user}")
+                        logger.debug("Preferencias de %s actualizadas en la sesión", updated_user.get('username'))
             except Exception as e:
                 st.warning(f"⚠️ No se pudieron guardar preferencias de usuario: {e}")
 
@@ -4330,12 +3405,12 @@ def show_toma_reportes():
 
         # Opciones dropdown
         try:
-            estados_db = _get_estados_options()
+            estados_db = _get_estados_options(version=db.get_version_datos('qth'))
             estados_options = [e['estado'] for e in estados_db]
         except Exception:
             estados_options = []
         try:
-            zonas_db = _get_zonas_options()
+            zonas_db = _get_zonas_options(version=db.get_version_datos('zonas'))
             zonas_options = [z['zona'] for z in zonas_db]
         except Exception:
             zonas_options = ["XE1", "XE2", "XE3", "EXT", ""]
@@ -4401,20 +3476,19 @@ def show_toma_reportes():
                             valor_actual_str = str(valor_actual) if valor_actual is not None else ""
 
                             if valor_editado_str != valor_actual_str:
-                                print(f"[DEBUG] Diferencia detectada en fila {i}, columna {col}")
-                                print(f"[DEBUG] Valor editado: '{valor_editado_str}', valor actual: '{valor_actual_str}'")
+                                logger.debug("Diferencia en fila %s, columna %s: %r -> %r",
+                                             i, col, valor_actual_str, valor_editado_str)
 
                                 # Actualizar inmediatamente el session_state
                                 if pd.notna(valor_editado) and valor_editado_str.strip():
                                     st.session_state.registros[i][col] = valor_editado_str
                                     campos_actualizados[f"{i}_{col}"] = valor_editado_str
-                                    print(f"[DEBUG] ✅ session_state actualizado para {col}")
                                     cambios_detectados = True
                                 break
                     if cambios_detectados:
                         break
         except Exception as e:
-            print(f"[DEBUG] Error en detección de cambios: {e}")
+            logger.warning("Error en detección de cambios: %s", e)
             cambios_detectados = True
 
         # Marcar que la tabla ha sido editada
@@ -4422,26 +3496,13 @@ def show_toma_reportes():
             st.session_state.tabla_editada = True
             st.session_state.registros_editados = True
 
-            # Mostrar resumen de cambios
-            if campos_actualizados:
-                print(f"[DEBUG] 📝 Campos actualizados: {len(campos_actualizados)}")
-                for campo, valor in campos_actualizados.items():
-                    print(f"[DEBUG]   {campo}: '{valor}'")
-
-            # Verificación detallada después de la actualización
-            print("[DEBUG] === VERIFICACIÓN POST-ACTUALIZACIÓN ===")
-            for i, reg in enumerate(st.session_state.registros[:3]):  # Solo primeros 3 para no saturar logs
-                print(f"[DEBUG] Registro {i}:")
-                for col in columnas_disponibles:
-                    valor = reg.get(col, 'N/A')
-                    print(f"[DEBUG]   {col}: '{valor}'")
-                print("[DEBUG] -------------------")
+            # Resumen de cambios (solo se arma si el nivel DEBUG está habilitado)
+            if campos_actualizados and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Campos actualizados: %s", campos_actualizados)
 
             # Forzar rerun para actualizar la interfaz visual
             st.rerun()
 
-        print(f"[DEBUG] Estado final - tabla_editada: {st.session_state.get('tabla_editada', False)}, registros_editados: {st.session_state.get('registros_editados', False)}")
-
         # Mostrar información de debug
         st.caption(f"Total de registros: {len(df)} | Tabla editada: {st.session_state.get('tabla_editada', False)}")
         if st.session_state.get("registros_editados", False):
@@ -4458,10 +3519,6 @@ def show_toma_reportes():
                     if not registro.get("indicativo") or not pr.get("tipo_reporte"):
                         continue
 
-                    # Debug: mostrar qué se va a guardar
-                    print(f"[DEBUG] Guardando registro: {registro.get('indicativo', 'N/A')}")
-                    print(f"[DEBUG] Valores: nombre_operador='{registro.get('nombre_operador', 'N/A')}', estado='{registro.get('estado', 'N/A')}', ciudad='{registro.get('ciudad', 'N/A')}'")
-
                     # Ensamble payload
                     # Obtener el indicativo del usuario logueado
                     usuario_logueado = st.session_state.user.get('username', '') if 'user' in st.session_state else ''
@@ -4469,8 +3526,6 @@ def show_toma_reportes():
                     # Obtener la estación QRZ del usuario logueado
                     qrz_station = ''
                     if 'user' in st.session_state and st.session_state.user:
-                        # Verificar la estructura del objeto user
-                        print(f"[DEBUG] Estructura del usuario: {st.session_state.user}")
                         # Intentar obtener qrz_station de diferentes formas
                         qrz_station = st.session_state.user.get('qrz_station', '')
                         if not qrz_station:
@@ -4478,10 +3533,6 @@ def show_toma_reportes():
                             if 'data' in st.session_state.user and st.session_state.user['data']:
                                 qrz_station = st.session_state.user['data'].get('qrz_station', '')
                     
-                    print(f"[DEBUG] qrz_station del usuario: {qrz_station}")
-                    print(f"[DEBUG] usuario_logueado: {usuario_logueado}")
-                    print(f"[DEBUG] Estructura completa del usuario: {st.session_state.user if 'user' in st.session_state else 'No hay usuario en la sesión'}")
-                    
                     payload = {
                         'indicativo': _safe_str(registro.get('indicativo')).upper(),
                         'nombre': _formatear_oracion(_safe_str(registro.get('nombre_operador'))),
@@ -4497,7 +3548,8 @@ def show_toma_reportes():
                         'qrz_station': qrz_station  # Estación QRZ del usuario
                     }
 
-                    print(f"[DEBUG] Payload: nombre='{payload['nombre']}', estado='{payload['estado']}', ciudad='{payload['ciudad']}'")
+                    logger.debug("Guardando %s (estación %s, capturado por %s)",
+                                 payload['indicativo'], qrz_station, usuario_logueado)
                     if payload['sistema'] == 'HF':
                         payload['observaciones'] = f"Frecuencia: {_safe_str(registro.get('frecuencia',''))}, Modo: {_safe_str(registro.get('modo',''))}, Potencia: {_safe_str(registro.get('potencia',''))}"
                     try:
@@ -4565,7 +3617,9 @@ def show_toma_reportes():
             from datetime import datetime
             fecha_dt = datetime.strptime(fecha_reporte, '%d/%m/%Y')
             fecha_consulta = fecha_dt.strftime('%Y-%m-%d')
-            reportes, estadisticas = db.get_reportes_por_fecha(fecha_consulta)
+            # Se mantienen en memoria y solo se vuelven a consultar si cambiaron los reportes
+            from estadisticas_diarias import obtener_estadisticas_del_dia
+            reportes, estadisticas = obtener_estadisticas_del_dia(db, fecha_consulta)
             st.caption(f"📅 Mostrando reportes del: {fecha_reporte}")
         except (ValueError, TypeError):
             st.error("❌ Error en el formato de la fecha. Asegúrate de usar el formato DD/MM/YYYY")
@@ -4673,7 +3727,8 @@ def show_toma_reportes():
                 'Capturado Por': r.get('qrz_captured_by','')
             } for r in reportes])
 
-            st.data_editor(
+            # Tabla de solo lectura: st.dataframe no arma el estado de edición de cada fila
+            st.dataframe(
                 df_reportes,
                 column_config={
                     'Indicativo': st.column_config.TextColumn("Indicativo"),
@@ -4691,6 +3746,7 @@ def show_toma_reportes():
         else:
             st.info("No hay reportes registrados para el día de hoy.")
 
+@metrics.medir('pagina')
 def show_registros():
     """Muestra la sección de registros con pestañas para listar y editar"""
     st.title("📋 Registros")
@@ -4747,6 +3803,13 @@ def show_lista_registros():
         key="busqueda_lista"
     )
 
+    incluir_archivo = st.checkbox(
+        "Incluir años archivados",
+        value=False,
+        help="Sin fechas, la lista muestra solo la tabla activa. Actívalo para buscar también en los años archivados.",
+        key="incluir_archivo_lista"
+    )
+
     # Botones de acción alineados al nivel de los filtros
     col_offset, col_buscar, col_limpiar, col_spacer = st.columns([1.2, 2.2, 2.2, 3.4])
 
@@ -4784,7 +3847,8 @@ def show_lista_registros():
         registros, total_registros = db.get_reportes_filtrados(
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
-            busqueda=busqueda
+            busqueda=busqueda,
+            incluir_archivo=incluir_archivo
             # Los filtros específicos (estado, zona, sistema) se eliminan
             # La búsqueda ya se hace en todos los campos
         )
@@ -4833,52 +3897,66 @@ def show_lista_registros():
                 disabled=True  # Solo lectura en la pestaña de lista
             )
 
-            # Botón para exportar a Excel
+            # Exportación: las filas se escriben desde el cursor a un archivo temporal
+            import exportacion
+
             fecha_inicio_str = fecha_inicio.strftime('%Y%m%d') if fecha_inicio else "inicio"
             fecha_fin_str = fecha_fin.strftime('%Y%m%d') if fecha_fin else "fin"
+            filtros_exportacion = {
+                'fecha_inicio': fecha_inicio,
+                'fecha_fin': fecha_fin,
+                'busqueda': busqueda,
+                'incluir_archivo': incluir_archivo
+            }
 
-            from io import BytesIO
-            output = BytesIO()
-
-            engine = None
-            try:
-                import importlib
-
-                if importlib.util.find_spec("xlsxwriter"):
-                    engine = "xlsxwriter"
-            except Exception:
-                engine = None
-
-            try:
-                with pd.ExcelWriter(output, engine=engine) as writer:
-                    df_registros.to_excel(writer, index=False, sheet_name='Registros')
-
-                    if engine == "xlsxwriter":
-                        workbook = writer.book
-                        worksheet = writer.sheets['Registros']
-
-                        for i, col in enumerate(df_registros.columns):
-                            max_length = max(df_registros[col].astype(str).apply(len).max(), len(col)) + 2
-                            worksheet.set_column(i, i, max_length)
-
-                data_bytes = output.getvalue()
-                mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                file_name = f"registros_{fecha_inicio_str}_{fecha_fin_str}.xlsx"
-            except Exception:
-                csv_output = df_registros.to_csv(index=False).encode('utf-8-sig')
-                data_bytes = csv_output
-                mime_type = "text/csv"
-                file_name = f"registros_{fecha_inicio_str}_{fecha_fin_str}.csv"
-
-            st.download_button(
-                label="📥 Exportar",
-                data=data_bytes,
-                file_name=file_name,
-                mime=mime_type,
-                key="descargar_excel_lista",
-                use_container_width=True
+            # Descartar un archivo preparado con otros filtros. En la sesión solo queda la
+            # ruta: el archivo se lee (y se borra) hasta que se descarga
+            exportacion_previa = st.session_state.get('exportacion_registros')
+            if exportacion_previa and exportacion_previa['filtros'] != filtros_exportacion:
+                exportacion.borrar_temporal(exportacion_previa['ruta'])
+                del st.session_state['exportacion_registros']
+
+            col_formato, col_preparar, col_descargar = st.columns([2, 1, 1])
+            formato = col_formato.selectbox(
+                "Formato de exportación",
+                list(exportacion.FORMATOS.keys()),
+                format_func=lambda f: exportacion.FORMATOS[f][0],
+                help="Para rangos muy grandes, el CSV comprimido es el archivo más ligero",
+                key="formato_exportacion_lista"
             )
 
+            if col_preparar.button("📦 Preparar exportación", key="preparar_exportacion_lista", use_container_width=True):
+                try:
+                    with st.spinner("Generando archivo..."):
+                        exportacion.borrar_temporales_viejos()
+                        if exportacion_previa:
+                            exportacion.borrar_temporal(exportacion_previa['ruta'])
+                        ruta, total_exportado = exportacion.exportar_registros(db, formato, **filtros_exportacion)
+                        st.session_state.exportacion_registros = {
+                            'filtros': filtros_exportacion,
+                            'ruta': ruta,
+                            'file_name': f"registros_{fecha_inicio_str}_{fecha_fin_str}.{formato}",
+                            'mime': exportacion.FORMATOS[formato][1],
+                            'total': total_exportado
+                        }
+                except Exception as e:
+                    st.error(f"Error al exportar los registros: {str(e)}")
+
+            exportacion_lista = st.session_state.get('exportacion_registros')
+            if exportacion_lista:
+                ruta_lista = exportacion_lista['ruta']
+                col_descargar.download_button(
+                    label="📥 Exportar",
+                    # Se lee al hacer clic, fuera del rerun; después el archivo ya no existe
+                    data=lambda: exportacion.leer_y_borrar(ruta_lista),
+                    on_click=lambda: st.session_state.pop('exportacion_registros', None),
+                    file_name=exportacion_lista['file_name'],
+                    mime=exportacion_lista['mime'],
+                    key="descargar_excel_lista",
+                    use_container_width=True
+                )
+                st.caption(f"Archivo listo: {exportacion_lista['total']:,} registros")
+
         else:
             st.info("No se encontraron registros con los filtros aplicados")
 
@@ -5148,7 +4226,7 @@ def _mostrar_formulario_edicion_registro(registro_id):
         # Mostrar información del registro
         st.info(f"Editando registro: {registro['indicativo']} - {registro['nombre'] or 'Sin nombre'}")
 
-        sistemas_options = _get_sistemas_options()
+        sistemas_options = _get_sistemas_options(version=db.get_version_datos('sistemas'))
         if "" not in sistemas_options:
             sistemas_options = [""] + sistemas_options
 
@@ -5184,8 +4262,8 @@ def _mostrar_formulario_edicion_registro(registro_id):
             with col1:
                 estado = st.selectbox(
                     "Estado",
-                    options=[""] + [e['estado'] for e in _get_estados_options() if e and 'estado' in e],
-                    index=0 if not registro['estado'] else [e['estado'] for e in _get_estados_options() if e and 'estado' in e].index(registro['estado']) + 1,
+                    options=[""] + [e['estado'] for e in _get_estados_options(version=db.get_version_datos('qth')) if e and 'estado' in e],
+                    index=0 if not registro['estado'] else [e['estado'] for e in _get_estados_options(version=db.get_version_datos('qth')) if e and 'estado' in e].index(registro['estado']) + 1,
                     help="Estado donde reside el radioexperimentador"
                 )
 
@@ -5329,8 +4407,8 @@ def _mostrar_formulario_edicion_registro(registro_id):
             st.rerun()
 
 @st.cache_data(ttl=300)  # Cache por 5 minutos
-def _get_estados_options():
-    """Obtiene las opciones de Estado con caché"""
+def _get_estados_options(version=None):
+    """Obtiene las opciones de Estado con caché (version invalida la caché entre workers)"""
     try:
         return db.get_estados(incluir_extranjero=True)
     except Exception as e:
@@ -5338,8 +4416,8 @@ def _get_estados_options():
         return []
 
 @st.cache_data(ttl=300)
-def _get_sistemas_options():
-    """Obtiene las opciones de sistemas disponibles"""
+def _get_sistemas_options(version=None):
+    """Obtiene las opciones de sistemas disponibles (version invalida la caché entre workers)"""
     try:
         sistemas = db.get_sistemas()
 
@@ -5356,8 +4434,8 @@ def _get_sistemas_options():
         return []
 
 @st.cache_data(ttl=300)  # Cache por 5 minutos
-def _get_zonas_options():
-    """Obtiene las opciones de Zona con caché"""
+def _get_zonas_options(version=None):
+    """Obtiene las opciones de Zona con caché (version invalida la caché entre workers)"""
     try:
         return db.get_zonas(incluir_inactivas=False)
     except Exception as e:
@@ -5426,6 +4504,9 @@ def main():
     if 'current_page' not in st.session_state:
         st.session_state.current_page = "home"
     
+    # Recuperar la sesión del token de la cookie (reconexión o pestaña nueva)
+    auth.restaurar_sesion()
+
     # Verificar autenticación
     if 'user' not in st.session_state:
         # No mostrar barra lateral en el login
@@ -5434,6 +4515,7 @@ def main():
             page_icon="🔒",
             layout="centered"
         )
+        auth.escribir_cookie()
         auth.show_login()
     else:
         # Configurar página con barra lateral solo cuando está autenticado
@@ -5443,6 +4525,7 @@ def main():
             layout="wide",
             initial_sidebar_state="expanded"
         )
+        auth.escribir_cookie()
         # Mostrar la barra lateral solo cuando está autenticado
         show_sidebar()
         
@@ -5652,16 +4735,34 @@ def show_gestion_radioexperimentadores():
         _show_importar_radioexperimentadores()
 
 @st.cache_data(ttl=300)  # Cache por 5 minutos
-def _get_radioexperimentadores(incluir_inactivos=False):
-    """Obtiene la lista de radioexperimentadores con caché"""
-    try:
-        return db.get_radioexperimentadores(incluir_inactivos=incluir_inactivos)
-    except Exception as e:
-        st.error(f"Error al cargar los radioexperimentadores: {str(e)}")
-        return []
+def _buscar_radioexperimentadores(texto, incluir_inactivos, orden, descendente, pagina, por_pagina, version=None):
+    """Página de la búsqueda de radioexperimentadores con caché
+
+    El argumento version (contador de cambios de la tabla) forma parte de la clave
+    de caché: cuando cualquier worker escribe en la tabla, la entrada deja de usarse.
+    """
+    return db.buscar_radioexperimentadores(
+        texto=texto, incluir_inactivos=incluir_inactivos, orden=orden,
+        descendente=descendente, pagina=pagina, por_pagina=por_pagina
+    )
+
+# Opciones de orden de la lista de radioexperimentadores → columna
+ORDEN_LISTA_RADIOEXPERIMENTADORES = {
+    "Indicativo": 'indicativo',
+    "Nombre": 'nombre_completo',
+    "Municipio": 'municipio',
+    "Estado": 'estado',
+    "Última actualización": 'updated_at',
+}
 
 def _show_lista_radioexperimentadores():
-    """Muestra la lista de radioexperimentadores con opciones de búsqueda y acciones"""
+    """Muestra la lista de radioexperimentadores con búsqueda, paginación y acciones
+
+    La búsqueda, el orden y la paginación se hacen en la base de datos
+    (FMREDatabase.buscar_radioexperimentadores): cada rerun dibuja una sola página
+    de la tabla y las acciones del registro seleccionado, sin importar el tamaño
+    del padrón.
+    """
     st.header("📋 Lista de Radioexperimentadores")
     
     # Inicializar variables de sesión si no existen
@@ -5679,124 +4780,152 @@ def _show_lista_radioexperimentadores():
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        busqueda = st.text_input("Buscar por indicativo, nombre o municipio:", "")
+        busqueda = st.text_input("Buscar por indicativo, nombre, municipio o estado:", "")
     
     with col2:
         incluir_inactivos = st.checkbox("Mostrar inactivos", False, key="mostrar_inactivos_radio")
     
-    # Obtener y mostrar la lista de radioexperimentadores
+    col_orden, col_direccion, col_tamano = st.columns(3)
+    with col_orden:
+        orden = st.selectbox("Ordenar por", list(ORDEN_LISTA_RADIOEXPERIMENTADORES), key="radio_lista_orden")
+    with col_direccion:
+        descendente = st.toggle("Descendente", False, key="radio_lista_descendente")
+    with col_tamano:
+        por_pagina = st.selectbox("Registros por página", [25, 50, 100], index=1, key="radio_lista_por_pagina")
+    
+    # Volver a la primera página cuando cambian los criterios
+    criterios = (busqueda, incluir_inactivos, orden, descendente, por_pagina)
+    if st.session_state.get('radio_lista_criterios') != criterios:
+        st.session_state.radio_lista_criterios = criterios
+        st.session_state.radio_lista_pagina = 1
+    
     try:
-        radioexperimentadores = []
-        
-        if busqueda:
-            # Primero intentar buscar por indicativo exacto
-            busqueda_upper = busqueda.upper()
-            radio = db.get_radioexperimentador_por_indicativo(busqueda_upper)
-            
-            if radio:
-                # Si encontramos por indicativo exacto, mostramos solo ese
-                radioexperimentadores = [radio]
-            else:
-                radioexperimentadores = db.get_radioexperimentadores(
-                    incluir_inactivos=incluir_inactivos
-                )
-                
-                # Filtrar localmente para mejor control de la búsqueda
-                busqueda_terms = busqueda_upper.split()
-                radioexperimentadores = [
-                    r for r in radioexperimentadores
-                    if (busqueda_upper in r['indicativo'].upper() or
-                        all(term in r['nombre_completo'].upper() for term in busqueda_terms) or
-                        busqueda_upper in (r['municipio'] or '').upper() or
-                        busqueda_upper in (r['estado'] or '').upper())
-                ]
-        else:
-            # Si no hay búsqueda, obtener todos los activos (o inactivos si está marcado)
-            radioexperimentadores = _get_radioexperimentadores(
-                incluir_inactivos=incluir_inactivos
+        version = db.get_version_datos('radioexperimentadores')
+        pagina = st.session_state.get('radio_lista_pagina', 1)
+        columna_orden = ORDEN_LISTA_RADIOEXPERIMENTADORES[orden]
+        radioexperimentadores, total_aficionados = _buscar_radioexperimentadores(
+            busqueda, incluir_inactivos, columna_orden, descendente, pagina, por_pagina, version=version
+        )
+        total_paginas = max(1, -(-total_aficionados // por_pagina))
+        if pagina > total_paginas:
+            # La lista se acortó (registros eliminados o desactivados): mostrar la última página
+            pagina = total_paginas
+            radioexperimentadores, total_aficionados = _buscar_radioexperimentadores(
+                busqueda, incluir_inactivos, columna_orden, descendente, pagina, por_pagina, version=version
             )
+        st.session_state.radio_lista_pagina = pagina
         
         # Mostrar contador de resultados
-        total_aficionados = len(radioexperimentadores)
         st.subheader(f"📊 {total_aficionados} aficionado{'s' if total_aficionados != 1 else ''} encontrado{'s' if total_aficionados != 1 else ''}")
         
         if radioexperimentadores:
-            # Mostrar la lista en un formato de tabla mejorado
-            for radio in radioexperimentadores:
-                with st.expander(f"{radio['indicativo']} - {radio['nombre_completo']}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write(f"**Municipio:** {radio['municipio'] or 'No especificado'}")
-                        st.write(f"**Estado:** {radio['estado'] or 'No especificado'}")
-                        st.write(f"**País:** {radio['pais'] or 'No especificado'}")
-                        
-                    with col2:
-                        st.write(f"**Tipo de licencia:** {radio['tipo_licencia'] or 'No especificado'}")
-                        st.write(f"**Estatus:** {radio['estatus'] or 'No especificado'}")
-                        st.write(f"**Activo:** {'Sí' if radio.get('activo', 1) == 1 else 'No'}")
-                    
-                    # Mostrar botones de acción
-                    col_btn1, col_btn2, col_btn3 = st.columns(3)
-                    
-                    with col_btn1:
-                        if st.button(f"✏️ Editar", key=f"editar_{radio['id']}"):
-                            st.session_state.editando_radio_id = radio['id']
-                            st.rerun()
-                    
-                    with col_btn2:
-                        if radio.get('activo', 1) == 1:
-                            if st.button(f"⏸️ Desactivar", key=f"desactivar_{radio['id']}"):
-                                try:
-                                    if db.delete_radioexperimentador(radio['id']):
-                                        st.success(f"Radioexperimentador {radio['indicativo']} desactivado correctamente")
-                                        time.sleep(2)
-                                        st.rerun()
-                                    else:
-                                        st.error("No se pudo desactivar el radioexperimentador")
-                                except Exception as e:
-                                    st.error(f"Error al desactivar: {str(e)}")
-                        else:
-                            if st.button(f"▶️ Activar", key=f"activar_{radio['id']}"):
-                                try:
-                                    if db.activar_radioexperimentador(radio['id']):
-                                        st.success(f"Radioexperimentador {radio['indicativo']} activado correctamente")
-                                        time.sleep(2)
-                                        st.rerun()
-                                    else:
-                                        st.error("No se pudo activar el radioexperimentador")
-                                except Exception as e:
-                                    st.error(f"Error al activar: {str(e)}")
-                    
-                    with col_btn3:
-                        if st.button(f"🗑️ Eliminar", key=f"eliminar_{radio['id']}"):
-                            st.session_state.eliminando_radio_id = radio['id']
-                            st.rerun()
-                    
-                    # Mostrar confirmación de eliminación si corresponde
-                    if st.session_state.get('eliminando_radio_id') == radio['id']:
-                        st.warning("¿Estás seguro de que deseas eliminar permanentemente este registro? Esta acción no se puede deshacer.")
-                        
-                        col_conf1, col_conf2 = st.columns(2)
-                        
-                        with col_conf1:
-                            if st.button("✅ Confirmar eliminación", type="primary", key=f"confirmar_eliminar_{radio['id']}"):
-                                try:
-                                    if db.delete_radioexperimentador(radio['id'], force_delete=True):
-                                        st.success(f"Radioexperimentador {radio['indicativo']} eliminado permanentemente")
-                                        del st.session_state.eliminando_radio_id
-                                        time.sleep(2)
-                                        st.rerun()
-                                    else:
-                                        st.error("No se pudo eliminar el radioexperimentador")
-                                except Exception as e:
-                                    st.error(f"Error al eliminar: {str(e)}")
-                        
-                        with col_conf2:
-                            if st.button("❌ Cancelar", key=f"cancelar_eliminar_{radio['id']}"):
-                                if 'eliminando_radio_id' in st.session_state:
-                                    del st.session_state.eliminando_radio_id
+            import pandas as pd
+            
+            st.dataframe(
+                pd.DataFrame([{
+                    'Indicativo': radio['indicativo'],
+                    'Nombre': radio['nombre_completo'],
+                    'Municipio': radio['municipio'] or '',
+                    'Estado': radio['estado'] or '',
+                    'Licencia': radio['tipo_licencia'] or '',
+                    'Estatus': radio['estatus'] or '',
+                    'Activo': 'Sí' if radio.get('activo', 1) == 1 else 'No',
+                } for radio in radioexperimentadores]),
+                hide_index=True,
+                width='stretch'
+            )
+            
+            col_pagina, col_total = st.columns([1, 3])
+            with col_pagina:
+                st.number_input("Página", min_value=1, max_value=total_paginas, step=1, key="radio_lista_pagina")
+            with col_total:
+                inicio = (pagina - 1) * por_pagina + 1
+                st.caption(f"Registros {inicio}–{inicio + len(radioexperimentadores) - 1} de {total_aficionados} · "
+                           f"página {pagina} de {total_paginas}")
+            
+            # Acciones sobre un registro de la página
+            radios_pagina = {radio['id']: radio for radio in radioexperimentadores}
+            radio_id = st.selectbox(
+                "Registro",
+                list(radios_pagina),
+                format_func=lambda rid: f"{radios_pagina[rid]['indicativo']} - {radios_pagina[rid]['nombre_completo']}",
+                key="radio_lista_seleccion"
+            )
+            radio = radios_pagina[radio_id]
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.write(f"**Municipio:** {radio['municipio'] or 'No especificado'}")
+                st.write(f"**Estado:** {radio['estado'] or 'No especificado'}")
+                st.write(f"**País:** {radio['pais'] or 'No especificado'}")
+                
+            with col2:
+                st.write(f"**Tipo de licencia:** {radio['tipo_licencia'] or 'No especificado'}")
+                st.write(f"**Estatus:** {radio['estatus'] or 'No especificado'}")
+                st.write(f"**Activo:** {'Sí' if radio.get('activo', 1) == 1 else 'No'}")
+            
+            # Mostrar botones de acción
+            col_btn1, col_btn2, col_btn3 = st.columns(3)
+            
+            with col_btn1:
+                if st.button(f"✏️ Editar", key=f"editar_{radio['id']}"):
+                    st.session_state.editando_radio_id = radio['id']
+                    st.rerun()
+            
+            with col_btn2:
+                if radio.get('activo', 1) == 1:
+                    if st.button(f"⏸️ Desactivar", key=f"desactivar_{radio['id']}"):
+                        try:
+                            if db.delete_radioexperimentador(radio['id']):
+                                st.success(f"Radioexperimentador {radio['indicativo']} desactivado correctamente")
+                                time.sleep(2)
+                                st.rerun()
+                            else:
+                                st.error("No se pudo desactivar el radioexperimentador")
+                        except Exception as e:
+                            st.error(f"Error al desactivar: {str(e)}")
+                else:
+                    if st.button(f"▶️ Activar", key=f"activar_{radio['id']}"):
+                        try:
+                            if db.activar_radioexperimentador(radio['id']):
+                                st.success(f"Radioexperimentador {radio['indicativo']} activado correctamente")
+                                time.sleep(2)
+                                st.rerun()
+                            else:
+                                st.error("No se pudo activar el radioexperimentador")
+                        except Exception as e:
+                            st.error(f"Error al activar: {str(e)}")
+            
+            with col_btn3:
+                if st.button(f"🗑️ Eliminar", key=f"eliminar_{radio['id']}"):
+                    st.session_state.eliminando_radio_id = radio['id']
+                    st.rerun()
+            
+            # Mostrar confirmación de eliminación si corresponde
+            if st.session_state.get('eliminando_radio_id') == radio['id']:
+                st.warning("¿Estás seguro de que deseas eliminar permanentemente este registro? Esta acción no se puede deshacer.")
+                
+                col_conf1, col_conf2 = st.columns(2)
+                
+                with col_conf1:
+                    if st.button("✅ Confirmar eliminación", type="primary", key=f"confirmar_eliminar_{radio['id']}"):
+                        try:
+                            if db.delete_radioexperimentador(radio['id'], force_delete=True):
+                                st.success(f"Radioexperimentador {radio['indicativo']} eliminado permanentemente")
+                                del st.session_state.eliminando_radio_id
+                                time.sleep(2)
                                 st.rerun()
+                            else:
+                                st.error("No se pudo eliminar el radioexperimentador")
+                        except Exception as e:
+                            st.error(f"Error al eliminar: {str(e)}")
+                
+                with col_conf2:
+                    if st.button("❌ Cancelar", key=f"cancelar_eliminar_{radio['id']}"):
+                        if 'eliminando_radio_id' in st.session_state:
+                            del st.session_state.eliminando_radio_id
+                        st.rerun()
         else:
             st.info("No se encontraron radioexperimentadores que coincidan con los criterios de búsqueda")
     
@@ -5804,8 +4933,8 @@ def _show_lista_radioexperimentadores():
         st.error(f"Error al cargar la lista de radioexperimentadores: {str(e)}")
 
 @st.cache_data(ttl=300)  # Cache por 5 minutos
-def _get_radioexperimentador_por_id(radio_id):
-    """Obtiene un radioexperimentador por su ID con caché"""
+def _get_radioexperimentador_por_id(radio_id, version=None):
+    """Obtiene un radioexperimentador por su ID con caché (version invalida la caché entre workers)"""
     try:
         return db.get_radioexperimentador_por_id(radio_id)
     except Exception as e:
@@ -5818,7 +4947,7 @@ def _mostrar_formulario_edicion(radio_id):
     
     try:
         # Obtener los datos actuales del radioexperimentador
-        radio = _get_radioexperimentador_por_id(radio_id)
+        radio = _get_radioexperimentador_por_id(radio_id, version=db.get_version_datos('radioexperimentadores'))
         
         if not radio:
             st.error("No se encontró el radioexperimentador especificado")
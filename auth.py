@@ -1,7 +1,9 @@
+import json
+import time
 import streamlit as st
-import streamlit_authenticator as stauth
 from database import FMREDatabase
-import time
+import password_hasher
+import session_tokens
 
 class AuthManager:
     def __init__(self, db):
@@ -16,19 +18,137 @@ class AuthManager:
             password = st.text_input("Contraseña", type="password")
             
             if st.form_submit_button("Iniciar sesión"):
-                user = self.db.verify_user(username, password)
+                try:
+                    user = self.db.verify_user(username, password)
+                except password_hasher.PoolSaturado as e:
+                    st.error(f"⏳ {e}")
+                    return
                 if user:
-                    st.session_state.user = user
-                    st.success(f"Bienvenido, {user['full_name']}!")
-                    time.sleep(2)
+                    self._iniciar_sesion(user)
                     st.rerun()
                 else:
                     st.error("Usuario o contraseña incorrectos")
     
+    def _iniciar_sesion(self, user, anterior=None):
+        """Guarda el usuario en la sesión y su token en la cookie
+
+        Args:
+            anterior (dict, optional): Claims del token que se renueva
+        """
+        st.session_state.user = user
+        token = session_tokens.emitir(user, anterior)
+        claims, _ = session_tokens.verificar(token)
+        st.session_state.sesion_claims = claims
+        st.session_state.sesion_revisada = time.time()
+        st.session_state.cookie_pendiente = (token, session_tokens.segundos_restantes(claims))
+
+    def _cerrar_token(self):
+        st.session_state.pop('sesion_claims', None)
+        st.session_state.pop('sesion_revisada', None)
+        # La cookie que trajo la conexión (st.context.cookies) ya no sirve para esta sesión
+        st.session_state.cookie_descartada = st.context.cookies.get(session_tokens.NOMBRE_COOKIE)
+        st.session_state.cookie_pendiente = ('', 0)
+
+    def _validar(self, claims, renovar):
+        """Confirma que el usuario sigue activo y que sus sesiones no se revocaron
+
+        Args:
+            claims (dict): Claims del token de la sesión
+            renovar (bool): Emitir un token nuevo (con el mismo auth y rexp)
+
+        Returns:
+            bool: True si la sesión sigue abierta
+        """
+        user = self.db.get_usuario_sesion(int(claims['sub']))
+        if (not user or not user.get('is_active')
+                or not session_tokens.emitido_despues_de(claims, user.get('sesiones_desde'))):
+            st.session_state.pop('user', None)
+            self._cerrar_token()
+            return False
+        user.pop('is_active', None)
+        user.pop('sesiones_desde', None)
+        if 'user' in st.session_state:
+            # Conservar lo que las páginas ya hayan cargado en la sesión
+            st.session_state.user.update(user)
+            user = st.session_state.user
+        if renovar:
+            self._iniciar_sesion(user, claims)
+        else:
+            st.session_state.user = user
+            st.session_state.sesion_claims = claims
+            st.session_state.sesion_revisada = time.time()
+        return True
+
+    def restaurar_sesion(self):
+        """
+        Recupera o mantiene la sesión a partir del token de la cookie
+
+        Sin sesión (reconexión o pestaña nueva) se verifica la firma del token de la
+        cookie y se lee al usuario; si el token ya pasó exp se emite otro. Una sesión
+        abierta vuelve a leer al usuario cada session_tokens.REVISION segundos o cuando
+        el token está por vencer, y termina al llegar a rexp. Ningún caso escribe en la
+        base de datos.
+        """
+        if session_tokens.PARAMETRO_URL_ANTERIOR in st.query_params:
+            # Enlaces con el token en la URL: se quita sin usarlo
+            del st.query_params[session_tokens.PARAMETRO_URL_ANTERIOR]
+
+        if 'user' in st.session_state:
+            claims = st.session_state.get('sesion_claims')
+            if not claims:
+                return
+            if session_tokens.vencido(claims):
+                st.session_state.pop('user', None)
+                self._cerrar_token()
+            elif session_tokens.por_vencer(claims):
+                self._validar(claims, renovar=True)
+            elif time.time() - st.session_state.get('sesion_revisada', 0) >= session_tokens.REVISION:
+                self._validar(claims, renovar=False)
+            return
+
+        token = st.context.cookies.get(session_tokens.NOMBRE_COOKIE)
+        if not token or token == st.session_state.get('cookie_descartada'):
+            return
+        claims, estado = session_tokens.verificar(token)
+        if estado:
+            self._validar(claims, renovar=(estado == 'renovar'))
+        else:
+            self._cerrar_token()
+
+    def escribir_cookie(self):
+        """
+        Escribe (o borra) en el navegador la cookie de sesión pendiente
+
+        Se llama en cada página después de st.set_page_config. Streamlit no envía
+        encabezados Set-Cookie, así que la escribe un script de la página con
+        document.cookie: SameSite=Strict, Secure bajo HTTPS y limitada a la ruta de la
+        aplicación. Por lo mismo no puede ser HttpOnly.
+        """
+        pendiente = st.session_state.pop('cookie_pendiente', None)
+        if pendiente is None:
+            return
+        token, segundos = pendiente
+        ruta = '/' + (st.get_option('server.baseUrlPath') or '').strip('/')
+        cookie = f"{session_tokens.NOMBRE_COOKIE}={token}; Path={ruta}; Max-Age={segundos}; SameSite=Strict"
+        st.html(
+            "<script>"
+            f"var cookie = {json.dumps(cookie)};"
+            "if (window.location.protocol === 'https:') { cookie += '; Secure'; }"
+            "document.cookie = cookie;"
+            "</script>",
+            unsafe_allow_javascript=True,
+        )
+
     def logout(self):
-        """Cierra la sesión del usuario"""
+        """Cierra la sesión del usuario e invalida su token"""
+        claims = st.session_state.get('sesion_claims')
+        if claims:
+            session_tokens.revocar(claims)
         if 'user' in st.session_state:
+            # Los demás workers rechazan el token en su siguiente revisión
+            self.db.revocar_sesiones(st.session_state.user['id'])
             del st.session_state.user
+        self._cerrar_token()
         st.session_state.current_page = "home"
         st.rerun()
     
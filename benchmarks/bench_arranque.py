@@ -0,0 +1,157 @@
+"""
+Benchmark de arranque de la aplicación Streamlit.
+
+Cada medición corre en un proceso nuevo (arranque en frío) sobre una copia de la
+base de datos, para no modificar qms.db:
+
+  - login: tiempo de importar streamlit y de mostrar la pantalla de inicio de sesión
+  - <página>: costo del primer render de cada página con un administrador autenticado,
+    elegida en el menú lateral después del inicio, en el mismo proceso
+
+También reporta qué bibliotecas pesadas quedaron cargadas tras cada medición.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 3] [--db qms.db] [--json salida.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGINAS = ['home', 'gestion', 'toma_reportes', 'registros', 'reports', 'settings']
+
+# La barra lateral decide la página en cada ejecución a partir de su selectbox
+OPCIONES_MENU = {
+    'home': "🏠 Inicio",
+    'gestion': "🔧 Gestión",
+    'toma_reportes': "📝 Toma de Reportes",
+    'registros': "📋 Registros",
+    'reports': "📊 Reportes",
+    'settings': "⚙️ Configuración",
+}
+
+BIBLIOTECAS_PESADAS = ['pandas', 'plotly', 'reportlab', 'openpyxl', 'xlsxwriter', 'pyarrow']
+
+
+def _usuario_admin(db_path):
+    """Obtiene un usuario administrador de la base para simular la sesión"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        fila = conn.execute("SELECT * FROM users WHERE role = 'admin' ORDER BY id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+    if fila is None:
+        raise SystemExit("La base de datos no tiene usuarios administradores")
+    usuario = dict(fila)
+    usuario.pop('password', None)
+    return usuario
+
+
+def _medir(objetivo):
+    """Ejecuta una medición dentro del proceso hijo e imprime el resultado en JSON"""
+    sys.path.insert(0, RAIZ)
+
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    t_streamlit = time.perf_counter() - inicio
+
+    at = AppTest.from_file(os.path.join(RAIZ, 'app.py'), default_timeout=300)
+    inicio = time.perf_counter()
+    at.run()
+    t_login = time.perf_counter() - inicio
+
+    resultado = {
+        'objetivo': objetivo,
+        'import_streamlit_s': t_streamlit,
+        'login_s': t_login,
+        'excepciones': [str(e.value) for e in at.exception],
+    }
+
+    if objetivo != 'login':
+        # La primera ejecución autenticada muestra el inicio; las demás páginas se
+        # eligen después en el menú, como lo haría el usuario
+        at.session_state['user'] = _usuario_admin('qms.db')
+        inicio = time.perf_counter()
+        at.run()
+        if objetivo != 'home':
+            at.sidebar.selectbox[0].set_value(OPCIONES_MENU[objetivo])
+            inicio = time.perf_counter()
+            at.run()
+        resultado['pagina_s'] = time.perf_counter() - inicio
+        resultado['excepciones'] = [str(e.value) for e in at.exception]
+
+    resultado['bibliotecas_cargadas'] = [m for m in BIBLIOTECAS_PESADAS if m in sys.modules]
+    print(json.dumps(resultado))
+
+
+def _preparar_directorio(db_path):
+    """Crea un directorio de trabajo con una copia de la base y enlaces a los recursos"""
+    directorio = tempfile.mkdtemp(prefix='qms_bench_')
+    shutil.copy2(db_path, os.path.join(directorio, 'qms.db'))
+    for recurso in ('data', 'assets'):
+        origen = os.path.join(RAIZ, recurso)
+        if os.path.isdir(origen):
+            os.symlink(origen, os.path.join(directorio, recurso))
+    return directorio
+
+
+def _ejecutar(objetivo, db_path):
+    directorio = _preparar_directorio(db_path)
+    try:
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--medir', objetivo],
+            cwd=directorio, capture_output=True, text=True, check=True
+        ).stdout
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el arranque y el primer render de cada página")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--db', default=os.path.join(RAIZ, 'qms.db'), help="Base de datos a copiar para la prueba")
+    parser.add_argument('--paginas', nargs='*', default=PAGINAS)
+    parser.add_argument('--json', help="Archivo donde guardar los resultados")
+    parser.add_argument('--medir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        _medir(args.medir)
+        return
+
+    resultados = {}
+    for objetivo in ['login'] + list(args.paginas):
+        corridas = [_ejecutar(objetivo, args.db) for _ in range(args.repeticiones)]
+        clave = 'login_s' if objetivo == 'login' else 'pagina_s'
+        tiempos = [c[clave] for c in corridas]
+        resultados[objetivo] = {
+            'mediana_s': statistics.median(tiempos),
+            'min_s': min(tiempos),
+            'max_s': max(tiempos),
+            'import_streamlit_s': statistics.median(c['import_streamlit_s'] for c in corridas),
+            'bibliotecas_cargadas': corridas[-1]['bibliotecas_cargadas'],
+            'excepciones': corridas[-1]['excepciones'],
+        }
+        r = resultados[objetivo]
+        print(f"{objetivo:<15} {r['mediana_s'] * 1000:9.1f} ms  (min {r['min_s'] * 1000:.1f}, max {r['max_s'] * 1000:.1f})"
+              f"  cargadas: {', '.join(r['bibliotecas_cargadas']) or '-'}")
+        for error in r['excepciones']:
+            print(f"    excepción: {error}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""
+Benchmark de las rutas más usadas de FMREDatabase.
+
+Corre sobre bases sintéticas (datos_sinteticos.py) de varios tamaños, cada una en
+una copia nueva para que las escrituras no se acumulen entre corridas. Las bases
+generadas se guardan en --datos y se reutilizan mientras no cambie el tamaño ni la
+semilla; los datos terminan en una fecha fija, así dos corridas miden lo mismo.
+
+Casos:
+  - save_reporte (por reporte, en ráfagas de --rafaga reportes)
+  - get_reportes_por_fecha (el domingo con más reportes)
+  - get_reportes_por_fecha_rango (últimos 30 días)
+  - get_reportes_filtrados sin búsqueda y con búsqueda (últimos 90 días)
+  - import_radioexperimentadores_from_excel (500 filas: la mitad ya existen)
+  - verify_user (contraseña correcta e incorrecta)
+
+Con --baseline compara la mediana de cada caso con un resultado guardado antes y
+termina con código 1 si alguno es más lento que la tolerancia; así se puede correr
+antes de desplegar. --guardar-baseline escribe los resultados como nueva referencia.
+
+Uso:
+    python benchmarks/bench_database.py [--tamanos pequeno mediano] [--repeticiones 5]
+        [--json salida.json] [--baseline base.json] [--tolerancia 0.25] [--guardar-baseline base.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import datos_sinteticos  # noqa: E402
+
+# (reportes, radioexperimentadores)
+TAMANOS = {
+    'pequeno': (10_000, 2_000),
+    'mediano': (200_000, 10_000),
+    'grande': (1_000_000, 20_000),
+}
+# Último día de los datos sintéticos (fijo para que las corridas sean comparables)
+FECHA_FINAL = date(2025, 12, 31)
+SEMILLA = 42
+
+USUARIO_BENCH = 'bench_user'
+PASSWORD_BENCH = 'Bench-Password-1'
+
+# Diferencias menores a esto (segundos) no cuentan como regresión, por ruido
+PISO_RUIDO_S = 0.001
+
+
+def _base_generada(directorio, tamano):
+    """Ruta de la base sintética de un tamaño, generándola si no existe"""
+    reportes, radioexperimentadores = TAMANOS[tamano]
+    ruta = os.path.join(directorio, f"qms_{tamano}_{reportes}_{radioexperimentadores}_{SEMILLA}.db")
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        temporal = ruta + '.tmp'
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(temporal + sufijo):
+                os.remove(temporal + sufijo)
+        print(f"Generando base '{tamano}' ({reportes:,} reportes)...", file=sys.stderr)
+        datos_sinteticos.generar(temporal, reportes, radioexperimentadores, semilla=SEMILLA, hasta=FECHA_FINAL)
+        conn = sqlite3.connect(temporal)
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.close()
+        os.replace(temporal, ruta)
+    return ruta
+
+
+def _medir(funcion, repeticiones, preparar=None):
+    """Ejecuta funcion una vez de calentamiento y luego 'repeticiones' veces
+
+    Args:
+        preparar: Función opcional que se llama (sin medir) antes de cada ejecución y
+            cuyo resultado recibe funcion
+
+    Returns:
+        tuple: (tiempos en segundos, resultado de la última ejecución)
+    """
+    tiempos = []
+    resultado = None
+    for i in range(repeticiones + 1):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        resultado = funcion(argumento) if preparar else funcion()
+        if i:
+            tiempos.append(time.perf_counter() - inicio)
+    return tiempos, resultado
+
+
+def _filas(resultado):
+    if isinstance(resultado, tuple) and resultado and isinstance(resultado[0], list):
+        return len(resultado[0])
+    if isinstance(resultado, list):
+        return len(resultado)
+    return None
+
+
+def _resumen(tiempos, filas=None, por=1):
+    tiempos = [t / por for t in tiempos]
+    return {
+        'mediana_s': statistics.median(tiempos),
+        'min_s': min(tiempos),
+        'max_s': max(tiempos),
+        'repeticiones': len(tiempos),
+        'filas': filas,
+    }
+
+
+def _archivos_importacion(directorio, conn, cantidad, repeticiones):
+    """Un Excel por ejecución: la mitad de los indicativos ya existen, la otra mitad son nuevos"""
+    import pandas as pd
+
+    existentes = [dict(fila) for fila in conn.execute(
+        'SELECT indicativo, nombre_completo, municipio, estado FROM radioexperimentadores ORDER BY id LIMIT ?',
+        (cantidad // 2,)
+    )]
+    archivos = []
+    rnd = random.Random(SEMILLA)
+    for i in range(repeticiones + 1):
+        filas = [{
+            'INDICATIVO': r['indicativo'],
+            'NOMBRE COMPLETO': r['nombre_completo'],
+            'MUNICIPIO': r['municipio'],
+            'ESTADO': r['estado'],
+        } for r in existentes]
+        filas += [{
+            'INDICATIVO': f"XE{rnd.randint(1, 3)}Z{i:02d}{j:04d}"[:10],
+            'NOMBRE COMPLETO': f"Operador Nuevo {i}-{j}",
+            'MUNICIPIO': 'Toluca',
+            'ESTADO': 'Estado De México',
+        } for j in range(cantidad - len(existentes))]
+        ruta = os.path.join(directorio, f"importacion_{i}.xlsx")
+        pd.DataFrame(filas).to_excel(ruta, index=False)
+        archivos.append(ruta)
+    return archivos
+
+
+def correr_tamano(tamano, directorio_datos, repeticiones, rafaga):
+    """Corre todos los casos sobre una copia nueva de la base de un tamaño"""
+    from database import FMREDatabase
+
+    origen = _base_generada(directorio_datos, tamano)
+    trabajo = tempfile.mkdtemp(prefix='qms_bench_db_')
+    try:
+        ruta = os.path.join(trabajo, 'qms.db')
+        shutil.copy2(origen, ruta)
+        db = FMREDatabase(ruta)
+
+        conn = sqlite3.connect(ruta)
+        conn.row_factory = sqlite3.Row
+        dia_pico = conn.execute(
+            "SELECT date(fecha_reporte) AS dia FROM reportes GROUP BY dia ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()['dia']
+        operadores = [dict(fila) for fila in conn.execute(
+            'SELECT indicativo, nombre_completo, municipio, estado FROM radioexperimentadores LIMIT 500'
+        )]
+        archivos = _archivos_importacion(trabajo, conn, 500, repeticiones)
+        conn.close()
+
+        fin = FECHA_FINAL.isoformat()
+        inicio_30 = (FECHA_FINAL - timedelta(days=30)).isoformat()
+        # get_reportes_filtrados recibe objetos date (los de los st.date_input)
+        inicio_90 = FECHA_FINAL - timedelta(days=90)
+        if not db.get_user_by_username(USUARIO_BENCH):
+            db.create_user(USUARIO_BENCH, PASSWORD_BENCH, 'Usuario Benchmark', 'bench@example.com')
+
+        resultados = {}
+        rnd = random.Random(SEMILLA)
+
+        def _rafaga_reportes():
+            for _ in range(rafaga):
+                operador = rnd.choice(operadores)
+                db.save_reporte({
+                    'indicativo': operador['indicativo'],
+                    'nombre': operador['nombre_completo'],
+                    'estado': operador['estado'],
+                    'ciudad': operador['municipio'],
+                    'sistema': 'ASL',
+                    'fecha_reporte': FECHA_FINAL.strftime('%d/%m/%Y'),
+                    'tipo_reporte': 'Boletín',
+                    'origen': 'Sistema',
+                })
+
+        tiempos, _ = _medir(_rafaga_reportes, repeticiones)
+        resultados['save_reporte'] = _resumen(tiempos, por=rafaga)
+
+        casos = {
+            'get_reportes_por_fecha': lambda: db.get_reportes_por_fecha(dia_pico),
+            'get_reportes_por_fecha_rango': lambda: db.get_reportes_por_fecha_rango(inicio_30, fin),
+            'get_reportes_filtrados': lambda: db.get_reportes_filtrados(fecha_inicio=inicio_90, fecha_fin=FECHA_FINAL),
+            'get_reportes_filtrados_busqueda': lambda: db.get_reportes_filtrados(
+                fecha_inicio=inicio_90, fecha_fin=FECHA_FINAL, busqueda='garcia'),
+            'buscar_radioexperimentadores': lambda: db.buscar_radioexperimentadores(pagina=20),
+            'buscar_radioexperimentadores_busqueda': lambda: db.buscar_radioexperimentadores(
+                texto='garcia', orden='nombre_completo'),
+        }
+        for nombre, caso in casos.items():
+            tiempos, resultado = _medir(caso, repeticiones)
+            resultados[nombre] = _resumen(tiempos, _filas(resultado))
+
+        pendientes = iter(archivos)
+        tiempos, resultado = _medir(db.import_radioexperimentadores_from_excel, repeticiones,
+                                    preparar=lambda: next(pendientes))
+        resultados['import_radioexperimentadores_from_excel'] = _resumen(tiempos, resultado[0])
+
+        tiempos, _ = _medir(lambda: db.verify_user(USUARIO_BENCH, PASSWORD_BENCH), repeticiones)
+        resultados['verify_user'] = _resumen(tiempos)
+        tiempos, _ = _medir(lambda: db.verify_user(USUARIO_BENCH, 'incorrecta'), repeticiones)
+        resultados['verify_user_incorrecta'] = _resumen(tiempos)
+        return resultados
+    finally:
+        shutil.rmtree(trabajo, ignore_errors=True)
+
+
+def comparar(resultados, baseline, tolerancia):
+    """
+    Compara las medianas con una referencia
+
+    Returns:
+        list: (tamaño, caso, mediana de referencia, mediana actual, cambio relativo)
+        de los casos más lentos que la tolerancia
+    """
+    regresiones = []
+    for tamano, casos in resultados.items():
+        for caso, actual in casos.items():
+            referencia = baseline.get('resultados', {}).get(tamano, {}).get(caso)
+            if not referencia:
+                continue
+            antes, ahora = referencia['mediana_s'], actual['mediana_s']
+            if ahora > antes * (1 + tolerancia) and ahora - antes > PISO_RUIDO_S:
+                regresiones.append((tamano, caso, antes, ahora, ahora / antes - 1))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide las operaciones principales de FMREDatabase")
+    parser.add_argument('--tamanos', nargs='*', default=['pequeno', 'mediano'], choices=list(TAMANOS))
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--rafaga', type=int, default=50, help="Reportes por ejecución de save_reporte")
+    parser.add_argument('--datos', default=os.path.join(tempfile.gettempdir(), 'qms_bench_datos'),
+                        help="Directorio donde se guardan las bases generadas")
+    parser.add_argument('--json', help="Archivo donde guardar los resultados")
+    parser.add_argument('--baseline', help="Resultados de referencia con los que comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Aumento relativo permitido (0.25 = 25%%)")
+    parser.add_argument('--guardar-baseline', help="Guarda estos resultados como nueva referencia")
+    args = parser.parse_args()
+
+    salida = {
+        'meta': {
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'semilla': SEMILLA,
+        },
+        'resultados': {},
+    }
+    for tamano in args.tamanos:
+        resultados = correr_tamano(tamano, args.datos, args.repeticiones, args.rafaga)
+        salida['resultados'][tamano] = resultados
+        print(f"\n{tamano} ({TAMANOS[tamano][0]:,} reportes)")
+        for caso, r in resultados.items():
+            filas = f"  {r['filas']:,} filas" if r['filas'] is not None else ''
+            print(f"  {caso:<42} {r['mediana_s'] * 1000:10.2f} ms  (min {r['min_s'] * 1000:.2f}){filas}")
+
+    for ruta in (args.json, args.guardar_baseline):
+        if ruta:
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(salida, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regresiones = comparar(salida['resultados'], baseline, args.tolerancia)
+        if regresiones:
+            print(f"\nRegresiones respecto a {args.baseline} (tolerancia {args.tolerancia:.0%}):")
+            for tamano, caso, antes, ahora, cambio in regresiones:
+                print(f"  {tamano}/{caso}: {antes * 1000:.2f} ms -> {ahora * 1000:.2f} ms (+{cambio:.0%})")
+            sys.exit(1)
+        print(f"\nSin regresiones respecto a {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
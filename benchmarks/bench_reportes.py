@@ -0,0 +1,312 @@
+"""
+Benchmark de las páginas de reportes, sin navegador.
+
+Corre sobre las bases sintéticas de bench_database.py (mismos tamaños, semilla y
+fecha final), en una copia dentro de un directorio temporal. Para cada reporte y
+para rangos de 30, 90 y 365 días que terminan en la fecha final mide:
+
+  - datos: la función reportes_calculo.datos_* (consulta y DataFrames)
+  - figuras: construir las figuras de Plotly y serializarlas, lo que hace
+    figure_cache con una caché vacía (el GeoJSON del mapa se carga antes, como
+    st.cache_resource)
+  - total: datos + figuras, lo que tarda la página con la caché de figuras fría
+
+Con --apptest también mide la página "📊 Reportes" completa con AppTest (las cinco
+pestañas y el reporte de evento se ejecutan en cada rerun) en un proceso nuevo por
+rango: la primera ejecución con las fechas elegidas (caché de figuras fría) y un
+rerun sin cambios (caché caliente), además del tiempo de cada página medido por
+metrics.
+
+Cada caso tiene un presupuesto de latencia por tamaño (PRESUPUESTOS); si la mediana
+lo supera el script termina con código 1.
+
+Uso:
+    python benchmarks/bench_reportes.py [--tamanos pequeno mediano] [--repeticiones 5]
+        [--rangos 30 90 365] [--apptest] [--json salida.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_arranque import OPCIONES_MENU, _preparar_directorio, _usuario_admin  # noqa: E402
+from bench_database import FECHA_FINAL, SEMILLA, TAMANOS, _base_generada, _medir, _resumen  # noqa: E402
+
+REPORTES = ['actividad', 'geografico', 'sistemas', 'tendencias', 'comparativos']
+RANGOS_DIAS = [30, 90, 365]
+
+# Presupuesto (segundos) de la mediana de cada caso, por tamaño de base. Los casos
+# por reporte son '<reporte>_<días>d' (total: datos + figuras); los de AppTest son
+# 'pagina_<días>d_fria' y 'pagina_<días>d_caliente'. pequeno y mediano tienen ~2x de
+# margen sobre lo medido; grande se extrapoló de mediano (5x reportes).
+PRESUPUESTOS = {
+    'pequeno': {
+        'actividad_30d': 0.05, 'actividad_90d': 0.08, 'actividad_365d': 0.2,
+        'geografico_30d': 0.6, 'geografico_90d': 0.7, 'geografico_365d': 0.8,
+        'sistemas_30d': 0.6, 'sistemas_90d': 0.6, 'sistemas_365d': 0.8,
+        'tendencias_30d': 0.05, 'tendencias_90d': 0.06, 'tendencias_365d': 0.15,
+        'comparativos_30d': 0.06, 'comparativos_90d': 0.1, 'comparativos_365d': 0.3,
+        'pagina_30d_fria': 4.0, 'pagina_90d_fria': 4.5, 'pagina_365d_fria': 5.5,
+        'pagina_30d_caliente': 2.0, 'pagina_90d_caliente': 2.0, 'pagina_365d_caliente': 3.0,
+    },
+    'mediano': {
+        'actividad_30d': 0.3, 'actividad_90d': 0.9, 'actividad_365d': 2.8,
+        'geografico_30d': 0.8, 'geografico_90d': 1.6, 'geografico_365d': 4.5,
+        'sistemas_30d': 0.8, 'sistemas_90d': 1.5, 'sistemas_365d': 4.0,
+        'tendencias_30d': 0.3, 'tendencias_90d': 1.0, 'tendencias_365d': 3.4,
+        'comparativos_30d': 0.6, 'comparativos_90d': 1.3, 'comparativos_365d': 5.2,
+        'pagina_30d_fria': 7.0, 'pagina_90d_fria': 12.0, 'pagina_365d_fria': 30.0,
+        'pagina_30d_caliente': 5.0, 'pagina_90d_caliente': 10.0, 'pagina_365d_caliente': 28.0,
+    },
+    'grande': {
+        'actividad_30d': 1.5, 'actividad_90d': 4.5, 'actividad_365d': 14.0,
+        'geografico_30d': 2.5, 'geografico_90d': 7.0, 'geografico_365d': 20.0,
+        'sistemas_30d': 2.5, 'sistemas_90d': 7.0, 'sistemas_365d': 18.0,
+        'tendencias_30d': 1.5, 'tendencias_90d': 5.0, 'tendencias_365d': 17.0,
+        'comparativos_30d': 3.0, 'comparativos_90d': 6.5, 'comparativos_365d': 26.0,
+        'pagina_30d_fria': 30.0, 'pagina_90d_fria': 50.0, 'pagina_365d_fria': 150.0,
+        'pagina_30d_caliente': 25.0, 'pagina_90d_caliente': 45.0, 'pagina_365d_caliente': 140.0,
+    },
+}
+
+
+def _rango(dias):
+    return FECHA_FINAL - timedelta(days=dias - 1), FECHA_FINAL
+
+
+def _calcular(db, reporte, dias, mapa_estados):
+    """Funciones (datos, figuras) de un reporte; figuras recibe el resultado de datos"""
+    import reportes_calculo
+
+    inicio, fin = _rango(dias)
+
+    if reporte == 'actividad':
+        return (lambda: reportes_calculo.datos_actividad_general(db, inicio, fin)), None
+
+    if reporte == 'geografico':
+        def figuras(datos):
+            if not datos['num_reportes']:
+                return []
+            return [
+                reportes_calculo.figura_mapa_estados(datos['df_geografico'], mapa_estados),
+                reportes_calculo.figura_reportes_por_zona(datos['zonas_count']),
+                reportes_calculo.figura_reportes_por_estado(datos['df_geografico']),
+            ]
+        return (lambda: reportes_calculo.datos_geografico(db, inicio, fin)), figuras
+
+    if reporte == 'sistemas':
+        def figuras(datos):
+            if not datos['num_reportes']:
+                return []
+            return [
+                reportes_calculo.figura_uso_sistemas(datos['sistemas_count']),
+                reportes_calculo.figura_senal_sistemas(datos['senal_por_sistema']),
+            ]
+        return (lambda: reportes_calculo.datos_sistemas(db, inicio, fin)), figuras
+
+    if reporte == 'tendencias':
+        return (lambda: reportes_calculo.datos_tendencias(db, inicio, fin)), None
+
+    # Comparativos: el rango contra el periodo de la misma duración que lo precede
+    p1_inicio, p1_fin = inicio - timedelta(days=dias), inicio - timedelta(days=1)
+    return (lambda: reportes_calculo.datos_comparativos(db, p1_inicio, p1_fin, inicio, fin)), None
+
+
+def _serializar(figuras):
+    """Lo que hace figure_cache.obtener_figura con cada figura nueva"""
+    return [figura.to_json() for figura, _ in figuras if figura is not None]
+
+
+def correr_calculo(db_path, repeticiones, rangos):
+    """Mide datos_* y las figuras de cada reporte con la base ya copiada en el directorio actual"""
+    from database import FMREDatabase
+    import reportes_calculo
+
+    db = FMREDatabase(db_path)
+    mapa_estados = reportes_calculo.cargar_mapa_estados('media')
+    resultados = {}
+    for dias in rangos:
+        for reporte in REPORTES:
+            calcular_datos, construir_figuras = _calcular(db, reporte, dias, mapa_estados)
+            tiempos_datos, datos = _medir(calcular_datos, repeticiones)
+            num_reportes = datos['num_reportes'] if datos and 'num_reportes' in datos else None
+            resultados[f"{reporte}_{dias}d_datos"] = _resumen(tiempos_datos, num_reportes)
+            if construir_figuras is None:
+                resultados[f"{reporte}_{dias}d"] = resultados[f"{reporte}_{dias}d_datos"]
+                continue
+            tiempos_figuras, _ = _medir(lambda: _serializar(construir_figuras(datos)), repeticiones)
+            resultados[f"{reporte}_{dias}d_figuras"] = _resumen(tiempos_figuras)
+            tiempos_total, _ = _medir(lambda: _serializar(construir_figuras(calcular_datos())), repeticiones)
+            resultados[f"{reporte}_{dias}d"] = _resumen(tiempos_total, num_reportes)
+    return resultados
+
+
+def _tiempos_paginas():
+    import metrics
+    return {f['nombre']: f['total_s'] for f in metrics.resumen() if f['tipo'] == 'pagina'}
+
+
+def _medir_apptest(dias, repeticiones):
+    """Ejecuta la página de reportes con AppTest dentro del proceso hijo e imprime JSON"""
+    from streamlit.testing.v1 import AppTest
+
+    inicio, fin = _rango(dias)
+    p1_inicio, p1_fin = inicio - timedelta(days=dias), inicio - timedelta(days=1)
+
+    at = AppTest.from_file(os.path.join(RAIZ, 'app.py'), default_timeout=600)
+    at.run()
+    at.session_state['user'] = _usuario_admin('qms.db')
+    at.run()
+    at.sidebar.selectbox[0].set_value(OPCIONES_MENU['reports'])
+    at.run()
+
+    # Los selectores de periodo muestran sus fechas solo en modo "Personalizado"
+    at.selectbox(key='tendencias_periodo').set_value("Personalizado")
+    at.selectbox(key='p1_tipo').set_value("Personalizado")
+    at.selectbox(key='p2_tipo').set_value("Personalizado")
+    at.run()
+
+    for prefijo in ('actividad', 'geo', 'sistemas', 'tendencias', 'p2'):
+        at.date_input(key=f'{prefijo}_fecha_inicio').set_value(inicio)
+        at.date_input(key=f'{prefijo}_fecha_fin').set_value(fin)
+    at.date_input(key='p1_fecha_inicio').set_value(p1_inicio)
+    at.date_input(key='p1_fecha_fin').set_value(p1_fin)
+
+    antes = _tiempos_paginas()
+    t = time.perf_counter()
+    at.run()
+    fria = time.perf_counter() - t
+    paginas = {nombre: total - antes.get(nombre, 0.0) for nombre, total in _tiempos_paginas().items()}
+
+    calientes = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        at.run()
+        calientes.append(time.perf_counter() - t)
+
+    print(json.dumps({
+        'fria_s': fria,
+        'calientes_s': calientes,
+        'paginas_s': {nombre: s for nombre, s in paginas.items() if s > 0},
+        'excepciones': [str(e.value) for e in at.exception],
+        'errores': [e.value for e in at.error],
+    }))
+
+
+def correr_apptest(db_path, repeticiones, rangos):
+    """Una corrida de AppTest por rango, cada una en un proceso y directorio nuevos"""
+    resultados = {}
+    for dias in rangos:
+        directorio = _preparar_directorio(db_path)
+        try:
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--medir-apptest', str(dias),
+                 '--repeticiones', str(repeticiones)],
+                cwd=directorio, capture_output=True, text=True, check=True
+            ).stdout
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+        medicion = json.loads(salida.strip().splitlines()[-1])
+        for error in medicion['excepciones'] + medicion['errores']:
+            print(f"    {dias}d: {error}", file=sys.stderr)
+        resultados[f"pagina_{dias}d_fria"] = _resumen([medicion['fria_s']])
+        resultados[f"pagina_{dias}d_caliente"] = _resumen(medicion['calientes_s'])
+        for pagina, segundos in sorted(medicion['paginas_s'].items()):
+            resultados[f"pagina_{dias}d_fria_{pagina}"] = _resumen([segundos])
+    return resultados
+
+
+def correr_tamano(tamano, directorio_datos, repeticiones, rangos, apptest):
+    base = _base_generada(directorio_datos, tamano)
+    directorio = _preparar_directorio(base)
+    anterior = os.getcwd()
+    # cargar_mapa_estados lee data/ relativo al directorio actual
+    os.chdir(directorio)
+    try:
+        resultados = correr_calculo(os.path.join(directorio, 'qms.db'), repeticiones, rangos)
+    finally:
+        os.chdir(anterior)
+        shutil.rmtree(directorio, ignore_errors=True)
+    if apptest:
+        resultados.update(correr_apptest(base, repeticiones, rangos))
+    return resultados
+
+
+def excedidos(resultados):
+    """
+    Casos cuya mediana supera su presupuesto
+
+    Returns:
+        list: (tamaño, caso, presupuesto, mediana) en segundos
+    """
+    fuera = []
+    for tamano, casos in resultados.items():
+        for caso, presupuesto in PRESUPUESTOS.get(tamano, {}).items():
+            medido = casos.get(caso)
+            if medido and medido['mediana_s'] > presupuesto:
+                fuera.append((tamano, caso, presupuesto, medido['mediana_s']))
+    return fuera
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide los cálculos y el render de las páginas de reportes")
+    parser.add_argument('--tamanos', nargs='*', default=['pequeno', 'mediano'], choices=list(TAMANOS))
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--rangos', nargs='*', type=int, default=RANGOS_DIAS, help="Días de cada rango medido")
+    parser.add_argument('--apptest', action='store_true', help="Mide también la página completa con AppTest")
+    parser.add_argument('--datos', default=os.path.join(tempfile.gettempdir(), 'qms_bench_datos'),
+                        help="Directorio donde se guardan las bases generadas")
+    parser.add_argument('--json', help="Archivo donde guardar los resultados")
+    parser.add_argument('--medir-apptest', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir_apptest:
+        _medir_apptest(args.medir_apptest, args.repeticiones)
+        return
+
+    salida = {
+        'meta': {
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'semilla': SEMILLA,
+        },
+        'resultados': {},
+    }
+    for tamano in args.tamanos:
+        resultados = correr_tamano(tamano, args.datos, args.repeticiones, args.rangos, args.apptest)
+        salida['resultados'][tamano] = resultados
+        presupuestos = PRESUPUESTOS.get(tamano, {})
+        print(f"\n{tamano} ({TAMANOS[tamano][0]:,} reportes)")
+        for caso, r in resultados.items():
+            filas = f"  {r['filas']:,} reportes" if r['filas'] is not None else ''
+            presupuesto = f"  [presupuesto {presupuestos[caso] * 1000:.0f} ms]" if caso in presupuestos else ''
+            print(f"  {caso:<44} {r['mediana_s'] * 1000:10.2f} ms  (min {r['min_s'] * 1000:.2f}){presupuesto}{filas}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(salida, f, indent=2)
+
+    fuera = excedidos(salida['resultados'])
+    if fuera:
+        print("\nCasos fuera de presupuesto:")
+        for tamano, caso, presupuesto, mediana in fuera:
+            print(f"  {tamano}/{caso}: {mediana * 1000:.2f} ms > {presupuesto * 1000:.0f} ms")
+        sys.exit(1)
+    print("\nTodos los casos dentro de su presupuesto")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de la conversión y el formato de fechas de time_utils.
+
+Compara, para una columna de fechas como las de SQLite (CURRENT_TIMESTAMP en UTC,
+algunas con fracciones de segundo y algunas vacías), format_datetime valor por valor
+contra format_series sobre la columna completa. Si la mediana de format_series
+supera el presupuesto (PRESUPUESTO_MS para 10 000 fechas, proporcional para otras
+cantidades) el script termina con código 1.
+
+Uso:
+    python benchmarks/bench_time_utils.py [--cantidades 1000 10000 100000] [--repeticiones 5]
+        [--json salida.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from bench_database import SEMILLA, _medir, _resumen  # noqa: E402
+
+# Milisegundos para formatear 10 000 fechas con format_series
+PRESUPUESTO_MS = 50
+
+
+def _fechas(cantidad, semilla):
+    """Cadenas 'YYYY-MM-DD HH:MM:SS' de los últimos años; 1 de cada 20 con fracciones y 1 de cada 50 vacía"""
+    rnd = random.Random(semilla)
+    inicio = datetime(2018, 1, 1)
+    valores = []
+    for i in range(cantidad):
+        fecha = inicio + timedelta(seconds=rnd.randrange(8 * 365 * 86400))
+        if i % 50 == 0:
+            valores.append(None)
+        elif i % 20 == 0:
+            fecha += timedelta(microseconds=rnd.randrange(1, 1000000))
+            valores.append(fecha.strftime('%Y-%m-%d %H:%M:%S.%f'))
+        else:
+            valores.append(fecha.strftime('%Y-%m-%d %H:%M:%S'))
+    return valores
+
+
+# Columnas que deben formatearse igual que con format_datetime: solo fracciones, 'T',
+# resoluciones distintas entre las dos pasadas de convert_series_to_cdmx, zona y vacías
+CASOS_BORDE = [
+    ['2024-07-01T12:00:00.123456'],
+    ['2024-07-01 12:00:00.123', '2024-07-01 12:00:00.5'],
+    ['2024-07-01 12:00:00', '2024-07-01 12:00:00.250000', '2024-07-01T12:00:00+00:00'],
+    ['2024-07-01', None, '', 'no es fecha'],
+]
+
+
+def verificar_casos_borde():
+    from time_utils import format_datetime, format_series
+
+    for valores in CASOS_BORDE:
+        esperado = [format_datetime(v) for v in valores]
+        obtenido = format_series(valores).tolist()
+        if obtenido != esperado:
+            raise SystemExit(f"format_series no coincide con format_datetime: {valores}: {obtenido} != {esperado}")
+
+
+def correr(cantidades, repeticiones):
+    from time_utils import format_datetime, format_series
+
+    verificar_casos_borde()
+    resultados = {}
+    for cantidad in cantidades:
+        valores = _fechas(cantidad, SEMILLA)
+        tiempos_valor, por_valor = _medir(lambda: [format_datetime(v) for v in valores], repeticiones)
+        tiempos_serie, por_serie = _medir(lambda: format_series(valores).tolist(), repeticiones)
+        if por_valor != por_serie:
+            raise SystemExit(f"format_series no coincide con format_datetime ({cantidad} fechas)")
+        resultados[cantidad] = {
+            'format_datetime': _resumen(tiempos_valor, cantidad),
+            'format_series': _resumen(tiempos_serie, cantidad),
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de time_utils")
+    parser.add_argument('--cantidades', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--json', help="Archivo donde guardar los resultados")
+    args = parser.parse_args()
+
+    resultados = correr(args.cantidades, args.repeticiones)
+
+    excedidos = []
+    print(f"  {'fechas':>8} {'format_datetime ms':>19} {'format_series ms':>17} {'presupuesto ms':>15}")
+    for cantidad, r in resultados.items():
+        presupuesto = PRESUPUESTO_MS * max(cantidad, 10000) / 10000
+        serie_ms = r['format_series']['mediana_s'] * 1000
+        print(f"  {cantidad:>8} {r['format_datetime']['mediana_s'] * 1000:>19.1f} {serie_ms:>17.1f} {presupuesto:>15.0f}")
+        if serie_ms > presupuesto:
+            excedidos.append(cantidad)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({str(k): v for k, v in resultados.items()}, f, indent=2)
+
+    if excedidos:
+        print(f"Presupuesto excedido con {', '.join(map(str, excedidos))} fechas")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,438 @@
+"""
+Generador de datos sintéticos para pruebas de carga y planeación de capacidad.
+
+Crea una base de datos nueva con el esquema de FMREDatabase y la llena con
+radioexperimentadores y reportes con la forma de los datos reales:
+
+  - Catálogos reales: estados y su zona (qth), sistemas y tipos de evento son los
+    que inserta FMREDatabase._insert_initial_data en la base nueva.
+  - Indicativos con las formas que acepta utils.validar_call_sign: XE1–XE3 con
+    sufijo (la mayoría), prefijos especiales de México y extranjeros.
+  - Reportes concentrados en los días de cada red: el boletín del domingo en la
+    mañana y su retransmisión del lunes, las prácticas de la RNE entre semana, etc.
+    El volumen de cada día crece con el tiempo, baja en diciembre y en verano y
+    tiene ruido; unos pocos operadores reportan casi cada semana (distribución de
+    Zipf) y cada uno usa casi siempre el mismo sistema.
+
+La misma semilla genera siempre los mismos datos.
+
+Uso:
+    python benchmarks/datos_sinteticos.py --db /tmp/qms_carga.db \\
+        [--reportes 1000000] [--radioexperimentadores 20000] [--anios 3] [--semilla 42]
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Días de la semana (date.weekday(): lunes = 0), hora de inicio, duración en minutos
+# y proporción de los reportes de cada evento
+CALENDARIO_EVENTOS = {
+    'Boletín': ((6,), (9, 0), 90, 0.70),
+    'Retransmisión': ((0,), (20, 0), 60, 0.12),
+    'RNE 40': ((2,), (20, 0), 60, 0.06),
+    'RNE 80': ((3,), (21, 0), 60, 0.05),
+    'Facebook': ((6,), (9, 0), 90, 0.05),
+}
+# Eventos del catálogo sin calendario: cualquier día, durante el día
+CALENDARIO_POR_DEFECTO = ((0, 1, 2, 3, 4, 5, 6), (10, 0), 600, 0.02)
+
+PESOS_SISTEMAS = {'ASL': 40, 'HF': 35, 'IRLP': 10, 'DMR': 8, 'Fusion': 3, 'D-Star': 2, 'P25': 1, 'M17': 1}
+
+# Peso aproximado de radioaficionados por estado (los demás pesan 1)
+PESOS_ESTADOS = {
+    'Ciudad De México': 14, 'Estado De México': 10, 'Jalisco': 7, 'Nuevo León': 6, 'Puebla': 4,
+    'Veracruz': 4, 'Guanajuato': 4, 'Chihuahua': 3, 'Baja California': 3, 'Sonora': 3,
+    'Michoacán': 3, 'Querétaro': 3, 'Coahuila': 2, 'Tamaulipas': 2, 'Sinaloa': 2, 'Yucatán': 2,
+}
+
+CIUDADES = {
+    'Aguascalientes': ['Aguascalientes', 'Jesús María', 'Calvillo'],
+    'Baja California': ['Tijuana', 'Mexicali', 'Ensenada'],
+    'Baja California Sur': ['La Paz', 'Los Cabos', 'Comondú'],
+    'Campeche': ['Campeche', 'Ciudad Del Carmen', 'Champotón'],
+    'Chiapas': ['Tuxtla Gutiérrez', 'Tapachula', 'San Cristóbal De Las Casas'],
+    'Chihuahua': ['Chihuahua', 'Ciudad Juárez', 'Delicias'],
+    'Ciudad De México': ['Gustavo A. Madero', 'Iztapalapa', 'Coyoacán', 'Benito Juárez', 'Tlalpan'],
+    'Coahuila': ['Saltillo', 'Torreón', 'Monclova'],
+    'Colima': ['Colima', 'Manzanillo', 'Tecomán'],
+    'Durango': ['Durango', 'Gómez Palacio', 'Lerdo'],
+    'Estado De México': ['Toluca', 'Naucalpan', 'Ecatepec', 'Nezahualcóyotl', 'Texcoco'],
+    'Guanajuato': ['León', 'Irapuato', 'Celaya', 'Guanajuato'],
+    'Guerrero': ['Acapulco', 'Chilpancingo', 'Iguala'],
+    'Hidalgo': ['Pachuca', 'Tulancingo', 'Tula'],
+    'Jalisco': ['Guadalajara', 'Zapopan', 'Tlaquepaque', 'Puerto Vallarta'],
+    'Michoacán': ['Morelia', 'Uruapan', 'Zamora'],
+    'Morelos': ['Cuernavaca', 'Cuautla', 'Jiutepec'],
+    'Nayarit': ['Tepic', 'Bahía De Banderas', 'Santiago Ixcuintla'],
+    'Nuevo León': ['Monterrey', 'San Nicolás De Los Garza', 'Guadalupe', 'Apodaca'],
+    'Oaxaca': ['Oaxaca', 'Salina Cruz', 'Juchitán'],
+    'Puebla': ['Puebla', 'Tehuacán', 'Atlixco'],
+    'Querétaro': ['Querétaro', 'San Juan Del Río', 'Tequisquiapan'],
+    'Quintana Roo': ['Cancún', 'Chetumal', 'Playa Del Carmen'],
+    'San Luis Potosí': ['San Luis Potosí', 'Ciudad Valles', 'Matehuala'],
+    'Sinaloa': ['Culiacán', 'Mazatlán', 'Los Mochis'],
+    'Sonora': ['Hermosillo', 'Ciudad Obregón', 'Nogales'],
+    'Tabasco': ['Villahermosa', 'Cárdenas', 'Comalcalco'],
+    'Tamaulipas': ['Reynosa', 'Matamoros', 'Tampico', 'Ciudad Victoria'],
+    'Tlaxcala': ['Tlaxcala', 'Apizaco', 'Huamantla'],
+    'Veracruz': ['Veracruz', 'Xalapa', 'Coatzacoalcos', 'Orizaba'],
+    'Yucatán': ['Mérida', 'Valladolid', 'Progreso'],
+    'Zacatecas': ['Zacatecas', 'Fresnillo', 'Guadalupe'],
+}
+
+EXTRANJEROS = [
+    # (prefijos, país, ciudades)
+    (('W', 'K', 'N', 'KA', 'KB', 'KD', 'KE', 'WA', 'WB'), 'Estados Unidos', ['San Antonio', 'Houston', 'El Paso', 'Los Angeles', 'Phoenix']),
+    (('EA',), 'España', ['Madrid', 'Barcelona', 'Sevilla']),
+    (('LU',), 'Argentina', ['Buenos Aires', 'Córdoba', 'Rosario']),
+    (('HK',), 'Colombia', ['Bogotá', 'Medellín', 'Cali']),
+    (('TI',), 'Costa Rica', ['San José', 'Alajuela']),
+    (('CO', 'CM'), 'Cuba', ['La Habana', 'Santiago De Cuba']),
+    (('VE', 'VA'), 'Canadá', ['Toronto', 'Montreal', 'Vancouver']),
+]
+
+NOMBRES_MASCULINOS = ['José', 'Juan', 'Luis', 'Carlos', 'Jorge', 'Miguel', 'Francisco', 'Alejandro', 'Roberto',
+                      'Fernando', 'Ricardo', 'Eduardo', 'Javier', 'Mario', 'Sergio', 'Raúl', 'Arturo', 'Daniel',
+                      'Héctor', 'Manuel', 'Adolfo', 'Enrique', 'Rafael', 'Víctor', 'Gerardo', 'Alberto']
+NOMBRES_FEMENINOS = ['María', 'Guadalupe', 'Patricia', 'Laura', 'Ana', 'Gabriela', 'Verónica', 'Claudia',
+                     'Adriana', 'Silvia', 'Leticia', 'Elena', 'Rosa', 'Mónica', 'Alejandra', 'Teresa']
+APELLIDOS = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Rodríguez', 'Pérez', 'Sánchez', 'Ramírez',
+             'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez', 'Reyes', 'Jiménez', 'Torres', 'Díaz', 'Gutiérrez',
+             'Ruiz', 'Mendoza', 'Aguilar', 'Ortiz', 'Moreno', 'Castillo', 'Romero', 'Álvarez', 'Medina',
+             'Fuentes', 'Licón', 'Acosta', 'Gil', 'Javier', 'Rivera', 'Domínguez', 'Herrera', 'Chávez']
+
+TIPOS_LICENCIA = ['NOVATO', 'AVANZADO', 'GENERAL', 'EXTRA']
+MODOS_HF = ['SSB', 'SSB', 'SSB', 'SSB', 'CW', 'FT8', 'RTTY', 'PSK31']
+POTENCIAS_HF = ['QRP (≤5W)', 'Baja (≤50W)', 'Baja (≤50W)', 'Media (≤200W)', 'Media (≤200W)', 'Alta (≤1kW)']
+FRECUENCIAS_HF = {'RNE 40': ['7.080', '7.085', '7.090'], 'RNE 80': ['3.690', '3.700', '3.720']}
+FRECUENCIAS_HF_POR_DEFECTO = ['7.080', '3.690', '14.250', '7.100']
+SENALES = [59] * 14 + [58, 57, 57, 56, 55, 55, 54, 53, 45]
+
+# Desplazamiento de la hora de CDMX a UTC (sin horario de verano desde 2022)
+DIFERENCIA_UTC = timedelta(hours=6)
+
+
+def _letras(rnd, minimo, maximo):
+    return ''.join(rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(rnd.randint(minimo, maximo)))
+
+
+def _indicativo(rnd, zona):
+    """Indicativo para un operador de la zona dada (XE1–XE3 o EXT)"""
+    if zona == 'EXT':
+        prefijos, _, _ = rnd.choice(EXTRANJEROS)
+        return f"{rnd.choice(prefijos)}{rnd.randint(0, 9)}{_letras(rnd, 2, 3)}"
+    forma = rnd.random()
+    if forma < 0.90:
+        return f"{zona}{_letras(rnd, 1, 3)}"
+    if forma < 0.97:
+        return f"{rnd.choice(('XE', 'XF', 'XB'))}{rnd.randint(4, 9)}{_letras(rnd, 1, 3)}"
+    return f"{rnd.choice(('4A', '4B', '4C', '6D', '6E', '6F', '6G', '6H', '6I', '6J'))}{rnd.randint(0, 9)}{_letras(rnd, 1, 3)}"
+
+
+def _fecha_dmy(rnd, anio_desde, anio_hasta):
+    return date(rnd.randint(anio_desde, anio_hasta), rnd.randint(1, 12), rnd.randint(1, 28)).strftime('%d/%m/%Y')
+
+
+def generar_radioexperimentadores(rnd, cantidad, estados_zonas):
+    """
+    Genera operadores únicos
+
+    Returns:
+        list: dicts con las columnas de radioexperimentadores (más 'zona' y 'sistema'
+        preferido, que no se insertan en esa tabla)
+    """
+    from utils import validar_call_sign
+
+    estados = [e for e in estados_zonas if e != 'Extranjero']
+    pesos = [PESOS_ESTADOS.get(e, 1) for e in estados]
+    sistemas = list(PESOS_SISTEMAS)
+    pesos_sistemas = list(PESOS_SISTEMAS.values())
+
+    operadores = []
+    usados = set()
+    while len(operadores) < cantidad:
+        extranjero = rnd.random() < 0.05
+        if extranjero:
+            estado, zona = 'Extranjero', 'EXT'
+        else:
+            estado = rnd.choices(estados, pesos)[0]
+            zona = estados_zonas[estado]
+        indicativo = _indicativo(rnd, zona)
+        if indicativo in usados:
+            continue
+        if not validar_call_sign(indicativo)['indicativo']:
+            raise AssertionError(f"Indicativo sintético inválido: {indicativo}")
+        usados.add(indicativo)
+
+        genero = rnd.choices(['MASCULINO', 'FEMENINO', 'OTRO'], [88, 11, 1])[0]
+        nombre = rnd.choice(NOMBRES_FEMENINOS if genero == 'FEMENINO' else NOMBRES_MASCULINOS)
+        if rnd.random() < 0.3:
+            nombre += ' ' + rnd.choice(NOMBRES_MASCULINOS + NOMBRES_FEMENINOS)
+        if extranjero:
+            _, pais, ciudades = next(e for e in EXTRANJEROS if indicativo.startswith(e[0]))
+            municipio = rnd.choice(ciudades)
+        else:
+            pais = 'México'
+            municipio = rnd.choice(CIUDADES.get(estado, [estado]))
+
+        operadores.append({
+            'indicativo': indicativo,
+            'nombre_completo': f"{nombre} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+            'municipio': municipio,
+            'estado': estado,
+            'pais': pais,
+            'fecha_nacimiento': _fecha_dmy(rnd, 1945, 2005) if rnd.random() < 0.6 else None,
+            'nacionalidad': 'EXTRANJERA' if extranjero else 'MEXICANA',
+            'genero': genero,
+            'tipo_licencia': rnd.choices(TIPOS_LICENCIA, [30, 25, 35, 10])[0],
+            'fecha_expedicion': _fecha_dmy(rnd, 1980, 2025),
+            'estatus': rnd.choices(['ACTIVO', 'INACTIVO', 'SUSPENDIDO', 'EN TRÁMITE'], [85, 10, 1, 4])[0],
+            'origen': 'Sintético',
+            'activo': 1 if rnd.random() < 0.95 else 0,
+            'zona': zona,
+            'sistema': rnd.choices(sistemas, pesos_sistemas)[0],
+        })
+    return operadores
+
+
+def _factor_dia(rnd, dia, desde, total_dias):
+    """Volumen relativo de un día: crecimiento, temporada y ruido"""
+    crecimiento = 1.0 + 0.6 * (dia - desde).days / max(total_dias, 1)
+    temporada = 0.7 if dia.month == 12 else 0.85 if dia.month in (7, 8) else 1.0
+    return crecimiento * temporada * rnd.lognormvariate(0, 0.25)
+
+
+def _repartir(total, pesos):
+    """Reparte un total en enteros proporcionales a los pesos (el resto por mayor fracción)"""
+    suma = sum(pesos)
+    if not suma:
+        return [0] * len(pesos)
+    exactos = [total * p / suma for p in pesos]
+    enteros = [int(x) for x in exactos]
+    faltan = total - sum(enteros)
+    for i in sorted(range(len(pesos)), key=lambda i: exactos[i] - enteros[i], reverse=True)[:faltan]:
+        enteros[i] += 1
+    return enteros
+
+
+def sesiones(rnd, total_reportes, eventos, desde, hasta):
+    """
+    Fechas de cada evento con el número de reportes de cada una, en orden cronológico
+
+    Returns:
+        list: (datetime de inicio, duración en minutos, evento, reportes)
+    """
+    calendario = {evento: CALENDARIO_EVENTOS.get(evento, CALENDARIO_POR_DEFECTO) for evento in eventos}
+    por_evento = _repartir(total_reportes, [calendario[e][3] for e in eventos])
+    total_dias = (hasta - desde).days
+
+    resultado = []
+    for evento, cantidad in zip(eventos, por_evento):
+        dias_semana, (hora, minuto), duracion, _ = calendario[evento]
+        dias = [desde + timedelta(days=i) for i in range(total_dias + 1)]
+        dias = [d for d in dias if d.weekday() in dias_semana]
+        for dia, reportes in zip(dias, _repartir(cantidad, [_factor_dia(rnd, d, desde, total_dias) for d in dias])):
+            if reportes:
+                inicio = datetime(dia.year, dia.month, dia.day, hora, minuto)
+                resultado.append((inicio, duracion, evento, reportes))
+    resultado.sort()
+    return resultado
+
+
+def generar_reportes(rnd, operadores, sesiones_red, capturistas):
+    """
+    Genera los reportes de cada sesión de red (iterador, en orden cronológico)
+
+    Los operadores se eligen con peso 1/rango^0.9, así unos pocos reportan casi
+    siempre; dentro de una sesión un operador no se repite mientras haya otros.
+    """
+    pesos_acumulados = []
+    acumulado = 0.0
+    for rango in range(1, len(operadores) + 1):
+        acumulado += 1.0 / rango ** 0.9
+        pesos_acumulados.append(acumulado)
+    sistemas = list(PESOS_SISTEMAS)
+    pesos_sistemas = list(PESOS_SISTEMAS.values())
+
+    for inicio, duracion, evento, cantidad in sesiones_red:
+        candidatos = rnd.choices(operadores, cum_weights=pesos_acumulados, k=math.ceil(cantidad * 1.3))
+        vistos = set()
+        elegidos = []
+        for operador in candidatos:
+            if operador['indicativo'] not in vistos:
+                vistos.add(operador['indicativo'])
+                elegidos.append(operador)
+                if len(elegidos) == cantidad:
+                    break
+        while len(elegidos) < cantidad:
+            elegidos.append(rnd.choice(operadores))
+
+        capturista = rnd.choice(capturistas)
+        minutos = sorted(rnd.triangular(0, duracion, duracion * 0.3) for _ in range(cantidad))
+        for operador, minuto in zip(elegidos, minutos):
+            fecha = inicio + timedelta(minutes=minuto)
+            if evento in FRECUENCIAS_HF:
+                sistema = 'HF'
+            elif rnd.random() < 0.8:
+                sistema = operador['sistema']
+            else:
+                sistema = rnd.choices(sistemas, pesos_sistemas)[0]
+            observaciones = ''
+            if sistema == 'HF':
+                frecuencia = rnd.choice(FRECUENCIAS_HF.get(evento, FRECUENCIAS_HF_POR_DEFECTO))
+                observaciones = (f"Frecuencia: {frecuencia}, Modo: {rnd.choice(MODOS_HF)}, "
+                                 f"Potencia: {rnd.choice(POTENCIAS_HF)}")
+            yield (
+                operador['indicativo'], operador['nombre_completo'], operador['zona'], sistema,
+                operador['municipio'], operador['estado'], rnd.choice(SENALES), observaciones, 0,
+                'Sistema', evento, fecha.strftime('%Y-%m-%d %H:%M:%S'),
+                (fecha + DIFERENCIA_UTC).strftime('%Y-%m-%d %H:%M:%S'), capturista, capturista,
+            )
+
+
+def _quitar_triggers_e_indices(conn, tablas):
+    """Quita triggers e índices de las tablas durante la carga; devuelve su SQL para recrearlos"""
+    marcadores = ','.join('?' * len(tablas))
+    objetos = conn.execute(
+        f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('trigger', 'index') "
+        f"AND tbl_name IN ({marcadores}) AND sql IS NOT NULL",
+        tablas
+    ).fetchall()
+    for tipo, nombre, _ in objetos:
+        conn.execute(f"DROP {tipo.upper()} {nombre}")
+    return [sql for _, _, sql in objetos]
+
+
+def generar(db_path, reportes=1_000_000, radioexperimentadores=20_000, anios=3, semilla=42,
+            hasta=None, lote=50_000, progreso=None):
+    """
+    Crea y llena una base de datos sintética
+
+    Args:
+        db_path (str): Ruta de la base nueva (no debe existir)
+        reportes (int): Número de reportes
+        radioexperimentadores (int): Número de operadores
+        anios (int): Años hacia atrás desde 'hasta'
+        semilla (int): Semilla del generador
+        hasta (date, optional): Último día con reportes (hoy por defecto)
+        lote (int): Filas por executemany
+        progreso: Función opcional que recibe (reportes insertados, total)
+
+    Returns:
+        dict: radioexperimentadores, reportes, sesiones, desde, hasta y segundos
+    """
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} ya existe")
+    sys.path.insert(0, RAIZ)
+    from database import FMREDatabase
+
+    inicio_generacion = time.perf_counter()
+    rnd = random.Random(semilla)
+    hasta = hasta or date.today()
+    desde = hasta - timedelta(days=int(365.25 * anios))
+
+    # El esquema, los triggers y los catálogos son los de la aplicación
+    db = FMREDatabase(db_path)
+    estados_zonas = db.get_estados_zonas()
+    eventos = [e['tipo'] for e in db.get_eventos_activos()]
+
+    operadores = generar_radioexperimentadores(rnd, radioexperimentadores, estados_zonas)
+    capturistas = [o['indicativo'] for o in operadores[:12] if o['zona'] != 'EXT'] or ['XE1QMS']
+    sesiones_red = sesiones(rnd, reportes, eventos, desde, hasta)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('BEGIN')
+        recrear = _quitar_triggers_e_indices(conn, ('radioexperimentadores', 'reportes'))
+
+        columnas = ['indicativo', 'nombre_completo', 'municipio', 'estado', 'pais', 'fecha_nacimiento',
+                    'nacionalidad', 'genero', 'tipo_licencia', 'fecha_expedicion', 'estatus', 'origen', 'activo']
+        conn.executemany(
+            f"INSERT INTO radioexperimentadores ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+            ([o[c] for c in columnas] for o in operadores)
+        )
+
+        insertar = '''
+            INSERT INTO reportes (indicativo, nombre, zona, sistema, ciudad, estado, senal, observaciones,
+                                  reportado, origen, tipo_reporte, fecha_reporte, created_at,
+                                  qrz_captured_by, qrz_station)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        filas = []
+        insertados = 0
+        for fila in generar_reportes(rnd, operadores, sesiones_red, capturistas):
+            filas.append(fila)
+            if len(filas) >= lote:
+                conn.executemany(insertar, filas)
+                insertados += len(filas)
+                filas = []
+                if progreso:
+                    progreso(insertados, reportes)
+        if filas:
+            conn.executemany(insertar, filas)
+            insertados += len(filas)
+
+        for sql in recrear:
+            conn.execute(sql)
+        # El índice de búsqueda no se actualizó sin sus triggers
+        conn.execute("INSERT INTO radioexperimentadores_fts (radioexperimentadores_fts) VALUES ('rebuild')")
+        # Sin triggers durante la carga: las versiones se avanzan una vez
+        conn.execute("UPDATE cambios_datos SET version = version + ? WHERE tabla = 'radioexperimentadores'",
+                     (len(operadores),))
+        conn.execute("UPDATE cambios_datos SET version = version + ? WHERE tabla = 'reportes'", (insertados,))
+        conn.execute('COMMIT')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+    return {
+        'radioexperimentadores': len(operadores),
+        'reportes': insertados,
+        'sesiones': len(sesiones_red),
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'segundos': time.perf_counter() - inicio_generacion,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética para pruebas de carga")
+    parser.add_argument('--db', required=True, help="Base de datos a crear (no debe existir)")
+    parser.add_argument('--reportes', type=int, default=1_000_000)
+    parser.add_argument('--radioexperimentadores', type=int, default=20_000)
+    parser.add_argument('--anios', type=int, default=3, help="Años de historia hasta hoy")
+    parser.add_argument('--hasta', type=date.fromisoformat, help="Último día con reportes (YYYY-MM-DD)")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sobrescribir', action='store_true', help="Borra la base si ya existe")
+    args = parser.parse_args()
+
+    if args.sobrescribir:
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + sufijo):
+                os.remove(args.db + sufijo)
+
+    def _progreso(insertados, total):
+        print(f"\r  {insertados:,} / {total:,} reportes", end='', file=sys.stderr, flush=True)
+
+    resultado = generar(args.db, args.reportes, args.radioexperimentadores, args.anios, args.semilla,
+                        hasta=args.hasta, progreso=_progreso)
+    print(file=sys.stderr)
+    print(f"{resultado['radioexperimentadores']:,} radioexperimentadores y {resultado['reportes']:,} reportes "
+          f"en {resultado['sesiones']:,} sesiones ({resultado['desde']} a {resultado['hasta']}) "
+          f"en {resultado['segundos']:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
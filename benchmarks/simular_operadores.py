@@ -0,0 +1,299 @@
+"""
+Simulador de carga de operadores capturando reportes al mismo tiempo.
+
+Reproduce lo que pasa en un boletín nacional, cuando decenas de operadores usan a la
+vez la toma de reportes (show_toma_reportes). Cada operador simulado repite el ciclo
+de la pantalla hasta que se acaba el tiempo:
+
+  1. pre-registro: busca cada indicativo de una tanda con
+     get_radioexperimentador_por_indicativo
+  2. edición: una pausa aleatoria, el tiempo que el operador revisa la tabla
+  3. guardado: save_reporte por cada estación de la tanda
+  4. estadísticas del día: get_reportes_por_fecha de la fecha del boletín
+
+Corre sobre una copia de la base (--db, o la base sintética 'pequeno' de
+bench_database.py) en un directorio temporal. Con --modo hilos todos los operadores
+comparten una instancia de FMREDatabase, como las sesiones de un mismo servidor
+Streamlit; con --modo procesos cada operador es un proceso con su propia instancia y
+su propia cola de escritura, como varios workers sobre la misma base.
+
+Al final muestra por operación: llamadas, rendimiento (llamadas/s), latencia p50/p99
+y máxima, errores y la tasa de errores "database is locked".
+
+Uso:
+    python benchmarks/simular_operadores.py [--operadores 30] [--duracion 60] [--modo hilos|procesos]
+        [--tanda 10] [--pausa 0.5 2.0] [--db qms.db] [--json salida.json]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+OPERACIONES = ['buscar_indicativo', 'save_reporte', 'get_reportes_por_fecha']
+SISTEMAS = ['ASL', 'ASL', 'ASL', 'HF', 'HF', 'IRLP', 'DMR']
+
+
+class _UltimoError(logging.Handler):
+    """Guarda el último error registrado por cada hilo
+
+    get_reportes_por_fecha registra el error y devuelve ([], {}) en lugar de lanzarlo;
+    así se puede saber por qué falló la lectura.
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.por_hilo = {}
+
+    def emit(self, record):
+        self.por_hilo[record.thread] = record.getMessage()
+
+
+_errores_registrados = _UltimoError()
+
+
+def _tipo_error(mensaje):
+    return 'bloqueada' if 'database is locked' in mensaje else 'otro'
+
+
+def _indicativos(db_path, cantidad, semilla):
+    """Indicativos activos de la base, para que las búsquedas y guardados sean válidos"""
+    conn = sqlite3.connect(db_path)
+    try:
+        filas = conn.execute(
+            "SELECT indicativo FROM radioexperimentadores WHERE activo = 1 ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    if not filas:
+        raise SystemExit("La base de datos no tiene radioexperimentadores activos")
+    indicativos = [f[0] for f in filas]
+    random.Random(semilla).shuffle(indicativos)
+    return indicativos[:cantidad]
+
+
+def operador(numero, db, indicativos, fecha, fin, tanda, pausa, semilla):
+    """
+    Ciclo de captura de un operador hasta el instante fin (time.time())
+
+    Returns:
+        list: (operación, segundos, tipo de error o None) de cada llamada
+    """
+    from datetime import datetime
+
+    rnd = random.Random(semilla + numero)
+    mediciones = []
+    capturista = f"SIM{numero:03d}"
+    fecha_consulta = datetime.strptime(fecha, '%d/%m/%Y').strftime('%Y-%m-%d')
+
+    def medir(nombre, funcion, *args):
+        inicio = time.perf_counter()
+        error = None
+        resultado = None
+        try:
+            resultado = funcion(*args)
+        except sqlite3.Error as e:
+            error = _tipo_error(str(e))
+        except Exception as e:
+            error = _tipo_error(str(e.__cause__ or e))
+        mediciones.append((nombre, time.perf_counter() - inicio, error))
+        return resultado, error
+
+    while time.time() < fin:
+        # 1. Pre-registro: búsqueda de cada estación
+        estaciones = rnd.sample(indicativos, min(tanda, len(indicativos)))
+        registros = []
+        for indicativo in estaciones:
+            rx, _ = medir('buscar_indicativo', db.get_radioexperimentador_por_indicativo, indicativo)
+            registros.append((indicativo, rx or {}))
+
+        # 2. Edición de la tabla
+        time.sleep(rnd.uniform(*pausa))
+        if time.time() >= fin:
+            break
+
+        # 3. Guardado
+        sistema = rnd.choice(SISTEMAS)
+        for indicativo, rx in registros:
+            payload = {
+                'indicativo': indicativo,
+                'nombre': rx.get('nombre_completo', ''),
+                'estado': rx.get('estado', ''),
+                'ciudad': rx.get('municipio', ''),
+                'zona': rx.get('zona', ''),
+                'sistema': sistema,
+                'senal': 59,
+                'fecha_reporte': fecha,
+                'tipo_reporte': 'Boletín',
+                'origen': 'Sistema',
+                'qrz_captured_by': capturista,
+                'qrz_station': capturista,
+            }
+            if sistema == 'HF':
+                payload['observaciones'] = "Frecuencia: 7.080, Modo: SSB, Potencia: Baja (≤50W)"
+            medir('save_reporte', db.save_reporte, payload)
+
+        # 4. Estadísticas del día
+        ident = threading.get_ident()
+        _errores_registrados.por_hilo.pop(ident, None)
+        inicio = time.perf_counter()
+        _, estadisticas = db.get_reportes_por_fecha(fecha_consulta)
+        duracion = time.perf_counter() - inicio
+        error = None
+        if not estadisticas:
+            error = _tipo_error(_errores_registrados.por_hilo.pop(ident, ''))
+        mediciones.append(('get_reportes_por_fecha', duracion, error))
+
+    return mediciones
+
+
+def _configurar_proceso():
+    logger = logging.getLogger('qms.database')
+    if _errores_registrados not in logger.handlers:
+        logger.addHandler(_errores_registrados)
+
+
+def _operador_en_proceso(args):
+    """Punto de entrada de cada proceso en --modo procesos"""
+    numero, db_path, indicativos, fecha, inicio, fin, tanda, pausa, semilla = args
+    _configurar_proceso()
+    from database import FMREDatabase
+
+    db = FMREDatabase(db_path)
+    time.sleep(max(0.0, inicio - time.time()))
+    return operador(numero, db, indicativos, fecha, fin, tanda, pausa, semilla)
+
+
+def simular(db_path, operadores, duracion, modo, tanda, pausa, semilla):
+    """
+    Corre la simulación sobre db_path (que se modifica)
+
+    Returns:
+        tuple: (mediciones de todos los operadores, segundos transcurridos)
+    """
+    from time_utils import get_current_cdmx_time
+
+    indicativos = _indicativos(db_path, max(500, operadores * tanda * 4), semilla)
+    fecha = get_current_cdmx_time().strftime('%d/%m/%Y')
+    # Todos empiezan a la vez, después de crear las instancias
+    inicio = time.time() + 2.0
+    fin = inicio + duracion
+
+    if modo == 'procesos':
+        argumentos = [(i, db_path, indicativos, fecha, inicio, fin, tanda, pausa, semilla) for i in range(operadores)]
+        with multiprocessing.Pool(operadores) as pool:
+            por_operador = pool.map(_operador_en_proceso, argumentos)
+    else:
+        _configurar_proceso()
+        from database import FMREDatabase
+
+        db = FMREDatabase(db_path)
+        por_operador = [None] * operadores
+
+        def _correr(i):
+            time.sleep(max(0.0, inicio - time.time()))
+            por_operador[i] = operador(i, db, indicativos, fecha, fin, tanda, pausa, semilla)
+
+        hilos = [threading.Thread(target=_correr, args=(i,), name=f"operador-{i}") for i in range(operadores)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+    return [m for mediciones in por_operador for m in mediciones], max(time.time(), fin) - inicio
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    return valores_ordenados[min(len(valores_ordenados) - 1, int(p * len(valores_ordenados)))]
+
+
+def resumen(mediciones, segundos):
+    """
+    Estadísticas por operación
+
+    Returns:
+        dict: {operación: llamadas, por_segundo, p50_ms, p99_ms, max_ms, errores,
+        bloqueos y tasa_bloqueos (fracción de llamadas con "database is locked")}
+    """
+    resultado = {}
+    for operacion in OPERACIONES:
+        del_tipo = [m for m in mediciones if m[0] == operacion]
+        tiempos = sorted(t for _, t, error in del_tipo if error is None)
+        errores = sum(1 for _, _, error in del_tipo if error)
+        bloqueos = sum(1 for _, _, error in del_tipo if error == 'bloqueada')
+        resultado[operacion] = {
+            'llamadas': len(del_tipo),
+            'por_segundo': round(len(tiempos) / segundos, 2),
+            'p50_ms': round(_percentil(tiempos, 0.50) * 1000, 2),
+            'p99_ms': round(_percentil(tiempos, 0.99) * 1000, 2),
+            'max_ms': round(tiempos[-1] * 1000, 2) if tiempos else 0.0,
+            'errores': errores,
+            'bloqueos': bloqueos,
+            'tasa_bloqueos': round(bloqueos / len(del_tipo), 4) if del_tipo else 0.0,
+        }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simula operadores capturando reportes al mismo tiempo")
+    parser.add_argument('--operadores', type=int, default=30)
+    parser.add_argument('--duracion', type=float, default=60, help="Segundos de simulación")
+    parser.add_argument('--modo', choices=['hilos', 'procesos'], default='hilos')
+    parser.add_argument('--tanda', type=int, default=10, help="Estaciones por pre-registro")
+    parser.add_argument('--pausa', type=float, nargs=2, default=[0.5, 2.0], metavar=('MIN', 'MAX'),
+                        help="Segundos de edición entre el pre-registro y el guardado")
+    parser.add_argument('--db', help="Base a copiar; por defecto la sintética 'pequeno' de bench_database")
+    parser.add_argument('--datos', default=os.path.join(tempfile.gettempdir(), 'qms_bench_datos'),
+                        help="Directorio donde se guardan las bases generadas")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--json', help="Archivo donde guardar los resultados")
+    args = parser.parse_args()
+
+    if args.db:
+        origen = args.db
+    else:
+        from bench_database import _base_generada
+        origen = _base_generada(args.datos, 'pequeno')
+
+    directorio = tempfile.mkdtemp(prefix='qms_sim_')
+    db_path = os.path.join(directorio, 'qms.db')
+    shutil.copy2(origen, db_path)
+    try:
+        mediciones, segundos = simular(db_path, args.operadores, args.duracion, args.modo,
+                                       args.tanda, tuple(args.pausa), args.semilla)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    resultados = resumen(mediciones, segundos)
+    guardados = resultados['save_reporte']['llamadas'] - resultados['save_reporte']['errores']
+    print(f"{args.operadores} operadores ({args.modo}), {segundos:.1f} s, {guardados / segundos:.1f} reportes guardados/s")
+    print(f"  {'operación':<24} {'llamadas':>9} {'/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errores':>8} {'locked':>8}")
+    for operacion, r in resultados.items():
+        print(f"  {operacion:<24} {r['llamadas']:>9} {r['por_segundo']:>8.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+              f" {r['max_ms']:>9.2f} {r['errores']:>8} {r['tasa_bloqueos']:>8.2%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'parametros': {k: v for k, v in vars(args).items() if k != 'json'},
+                'segundos': segundos,
+                'reportes_por_segundo': guardados / segundos,
+                'resultados': resultados,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+
+# Un observador por archivo de base de datos y por proceso
+_observadores = {}
+_observadores_lock = threading.Lock()
+
+
+class ObservadorCambios:
+    """Lee los contadores de cambios_datos solo cuando otra conexión confirmó escrituras.
+
+    Mantiene una conexión propia y consulta PRAGMA data_version, que cambia cuando
+    cualquier otra conexión (de este u otro proceso) confirma una transacción. Si no
+    cambió, los contadores en memoria siguen siendo válidos y no se lee la tabla.
+    """
+
+    def __init__(self, connection_factory):
+        """
+        Args:
+            connection_factory: Función sin argumentos que devuelve una conexión sqlite3
+        """
+        self._connection_factory = connection_factory
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._versiones = {}
+
+    def _revisar(self):
+        # data_version es muy barato; solo se lee la tabla cuando cambió
+        try:
+            if self._conn is None:
+                self._conn = self._connection_factory()
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                filas = self._conn.execute('SELECT tabla, version FROM cambios_datos').fetchall()
+                self._versiones = {fila[0]: fila[1] for fila in filas}
+                self._data_version = data_version
+        except sqlite3.Error as e:
+            print(f"Error al revisar cambios de datos: {str(e)}")
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._data_version = None
+
+    def get_version(self, tabla):
+        """Devuelve la versión conocida de una tabla"""
+        with self._lock:
+            self._revisar()
+            return self._versiones.get(tabla, 0)
+
+
+def get_version_datos(db_path, connection_factory, tabla):
+    """Obtiene la versión de una tabla usando el observador compartido del proceso
+
+    Args:
+        db_path (str): Ruta de la base de datos
+        connection_factory: Función que abre una conexión a esa base de datos
+        tabla (str): Nombre de la tabla versionada
+
+    Returns:
+        int: Versión actual de la tabla
+    """
+    clave = os.path.abspath(db_path)
+    with _observadores_lock:
+        observador = _observadores.get(clave)
+        if observador is None:
+            observador = ObservadorCambios(connection_factory)
+            _observadores[clave] = observador
+    return observador.get_version(tabla)
@@ -0,0 +1,316 @@
+"""
+Registro de consultas lentas de SQLite con su plan de ejecución.
+
+Modo opcional: con QMS_SQL_TRACE=1, FMREDatabase.get_connection abre las conexiones
+con ConexionTrazada, cuyos cursores miden cada sentencia desde execute() hasta que
+se terminan de leer sus filas. Las sentencias que superan QMS_SQL_UMBRAL_MS
+milisegundos (100 por defecto) se escriben como una línea JSON en QMS_SQL_LOG
+(consultas_lentas.log), un archivo rotativo (QMS_SQL_LOG_MB por archivo, 5 respaldos):
+
+  - sql: el texto normalizado (literales y parámetros reemplazados por ?), así que
+    los valores nunca se escriben; de los parámetros solo se registran sus tipos.
+  - plan: el resultado de EXPLAIN QUERY PLAN con los mismos parámetros.
+  - sentencias: programas ejecutados por SQLite durante la medición, contados con
+    set_trace_callback (incluye los triggers que dispara la sentencia).
+  - origen: la función de la aplicación que ejecutó la sentencia.
+
+Sin QMS_SQL_TRACE las conexiones son sqlite3.Connection normales y no hay ningún
+costo. La vista de administración agrupa el archivo por SQL normalizado
+(peores_consultas), de modo que incluye a todos los procesos que escriben en él.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+
+ACTIVO = os.environ.get('QMS_SQL_TRACE', '0') == '1'
+UMBRAL_MS = float(os.environ.get('QMS_SQL_UMBRAL_MS', '100'))
+RUTA_LOG = os.environ.get('QMS_SQL_LOG', 'consultas_lentas.log')
+RESPALDOS_LOG = 5
+
+# Solo estas sentencias tienen un plan que valga la pena registrar
+_CON_PLAN = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_RE_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_NOMBRADOS = re.compile(r"[:@$][A-Za-z_]\w*")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+_logger = None
+
+
+def normalizar_sql(sql):
+    """Texto de la sentencia sin literales, para agrupar y registrar sin datos"""
+    sql = _RE_COMENTARIOS.sub(' ', sql)
+    sql = _RE_CADENAS.sub('?', sql)
+    sql = _RE_NUMEROS.sub('?', sql)
+    sql = _RE_NOMBRADOS.sub('?', sql)
+    sql = _RE_LISTAS.sub('(?, ...)', sql)
+    return _RE_ESPACIOS.sub(' ', sql).strip()
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('qms.sql_lento')
+        if not logger.handlers:
+            handler = RotatingFileHandler(
+                RUTA_LOG,
+                maxBytes=int(float(os.environ.get('QMS_SQL_LOG_MB', '5')) * 1024 * 1024),
+                backupCount=RESPALDOS_LOG,
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _logger = logger
+    return _logger
+
+
+def _tipos_parametros(params):
+    if params is None:
+        return []
+    valores = params.values() if isinstance(params, dict) else params
+    return [type(valor).__name__ for valor in valores]
+
+
+def _origen():
+    """Primera función fuera de este módulo que ejecutó la sentencia"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+def _plan(conn, sql, params):
+    """Filas de EXPLAIN QUERY PLAN como texto indentado, o el error si no se pudo obtener"""
+    try:
+        cursor = sqlite3.Cursor(conn)
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params if params is not None else ())
+        niveles = {}
+        lineas = []
+        for id_nodo, padre, _, detalle in cursor.fetchall():
+            niveles[id_nodo] = niveles.get(padre, -1) + 1
+            lineas.append("  " * niveles[id_nodo] + detalle)
+        return lineas
+    except sqlite3.Error as e:
+        return [f"(sin plan: {e})"]
+
+
+def _registrar(conn, sql, params, duracion_ms, filas, sentencias, muchas=False):
+    entrada = {
+        'ts': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'pid': os.getpid(),
+        'ms': round(duracion_ms, 1),
+        'sql': normalizar_sql(sql),
+        'parametros': _tipos_parametros(params),
+        'filas': filas,
+        'sentencias': sentencias,
+        'origen': _origen(),
+    }
+    if muchas:
+        entrada['executemany'] = True
+    palabras = sql.split(None, 1)
+    if palabras and palabras[0].upper() in _CON_PLAN:
+        entrada['plan'] = _plan(conn, sql, params)
+    _get_logger().info(json.dumps(entrada, ensure_ascii=False))
+
+
+class CursorTrazado(sqlite3.Cursor):
+    """Cursor que mide cada sentencia hasta leer sus filas (o hasta la siguiente)"""
+
+    _sql = None
+    _params = None
+    _muchas = False
+    _ms = 0.0
+    _filas = 0
+
+    def _iniciar(self, sql, params, muchas=False):
+        self._terminar()
+        self._sql = sql
+        self._params = params
+        self._muchas = muchas
+        self._ms = 0.0
+        self._filas = 0
+        self.connection._sentencias = 0
+
+    def _terminar(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        if self._ms >= UMBRAL_MS:
+            _registrar(self.connection, sql, self._params, self._ms, self._filas,
+                       self.connection._sentencias, self._muchas)
+        self._params = None
+
+    def _medir(self, inicio):
+        self._ms += (time.perf_counter() - inicio) * 1000
+
+    def execute(self, sql, parameters=()):
+        self._iniciar(sql, parameters)
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._medir(inicio)
+        if self.description is None:
+            self._terminar()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        self._iniciar(sql, seq_of_parameters[0] if seq_of_parameters else None, muchas=True)
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._medir(inicio)
+        self._terminar()
+        return self
+
+    def executescript(self, sql_script):
+        self._iniciar(sql_script, None)
+        inicio = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            self._medir(inicio)
+        self._terminar()
+        return self
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._medir(inicio)
+        if fila is None:
+            self._terminar()
+        else:
+            self._filas += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._medir(inicio)
+        self._filas += len(filas)
+        if len(filas) < (self.arraysize if size is None else size):
+            self._terminar()
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._medir(inicio)
+        self._filas += len(filas)
+        self._terminar()
+        return filas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            self._medir(inicio)
+            self._terminar()
+            raise
+        self._medir(inicio)
+        self._filas += 1
+        return fila
+
+    def close(self):
+        self._terminar()
+        super().close()
+
+    def __del__(self):
+        # Cursores que se descartan sin agotar sus filas (p. ej. un solo fetchone())
+        try:
+            self._terminar()
+        except Exception:
+            pass
+
+
+class ConexionTrazada(sqlite3.Connection):
+    """Conexión cuyos cursores (también los de execute) son CursorTrazado"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sentencias = 0
+        # El texto que recibe el callback lleva los parámetros expandidos: solo se cuenta
+        self.set_trace_callback(self._contar_sentencia)
+
+    def _contar_sentencia(self, _texto):
+        self._sentencias += 1
+
+    def cursor(self, factory=CursorTrazado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def fabrica_conexion():
+    """Clase de conexión para sqlite3.connect(factory=...) según QMS_SQL_TRACE"""
+    return ConexionTrazada if ACTIVO else sqlite3.Connection
+
+
+def peores_consultas(limite=20, ruta=None):
+    """
+    Agrupa el registro (y sus respaldos) por SQL normalizado
+
+    Args:
+        limite (int): Número de sentencias a devolver
+        ruta (str, optional): Archivo de registro; por defecto QMS_SQL_LOG
+
+    Returns:
+        list: dicts con sql, veces, total_ms, promedio_ms, max_ms, filas_max, origen,
+        ultima y plan (el de la ejecución más lenta), de mayor a menor tiempo total
+    """
+    ruta = ruta or RUTA_LOG
+    grupos = {}
+    for archivo in [ruta] + [f"{ruta}.{i}" for i in range(1, RESPALDOS_LOG + 1)]:
+        try:
+            with open(archivo, encoding='utf-8') as f:
+                lineas = f.readlines()
+        except OSError:
+            continue
+        for linea in lineas:
+            try:
+                entrada = json.loads(linea)
+            except ValueError:
+                continue
+            grupo = grupos.get(entrada['sql'])
+            if grupo is None:
+                grupo = grupos[entrada['sql']] = {
+                    'sql': entrada['sql'], 'veces': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'filas_max': 0, 'origen': None, 'ultima': '', 'plan': [],
+                }
+            grupo['veces'] += 1
+            grupo['total_ms'] += entrada['ms']
+            grupo['filas_max'] = max(grupo['filas_max'], entrada.get('filas') or 0)
+            grupo['ultima'] = max(grupo['ultima'], entrada['ts'])
+            if entrada['ms'] >= grupo['max_ms']:
+                grupo['max_ms'] = entrada['ms']
+                grupo['origen'] = entrada.get('origen')
+                grupo['plan'] = entrada.get('plan', [])
+
+    resultado = sorted(grupos.values(), key=lambda g: g['total_ms'], reverse=True)[:limite]
+    for grupo in resultado:
+        grupo['total_ms'] = round(grupo['total_ms'], 1)
+        grupo['promedio_ms'] = round(grupo['total_ms'] / grupo['veces'], 1)
+    return resultado
@@ -1,37 +1,62 @@
+import logging
+import os
+import re
 import sqlite3
-import hashlib
-import secrets
 import string
 from datetime import datetime
+from urllib.request import pathname2url
+
+import consultas_lentas
+import metrics
+import password_hasher
+
+logger = logging.getLogger('qms.database')
 
 class FMREDatabase:
+    # Tablas cuyas escrituras invalidan las cachés de la aplicación
+    TABLAS_VERSIONADAS = ('radioexperimentadores', 'reportes', 'qth', 'zonas', 'sistemas', 'eventos')
+
     def __init__(self, db_path="qms.db"):
         self.db_path = db_path
         self.init_database()
         self.ensure_zona_column_exists()
         
-    def _check_password(self, password, hashed_password):
-        """
-        Verifica si la contraseña coincide con el hash almacenado
-        
+    def _uri_base_datos(self, ruta, modo=None):
+        """Construye la URI 'file:' de un archivo SQLite (opcionalmente con ?mode=)"""
+        uri = 'file:' + pathname2url(os.path.abspath(ruta))
+        if modo:
+            uri += f'?mode={modo}'
+        return uri
+
+    def _ejecutar_escritura(self, operacion):
+        """Ejecuta una escritura en el hilo escritor compartido y espera su resultado
+
         Args:
-            password (str): Contraseña en texto plano
-            hashed_password (str): Hash de la contraseña almacenado en la base de datos
-            
+            operacion: Función que recibe un cursor dentro de la transacción del lote
+
         Returns:
-            bool: True si la contraseña coincide, False en caso contrario
+            El valor devuelto por la operación una vez confirmada la transacción
         """
-        # Asegurarse de que el hash se calcule de la misma manera que en change_password
-        return hashlib.sha256(password.encode()).hexdigest() == hashed_password
-    
+        from write_queue import get_write_queue
+        return get_write_queue(self.db_path, self.get_connection).execute(operacion)
+
+    def _marcar_actividad(self, tabla, columna, fila_id):
+        """Registra actividad de una fila en el búfer de marcas (ver marcas_actividad.py)"""
+        from marcas_actividad import get_marcas_actividad
+        get_marcas_actividad(self.db_path, self.get_connection).marcar(tabla, columna, fila_id)
+
     def get_connection(self):
         """Obtiene una conexión a la base de datos con manejo de timeouts y conexiones persistentes"""
         # Configuración para evitar bloqueos
+        # Se abre como URI para poder adjuntar (ATTACH) archivos en modo solo lectura
         conn = sqlite3.connect(
-            self.db_path,
+            self._uri_base_datos(self.db_path),
             timeout=30.0,  # Aumentar el tiempo de espera
             isolation_level=None,  # Deshabilitar el modo de transacción automática
-            check_same_thread=False  # Permitir acceso desde múltiples hilos
+            check_same_thread=False,  # Permitir acceso desde múltiples hilos
+            uri=True,
+            # Con QMS_SQL_TRACE=1 las sentencias lentas se registran (consultas_lentas.py)
+            factory=consultas_lentas.fabrica_conexion()
         )
         # Habilitar WAL (Write-Ahead Logging) para mejor concurrencia
         conn.execute('PRAGMA journal_mode=WAL')
@@ -114,6 +139,29 @@ class FMREDatabase:
                     VALUES (?, ?, ?, ?, ?, ?)
                 ''', ('smtp.gmail.com', 587, '', '', 1, ''))
             
+            # Buzón de salida de correos (lo envía el hilo de email_sender.BuzonSalida)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    destinatario TEXT NOT NULL,
+                    asunto TEXT NOT NULL,
+                    cuerpo TEXT NOT NULL,
+                    es_html BOOLEAN DEFAULT 0,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    intentos INTEGER DEFAULT 0,
+                    siguiente_intento DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    ultimo_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    enviado_at DATETIME,
+                    usuario TEXT
+                )
+            ''')
+            cursor.execute("PRAGMA table_info(email_outbox)")
+            if 'usuario' not in {column[1] for column in cursor.fetchall()}:
+                # Usuario al que pertenecen las credenciales del correo (NULL en los demás)
+                cursor.execute('ALTER TABLE email_outbox ADD COLUMN usuario TEXT')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_email_outbox_estado ON email_outbox(estado, siguiente_intento)')
+
             # Tabla de QTH (Estados)
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS qth (
@@ -222,6 +270,9 @@ class FMREDatabase:
                 cursor.execute('ALTER TABLE users ADD COLUMN swl_ciudad TEXT')
             if 'qrz_station' not in columns:
                 cursor.execute('ALTER TABLE users ADD COLUMN qrz_station TEXT')
+            if 'sesiones_desde' not in columns:
+                # Los tokens de sesión emitidos antes de esta fecha (UTC) ya no se renuevan
+                cursor.execute('ALTER TABLE users ADD COLUMN sesiones_desde DATETIME')
                         
             # Tabla de Radioexperimentadores
             cursor.execute('''
@@ -261,6 +312,7 @@ class FMREDatabase:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_radioexperimentadores_estado ON radioexperimentadores(estado)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_radioexperimentadores_municipio ON radioexperimentadores(municipio)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_radioexperimentadores_estatus ON radioexperimentadores(estatus)')
+            self._crear_indice_busqueda_radioexperimentadores(cursor)
             
             # Tabla de Reportes - Primero creamos la tabla si no existe
             cursor.execute('''
@@ -305,11 +357,100 @@ class FMREDatabase:
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_reportes_sistema ON reportes(sistema)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_reportes_tipo_reporte ON reportes(tipo_reporte)')
             
+            # Contadores de cambios por tabla para invalidar cachés entre procesos
+            self._crear_contadores_cambios(cursor)
+            
             # Insertar datos iniciales
             self._insert_initial_data(cursor)
             
             conn.commit()
     
+    def _crear_indice_busqueda_radioexperimentadores(self, cursor):
+        """Crea el índice FTS5 de búsqueda de radioexperimentadores y sus triggers
+
+        radioexperimentadores_fts indexa indicativo, nombre_completo, municipio y
+        estado sin acentos ni mayúsculas (unicode61 remove_diacritics 2). Es de
+        contenido externo: guarda solo el índice y lee las filas de la tabla; los
+        triggers lo mantienen al día en la misma transacción de cada escritura.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'radioexperimentadores_fts'")
+        existia = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS radioexperimentadores_fts USING fts5(
+                indicativo, nombre_completo, municipio, estado,
+                content='radioexperimentadores', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+        columnas = 'indicativo, nombre_completo, municipio, estado'
+        nuevos = 'new.indicativo, new.nombre_completo, new.municipio, new.estado'
+        anteriores = 'old.indicativo, old.nombre_completo, old.municipio, old.estado'
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_radioexperimentadores_fts_insert
+            AFTER INSERT ON radioexperimentadores
+            BEGIN
+                INSERT INTO radioexperimentadores_fts (rowid, {columnas}) VALUES (new.id, {nuevos});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_radioexperimentadores_fts_delete
+            AFTER DELETE ON radioexperimentadores
+            BEGIN
+                INSERT INTO radioexperimentadores_fts (radioexperimentadores_fts, rowid, {columnas})
+                VALUES ('delete', old.id, {anteriores});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_radioexperimentadores_fts_update
+            AFTER UPDATE OF {columnas} ON radioexperimentadores
+            BEGIN
+                INSERT INTO radioexperimentadores_fts (radioexperimentadores_fts, rowid, {columnas})
+                VALUES ('delete', old.id, {anteriores});
+                INSERT INTO radioexperimentadores_fts (rowid, {columnas}) VALUES (new.id, {nuevos});
+            END
+        ''')
+        if not existia:
+            # Bases anteriores al índice: indexar los registros que ya tienen
+            cursor.execute("INSERT INTO radioexperimentadores_fts (radioexperimentadores_fts) VALUES ('rebuild')")
+
+    def _crear_contadores_cambios(self, cursor):
+        """Crea la tabla cambios_datos y los triggers que incrementan su versión
+        
+        Cada escritura en una tabla versionada incrementa su contador dentro de la
+        misma transacción, así cualquier proceso puede saber si sus cachés siguen vigentes.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cambios_datos (
+                tabla TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for tabla in self.TABLAS_VERSIONADAS:
+            cursor.execute('INSERT OR IGNORE INTO cambios_datos (tabla, version) VALUES (?, 0)', (tabla,))
+            for operacion in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_{operacion.lower()}
+                    AFTER {operacion} ON {tabla}
+                    BEGIN
+                        UPDATE cambios_datos SET version = version + 1 WHERE tabla = '{tabla}';
+                    END
+                ''')
+    
+    def get_version_datos(self, tabla):
+        """Obtiene el contador de cambios de una tabla
+        
+        Sirve como argumento de las funciones con st.cache_data para que una
+        escritura hecha por cualquier worker invalide la caché de todos.
+        
+        Args:
+            tabla (str): Nombre de la tabla versionada
+            
+        Returns:
+            int: Versión actual de la tabla (0 si no se conoce)
+        """
+        from cache_sync import get_version_datos
+        return get_version_datos(self.db_path, self.get_connection, tabla)
+    
     def _normalizar_datos_existentes(self, cursor):
         """Normaliza los datos existentes en la base de datos para mantener consistencia"""
         try:
@@ -328,12 +469,12 @@ class FMREDatabase:
                 
                 # Aplicar formato a los campos que deben estar en formato oración
                 for campo in ['nombre_completo', 'municipio', 'estado', 'pais']:
-                    if radio[campo]:
+                    if radio[campo] and formatear_oracion(radio[campo]) != radio[campo]:
                         datos_actualizados[campo] = formatear_oracion(radio[campo])
                 
                 # Asegurar que los campos de códigos estén en mayúsculas
                 for campo in ['nacionalidad', 'genero', 'tipo_licencia', 'estatus']:
-                    if radio[campo]:
+                    if radio[campo] and radio[campo].upper() != radio[campo]:
                         datos_actualizados[campo] = radio[campo].upper()
                 
                 # Actualizar solo si hay cambios
@@ -445,30 +586,12 @@ class FMREDatabase:
             )
     
     def _hash_password(self, password):
-        """Genera un hash seguro de la contraseña"""
-        salt = secrets.token_hex(16)
-        pwd_hash = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000
-        ).hex()
-        return f"{salt}${pwd_hash}"
-        
+        """Genera un hash seguro de la contraseña (ver password_hasher.py)"""
+        return password_hasher.hashear(password)
+
     def _check_password(self, password, stored_hash):
-        """Verifica si la contraseña coincide con el hash almacenado"""
-        if not stored_hash or '$' not in stored_hash:
-            return False
-            
-        salt, pwd_hash = stored_hash.split('$', 1)
-        new_hash = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt.encode('utf-8'),
-            100000
-        ).hex()
-        
-        return pwd_hash == new_hash
+        """Verifica si la contraseña coincide con el hash almacenado, en cualquier formato aceptado"""
+        return password_hasher.verificar(password, stored_hash)
         
     def create_user(self, username, password, full_name, email, phone=None, role='operator', sistema_preferido=None, frecuencia=None, modo=None, potencia=None):
         """Crea un nuevo usuario en la base de datos"""
@@ -514,6 +637,91 @@ class FMREDatabase:
                 cursor.execute('SELECT COUNT(*) FROM users WHERE email = ?', (email,))
             return cursor.fetchone()[0] > 0
             
+    def usernames_existentes(self, usernames):
+        """
+        Nombres de usuario que ya están registrados, con una consulta por bloque
+
+        Args:
+            usernames (iterable): Nombres a buscar
+
+        Returns:
+            set: Los que ya existen en users
+        """
+        return self._valores_existentes('username', usernames)
+
+    def emails_existentes(self, emails):
+        """
+        Correos que ya están registrados, con una consulta por bloque
+
+        Args:
+            emails (iterable): Correos a buscar
+
+        Returns:
+            set: Los que ya existen en users
+        """
+        return self._valores_existentes('email', emails)
+
+    def _valores_existentes(self, columna, valores, bloque=500):
+        valores = list(dict.fromkeys(v for v in valores if v))
+        existentes = set()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # SQLite admite un número limitado de parámetros por sentencia
+            for inicio in range(0, len(valores), bloque):
+                parte = valores[inicio:inicio + bloque]
+                cursor.execute(
+                    f"SELECT {columna} FROM users WHERE {columna} IN ({','.join('?' * len(parte))})",
+                    parte
+                )
+                existentes.update(fila[0] for fila in cursor.fetchall())
+        return existentes
+
+    def crear_usuarios_lote(self, usuarios):
+        """
+        Crea varios usuarios en una sola transacción
+
+        Las contraseñas se hashean antes de tomar el candado de escritura
+        (password_hasher.hashear_lote). Cada usuario se inserta en su propio
+        SAVEPOINT: si uno choca con un usuario o correo registrado mientras tanto, se
+        reporta y los demás se conservan.
+
+        Args:
+            usuarios (list): dicts con username, password, full_name, email y
+                opcionalmente phone, role y sistema_preferido
+
+        Returns:
+            list: (user_id, None) o (None, mensaje de error) por usuario, en el mismo orden
+        """
+        if not usuarios:
+            return []
+        hashes = password_hasher.hashear_lote([u['password'] for u in usuarios])
+
+        def _insertar(cursor):
+            resultados = []
+            for usuario, password_hash in zip(usuarios, hashes):
+                cursor.execute('SAVEPOINT usuario')
+                try:
+                    cursor.execute('''
+                        INSERT INTO users
+                        (username, password_hash, full_name, email, phone, role, sistema_preferido)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (usuario['username'], password_hash, usuario['full_name'], usuario['email'],
+                          usuario.get('phone'), usuario.get('role') or 'operator', usuario.get('sistema_preferido')))
+                    resultados.append((cursor.lastrowid, None))
+                except sqlite3.IntegrityError as e:
+                    if 'users.username' in str(e):
+                        mensaje = f"El nombre de usuario '{usuario['username']}' ya existe"
+                    elif 'users.email' in str(e):
+                        mensaje = f"El correo electrónico '{usuario['email']}' ya está registrado"
+                    else:
+                        mensaje = str(e)
+                    resultados.append((None, mensaje))
+                finally:
+                    cursor.execute('RELEASE usuario')
+            return resultados
+
+        return self._ejecutar_escritura(_insertar)
+
     def get_all_users(self):
         """Obtiene todos los usuarios registrados"""
         with self.get_connection() as conn:
@@ -549,7 +757,8 @@ class FMREDatabase:
                 cursor.execute('''
                     UPDATE users 
                     SET password_hash = ?, 
-                        updated_at = CURRENT_TIMESTAMP
+                        updated_at = CURRENT_TIMESTAMP,
+                        sesiones_desde = CURRENT_TIMESTAMP
                     WHERE username = ?
                 ''', (password_hash, username))
                 
@@ -666,11 +875,8 @@ class FMREDatabase:
                     update_fields.append("swl_ciudad = ?")
                     params.append(swl_ciudad)
                 if qrz_station is not None:
-                    print(f"[DEBUG] Actualizando qrz_station a: {qrz_station}")
                     update_fields.append("qrz_station = ?")
                     params.append(qrz_station)
-                else:
-                    print("[DEBUG] qrz_station es None, no se actualizará")
                 
                 # Si no hay campos para actualizar, retornar False
                 if not update_fields:
@@ -683,11 +889,10 @@ class FMREDatabase:
                 query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
                 params.append(user_id)
                 
-                print(f"[DEBUG] Ejecutando consulta: {query}")
-                print(f"[DEBUG] Parámetros: {params}")
-                
+                # Los parámetros pueden incluir el hash de la contraseña: no se registran
+                logger.debug("update_user %s: %s", user_id, query)
+
                 cursor.execute(query, params)
-                print("[DEBUG] Consulta ejecutada exitosamente")
                 conn.commit()
                 return True
                 
@@ -716,6 +921,28 @@ class FMREDatabase:
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def get_usuario_sesion(self, user_id):
+        """Datos que lleva un token de sesión, más is_active y sesiones_desde para renovarlo"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, username, full_name, role, is_active, sistema_preferido,
+                       qrz_station, sesiones_desde
+                FROM users
+                WHERE id = ?
+            ''', (user_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def revocar_sesiones(self, user_id):
+        """Termina las sesiones abiertas hasta ahora: sus tokens ya no se restauran ni se renuevan"""
+        with self.get_connection() as conn:
+            conn.execute(
+                'UPDATE users SET sesiones_desde = CURRENT_TIMESTAMP WHERE id = ?',
+                (user_id,)
+            )
+            conn.commit()
+
     def get_user_by_username(self, username):
         """Obtiene un usuario por su nombre de usuario"""
         with self.get_connection() as conn:
@@ -750,6 +977,201 @@ class FMREDatabase:
             conn.commit()
             return True
     
+    # =============================================
+    # BUZÓN DE SALIDA DE CORREOS
+    # =============================================
+
+    def encolar_correo(self, destinatario, asunto, cuerpo, es_html=False, usuario=None):
+        """
+        Guarda un correo en el buzón de salida; lo envía el hilo de email_sender
+
+        Args:
+            usuario (str, optional): Usuario cuyas credenciales lleva el correo
+
+        Returns:
+            int: ID del correo en email_outbox
+        """
+        return self.encolar_correos([(destinatario, asunto, cuerpo, es_html, usuario)])[0]
+
+    def encolar_correos(self, correos):
+        """
+        Guarda varios correos en el buzón de salida en una sola transacción
+
+        Args:
+            correos (list): (destinatario, asunto, cuerpo, es_html, usuario) por correo;
+                usuario es None salvo en los correos de credenciales
+
+        Returns:
+            list: IDs en email_outbox, en el mismo orden
+        """
+        def _insertar(cursor):
+            ids = []
+            for destinatario, asunto, cuerpo, es_html, usuario in correos:
+                cursor.execute('''
+                    INSERT INTO email_outbox (destinatario, asunto, cuerpo, es_html, usuario)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (destinatario, asunto, cuerpo, 1 if es_html else 0, usuario))
+                ids.append(cursor.lastrowid)
+            return ids
+
+        return self._ejecutar_escritura(_insertar)
+
+    def hay_correos_pendientes(self, reclamo_vencido=600):
+        """True si hay correos listos para tomar (consulta de solo lectura, sin la cola de escritura)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT EXISTS (
+                    SELECT 1 FROM email_outbox
+                    WHERE (estado = 'pendiente' AND siguiente_intento <= CURRENT_TIMESTAMP)
+                       OR (estado = 'enviando' AND siguiente_intento <= datetime('now', ?))
+                )
+            ''', (f'-{int(reclamo_vencido)} seconds',))
+            return bool(cursor.fetchone()[0])
+
+    def tomar_correos_pendientes(self, limite=20, reclamo_vencido=600):
+        """
+        Marca como 'enviando' los correos listos para enviarse y los devuelve
+
+        La selección y el cambio de estado ocurren en la misma transacción de la cola
+        de escritura, así dos procesos no toman el mismo correo. Los que quedaron en
+        'enviando' por más de reclamo_vencido segundos (un proceso que terminó a medio
+        envío) se vuelven a tomar.
+
+        Args:
+            limite (int): Máximo de correos
+            reclamo_vencido (int): Segundos tras los que un correo en 'enviando' se reintenta
+
+        Returns:
+            list: Correos (dict) tomados, del más antiguo al más reciente
+        """
+        def _tomar(cursor):
+            cursor.execute('''
+                SELECT * FROM email_outbox
+                WHERE (estado = 'pendiente' AND siguiente_intento <= CURRENT_TIMESTAMP)
+                   OR (estado = 'enviando' AND siguiente_intento <= datetime('now', ?))
+                ORDER BY id
+                LIMIT ?
+            ''', (f'-{int(reclamo_vencido)} seconds', limite))
+            correos = [dict(fila) for fila in cursor.fetchall()]
+            if correos:
+                cursor.executemany(
+                    "UPDATE email_outbox SET estado = 'enviando', siguiente_intento = CURRENT_TIMESTAMP WHERE id = ?",
+                    [(correo['id'],) for correo in correos]
+                )
+            return correos
+
+        return self._ejecutar_escritura(_tomar)
+
+    def marcar_correos_enviados(self, ids):
+        """Marca correos como enviados y borra su cuerpo (puede llevar contraseñas temporales)"""
+        if not ids:
+            return
+        self._ejecutar_escritura(lambda cursor: cursor.executemany(
+            "UPDATE email_outbox SET estado = 'enviado', cuerpo = '', ultimo_error = NULL, "
+            "enviado_at = CURRENT_TIMESTAMP WHERE id = ?",
+            [(correo_id,) for correo_id in ids]
+        ))
+
+    def reprogramar_correos(self, fallos, max_intentos):
+        """
+        Registra intentos fallidos de envío
+
+        Los correos de credenciales que quedan 'fallido' pierden el cuerpo (lleva la
+        contraseña temporal); al reintentarlos se reemiten con una contraseña nueva.
+
+        Args:
+            fallos (list): (id, segundos de espera, mensaje de error) por correo
+            max_intentos (int): Al llegar a estos intentos el correo queda 'fallido'
+        """
+        if not fallos:
+            return
+        self._ejecutar_escritura(lambda cursor: cursor.executemany('''
+            UPDATE email_outbox
+            SET intentos = intentos + 1,
+                estado = CASE WHEN intentos + 1 >= ? THEN 'fallido' ELSE 'pendiente' END,
+                cuerpo = CASE WHEN intentos + 1 >= ? AND usuario IS NOT NULL THEN '' ELSE cuerpo END,
+                siguiente_intento = datetime('now', ?),
+                ultimo_error = ?
+            WHERE id = ?
+        ''', [(max_intentos, max_intentos, f'+{int(espera)} seconds', str(error)[:500], correo_id)
+              for correo_id, espera, error in fallos]))
+
+    def reintentar_correos_fallidos(self):
+        """Devuelve al buzón, con los intentos en cero, los correos 'fallido' que no son de
+        credenciales (esos no conservan el cuerpo; ver EmailSender.reintentar_fallidos)
+
+        Returns:
+            int: Cantidad de correos reintentados
+        """
+        def _reintentar(cursor):
+            cursor.execute('''
+                UPDATE email_outbox
+                SET estado = 'pendiente', intentos = 0, siguiente_intento = CURRENT_TIMESTAMP
+                WHERE estado = 'fallido' AND usuario IS NULL
+            ''')
+            return cursor.rowcount
+
+        return self._ejecutar_escritura(_reintentar)
+
+    def get_credenciales_fallidas(self):
+        """
+        Correos de credenciales en 'fallido' junto con su usuario
+
+        Returns:
+            list: dicts con id y usuario del correo, y username, full_name, email e
+            is_active del usuario (None si ya no existe); ya_ingreso es 1 si el usuario
+            inició sesión después de encolarse el correo
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT o.id, o.usuario, u.username, u.full_name, u.email, u.is_active,
+                       COALESCE(u.last_login > o.created_at, 0) AS ya_ingreso
+                FROM email_outbox o
+                LEFT JOIN users u ON u.username = o.usuario
+                WHERE o.estado = 'fallido' AND o.usuario IS NOT NULL
+                ORDER BY o.id
+            ''')
+            return [dict(fila) for fila in cursor.fetchall()]
+
+    def reemitir_correo(self, correo_id, destinatario, cuerpo):
+        """Devuelve un correo 'fallido' al buzón con un cuerpo nuevo y los intentos en cero"""
+        self._ejecutar_escritura(lambda cursor: cursor.execute('''
+            UPDATE email_outbox
+            SET estado = 'pendiente', intentos = 0, siguiente_intento = CURRENT_TIMESTAMP,
+                destinatario = ?, cuerpo = ?
+            WHERE id = ? AND estado = 'fallido'
+        ''', (destinatario, cuerpo, correo_id)))
+
+    def descartar_correo(self, correo_id, motivo):
+        """Deja un correo 'fallido' como 'descartado' (ya no se reintenta)"""
+        self._ejecutar_escritura(lambda cursor: cursor.execute('''
+            UPDATE email_outbox
+            SET estado = 'descartado', cuerpo = '', ultimo_error = ?
+            WHERE id = ? AND estado = 'fallido'
+        ''', (motivo, correo_id)))
+
+    def get_estado_buzon_correos(self):
+        """
+        Resumen del buzón de salida
+
+        Returns:
+            dict: Cantidad de correos por estado y el último error de los fallidos
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT estado, COUNT(*) FROM email_outbox GROUP BY estado')
+            resumen = {estado: cantidad for estado, cantidad in cursor.fetchall()}
+            cursor.execute('''
+                SELECT ultimo_error FROM email_outbox
+                WHERE estado IN ('fallido', 'pendiente') AND ultimo_error IS NOT NULL
+                ORDER BY siguiente_intento DESC LIMIT 1
+            ''')
+            fila = cursor.fetchone()
+            resumen['ultimo_error'] = fila[0] if fila else None
+            return resumen
+
     def verify_user(self, username, password):
         """Verifica las credenciales del usuario"""
         user = self.get_user_by_username(username)
@@ -757,14 +1179,20 @@ class FMREDatabase:
             return None
             
         if self._check_password(password, user['password_hash']):
-            # Actualizar último inicio de sesión
-            with self.get_connection() as conn:
-                conn.execute(
-                    'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?',
-                    (user['id'],)
-                )
-                conn.commit()
-            
+            # Hashes de un formato anterior o con otras iteraciones se regeneran ahora,
+            # que se conoce la contraseña
+            nuevo_hash = None
+            if password_hasher.necesita_rehash(user['password_hash']):
+                nuevo_hash = self._hash_password(password)
+
+            if nuevo_hash:
+                self._ejecutar_escritura(lambda cursor: cursor.execute(
+                    'UPDATE users SET password_hash = ? WHERE id = ?', (nuevo_hash, user['id'])
+                ))
+
+            # El último inicio de sesión se escribe en el siguiente vaciado del búfer
+            self._marcar_actividad('users', 'last_login', user['id'])
+
             # No devolver el hash de la contraseña
             user.pop('password_hash', None)
             return user
@@ -808,6 +1236,72 @@ class FMREDatabase:
             
             return [dict(row) for row in cursor.fetchall()]
     
+    # Columnas por las que se puede ordenar buscar_radioexperimentadores
+    ORDEN_RADIOEXPERIMENTADORES = ('indicativo', 'nombre_completo', 'municipio', 'estado', 'updated_at')
+
+    def buscar_radioexperimentadores(self, texto=None, incluir_inactivos=False, orden='indicativo',
+                                     descendente=False, pagina=1, por_pagina=50):
+        """Busca radioexperimentadores y devuelve una página de resultados
+
+        La búsqueda usa el índice radioexperimentadores_fts: cada palabra del texto
+        debe aparecer, como inicio de palabra y sin importar acentos ni mayúsculas,
+        en el indicativo, el nombre, el municipio o el estado ('xe1 garcia' encuentra
+        a XE1ABC García). Un indicativo exacto siempre coincide.
+
+        Args:
+            texto (str, optional): Texto a buscar; sin texto se listan todos
+            incluir_inactivos (bool): Incluir los registros inactivos
+            orden (str): Columna de ORDEN_RADIOEXPERIMENTADORES
+            descendente (bool): Orden descendente
+            pagina (int): Página a devolver, desde 1
+            por_pagina (int): Registros por página
+
+        Returns:
+            tuple: (registros de la página, total de registros que coinciden)
+        """
+        if orden not in self.ORDEN_RADIOEXPERIMENTADORES:
+            raise ValueError(f"No se puede ordenar por {orden}")
+
+        condiciones = []
+        params = []
+        if not incluir_inactivos:
+            condiciones.append('r.activo = 1')
+
+        consulta_fts = self._consulta_fts(texto)
+        if consulta_fts:
+            condiciones.append('''(r.id IN (SELECT rowid FROM radioexperimentadores_fts
+                                         WHERE radioexperimentadores_fts MATCH ?)
+                                 OR r.indicativo = ?)''')
+            params.extend([consulta_fts, texto.strip().upper()])
+        elif texto and texto.strip():
+            # Solo signos de puntuación: nada que buscar
+            return [], 0
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        direccion = 'DESC' if descendente else 'ASC'
+        # Los indicativos ya están en mayúsculas; sin COLLATE el orden usa su índice
+        collate = '' if orden == 'indicativo' else ' COLLATE NOCASE'
+        pagina = max(1, int(pagina))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT COUNT(*) FROM radioexperimentadores r {where}', params)
+            total = cursor.fetchone()[0]
+            cursor.execute(f'''
+                SELECT r.* FROM radioexperimentadores r
+                {where}
+                ORDER BY r.{orden}{collate} {direccion}, r.id {direccion}
+                LIMIT ? OFFSET ?
+            ''', params + [por_pagina, (pagina - 1) * por_pagina])
+            return [dict(row) for row in cursor.fetchall()], total
+
+    @staticmethod
+    def _consulta_fts(texto):
+        """Convierte el texto de búsqueda en una consulta FTS5 de prefijos ('"xe1"* AND "garcia"*')"""
+        if not texto:
+            return None
+        palabras = re.findall(r'\w+', texto)
+        return ' AND '.join(f'"{palabra}"*' for palabra in palabras) or None
+
     def get_radioexperimentador(self, id_or_indicativo):
         """Obtiene un radioexperimentador por su ID o indicativo"""
         with self.get_connection() as conn:
@@ -1497,10 +1991,11 @@ class FMREDatabase:
             
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                fuente = self._fuente_reportes(conn, fecha_sql, fecha_sql)
                 
                 # Obtener los reportes del día
-                cursor.execute('''
-                    SELECT * FROM reportes 
+                cursor.execute(f'''
+                    SELECT * FROM {fuente} 
                     WHERE date(fecha_reporte) = date(?)
                     ORDER BY created_at DESC
                 ''', (fecha_sql,))
@@ -1514,9 +2009,9 @@ class FMREDatabase:
                 estadisticas['total'] = len(reportes)
                 
                 # Zonas más reportadas
-                cursor.execute('''
+                cursor.execute(f'''
                     SELECT zona, COUNT(*) as cantidad 
-                    FROM reportes 
+                    FROM {fuente} 
                     WHERE date(fecha_reporte) = date(?)
                     GROUP BY zona 
                     ORDER BY cantidad DESC
@@ -1525,9 +2020,9 @@ class FMREDatabase:
                 estadisticas['zonas_mas_reportadas'] = [dict(row) for row in cursor.fetchall()]
                 
                 # Sistemas más utilizados
-                cursor.execute('''
+                cursor.execute(f'''
                     SELECT sistema, COUNT(*) as cantidad 
-                    FROM reportes 
+                    FROM {fuente} 
                     WHERE date(fecha_reporte) = date(?)
                     GROUP BY sistema 
                     ORDER BY cantidad DESC
@@ -1536,9 +2031,9 @@ class FMREDatabase:
                 estadisticas['sistemas_mas_utilizados'] = [dict(row) for row in cursor.fetchall()]
                 
                 # Estados más reportados
-                cursor.execute('''
+                cursor.execute(f'''
                     SELECT estado, COUNT(*) as cantidad 
-                    FROM reportes 
+                    FROM {fuente} 
                     WHERE date(fecha_reporte) = date(?) AND estado != ''
                     GROUP BY estado 
                     ORDER BY cantidad DESC
@@ -1549,13 +2044,50 @@ class FMREDatabase:
                 return reportes, estadisticas
                 
         except Exception as e:
-            print(f"Error al obtener reportes por fecha: {str(e)}")
+            logger.error("Error al obtener reportes por fecha: %s", e)
             return [], {}
 
+    def get_reportes_del_dia(self, fecha):
+        """
+        Obtiene los reportes de un día junto con la versión de la tabla reportes
+
+        Ambos se leen en la misma transacción, así la versión corresponde exactamente
+        a los reportes devueltos.
+
+        Args:
+            fecha (str): Fecha en formato 'YYYY-MM-DD'
+
+        Returns:
+            tuple: (reportes en orden de captura, versión) o ([], None) si hubo un error
+        """
+        try:
+            with self.get_connection() as conn:
+                fuente = self._fuente_reportes(conn, fecha, fecha)
+                cursor = conn.cursor()
+                cursor.execute('BEGIN')
+                try:
+                    cursor.execute("SELECT version FROM cambios_datos WHERE tabla = 'reportes'")
+                    fila = cursor.fetchone()
+                    cursor.execute(f'''
+                        SELECT * FROM {fuente}
+                        WHERE date(fecha_reporte) = date(?)
+                        ORDER BY created_at, id
+                    ''', (fecha,))
+                    reportes = [dict(row) for row in cursor.fetchall()]
+                finally:
+                    cursor.execute('COMMIT')
+                return reportes, (fila[0] if fila else 0)
+
+        except Exception as e:
+            print(f"Error al obtener reportes del día: {str(e)}")
+            return [], None
+
     def get_reportes_por_fecha_rango(self, fecha_inicio, fecha_fin):
         """
         Obtiene reportes en un rango de fechas con estadísticas
 
+        Si el rango incluye años archivados, éstos se adjuntan automáticamente.
+
         Args:
             fecha_inicio (str): Fecha de inicio en formato 'YYYY-MM-DD'
             fecha_fin (str): Fecha de fin en formato 'YYYY-MM-DD'
@@ -1566,10 +2098,11 @@ class FMREDatabase:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                fuente = self._fuente_reportes(conn, fecha_inicio, fecha_fin)
 
                 # Obtener reportes en el rango de fechas
-                cursor.execute('''
-                    SELECT * FROM reportes
+                cursor.execute(f'''
+                    SELECT * FROM {fuente}
                     WHERE date(fecha_reporte) BETWEEN date(?) AND date(?)
                     ORDER BY fecha_reporte DESC
                 ''', (fecha_inicio, fecha_fin))
@@ -1628,20 +2161,52 @@ class FMREDatabase:
             print(f"Error al obtener reportes por rango de fechas: {str(e)}")
             return [], {}
 
-    def get_reportes_filtrados(self, fecha_inicio=None, fecha_fin=None, busqueda='', estado='', zona='', sistema=''):
+    def get_reportes_por_evento_rango(self, fecha_inicio, fecha_fin, eventos):
         """
-        Obtiene reportes filtrados por fecha, búsqueda y otros criterios
+        Obtiene en una sola consulta los reportes de varios eventos en un rango de fechas
 
         Args:
-            fecha_inicio (date): Fecha de inicio para filtrar
-            fecha_fin (date): Fecha de fin para filtrar
-            busqueda (str): Texto de búsqueda en múltiples campos
-            estado (str): Filtro por estado
-            zona (str): Filtro por zona
-            sistema (str): Filtro por sistema
+            fecha_inicio (str): Fecha de inicio en formato 'YYYY-MM-DD'
+            fecha_fin (str): Fecha de fin en formato 'YYYY-MM-DD'
+            eventos (list): Tipos de reporte de los eventos
 
         Returns:
-            tuple: (reportes_filtrados, total_registros)
+            dict: {(evento, 'YYYY-MM-DD'): [reportes]} ordenado por evento y fecha; los
+            reportes de cada día van del más reciente al más antiguo
+        """
+        if not eventos:
+            return {}
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                fuente = self._fuente_reportes(conn, fecha_inicio, fecha_fin)
+                marcadores = ','.join('?' for _ in eventos)
+
+                cursor.execute(f'''
+                    SELECT *, date(fecha_reporte) AS dia_evento FROM {fuente}
+                    WHERE date(fecha_reporte) BETWEEN date(?) AND date(?)
+                    AND tipo_reporte IN ({marcadores})
+                    ORDER BY tipo_reporte, dia_evento, fecha_reporte DESC
+                ''', (fecha_inicio, fecha_fin, *eventos))
+
+                grupos = {}
+                for row in cursor:
+                    reporte = dict(row)
+                    clave = (reporte['tipo_reporte'], reporte.pop('dia_evento'))
+                    grupos.setdefault(clave, []).append(reporte)
+                return grupos
+
+        except Exception as e:
+            print(f"Error al obtener reportes por evento: {str(e)}")
+            return {}
+
+    def _condiciones_reportes(self, fecha_inicio=None, fecha_fin=None, busqueda='', estado='', zona='', sistema='', tipo_reporte=''):
+        """
+        Construye las condiciones WHERE de los filtros de reportes
+
+        Returns:
+            tuple: (condiciones, params, condicion_busqueda, params_busqueda). La
+            búsqueda va aparte porque el total de registros se cuenta sin ella.
         """
         def normalize_text(text):
             """Normaliza el texto eliminando acentos y caracteres especiales"""
@@ -1653,68 +2218,84 @@ class FMREDatabase:
             # Filtrar solo caracteres que no sean marcas de acento (category 'Mn')
             return ''.join(char for char in normalized if unicodedata.category(char) != 'Mn').lower()
 
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Construir consulta base
-                query = '''
-                    SELECT * FROM reportes WHERE 1=1
-                '''
-                params = []
-
-                # Filtros de fecha
-                if fecha_inicio:
-                    query += ' AND date(fecha_reporte) >= date(?)'
-                    params.append(fecha_inicio.strftime('%Y-%m-%d'))
+        condiciones = []
+        params = []
+
+        # Filtros de fecha
+        if fecha_inicio:
+            condiciones.append('date(fecha_reporte) >= date(?)')
+            params.append(fecha_inicio.strftime('%Y-%m-%d'))
+
+        if fecha_fin:
+            condiciones.append('date(fecha_reporte) <= date(?)')
+            params.append(fecha_fin.strftime('%Y-%m-%d'))
+
+        # Filtros exactos por estado, zona, sistema y tipo de reporte
+        for campo, valor in (('estado', estado), ('zona', zona), ('sistema', sistema), ('tipo_reporte', tipo_reporte)):
+            if valor:
+                condiciones.append(f'{campo} = ?')
+                params.append(valor)
+
+        condicion_busqueda = ''
+        params_busqueda = []
+        if busqueda:
+            # Normalizar el término de búsqueda
+            search_term = f'%{normalize_text(busqueda)}%'
+            condicion_busqueda = '''(
+                remove_accents(indicativo) LIKE ? OR
+                remove_accents(nombre) LIKE ? OR
+                remove_accents(ciudad) LIKE ? OR
+                remove_accents(estado) LIKE ? OR
+                remove_accents(zona) LIKE ? OR
+                remove_accents(sistema) LIKE ? OR
+                remove_accents(tipo_reporte) LIKE ?
+            )'''
+            params_busqueda = [search_term] * 7
+
+        return condiciones, params, condicion_busqueda, params_busqueda
+
+    def get_reportes_filtrados(self, fecha_inicio=None, fecha_fin=None, busqueda='', estado='', zona='', sistema='', incluir_archivo=False):
+        """
+        Obtiene reportes filtrados por fecha, búsqueda y otros criterios
 
-                if fecha_fin:
-                    query += ' AND date(fecha_reporte) <= date(?)'
-                    params.append(fecha_fin.strftime('%Y-%m-%d'))
+        Sin fecha de inicio solo se consulta la tabla activa, a menos que se
+        indique incluir_archivo; con fechas, los años archivados del rango se
+        adjuntan automáticamente.
 
-                # Filtro por estado
-                if estado:
-                    query += ' AND estado = ?'
-                    params.append(estado)
+        Args:
+            fecha_inicio (date): Fecha de inicio para filtrar
+            fecha_fin (date): Fecha de fin para filtrar
+            busqueda (str): Texto de búsqueda en múltiples campos
+            estado (str): Filtro por estado
+            zona (str): Filtro por zona
+            sistema (str): Filtro por sistema
+            incluir_archivo (bool): Si es True, incluye todos los años archivados
 
-                # Filtro por zona
-                if zona:
-                    query += ' AND zona = ?'
-                    params.append(zona)
+        Returns:
+            tuple: (reportes_filtrados, total_registros)
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                fuente = self._fuente_reportes(conn, fecha_inicio, fecha_fin, incluir_archivo)
 
-                # Filtro por sistema
-                if sistema:
-                    query += ' AND sistema = ?'
-                    params.append(sistema)
+                condiciones, params, condicion_busqueda, params_busqueda = self._condiciones_reportes(
+                    fecha_inicio, fecha_fin, busqueda, estado, zona, sistema
+                )
+                where = ''.join(f' AND {c}' for c in condiciones)
 
                 # Obtener total antes de aplicar búsqueda
-                count_query = query.replace('SELECT *', 'SELECT COUNT(*) as total')
-                cursor.execute(count_query, params)
+                cursor.execute(f'SELECT COUNT(*) as total FROM {fuente} WHERE 1=1{where}', params)
                 total_result = cursor.fetchone()
                 total_registros = total_result['total'] if total_result else 0
 
                 # Agregar búsqueda si existe
-                if busqueda:
-                    # Normalizar el término de búsqueda
-                    busqueda_normalized = normalize_text(busqueda)
-                    search_term = f'%{busqueda_normalized}%'
-
-                    query += ''' AND (
-                        remove_accents(indicativo) LIKE ? OR
-                        remove_accents(nombre) LIKE ? OR
-                        remove_accents(ciudad) LIKE ? OR
-                        remove_accents(estado) LIKE ? OR
-                        remove_accents(zona) LIKE ? OR
-                        remove_accents(sistema) LIKE ? OR
-                        remove_accents(tipo_reporte) LIKE ?
-                    )'''
-                    params.extend([search_term] * 7)
+                if condicion_busqueda:
+                    where += f' AND {condicion_busqueda}'
+                    params = params + params_busqueda
 
                 # Ordenar por fecha descendente
-                query += ' ORDER BY fecha_reporte DESC'
-
-                # Ejecutar consulta
-                cursor.execute(query, params)
+                cursor.execute(f'SELECT * FROM {fuente} WHERE 1=1{where} ORDER BY fecha_reporte DESC', params)
                 reportes = [dict(row) for row in cursor.fetchall()]
 
                 return reportes, total_registros
@@ -1723,6 +2304,43 @@ class FMREDatabase:
             print(f"Error al obtener reportes filtrados: {str(e)}")
             return [], 0
 
+    def iter_reportes_filtrados(self, columnas=None, fecha_inicio=None, fecha_fin=None, busqueda='', estado='', zona='',
+                                sistema='', tipo_reporte='', incluir_archivo=False, tamano_lote=1000):
+        """
+        Recorre los reportes filtrados leyendo el cursor por lotes
+
+        Usa los mismos filtros que get_reportes_filtrados, pero entrega las filas
+        una a una para que las exportaciones no carguen todo el resultado en memoria.
+
+        Args:
+            columnas (list, optional): Columnas a seleccionar (por defecto todas)
+            tipo_reporte (str): Filtro por tipo de reporte o evento
+            tamano_lote (int): Filas por llamada a fetchmany
+
+        Yields:
+            sqlite3.Row: Cada reporte, ordenado por fecha descendente
+        """
+        conn = self.get_connection()
+        try:
+            fuente = self._fuente_reportes(conn, fecha_inicio, fecha_fin, incluir_archivo)
+            condiciones, params, condicion_busqueda, params_busqueda = self._condiciones_reportes(
+                fecha_inicio, fecha_fin, busqueda, estado, zona, sistema, tipo_reporte
+            )
+            if condicion_busqueda:
+                condiciones.append(condicion_busqueda)
+                params.extend(params_busqueda)
+            where = ''.join(f' AND {c}' for c in condiciones)
+            seleccion = ', '.join(columnas) if columnas else '*'
+
+            cursor = conn.execute(f'SELECT {seleccion} FROM {fuente} WHERE 1=1{where} ORDER BY fecha_reporte DESC', params)
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    break
+                yield from lote
+        finally:
+            conn.close()
+
     def get_reporte_por_id(self, reporte_id):
         """
         Obtiene un reporte específico por su ID
@@ -1756,9 +2374,7 @@ class FMREDatabase:
             bool: True si se actualizó correctamente
         """
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-
+            def _actualizar(cursor):
                 # Determinar columnas disponibles en la tabla para evitar errores al actualizar
                 cursor.execute("PRAGMA table_info(reportes)")
                 columnas_reportes = {columna[1] for columna in cursor.fetchall()}
@@ -1788,12 +2404,13 @@ class FMREDatabase:
                 query = f"UPDATE reportes SET {', '.join(update_fields)} WHERE id = ?"
 
                 cursor.execute(query, params)
-                conn.commit()
 
                 # SQLite puede devolver rowcount = 0 si los valores nuevos son iguales a los existentes.
                 # Considera la actualización exitosa si la consulta se ejecutó sin errores.
                 return True
 
+            return self._ejecutar_escritura(_actualizar)
+
         except Exception as e:
             print(f"Error al actualizar reporte: {str(e)}")
             return False
@@ -1842,9 +2459,9 @@ class FMREDatabase:
             int: ID del reporte guardado o None si hubo un error
         """
         try:
-            print(f"[DEBUG] save_reporte - Datos recibidos: {reporte_data}")
-            print(f"[DEBUG] qrz_station recibido: {reporte_data.get('qrz_station', 'No proporcionado')}")
-            print(f"[DEBUG] qrz_captured_by recibido: {reporte_data.get('qrz_captured_by', 'No proporcionado')}")
+            logger.debug("save_reporte %s (capturado por %s, estación %s)",
+                         reporte_data.get('indicativo'), reporte_data.get('qrz_captured_by'),
+                         reporte_data.get('qrz_station'))
             # Validar campos obligatorios
             required_fields = ['indicativo', 'sistema', 'fecha_reporte', 'tipo_reporte']
             for field in required_fields:
@@ -1867,7 +2484,7 @@ class FMREDatabase:
                 def get_cdmx_timezone():
                     return pytz.timezone('America/Mexico_City')
 
-                print(f"[DEBUG] Fecha recibida en save_reporte: {reporte_data['fecha_reporte']}")
+                logger.debug("Fecha recibida en save_reporte: %s", reporte_data['fecha_reporte'])
 
                 # Obtener la fecha actual en CDMX para la hora
                 ahora_cdmx = get_current_cdmx_time()
@@ -1884,44 +2501,44 @@ class FMREDatabase:
                     fecha_obj = get_cdmx_timezone().localize(
                         datetime(anio, mes, dia, ahora_cdmx.hour, ahora_cdmx.minute, ahora_cdmx.second)
                     )
-                    print(f"[DEBUG] Fecha seleccionada con hora actual: {fecha_obj}")
+                    logger.debug("Fecha seleccionada con hora actual: %s", fecha_obj)
                 else:
                     # Si no es un formato reconocido, usar la fecha y hora actual
-                    print("[WARN] Formato de fecha no reconocido, usando fecha y hora actual")
+                    logger.warning("Formato de fecha no reconocido (%r), usando fecha y hora actual",
+                                   reporte_data['fecha_reporte'])
                     fecha_obj = ahora_cdmx
 
                 # Usar directamente la hora de CDMX sin convertir a UTC
                 fecha_sql = fecha_obj.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"[DEBUG] Fecha a guardar en BD (CDMX): {fecha_sql}")
+                logger.debug("Fecha a guardar en BD (CDMX): %s", fecha_sql)
 
             except Exception as e:
-                print(f"[ERROR] Error al procesar la fecha {reporte_data['fecha_reporte']}: {e}")
+                logger.error("Error al procesar la fecha %s: %s", reporte_data['fecha_reporte'], e)
                 # En caso de error, usar la fecha y hora actual en CDMX
                 fecha_obj = get_current_cdmx_time()
                 fecha_sql = fecha_obj.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"[WARN] Usando fecha actual (CDMX): {fecha_sql}")
-
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+                logger.warning("Usando fecha actual (CDMX): %s", fecha_sql)
+
+            # Obtener la hora actual en UTC
+            created_at_utc = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Normalizar el nombre del estado si es necesario
+            estado = reporte_data.get('estado', '')
+            if estado:
+                # Mapeo de nombres de estados a su versión normalizada
+                mapeo_estados = {
+                    'México': 'Estado de México',
+                    'MEXICO': 'Estado de México',
+                    'MEX': 'Estado de México',
+                    'mexico': 'Estado de México',
+                    'mex': 'Estado de México'
+                }
+                # Aplicar el mapeo si el estado está en el diccionario
+                reporte_data['estado'] = mapeo_estados.get(estado, estado)
 
-                # Obtener la hora actual en UTC
-                created_at_utc = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Normalizar el nombre del estado si es necesario
-                estado = reporte_data.get('estado', '')
-                if estado:
-                    # Mapeo de nombres de estados a su versión normalizada
-                    mapeo_estados = {
-                        'México': 'Estado de México',
-                        'MEXICO': 'Estado de México',
-                        'MEX': 'Estado de México',
-                        'mexico': 'Estado de México',
-                        'mex': 'Estado de México'
-                    }
-                    # Aplicar el mapeo si el estado está en el diccionario
-                    reporte_data['estado'] = mapeo_estados.get(estado, estado)
-
-                # Insertar el reporte en la base de datos
+            # Insertar el reporte a través de la cola de escritura: un solo hilo escritor
+            # agrupa las capturas concurrentes en transacciones cortas
+            def _insertar(cursor):
                 cursor.execute('''
                     INSERT INTO reportes (
                         indicativo, nombre, zona, sistema, ciudad, estado,
@@ -1944,21 +2561,324 @@ class FMREDatabase:
                     reporte_data.get('qrz_captured_by', ''),  # Nuevo campo
                     reporte_data.get('qrz_station', '')       # Nuevo campo
                 ))
-
                 reporte_id = cursor.lastrowid
-                conn.commit()
-                return reporte_id
+
+                # Versión de reportes que dejó esta inserción (misma transacción)
+                cursor.execute("SELECT version FROM cambios_datos WHERE tabla = 'reportes'")
+                fila = cursor.fetchone()
+                return reporte_id, (fila[0] if fila else None)
+
+            reporte_id, version = self._ejecutar_escritura(_insertar)
+
+            # Las estadísticas del día de este proceso se actualizan sin volver a consultar
+            from estadisticas_diarias import registrar_reporte
+            registrar_reporte(self.db_path, {
+                'id': reporte_id,
+                'indicativo': reporte_data['indicativo'],
+                'nombre': reporte_data.get('nombre', ''),
+                'zona': reporte_data.get('zona', ''),
+                'sistema': reporte_data['sistema'],
+                'ciudad': reporte_data.get('ciudad', ''),
+                'estado': reporte_data.get('estado', ''),
+                'senal': reporte_data['senal'],
+                'observaciones': reporte_data.get('observaciones', ''),
+                'origen': reporte_data.get('origen', ''),
+                'tipo_reporte': reporte_data['tipo_reporte'],
+                'fecha_reporte': fecha_sql,
+                'created_at': created_at_utc,
+                'qrz_captured_by': reporte_data.get('qrz_captured_by', ''),
+                'qrz_station': reporte_data.get('qrz_station', ''),
+            }, version)
+
+            return reporte_id
 
         except sqlite3.IntegrityError as e:
             if 'FOREIGN KEY constraint failed' in str(e):
                 raise ValueError("El indicativo no existe en la base de datos") from e
             raise
         except Exception as e:
-            if 'conn' in locals():
-                conn.rollback()
             print(f"Error al guardar el reporte: {str(e)}")
             raise
 
+    # =============================================
+    # CONSULTAS DE SOLO LECTURA (CONSOLA SQL)
+    # =============================================
+
+    def ejecutar_consulta_solo_lectura(self, query, max_filas=1000, timeout=10.0, cancelar=None, tamano_lote=500):
+        """Ejecuta una consulta ad hoc en una conexión de solo lectura y con límites
+
+        La conexión se abre con mode=ro y query_only, sin posibilidad de ATTACH. Un
+        progress handler interrumpe la consulta al vencer el tiempo límite o al
+        activarse el evento cancelar. Las filas se leen por lotes hasta max_filas.
+
+        Args:
+            query (str): Sentencia SQL (una sola)
+            max_filas (int): Máximo de filas a devolver
+            timeout (float): Segundos máximos de ejecución
+            cancelar (threading.Event, optional): Evento para cancelar la consulta
+            tamano_lote (int): Filas por llamada a fetchmany
+
+        Returns:
+            dict: columnas, filas, truncado, duracion_ms y plan (filas de EXPLAIN QUERY PLAN)
+
+        Raises:
+            sqlite3.Error: Si la consulta falla, excede el tiempo o es cancelada
+        """
+        import time
+
+        conn = sqlite3.connect(
+            self._uri_base_datos(self.db_path, 'ro'),
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False,
+            uri=True
+        )
+        try:
+            conn.execute('PRAGMA query_only=ON')
+            conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+
+            limite = time.monotonic() + timeout
+
+            def _interrumpir():
+                if cancelar is not None and cancelar.is_set():
+                    return 1
+                return 1 if time.monotonic() > limite else 0
+
+            conn.set_progress_handler(_interrumpir, 1000)
+
+            # El plan no siempre existe (p. ej. PRAGMA); en ese caso se omite
+            try:
+                plan = [tuple(fila) for fila in conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()]
+            except sqlite3.Error:
+                plan = []
+
+            inicio = time.perf_counter()
+            try:
+                cursor = conn.execute(query)
+                columnas = [d[0] for d in cursor.description] if cursor.description else []
+                filas = []
+                while columnas and len(filas) <= max_filas:
+                    lote = cursor.fetchmany(min(tamano_lote, max_filas + 1 - len(filas)))
+                    if not lote:
+                        break
+                    filas.extend(lote)
+            except sqlite3.OperationalError as e:
+                if str(e) == 'interrupted':
+                    if cancelar is not None and cancelar.is_set():
+                        raise sqlite3.OperationalError("La consulta fue cancelada") from e
+                    raise sqlite3.OperationalError(f"La consulta excedió el límite de {timeout:g} s") from e
+                raise
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+
+            truncado = len(filas) > max_filas
+            return {
+                'columnas': columnas,
+                'filas': filas[:max_filas],
+                'truncado': truncado,
+                'duracion_ms': duracion_ms,
+                'plan': plan,
+            }
+        finally:
+            conn.close()
+
+    # =============================================
+    # MÉTODOS PARA ARCHIVO ANUAL DE REPORTES
+    # =============================================
+
+    def _ruta_archivo_anual(self, anio):
+        """Ruta del archivo reportes_YYYY.db de un año, junto a la base principal"""
+        directorio = os.path.dirname(os.path.abspath(self.db_path))
+        return os.path.join(directorio, f"reportes_{int(anio)}.db")
+
+    def get_anios_archivados(self):
+        """Obtiene los años que ya fueron movidos a archivos reportes_YYYY.db
+
+        Returns:
+            list: Años archivados en orden ascendente
+        """
+        directorio = os.path.dirname(os.path.abspath(self.db_path))
+        anios = []
+        for nombre in os.listdir(directorio):
+            match = re.fullmatch(r'reportes_(\d{4})\.db', nombre)
+            if match:
+                anios.append(int(match.group(1)))
+        return sorted(anios)
+
+    def get_anios_con_reportes(self):
+        """Obtiene los años que aún tienen reportes en la tabla activa"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT CAST(strftime('%Y', fecha_reporte) AS INTEGER) AS anio
+                FROM reportes
+                WHERE strftime('%Y', fecha_reporte) IS NOT NULL
+                ORDER BY anio
+            ''')
+            return [row['anio'] for row in cursor.fetchall()]
+
+    def adjuntar_archivo(self, conn, anios=None):
+        """Adjunta en modo solo lectura los años archivados y crea la vista
+        temporal reportes_historico (tabla activa + años adjuntos)
+
+        Args:
+            conn: Conexión obtenida con get_connection
+            anios: Años a adjuntar; None adjunta todos los archivados
+
+        Returns:
+            str: Nombre de la tabla o vista a consultar
+        """
+        disponibles = self.get_anios_archivados()
+        if anios is not None:
+            disponibles = [anio for anio in disponibles if anio in set(anios)]
+        if not disponibles:
+            return 'reportes'
+
+        # SQLite limita el número de bases adjuntas (10 por defecto)
+        try:
+            limite = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        except AttributeError:
+            limite = 10
+        if len(disponibles) > limite:
+            logger.warning("Solo se adjuntarán los %s años archivados más recientes", limite)
+            disponibles = disponibles[-limite:]
+
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(reportes)")
+        columnas = [columna[1] for columna in cursor.fetchall()]
+        cursor.execute("PRAGMA database_list")
+        adjuntas = {row[1] for row in cursor.fetchall()}
+
+        selects = [f"SELECT {', '.join(columnas)} FROM main.reportes"]
+        for anio in disponibles:
+            esquema = f"archivo_{anio}"
+            if esquema not in adjuntas:
+                cursor.execute(
+                    f"ATTACH DATABASE ? AS {esquema}",
+                    (self._uri_base_datos(self._ruta_archivo_anual(anio), modo='ro'),)
+                )
+            # Los archivos antiguos pueden no tener columnas agregadas después
+            cursor.execute(f"PRAGMA {esquema}.table_info(reportes)")
+            columnas_archivo = {columna[1] for columna in cursor.fetchall()}
+            expresiones = [c if c in columnas_archivo else f"NULL AS {c}" for c in columnas]
+            selects.append(f"SELECT {', '.join(expresiones)} FROM {esquema}.reportes")
+
+        cursor.execute("DROP VIEW IF EXISTS temp.reportes_historico")
+        cursor.execute(f"CREATE TEMP VIEW reportes_historico AS {' UNION ALL '.join(selects)}")
+        return 'reportes_historico'
+
+    def _fuente_reportes(self, conn, fecha_inicio=None, fecha_fin=None, incluir_archivo=False):
+        """Determina si una consulta por fechas puede resolverse solo con la tabla
+        activa o si necesita adjuntar años archivados
+
+        Args:
+            conn: Conexión abierta
+            fecha_inicio: Fecha inicial (date o str 'YYYY-MM-DD'), opcional
+            fecha_fin: Fecha final (date o str 'YYYY-MM-DD'), opcional
+            incluir_archivo (bool): Sin fecha inicial, indica si se incluye todo el archivo
+
+        Returns:
+            str: 'reportes' o 'reportes_historico'
+        """
+        def _anio(fecha):
+            if not fecha:
+                return None
+            if hasattr(fecha, 'year'):
+                return fecha.year
+            try:
+                return int(str(fecha)[:4])
+            except ValueError:
+                return None
+
+        archivados = self.get_anios_archivados()
+        if not archivados:
+            return 'reportes'
+
+        anio_inicio = _anio(fecha_inicio)
+        if anio_inicio is None and not incluir_archivo:
+            return 'reportes'
+
+        anio_fin = _anio(fecha_fin)
+        anios = [
+            anio for anio in archivados
+            if (anio_inicio is None or anio >= anio_inicio)
+            and (anio_fin is None or anio <= anio_fin)
+        ]
+        if not anios:
+            return 'reportes'
+        return self.adjuntar_archivo(conn, anios)
+
+    def archivar_reportes_anio(self, anio):
+        """Mueve los reportes de un año cerrado de la tabla activa a reportes_YYYY.db
+
+        La copia y el borrado se hacen en una transacción; si el proceso se
+        interrumpe, volver a archivar el mismo año es seguro (INSERT OR IGNORE).
+
+        Args:
+            anio (int): Año a archivar (debe ser anterior al año en curso)
+
+        Returns:
+            int: Número de reportes archivados
+        """
+        from time_utils import get_current_cdmx_time
+
+        anio = int(anio)
+        if anio >= get_current_cdmx_time().year:
+            raise ValueError("Solo se pueden archivar años cerrados")
+
+        desde = f"{anio}-01-01"
+        hasta = f"{anio + 1}-01-01"
+        ruta = self._ruta_archivo_anual(anio)
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA table_info(reportes)")
+            columnas = cursor.fetchall()
+            nombres = [columna[1] for columna in columnas]
+
+            cursor.execute("ATTACH DATABASE ? AS archivo_destino", (self._uri_base_datos(ruta, modo='rwc'),))
+            try:
+                definicion = ', '.join(
+                    f"{columna[1]} INTEGER PRIMARY KEY" if columna[5] else f"{columna[1]} {columna[2]}".strip()
+                    for columna in columnas
+                )
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS archivo_destino.reportes ({definicion})")
+                cursor.execute("CREATE INDEX IF NOT EXISTS archivo_destino.idx_reportes_fecha ON reportes(fecha_reporte)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS archivo_destino.idx_reportes_indicativo ON reportes(indicativo)")
+
+                # Agregar columnas nuevas a un archivo creado con un esquema anterior
+                cursor.execute("PRAGMA archivo_destino.table_info(reportes)")
+                existentes = {columna[1] for columna in cursor.fetchall()}
+                for columna in columnas:
+                    if columna[1] not in existentes:
+                        cursor.execute(f"ALTER TABLE archivo_destino.reportes ADD COLUMN {columna[1]} {columna[2]}")
+
+                lista = ', '.join(nombres)
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO archivo_destino.reportes ({lista})
+                        SELECT {lista} FROM main.reportes
+                        WHERE fecha_reporte >= ? AND fecha_reporte < ?
+                    ''', (desde, hasta))
+                    cursor.execute(
+                        'DELETE FROM main.reportes WHERE fecha_reporte >= ? AND fecha_reporte < ?',
+                        (desde, hasta)
+                    )
+                    archivados = cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                cursor.execute("DETACH DATABASE archivo_destino")
+
+        print(f"Se archivaron {archivados} reportes de {anio} en {ruta}")
+        return archivados
+
+# Tiempos, filas devueltas y errores de cada método público (ver metrics.py)
+metrics.instrumentar_clase(FMREDatabase)
+
+
 if __name__ == "__main__":
     # Crear la base de datos y tablas si no existen
     db = FMREDatabase()
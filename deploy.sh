@@ -14,8 +14,13 @@ NC='\033[0m' # No Color
 APP_DIR="/var/www/qms"
 DB_FILE="$APP_DIR/fmre_reports.db"
 VENV_DIR="$APP_DIR/venv"
-SERVICE_FILE="/etc/systemd/system/qms.service"
+SERVICE_FILE="/etc/systemd/system/qms@.service"
 APACHE_CONF="/etc/apache2/sites-available/000-default.conf"
+BALANCER_CONF="/etc/apache2/conf-available/qms-balancer.conf"
+
+# Streamlit worker processes (one per core by default) on consecutive ports from BASE_PORT
+WORKERS="${WORKERS:-$(nproc)}"
+BASE_PORT="${BASE_PORT:-8502}"
 
 # Check if running as root
 if [ "$(id -u)" -ne 0 ]; then
@@ -38,7 +43,7 @@ apt-get install -y \
 
 # Enable required Apache modules
 echo -e "\n${GREEN}Configuring Apache...${NC}"
-a2enmod proxy proxy_http proxy_wstunnel rewrite headers
+a2enmod proxy proxy_http proxy_wstunnel proxy_balancer lbmethod_byrequests slotmem_shm rewrite headers
 systemctl restart apache2
 
 # Create application directory if it doesn't exist
@@ -51,17 +56,17 @@ chmod 775 $APP_DIR
 chmod g+s $APP_DIR
 
 # Create and activate virtual environment
-echo -e "\n${GREEN}Setting up Python virtual environment...${NC}
+echo -e "\n${GREEN}Setting up Python virtual environment...${NC}"
 python3 -m venv $VENV_DIR
 source $VENV_DIR/bin/activate
 
 # Install Python dependencies
-echo -e "\n${GREEN}Installing Python dependencies...${NC}
+echo -e "\n${GREEN}Installing Python dependencies...${NC}"
 pip install --upgrade pip
 pip install -r $APP_DIR/requirements.txt
 
 # Set up database
-echo -e "\n${GREEN}Setting up database...${NC}
+echo -e "\n${GREEN}Setting up database...${NC}"
 if [ ! -f "$DB_FILE" ]; then
     sqlite3 $DB_FILE ""
     chown www-data:www-data $DB_FILE
@@ -70,8 +75,28 @@ if [ ! -f "$DB_FILE" ]; then
     # python $APP_DIR/init_db.py
 fi
 
+# Balancers for the /qms workers
+# A Streamlit session lives in a single process (session_state, websocket, uploads),
+# so routing is sticky: the ROUTEID cookie pins both HTTP and websocket to one worker.
+echo -e "\n${GREEN}Configuring Apache balancer for $WORKERS workers...${NC}"
+{
+    echo '<Proxy "balancer://qms_http">'
+    for i in $(seq 1 "$WORKERS"); do
+        echo "    BalancerMember http://127.0.0.1:$((BASE_PORT + i - 1)) route=w$i"
+    done
+    echo '    ProxySet stickysession=ROUTEID lbmethod=byrequests'
+    echo '</Proxy>'
+    echo '<Proxy "balancer://qms_ws">'
+    for i in $(seq 1 "$WORKERS"); do
+        echo "    BalancerMember ws://127.0.0.1:$((BASE_PORT + i - 1)) route=w$i"
+    done
+    echo '    ProxySet stickysession=ROUTEID lbmethod=byrequests'
+    echo '</Proxy>'
+} > $BALANCER_CONF
+a2enconf qms-balancer
+
 # Configure Apache for QMS
-echo -e "\n${GREEN}Configuring Apache virtual host...${NC}"\n
+echo -e "\n${GREEN}Configuring Apache virtual host...${NC}"
 # Backup existing config
 cp $APACHE_CONF "${APACHE_CONF}.bak"
 
@@ -102,21 +127,24 @@ cat > /tmp/qms_apache.conf << 'EOL'
     RewriteCond %{HTTP:Connection} upgrade [NC]
     RewriteRule ^/fmre/_stcore/stream$ ws://127.0.0.1:8501/fmre/_stcore/stream [P,L]
 
-    # Configuración para /qms (pruebas)
+    # Configuración para /qms (pruebas), repartida entre los workers de qms-balancer.conf
     RewriteRule ^/qms$ /qms/ [R=301,L]
 
-    ProxyPass /qms/_stcore/stream ws://127.0.0.1:8502/qms/_stcore/stream
-    ProxyPassReverse /qms/_stcore/stream ws://127.0.0.1:8502/qms/_stcore/stream
+    # Fijar el worker de la sesión con la cookie ROUTEID
+    Header add Set-Cookie "ROUTEID=.%{BALANCER_WORKER_ROUTE}e; path=/qms/" env=BALANCER_ROUTE_CHANGED
 
-    ProxyPass /qms/_stcore/health http://127.0.0.1:8502/qms/_stcore/health
-    ProxyPassReverse /qms/_stcore/health http://127.0.0.1:8502/qms/_stcore/health
+    ProxyPass /qms/_stcore/stream balancer://qms_ws/qms/_stcore/stream
+    ProxyPassReverse /qms/_stcore/stream balancer://qms_ws/qms/_stcore/stream
 
-    ProxyPass /qms/ http://127.0.0.1:8502/qms/
-    ProxyPassReverse /qms/ http://127.0.0.1:8502/qms/
+    ProxyPass /qms/_stcore/health balancer://qms_http/qms/_stcore/health
+    ProxyPassReverse /qms/_stcore/health balancer://qms_http/qms/_stcore/health
+
+    ProxyPass /qms/ balancer://qms_http/qms/
+    ProxyPassReverse /qms/ balancer://qms_http/qms/
 
     RewriteCond %{HTTP:Upgrade} =websocket [NC]
     RewriteCond %{HTTP:Connection} upgrade [NC]
-    RewriteRule ^/qms/_stcore/stream$ ws://127.0.0.1:8502/qms/_stcore/stream [P,L]
+    RewriteRule ^/qms/_stcore/stream$ balancer://qms_ws/qms/_stcore/stream [P,L]
 
     ErrorLog ${APACHE_LOG_DIR}/error.log
     CustomLog ${APACHE_LOG_DIR}/access.log combined
@@ -129,10 +157,12 @@ EOL
 cp /tmp/qms_apache.conf $APACHE_CONF
 
 # Create systemd service for QMS
+# Template unit qms@<port>.service, one instance per worker. All workers share the SQLite
+# database (WAL mode); caches are invalidated across processes via the cambios_datos table.
 echo -e "\n${GREEN}Setting up QMS service...${NC}"
 cat > /tmp/qms.service << 'EOL'
 [Unit]
-Description=QMS Streamlit Application
+Description=QMS Streamlit Application (port %i)
 After=network.target
 
 [Service]
@@ -140,7 +170,7 @@ User=www-data
 Group=www-data
 WorkingDirectory=/var/www/qms
 Environment="PATH=/var/www/qms/venv/bin"
-ExecStart=/var/www/qms/venv/bin/streamlit run app.py --server.port=8502 --server.address=127.0.0.1 --server.headless=true --server.enableCORS=false --server.enableXsrfProtection=false --server.baseUrlPath=/qms --server.allowRunOnSave=false
+ExecStart=/var/www/qms/venv/bin/streamlit run app.py --server.port=%i --server.address=127.0.0.1 --server.headless=true --server.enableCORS=false --server.enableXsrfProtection=false --server.baseUrlPath=/qms --server.allowRunOnSave=false
 Restart=always
 
 [Install]
@@ -150,8 +180,44 @@ EOL
 # Install and enable the service
 cp /tmp/qms.service $SERVICE_FILE
 systemctl daemon-reload
-systemctl enable qms.service
-systemctl restart qms.service
+# Remove the single-process service from previous installs
+if [ -f /etc/systemd/system/qms.service ]; then
+    systemctl disable --now qms.service || true
+    rm -f /etc/systemd/system/qms.service
+    systemctl daemon-reload
+fi
+for i in $(seq 1 "$WORKERS"); do
+    PORT=$((BASE_PORT + i - 1))
+    systemctl enable "qms@$PORT.service"
+    systemctl restart "qms@$PORT.service"
+done
+
+# Daily columnar snapshot of reportes for offline analysis (keeps the last 30)
+echo -e "\n${GREEN}Setting up daily reportes snapshot...${NC}"
+cat > /etc/systemd/system/qms-snapshot.service << EOL
+[Unit]
+Description=QMS reportes Parquet snapshot
+
+[Service]
+Type=oneshot
+User=www-data
+Group=www-data
+WorkingDirectory=$APP_DIR
+ExecStart=$VENV_DIR/bin/python exportacion.py --snapshot $APP_DIR/snapshots --formato parquet --conservar 30
+EOL
+cat > /etc/systemd/system/qms-snapshot.timer << 'EOL'
+[Unit]
+Description=Daily QMS reportes snapshot
+
+[Timer]
+OnCalendar=*-*-* 03:30:00
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+EOL
+systemctl daemon-reload
+systemctl enable --now qms-snapshot.timer
 
 # Restart Apache to apply changes
 echo -e "\n${GREEN}Restarting Apache...${NC}"
@@ -160,7 +226,8 @@ systemctl restart apache2
 echo -e "\n${GREEN}Deployment completed successfully!${NC}"
 echo -e "\nAccess the application at: http://your-server-ip/qms/"
 echo -e "Production site: http://your-server-ip/fmre/"
-echo -e "\nTo check the service status: systemctl status qms"
-echo -e "To view logs: journalctl -u qms -f"
+echo -e "\nWorkers: $WORKERS (ports $BASE_PORT-$((BASE_PORT + WORKERS - 1)))"
+echo -e "To check the service status: systemctl status 'qms@*'"
+echo -e "To view logs: journalctl -u 'qms@*' -f"
 
 exit 0
@@ -1,62 +1,293 @@
+"""
+Envío de correos con un buzón de salida (tabla email_outbox).
+
+EmailSender.send_email guarda el mensaje en email_outbox y regresa de inmediato; la
+página no espera al servidor SMTP. Un hilo por proceso (BuzonSalida) toma los correos
+pendientes en lotes de QMS_CORREO_LOTE, los envía por una sola conexión SMTP
+autenticada que se mantiene abierta entre lotes y se cierra tras
+QMS_CORREO_INACTIVIDAD segundos sin uso. Si el envío falla, el correo se reintenta con
+espera exponencial (QMS_CORREO_ESPERA segundos, duplicándose hasta una hora) y tras
+QMS_CORREO_INTENTOS intentos queda como 'fallido'; desde Configuración se pueden
+reintentar. El cuerpo de los correos de credenciales se borra al enviarse o al quedar
+'fallido', porque lleva una contraseña temporal; al reintentarlos se genera otra.
+
+El hilo revisa el buzón con una consulta de solo lectura y solo pasa por la cola de
+escritura (para reclamar los correos) cuando hay alguno listo.
+
+Para probar sin un servidor real se puede usar aiosmtpd:
+
+    python -m aiosmtpd -n -l localhost:8025
+
+y configurar en la aplicación el servidor localhost, puerto 8025, sin TLS y sin
+usuario ni contraseña.
+"""
+import logging
+import os
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from database import FMREDatabase
 
-class EmailSender:
+logger = logging.getLogger('qms.email')
+
+LOTE = int(os.environ.get('QMS_CORREO_LOTE', '20'))
+MAX_INTENTOS = int(os.environ.get('QMS_CORREO_INTENTOS', '6'))
+ESPERA_BASE = float(os.environ.get('QMS_CORREO_ESPERA', '30'))
+ESPERA_MAXIMA = 3600
+INACTIVIDAD = float(os.environ.get('QMS_CORREO_INACTIVIDAD', '60'))
+# Cada cuántos segundos se revisa el buzón aunque nadie haya encolado un correo
+INTERVALO = 15
+
+# Errores de un destinatario o mensaje concreto; los demás del lote se siguen enviando
+ERRORES_DEL_MENSAJE = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def conectar_smtp(settings):
+    """
+    Abre una conexión SMTP autenticada
+
+    Args:
+        settings (dict): Configuración de smtp_settings (server, port, use_tls, username, password)
+
+    Returns:
+        smtplib.SMTP: Conexión lista para enviar
+    """
+    try:
+        server = smtplib.SMTP(settings['server'], settings['port'], timeout=30)
+        if settings['use_tls']:
+            server.starttls()
+
+        if settings['username'] and settings['password']:
+            server.login(settings['username'], settings['password'])
+
+        return server
+
+    except Exception as e:
+        raise Exception(f"Error al conectar con el servidor SMTP: {str(e)}")
+
+
+def crear_mensaje(from_email, to_email, subject, body, is_html=False):
+    """Arma el mensaje MIME de un correo"""
+    msg = MIMEMultipart()
+    msg['From'] = from_email
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
+    return msg
+
+
+class BuzonSalida:
+    """Hilo que envía los correos de email_outbox por una conexión SMTP persistente"""
+
     def __init__(self, db):
         self.db = db
-    
-    def get_smtp_connection(self):
-        """Obtiene la configuración SMTP y devuelve una conexión"""
+        self._despertar = threading.Event()
+        self._conexion = None
+        self._settings = None
+        self._ultimo_uso = 0.0
+        self._hilo = threading.Thread(target=self._run, name="qms-email-outbox", daemon=True)
+        self._hilo.start()
+
+    def despertar(self):
+        """Revisa el buzón sin esperar al siguiente intervalo"""
+        self._despertar.set()
+
+    def _run(self):
+        while True:
+            self._despertar.wait(INTERVALO)
+            self._despertar.clear()
+            try:
+                # Vaciar el buzón antes de volver a esperar
+                while self.enviar_lote() == LOTE:
+                    pass
+            except Exception as e:
+                logger.error("Error en el buzón de salida de correos: %s", e)
+            if self._conexion is not None and time.monotonic() - self._ultimo_uso > INACTIVIDAD:
+                self._cerrar_conexion()
+
+    def _cerrar_conexion(self):
+        try:
+            self._conexion.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._conexion = None
+
+    def _obtener_conexion(self):
+        """Conexión abierta con la configuración vigente (se reabre si cambió o se cayó)"""
         settings = self.db.get_smtp_settings()
         if not settings:
             raise Exception("No se ha configurado el servidor SMTP")
-        
+        if self._conexion is not None and settings != self._settings:
+            self._cerrar_conexion()
+        if self._conexion is not None:
+            try:
+                if self._conexion.noop()[0] != 250:
+                    self._cerrar_conexion()
+            except (smtplib.SMTPException, OSError):
+                self._conexion = None
+        if self._conexion is None:
+            self._conexion = conectar_smtp(settings)
+            self._settings = settings
+        return self._conexion
+
+    @staticmethod
+    def _espera(intentos):
+        return min(ESPERA_BASE * 2 ** intentos, ESPERA_MAXIMA)
+
+    def enviar_lote(self):
+        """
+        Envía un lote de correos pendientes
+
+        Returns:
+            int: Cantidad de correos tomados del buzón
+        """
+        # Con el buzón vacío no se ocupa el turno de la cola de escritura
+        if not self.db.hay_correos_pendientes():
+            return 0
+        correos = self.db.tomar_correos_pendientes(LOTE)
+        if not correos:
+            return 0
+
+        enviados = []
+        fallos = []
         try:
-            if settings['use_tls']:
-                server = smtplib.SMTP(settings['server'], settings['port'])
-                server.starttls()
-            else:
-                server = smtplib.SMTP(settings['server'], settings['port'])
-            
-            if settings['username'] and settings['password']:
-                server.login(settings['username'], settings['password'])
-                
-            return server, settings['from_email']
-            
+            conexion = self._obtener_conexion()
+            from_email = self._settings['from_email']
+            for i, correo in enumerate(correos):
+                msg = crear_mensaje(from_email, correo['destinatario'], correo['asunto'],
+                                    correo['cuerpo'], bool(correo['es_html']))
+                try:
+                    conexion.send_message(msg)
+                    enviados.append(correo['id'])
+                except ERRORES_DEL_MENSAJE as e:
+                    fallos.append((correo['id'], self._espera(correo['intentos']), e))
+                except (smtplib.SMTPException, OSError) as e:
+                    # Se perdió la conexión: este y los que faltan se reintentan
+                    self._conexion = None
+                    fallos.extend((c['id'], self._espera(c['intentos']), e) for c in correos[i:])
+                    break
+            self._ultimo_uso = time.monotonic()
         except Exception as e:
-            raise Exception(f"Error al conectar con el servidor SMTP: {str(e)}")
-    
-    def send_email(self, to_email, subject, body, is_html=False):
-        """Envía un correo electrónico"""
+            # No se pudo conectar: todo el lote se reintenta más tarde
+            pendientes = set(enviados) | {correo_id for correo_id, _, _ in fallos}
+            fallos.extend((c['id'], self._espera(c['intentos']), e) for c in correos if c['id'] not in pendientes)
+
+        self.db.marcar_correos_enviados(enviados)
+        self.db.reprogramar_correos(fallos, MAX_INTENTOS)
+        if fallos:
+            logger.warning("No se enviaron %d de %d correos: %s", len(fallos), len(correos), fallos[-1][2])
+        return len(correos)
+
+
+_buzon = None
+_buzon_lock = threading.Lock()
+
+
+def iniciar_buzon(db):
+    """Inicia (una vez por proceso) el hilo del buzón de salida
+
+    Returns:
+        BuzonSalida: Buzón del proceso
+    """
+    global _buzon
+    with _buzon_lock:
+        if _buzon is None:
+            _buzon = BuzonSalida(db)
+        return _buzon
+
+
+class EmailSender:
+    def __init__(self, db):
+        self.db = db
+
+    def get_smtp_connection(self, settings=None):
+        """Obtiene la configuración SMTP (o usa la indicada) y devuelve una conexión"""
+        settings = settings or self.db.get_smtp_settings()
+        if not settings:
+            raise Exception("No se ha configurado el servidor SMTP")
+
+        return conectar_smtp(settings), settings['from_email']
+
+    def send_email(self, to_email, subject, body, is_html=False, usuario=None):
+        """Guarda un correo en el buzón de salida; se envía en segundo plano"""
         try:
-            server, from_email = self.get_smtp_connection()
-            
-            # Crear mensaje
-            msg = MIMEMultipart()
-            msg['From'] = from_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Adjuntar el cuerpo del mensaje
-            if is_html:
-                msg.attach(MIMEText(body, 'html'))
-            else:
-                msg.attach(MIMEText(body, 'plain'))
-            
-            # Enviar correo
-            server.send_message(msg)
-            server.quit()
+            self.db.encolar_correo(to_email, subject, body, is_html, usuario)
+            iniciar_buzon(self.db).despertar()
             return True
-            
+
         except Exception as e:
-            raise Exception(f"Error al enviar el correo: {str(e)}")
-    
+            raise Exception(f"Error al encolar el correo: {str(e)}")
+
     def send_user_credentials(self, user, password):
         """Envía las credenciales a un nuevo usuario"""
+        subject, body = self._mensaje_credenciales(user, password)
+        return self.send_email(user['email'], subject, body, is_html=True, usuario=user['username'])
+
+    def send_user_credentials_lote(self, usuarios):
+        """
+        Encola las credenciales de varios usuarios en una sola transacción
+
+        El hilo del buzón los envía por la misma conexión SMTP, en lotes.
+
+        Args:
+            usuarios (list): (user, password) por usuario
+
+        Returns:
+            list: IDs de los correos en email_outbox, en el mismo orden
+        """
+        if not usuarios:
+            return []
+        correos = []
+        for user, password in usuarios:
+            subject, body = self._mensaje_credenciales(user, password)
+            correos.append((user['email'], subject, body, True, user['username']))
+        try:
+            ids = self.db.encolar_correos(correos)
+        except Exception as e:
+            raise Exception(f"Error al encolar los correos: {str(e)}")
+        iniciar_buzon(self.db).despertar()
+        return ids
+
+    def reintentar_fallidos(self):
+        """
+        Devuelve al buzón los correos 'fallido'
+
+        Los de credenciales ya no tienen cuerpo: se genera otra contraseña temporal para
+        el usuario y se vuelve a armar el correo. Si el usuario ya no existe, está
+        inactivo o ya inició sesión después de encolarse el correo, se descarta en lugar
+        de cambiarle la contraseña.
+
+        Returns:
+            tuple: (correos reintentados, correos descartados)
+        """
+        from alta_usuarios import generar_password
+
+        reintentados = descartados = 0
+        for correo in self.db.get_credenciales_fallidas():
+            if not correo['username'] or not correo['is_active']:
+                self.db.descartar_correo(correo['id'], "El usuario ya no existe o está inactivo")
+                descartados += 1
+                continue
+            if correo['ya_ingreso']:
+                self.db.descartar_correo(correo['id'], "El usuario ya inició sesión")
+                descartados += 1
+                continue
+            password = generar_password()
+            self.db.change_password(correo['username'], password)
+            _, body = self._mensaje_credenciales(correo, password)
+            self.db.reemitir_correo(correo['id'], correo['email'], body)
+            reintentados += 1
+
+        reintentados += self.db.reintentar_correos_fallidos()
+        iniciar_buzon(self.db).despertar()
+        return reintentados, descartados
+
+    @staticmethod
+    def _mensaje_credenciales(user, password):
+        """Asunto y cuerpo HTML del correo de bienvenida"""
         subject = "Bienvenido al Sistema de Gestión de QSOs"
-        
+
         # Cuerpo del mensaje en HTML
         body = f"""
         <html>
@@ -75,5 +306,5 @@ class EmailSender:
             </body>
         </html>
         """
-        
-        return self.send_email(user['email'], subject, body, is_html=True)
+
+        return subject, body
@@ -0,0 +1,139 @@
+"""
+Estadísticas del día para la pantalla de toma de reportes, mantenidas en memoria.
+
+El panel "📊 Estadísticas del Día" se dibuja en cada interacción de la captura. En
+lugar de volver a consultar los reportes del día y sus agrupaciones cada vez, cada
+fecha tiene un objeto con los reportes y los contadores por zona, sistema y estado:
+
+  - Cuando este proceso guarda un reporte (FMREDatabase.save_reporte), se suma a
+    los contadores sin consultar la base de datos.
+  - Si la versión de la tabla reportes (cambios_datos) avanzó por otra razón (otro
+    worker, una edición o un borrado), los datos del día se vuelven a leer una vez.
+
+Cada inserción aumenta la versión en 1 dentro de la misma transacción, así que una
+inserción se puede aplicar solo si el objeto estaba exactamente en la versión
+anterior; en cualquier otro caso se recarga.
+"""
+import os
+import threading
+from collections import Counter, OrderedDict
+
+# Fechas con estadísticas en memoria por base de datos
+MAX_FECHAS = 8
+
+_lock = threading.Lock()
+_seguimientos = {}
+
+
+class EstadisticasDiarias:
+    """Reportes y contadores de un día"""
+
+    def __init__(self, fecha):
+        """
+        Args:
+            fecha (str): Fecha en formato 'YYYY-MM-DD'
+        """
+        self.fecha = fecha
+        self.version = None
+        self.lock = threading.Lock()
+        self._reportes = []
+        self._zonas = Counter()
+        self._sistemas = Counter()
+        self._estados = Counter()
+
+    def recargar(self, db):
+        """Vuelve a leer los reportes del día (una consulta)"""
+        reportes, version = db.get_reportes_del_dia(self.fecha)
+        self._reportes = []
+        self._zonas.clear()
+        self._sistemas.clear()
+        self._estados.clear()
+        for reporte in reportes:
+            self._agregar(reporte)
+        self.version = version
+
+    def _agregar(self, reporte):
+        self._reportes.append(reporte)
+        self._zonas[reporte.get('zona')] += 1
+        self._sistemas[reporte.get('sistema')] += 1
+        if reporte.get('estado'):
+            self._estados[reporte.get('estado')] += 1
+
+    def aplicar_insercion(self, reporte, version):
+        """Aplica un reporte recién insertado si es justo el siguiente cambio conocido
+
+        Returns:
+            bool: False si el objeto no estaba en la versión anterior (debe recargarse)
+        """
+        if self.version is None or self.version != version - 1:
+            return False
+        if str(reporte.get('fecha_reporte', ''))[:10] == self.fecha:
+            self._agregar(reporte)
+        self.version = version
+        return True
+
+    def reportes(self):
+        """Reportes del día, del más reciente al más antiguo"""
+        return self._reportes[::-1]
+
+    def estadisticas(self):
+        """Mismo formato que FMREDatabase.get_reportes_por_fecha"""
+        return {
+            'total': len(self._reportes),
+            'zonas_mas_reportadas': [{'zona': z, 'cantidad': c} for z, c in self._zonas.most_common(3)],
+            'sistemas_mas_utilizados': [{'sistema': s, 'cantidad': c} for s, c in self._sistemas.most_common(3)],
+            'estados_mas_reportados': [{'estado': e, 'cantidad': c} for e, c in self._estados.most_common(3)],
+        }
+
+
+def _seguimientos_de(db_path):
+    return _seguimientos.setdefault(os.path.abspath(db_path), OrderedDict())
+
+
+def obtener_estadisticas_del_dia(db, fecha):
+    """
+    Devuelve los reportes y las estadísticas de un día, recargando solo si hace falta
+
+    Args:
+        db (FMREDatabase): Base de datos
+        fecha (str): Fecha en formato 'YYYY-MM-DD'
+
+    Returns:
+        tuple: (reportes del más reciente al más antiguo, estadisticas)
+    """
+    with _lock:
+        seguimientos = _seguimientos_de(db.db_path)
+        seguimiento = seguimientos.get(fecha)
+        if seguimiento is None:
+            seguimiento = seguimientos[fecha] = EstadisticasDiarias(fecha)
+            while len(seguimientos) > MAX_FECHAS:
+                seguimientos.popitem(last=False)
+        else:
+            seguimientos.move_to_end(fecha)
+
+    version_actual = db.get_version_datos('reportes')
+    with seguimiento.lock:
+        if seguimiento.version != version_actual:
+            seguimiento.recargar(db)
+        return seguimiento.reportes(), seguimiento.estadisticas()
+
+
+def registrar_reporte(db_path, reporte, version):
+    """
+    Notifica un reporte insertado por este proceso
+
+    Todas las fechas en seguimiento avanzan a la nueva versión (la inserción no les
+    afecta si es de otro día); solo la fecha del reporte lo suma a sus contadores.
+
+    Args:
+        db_path (str): Ruta de la base de datos
+        reporte (dict): Columnas del reporte insertado
+        version (int): Versión de reportes después de la inserción
+    """
+    if version is None:
+        return
+    with _lock:
+        seguimientos = list(_seguimientos_de(db_path).values())
+    for seguimiento in seguimientos:
+        with seguimiento.lock:
+            seguimiento.aplicar_insercion(reporte, version)
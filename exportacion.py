@@ -0,0 +1,436 @@
+"""
+Exportación de reportes a Excel, CSV, CSV comprimido, Parquet y Arrow.
+
+Las filas se toman directamente de un cursor (FMREDatabase.iter_reportes_filtrados)
+y se escriben a un archivo temporal en disco: Excel con xlsxwriter en modo
+constant_memory, que guarda en memoria solo la fila actual, y CSV con el módulo
+csv, opcionalmente comprimido con gzip. Así exportar un año completo no obliga a
+armar DataFrames ni copias intermedias del resultado.
+
+Parquet y Arrow se escriben por lotes con pyarrow, con codificación de diccionario
+para zona, sistema, estado y tipo_reporte (llegan a pandas como category).
+
+Uso como script, para generar un snapshot completo (p. ej. desde un timer de systemd):
+    python exportacion.py --snapshot snapshots/ [--formato parquet] [--conservar 30]
+"""
+import csv
+import glob
+import gzip
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+
+# (columna en la tabla reportes, encabezado, ancho en Excel)
+COLUMNAS_REGISTROS = [
+    ('id', 'ID', 8),
+    ('indicativo', 'Indicativo', 14),
+    ('nombre', 'Nombre', 30),
+    ('sistema', 'Sistema', 10),
+    ('zona', 'Zona', 8),
+    ('estado', 'Estado', 22),
+    ('ciudad', 'Ciudad', 22),
+    ('senal', 'Señal', 8),
+    ('tipo_reporte', 'Tipo', 14),
+    ('fecha_reporte', 'Fecha', 20),
+    ('observaciones', 'Observaciones', 40),
+    ('qrz_station', 'Operando', 14),
+    ('qrz_captured_by', 'Capturado Por', 14),
+]
+
+COLUMNAS_EVENTO = [
+    ('indicativo', 'Indicativo', 14),
+    ('nombre', 'Nombre', 30),
+    ('zona', 'Zona', 8),
+    ('sistema', 'Sistema', 10),
+    ('estado', 'Estado', 22),
+    ('ciudad', 'Ciudad', 22),
+    ('senal', 'Señal', 8),
+    ('observaciones', 'Observaciones', 40),
+]
+
+# (columna, tipo) del esquema columnar; 'categoria' usa codificación de diccionario
+COLUMNAS_COLUMNAR = [
+    ('id', 'entero'),
+    ('indicativo', 'texto'),
+    ('nombre', 'texto'),
+    ('sistema', 'categoria'),
+    ('zona', 'categoria'),
+    ('estado', 'categoria'),
+    ('ciudad', 'texto'),
+    ('senal', 'entero'),
+    ('tipo_reporte', 'categoria'),
+    ('fecha_reporte', 'fecha'),
+    ('observaciones', 'texto'),
+    ('origen', 'texto'),
+    ('qrz_station', 'texto'),
+    ('qrz_captured_by', 'texto'),
+    ('created_at', 'fecha'),
+]
+
+FORMATOS = {
+    'xlsx': ('Excel (.xlsx)', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('CSV (.csv)', 'text/csv'),
+    'csv.gz': ('CSV comprimido (.csv.gz)', 'application/gzip'),
+    'parquet': ('Parquet (.parquet)', 'application/vnd.apache.parquet'),
+    'arrow': ('Arrow / Feather (.arrow)', 'application/vnd.apache.arrow.file'),
+}
+
+FORMATOS_COLUMNARES = ('parquet', 'arrow')
+
+# Exportaciones preparadas que nadie descargó (sesión cerrada) se borran tras estas horas
+HORAS_TEMPORALES = 6
+
+
+def _escribir_hoja(workbook, nombre, encabezados, anchos, filas):
+    """Escribe una hoja fila por fila (requisito del modo constant_memory)"""
+    worksheet = workbook.add_worksheet(nombre)
+    negrita = workbook.add_format({'bold': True})
+    for i, ancho in enumerate(anchos):
+        worksheet.set_column(i, i, ancho)
+    worksheet.write_row(0, 0, encabezados, negrita)
+    total = 0
+    for total, fila in enumerate(filas, start=1):
+        worksheet.write_row(total, 0, ['' if valor is None else valor for valor in fila])
+    return total
+
+
+def escribir_excel(ruta, hojas):
+    """
+    Crea un libro de Excel en modo constant_memory
+
+    Args:
+        ruta (str): Archivo de destino
+        hojas (list): Tuplas (nombre, columnas, filas) donde columnas es una lista de
+            (clave, encabezado, ancho) y filas un iterable de secuencias
+
+    Returns:
+        int: Total de filas de datos escritas
+    """
+    import xlsxwriter
+
+    total = 0
+    workbook = xlsxwriter.Workbook(ruta, {'constant_memory': True, 'strings_to_numbers': False})
+    try:
+        for nombre, columnas, filas in hojas:
+            total += _escribir_hoja(
+                workbook, nombre, [c[1] for c in columnas], [c[2] for c in columnas], filas
+            )
+    finally:
+        workbook.close()
+    return total
+
+
+def escribir_csv(ruta, columnas, filas, comprimir=False):
+    """
+    Escribe filas a CSV (UTF-8 con BOM para que Excel respete los acentos)
+
+    Args:
+        ruta (str): Archivo de destino
+        columnas (list): Lista de (clave, encabezado, ancho)
+        filas: Iterable de secuencias
+        comprimir (bool): Si es True, escribe el CSV comprimido con gzip
+
+    Returns:
+        int: Total de filas escritas
+    """
+    if comprimir:
+        archivo = io.TextIOWrapper(gzip.open(ruta, 'wb'), encoding='utf-8-sig', newline='')
+    else:
+        archivo = open(ruta, 'w', encoding='utf-8-sig', newline='')
+    total = 0
+    with archivo:
+        writer = csv.writer(archivo)
+        writer.writerow([c[1] for c in columnas])
+        for total, fila in enumerate(filas, start=1):
+            writer.writerow(fila)
+    return total
+
+
+def _a_entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _a_fecha(valor):
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(str(valor)).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class _LotesColumnares:
+    """Convierte filas en RecordBatch de pyarrow con diccionarios compartidos
+
+    Los diccionarios de las columnas de categoría solo crecen (los valores nuevos se
+    agregan al final), así cada lote es un delta del anterior, lo que admite tanto
+    Parquet como el formato de archivo IPC de Arrow.
+    """
+
+    def __init__(self):
+        import pyarrow as pa
+
+        self.pa = pa
+        tipos = {
+            'entero': pa.int64(),
+            'texto': pa.string(),
+            'categoria': pa.dictionary(pa.int32(), pa.string()),
+            'fecha': pa.timestamp('s'),
+        }
+        self.esquema = pa.schema([(columna, tipos[tipo]) for columna, tipo in COLUMNAS_COLUMNAR])
+        self._diccionarios = {columna: ([], {}) for columna, tipo in COLUMNAS_COLUMNAR if tipo == 'categoria'}
+
+    def _codificar(self, columna, valores):
+        pa = self.pa
+        diccionario, indice = self._diccionarios[columna]
+        codigos = []
+        for valor in valores:
+            if valor is None:
+                codigos.append(None)
+                continue
+            valor = str(valor)
+            codigo = indice.get(valor)
+            if codigo is None:
+                codigo = indice[valor] = len(diccionario)
+                diccionario.append(valor)
+            codigos.append(codigo)
+        return pa.DictionaryArray.from_arrays(pa.array(codigos, pa.int32()), pa.array(diccionario, pa.string()))
+
+    def lote(self, filas):
+        pa = self.pa
+        arrays = []
+        for (columna, tipo), valores in zip(COLUMNAS_COLUMNAR, zip(*filas)):
+            if tipo == 'categoria':
+                arrays.append(self._codificar(columna, valores))
+            elif tipo == 'entero':
+                arrays.append(pa.array([_a_entero(v) for v in valores], pa.int64()))
+            elif tipo == 'fecha':
+                arrays.append(pa.array([_a_fecha(v) for v in valores], pa.timestamp('s')))
+            else:
+                arrays.append(pa.array([None if v is None else str(v) for v in valores], pa.string()))
+        return pa.record_batch(arrays, schema=self.esquema)
+
+
+def escribir_columnar(ruta, filas, formato='parquet', tamano_lote=50000):
+    """
+    Escribe filas (en el orden de COLUMNAS_COLUMNAR) a Parquet o Arrow por lotes
+
+    Args:
+        ruta (str): Archivo de destino
+        filas: Iterable de secuencias
+        formato (str): 'parquet' o 'arrow' (archivo IPC, legible con pandas.read_feather)
+        tamano_lote (int): Filas por RecordBatch / grupo de filas
+
+    Returns:
+        int: Total de filas escritas
+    """
+    lotes = _LotesColumnares()
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(ruta, lotes.esquema, compression='zstd')
+    else:
+        import pyarrow as pa
+        opciones = pa.ipc.IpcWriteOptions(compression='zstd', emit_dictionary_deltas=True)
+        writer = pa.ipc.new_file(ruta, lotes.esquema, options=opciones)
+
+    total = 0
+    try:
+        pendientes = []
+        for fila in filas:
+            pendientes.append(tuple(fila))
+            if len(pendientes) >= tamano_lote:
+                writer.write_batch(lotes.lote(pendientes))
+                total += len(pendientes)
+                pendientes = []
+        if pendientes:
+            writer.write_batch(lotes.lote(pendientes))
+            total += len(pendientes)
+    finally:
+        writer.close()
+    return total
+
+
+def borrar_temporal(ruta):
+    """Borra un archivo exportado que ya no se va a descargar (si aún existe)"""
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def borrar_temporales_viejos(horas=HORAS_TEMPORALES):
+    """Borra las exportaciones temporales de más de cierta antigüedad
+
+    Returns:
+        int: Cantidad de archivos borrados
+    """
+    limite = time.time() - horas * 3600
+    borrados = 0
+    for ruta in glob.glob(os.path.join(tempfile.gettempdir(), 'qms_export_*')):
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+                borrados += 1
+        except OSError:
+            pass
+    return borrados
+
+
+def _archivo_temporal(extension):
+    descriptor, ruta = tempfile.mkstemp(prefix='qms_export_', suffix=f'.{extension}')
+    os.close(descriptor)
+    return ruta
+
+
+def exportar_registros(db, formato='xlsx', **filtros):
+    """
+    Exporta los reportes filtrados a un archivo temporal
+
+    Args:
+        db (FMREDatabase): Base de datos
+        formato (str): Una de las claves de FORMATOS
+        **filtros: Filtros de FMREDatabase.iter_reportes_filtrados
+
+    Returns:
+        tuple: (ruta_temporal, total_filas). El llamador debe borrar el archivo.
+    """
+    ruta = _archivo_temporal(formato)
+    try:
+        if formato in FORMATOS_COLUMNARES:
+            filas = db.iter_reportes_filtrados(columnas=[c[0] for c in COLUMNAS_COLUMNAR], **filtros)
+            return ruta, escribir_columnar(ruta, filas, formato)
+
+        filas = db.iter_reportes_filtrados(columnas=[c[0] for c in COLUMNAS_REGISTROS], **filtros)
+        if formato == 'xlsx':
+            total = escribir_excel(ruta, [('Registros', COLUMNAS_REGISTROS, filas)])
+        else:
+            total = escribir_csv(ruta, COLUMNAS_REGISTROS, filas, comprimir=(formato == 'csv.gz'))
+    except Exception:
+        os.remove(ruta)
+        raise
+    return ruta, total
+
+
+def exportar_evento(db, evento, fecha, estadisticas, por_zona, por_sistema, formato='xlsx'):
+    """
+    Exporta el reporte de un evento; el detalle se lee directo del cursor
+
+    Args:
+        db (FMREDatabase): Base de datos
+        evento (str): Tipo de reporte del evento
+        fecha (date): Fecha del evento
+        estadisticas (list): Pares (métrica, valor) para la hoja de estadísticas
+        por_zona (list): Filas (zona, cantidad, porcentaje)
+        por_sistema (list): Filas (sistema, cantidad, porcentaje)
+        formato (str): 'xlsx', 'csv' o 'csv.gz' (CSV solo incluye el detalle)
+
+    Returns:
+        str: Ruta del archivo temporal. El llamador debe borrarlo.
+    """
+    ruta = _archivo_temporal(formato)
+    detalle = db.iter_reportes_filtrados(
+        columnas=[c[0] for c in COLUMNAS_EVENTO],
+        fecha_inicio=fecha, fecha_fin=fecha, tipo_reporte=evento
+    )
+    try:
+        escribir_evento(ruta, estadisticas, detalle, por_zona, por_sistema, formato)
+    except Exception:
+        os.remove(ruta)
+        raise
+    return ruta
+
+
+def escribir_evento(ruta, estadisticas, detalle, por_zona, por_sistema, formato='xlsx'):
+    """
+    Escribe el archivo del reporte de un evento (ver exportar_evento)
+
+    Args:
+        detalle: Iterable de filas en el orden de COLUMNAS_EVENTO
+    """
+    if formato == 'xlsx':
+        escribir_excel(ruta, [
+            ('Estadísticas', [('metrica', 'Métrica', 22), ('valor', 'Valor', 40)], estadisticas),
+            ('Datos Detallados', COLUMNAS_EVENTO, detalle),
+            ('Por Zona', [('zona', 'Zona', 10), ('cantidad', 'Cantidad', 10), ('porcentaje', 'Porcentaje', 12)], por_zona),
+            ('Por Sistema', [('sistema', 'Sistema', 10), ('cantidad', 'Cantidad', 10), ('porcentaje', 'Porcentaje', 12)], por_sistema),
+        ])
+    else:
+        escribir_csv(ruta, COLUMNAS_EVENTO, detalle, comprimir=(formato == 'csv.gz'))
+
+
+def estadisticas_evento(datos):
+    """Pares (métrica, valor) de la hoja de estadísticas a partir de reportes_pdf.datos_evento"""
+    return [
+        ('Evento', datos['evento']),
+        ('Fecha', datos['fecha']),
+        ('Total Reportes', datos['total_reportes']),
+        ('Estaciones Únicas', datos['estaciones_unicas']),
+        ('Zona Más Reportada', datos['zona_mas_reportada']),
+        ('Sistema Más Usado', datos['sistema_mas_usado']),
+        ('Generado por', datos['generado_por'])
+    ]
+
+
+def leer_y_borrar(ruta):
+    """Lee el archivo exportado para st.download_button y lo elimina del disco"""
+    try:
+        with open(ruta, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(ruta)
+
+
+def crear_snapshot(db, directorio, formato='parquet', conservar=None):
+    """
+    Escribe un snapshot completo de reportes (incluidos los años archivados)
+
+    El archivo se escribe con un nombre temporal y se renombra al terminar, así
+    los lectores nunca ven un snapshot a medias.
+
+    Args:
+        db (FMREDatabase): Base de datos
+        directorio (str): Carpeta de snapshots
+        formato (str): 'parquet' o 'arrow'
+        conservar (int, optional): Cuántos snapshots de ese formato mantener
+
+    Returns:
+        tuple: (ruta_snapshot, total_filas)
+    """
+    os.makedirs(directorio, exist_ok=True)
+    destino = os.path.join(directorio, f"reportes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}")
+    temporal = destino + '.tmp'
+    try:
+        filas = db.iter_reportes_filtrados(columnas=[c[0] for c in COLUMNAS_COLUMNAR], incluir_archivo=True)
+        total = escribir_columnar(temporal, filas, formato)
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    if conservar:
+        anteriores = sorted(glob.glob(os.path.join(directorio, f'reportes_*.{formato}')))
+        for ruta in anteriores[:-conservar]:
+            os.remove(ruta)
+
+    return destino, total
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from database import FMREDatabase
+
+    parser = argparse.ArgumentParser(description="Snapshot completo de reportes en formato columnar")
+    parser.add_argument('--snapshot', required=True, metavar='DIRECTORIO', help="Carpeta donde guardar el snapshot")
+    parser.add_argument('--formato', choices=FORMATOS_COLUMNARES, default='parquet')
+    parser.add_argument('--conservar', type=int, default=None, help="Número de snapshots a conservar")
+    parser.add_argument('--db', default='qms.db', help="Ruta de la base de datos")
+    args = parser.parse_args()
+
+    ruta, total = crear_snapshot(FMREDatabase(args.db), args.snapshot, args.formato, args.conservar)
+    print(f"Snapshot escrito: {ruta} ({total} reportes)")
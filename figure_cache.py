@@ -0,0 +1,154 @@
+"""
+Caché de figuras de Plotly y de los datos de las páginas de reportes, compartida por
+todas las sesiones del proceso.
+
+Streamlit vuelve a ejecutar las páginas de reportes completas en cada interacción,
+aunque el widget que cambió no tenga nada que ver con las gráficas. Las claves
+incluyen el reporte, el rango de fechas, los filtros y la versión de los datos
+(FMREDatabase.get_version_datos), así que lo que está en caché siempre corresponde a
+los datos actuales:
+
+  - obtener_datos guarda el resultado de reportes_calculo.datos_* (las tablas de la
+    página); en un rerun no se consulta la base ni se arma ningún DataFrame. Los
+    datos se comparten entre sesiones y no se deben modificar.
+  - obtener_figura guarda el go.Figure construido la primera vez y se pasa tal cual
+    a st.plotly_chart. Con una figura (no un dict) Streamlit solo llama to_dict() y
+    no la vuelve a validar (plotly.tools.return_figure_from_figure_or_data, así desde
+    plotly 4 hasta la 7.1 con la que se midió); validar un dict cuesta decenas de
+    milisegundos con el mapa. Las figuras también se comparten y no se deben modificar.
+
+La caché es LRU con un límite de memoria en bytes (QMS_FIGURE_CACHE_MB, 64 MB por
+defecto), medido con el JSON de las figuras y la memoria de los DataFrames; al
+superarlo se descartan las entradas usadas hace más tiempo.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """LRU de figuras y datos de página con límite de bytes"""
+
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int): Memoria máxima aproximada (tamaño del JSON de las figuras
+                y memoria de los DataFrames de los datos)
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave):
+        """Devuelve lo guardado ((figura, avisos) o los datos) o None si no está en caché"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def put(self, clave, figura, avisos=()):
+        """Guarda una figura de Plotly; no se guarda si por sí sola excede el límite"""
+        avisos = tuple(avisos)
+        self._guardar(clave, (figura, avisos), len(figura.to_json()) + sum(len(texto) for _, texto in avisos))
+
+    def put_datos(self, clave, datos):
+        """Guarda los datos de una página; no se guardan si por sí solos exceden el límite"""
+        self._guardar(clave, datos, _tamano_datos(datos))
+
+    def _guardar(self, clave, valor, tamano):
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[clave] = (valor, tamano)
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                _, (_, descartada) = self._entradas.popitem(last=False)
+                self._bytes -= descartada
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """Entradas (figuras y datos), bytes usados, aciertos y fallos"""
+        with self._lock:
+            return {
+                'figuras': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+            }
+
+
+def _tamano_datos(valor):
+    """Bytes aproximados de los datos de una página (DataFrames, listas, dicts y escalares)"""
+    if hasattr(valor, 'memory_usage'):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if hasattr(uso, 'sum') else int(uso)
+    if isinstance(valor, dict):
+        return sum(_tamano_datos(v) for v in valor.values())
+    if isinstance(valor, (list, tuple, set)):
+        return sum(_tamano_datos(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+_cache = FigureCache(int(float(os.environ.get('QMS_FIGURE_CACHE_MB', '64')) * 1024 * 1024))
+
+
+def obtener_figura(clave, construir):
+    """
+    Devuelve la figura de una clave, construyéndola solo si hace falta
+
+    Args:
+        clave (tuple): (reporte, gráfica, fechas, filtros..., versión de datos)
+        construir: Función sin argumentos que devuelve (figura o None, avisos), donde
+            avisos es una lista de (tipo, texto) con tipo 'info', 'warning' o 'caption'
+
+    Returns:
+        tuple: (go.Figure o None, avisos); la figura se comparte y no se debe modificar
+    """
+    entrada = _cache.get(clave)
+    if entrada is not None:
+        return entrada
+
+    figura, avisos = construir()
+    if figura is not None:
+        _cache.put(clave, figura, avisos)
+    return figura, tuple(avisos)
+
+
+def obtener_datos(clave, calcular):
+    """
+    Devuelve los datos de una página de reportes, calculándolos solo si hace falta
+
+    Args:
+        clave (tuple): (reporte, fechas, filtros..., versión de datos)
+        calcular: Función sin argumentos que devuelve los datos (p. ej.
+            reportes_calculo.datos_sistemas); el resultado no se debe modificar
+
+    Returns:
+        Los datos guardados o recién calculados
+    """
+    # En una tupla, para distinguir datos None (p. ej. sin reportes) de una clave ausente
+    entrada = _cache.get(clave)
+    if entrada is None:
+        entrada = (calcular(),)
+        _cache.put_datos(clave, entrada)
+    return entrada[0]
+
+
+def estadisticas():
+    return _cache.estadisticas()
@@ -0,0 +1,136 @@
+"""
+Generación por lotes de los reportes por evento de un periodo.
+
+Produce, para cada evento y cada día con reportes, los mismos archivos que la
+página "Reportes por Evento" (PDF y Excel), con los mismos constructores
+(reportes_pdf y exportacion). Los reportes de todos los eventos se leen con una
+sola consulta agrupada y los archivos se generan en paralelo en un pool de
+procesos, uno por núcleo por defecto.
+
+Uso:
+    python generar_reportes_lote.py --desde 2025-01-01 --hasta 2025-01-31 --salida reportes_enero/
+        [--formatos pdf xlsx] [--eventos "Boletín" ...] [--procesos N] [--db qms.db]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import exportacion
+import reportes_pdf
+from database import FMREDatabase
+
+FORMATOS_LOTE = ('pdf', 'xlsx', 'csv')
+
+
+def _nombre_archivo(evento, fecha, extension):
+    """Nombre seguro para el sistema de archivos, como el de la descarga en la app"""
+    evento = re.sub(r'[^\w\-]+', '_', evento).strip('_') or 'evento'
+    return f"reporte_{evento}_{fecha}.{extension}"
+
+
+def _generar_evento(datos, detalle, directorio, formatos):
+    """Genera los archivos de un evento (se ejecuta en un proceso del pool)
+
+    Returns:
+        list: Rutas escritas
+    """
+    rutas = []
+    if 'pdf' in formatos:
+        ruta = os.path.join(directorio, _nombre_archivo(datos['evento'], datos['fecha'], 'pdf'))
+        with open(ruta, 'wb') as f:
+            f.write(reportes_pdf.construir_pdf_evento(datos))
+        rutas.append(ruta)
+    for formato in ('xlsx', 'csv'):
+        if formato in formatos:
+            ruta = os.path.join(directorio, _nombre_archivo(datos['evento'], datos['fecha'], formato))
+            exportacion.escribir_evento(
+                ruta, exportacion.estadisticas_evento(datos), detalle, datos['zonas'], datos['sistemas'], formato
+            )
+            rutas.append(ruta)
+    return rutas
+
+
+def generar_lote(db, fecha_inicio, fecha_fin, directorio, formatos=('pdf', 'xlsx'), eventos=None,
+                 procesos=None, generado_por='Sistema QMS', incluir_inactivos=False):
+    """
+    Genera los reportes de todos los eventos en un rango de fechas
+
+    Args:
+        db (FMREDatabase): Base de datos
+        fecha_inicio (str): Fecha de inicio 'YYYY-MM-DD'
+        fecha_fin (str): Fecha de fin 'YYYY-MM-DD'
+        directorio (str): Carpeta de salida
+        formatos (tuple): Subconjunto de FORMATOS_LOTE
+        eventos (list, optional): Tipos de evento; por defecto, los de get_all_eventos
+        procesos (int, optional): Procesos del pool; por defecto, uno por núcleo
+        generado_por (str): Texto de "Generado por" en los reportes
+        incluir_inactivos (bool): Incluir eventos inactivos cuando no se indican eventos
+
+    Returns:
+        tuple: (archivos generados, errores [(evento, fecha, mensaje)])
+    """
+    if not eventos:
+        eventos = [e['tipo'] for e in db.get_all_eventos(incluir_inactivos=incluir_inactivos)]
+    grupos = db.get_reportes_por_evento_rango(fecha_inicio, fecha_fin, eventos)
+    os.makedirs(directorio, exist_ok=True)
+
+    fecha_generacion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    columnas_detalle = [c[0] for c in exportacion.COLUMNAS_EVENTO]
+    archivos = []
+    errores = []
+
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        trabajos = {}
+        for (evento, fecha), reportes in grupos.items():
+            datos = reportes_pdf.datos_evento(evento, fecha, reportes, generado_por, fecha_generacion)
+            detalle = [tuple(r.get(c) for c in columnas_detalle) for r in reportes]
+            trabajos[executor.submit(_generar_evento, datos, detalle, directorio, formatos)] = (evento, fecha)
+
+        for trabajo in as_completed(trabajos):
+            evento, fecha = trabajos[trabajo]
+            try:
+                archivos.extend(trabajo.result())
+            except Exception as e:
+                print(f"Error al generar el reporte de {evento} ({fecha}): {str(e)}")
+                errores.append((evento, fecha, str(e)))
+
+    return sorted(archivos), errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los reportes por evento de un periodo")
+    parser.add_argument('--desde', required=True, help="Fecha de inicio (YYYY-MM-DD)")
+    parser.add_argument('--hasta', required=True, help="Fecha de fin (YYYY-MM-DD)")
+    parser.add_argument('--salida', required=True, metavar='DIRECTORIO', help="Carpeta donde guardar los archivos")
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS_LOTE, default=['pdf', 'xlsx'])
+    parser.add_argument('--eventos', nargs='*', help="Eventos a generar (por defecto, todos los activos)")
+    parser.add_argument('--incluir-inactivos', action='store_true', help="Incluir también eventos inactivos")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument('--generado-por', default='Sistema QMS', help="Texto de 'Generado por'")
+    parser.add_argument('--db', default='qms.db', help="Ruta de la base de datos")
+    args = parser.parse_args()
+
+    for fecha in (args.desde, args.hasta):
+        try:
+            datetime.strptime(fecha, '%Y-%m-%d')
+        except ValueError:
+            parser.error(f"Fecha inválida: {fecha}")
+
+    inicio = time.perf_counter()
+    archivos, errores = generar_lote(
+        FMREDatabase(args.db), args.desde, args.hasta, args.salida, tuple(args.formatos),
+        eventos=args.eventos, procesos=args.procesos, generado_por=args.generado_por,
+        incluir_inactivos=args.incluir_inactivos
+    )
+    print(f"{len(archivos)} archivos generados en {args.salida} ({time.perf_counter() - inicio:.1f} s)")
+    if errores:
+        print(f"{len(errores)} reportes con error")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
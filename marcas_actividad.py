@@ -0,0 +1,163 @@
+"""
+Marcas de actividad (users.last_login y similares) acumuladas en memoria.
+
+Registrar un inicio de sesión no necesita ser inmediato ni tomar el candado de
+escritura en medio de un grupo de inicios de sesión. marcar() solo guarda en un
+diccionario el instante más reciente de cada fila; un hilo vacía el diccionario cada
+QMS_ACTIVIDAD_INTERVALO segundos (30 por defecto) con una sola operación en la cola
+de escritura (write_queue.py), que actualiza todas las filas en la misma transacción
+que los reportes que estén esperando. Al terminar el proceso se vacía lo pendiente
+antes de cerrar la cola.
+
+Las marcas se guardan en UTC con el formato de CURRENT_TIMESTAMP y solo avanzan: si
+otro proceso ya escribió un instante posterior, se conserva. Mientras no se vacía el
+búfer, las consultas ven el valor anterior (a lo más un intervalo de retraso).
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from write_queue import get_write_queue
+
+logger = logging.getLogger('qms.marcas_actividad')
+
+INTERVALO = float(os.environ.get('QMS_ACTIVIDAD_INTERVALO', '30'))
+
+# Columnas que se pueden marcar: (tabla, columna)
+COLUMNAS = {
+    ('users', 'last_login'),
+}
+
+# Un búfer por archivo de base de datos y por proceso, como las colas de escritura
+_buferes = {}
+_buferes_lock = threading.Lock()
+
+
+class MarcasActividad:
+    """Búfer de marcas de actividad de una base de datos"""
+
+    def __init__(self, db_path, connection_factory, intervalo=INTERVALO):
+        """
+        Args:
+            db_path (str): Ruta de la base de datos
+            connection_factory: Función que abre una conexión (para la cola de escritura)
+            intervalo (float): Segundos entre cada vaciado
+        """
+        self._db_path = db_path
+        self._connection_factory = connection_factory
+        self._intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendientes = {}
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._run, name="qms-marcas-actividad", daemon=True)
+        self._hilo.start()
+
+    def marcar(self, tabla, columna, fila_id, momento=None):
+        """
+        Registra actividad de una fila; se escribe en el siguiente vaciado
+
+        Args:
+            tabla (str): Tabla (debe estar en COLUMNAS junto con la columna)
+            columna (str): Columna de fecha a actualizar
+            fila_id (int): id de la fila
+            momento (datetime, optional): Instante de la actividad; por defecto ahora
+        """
+        if (tabla, columna) not in COLUMNAS:
+            raise ValueError(f"No se pueden marcar {tabla}.{columna}")
+        momento = (momento or datetime.now(timezone.utc)).strftime('%Y-%m-%d %H:%M:%S')
+        clave = (tabla, columna, fila_id)
+        with self._lock:
+            # Dos marcas de la misma fila en un intervalo se reducen a la más reciente
+            if momento > self._pendientes.get(clave, ''):
+                self._pendientes[clave] = momento
+
+    def vaciar(self, esperar=False):
+        """
+        Escribe las marcas pendientes en una sola operación de la cola de escritura
+
+        Args:
+            esperar (bool): Esperar a que se confirme la transacción
+
+        Returns:
+            int: Cantidad de filas enviadas
+        """
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        if not pendientes:
+            return 0
+
+        por_columna = {}
+        for (tabla, columna, fila_id), momento in pendientes.items():
+            por_columna.setdefault((tabla, columna), []).append((momento, fila_id, momento))
+
+        def _escribir(cursor):
+            for (tabla, columna), filas in por_columna.items():
+                cursor.executemany(
+                    f'UPDATE {tabla} SET {columna} = ? WHERE id = ? AND ({columna} IS NULL OR {columna} < ?)',
+                    filas
+                )
+
+        future = get_write_queue(self._db_path, self._connection_factory).submit(_escribir)
+        future.add_done_callback(lambda f: self._al_terminar(f, pendientes))
+        if esperar:
+            future.exception()
+        return len(pendientes)
+
+    def _al_terminar(self, future, pendientes):
+        error = future.exception()
+        if error is None:
+            return
+        logger.warning("No se pudieron escribir %d marcas de actividad: %s", len(pendientes), error)
+        # Devolverlas al búfer (sin pisar marcas más recientes) para el siguiente intento
+        with self._lock:
+            for clave, momento in pendientes.items():
+                if momento > self._pendientes.get(clave, ''):
+                    self._pendientes[clave] = momento
+
+    def close(self):
+        """Detiene el hilo y escribe lo pendiente"""
+        self._detener.set()
+        try:
+            self.vaciar(esperar=True)
+        except RuntimeError:
+            # La cola de escritura ya se cerró
+            pass
+
+    def _run(self):
+        while not self._detener.wait(self._intervalo):
+            try:
+                self.vaciar()
+            except Exception as e:
+                logger.warning("Error al vaciar las marcas de actividad: %s", e)
+
+
+def get_marcas_actividad(db_path, connection_factory):
+    """Obtiene (o crea) el búfer de marcas de actividad del proceso para una base de datos
+
+    Args:
+        db_path (str): Ruta de la base de datos
+        connection_factory: Función que abre una conexión a esa base de datos
+
+    Returns:
+        MarcasActividad: Búfer compartido para esa base de datos
+    """
+    clave = os.path.abspath(db_path)
+    with _buferes_lock:
+        marcas = _buferes.get(clave)
+        if marcas is None:
+            marcas = MarcasActividad(db_path, connection_factory)
+            _buferes[clave] = marcas
+        return marcas
+
+
+# Se registra después del atexit de write_queue (importado arriba), así que corre antes
+# y las marcas pendientes entran a la cola antes de cerrarla
+@atexit.register
+def _vaciar_buferes():
+    with _buferes_lock:
+        buferes = list(_buferes.values())
+        _buferes.clear()
+    for marcas in buferes:
+        marcas.close()
@@ -0,0 +1,281 @@
+"""
+Métricas de tiempos y registro (logging) de la aplicación.
+
+Métricas
+--------
+Cada método público de FMREDatabase y las páginas principales de app.py se miden
+con histogramas de duración, contador de errores y total de filas devueltas (si el
+resultado es una lista o un par (lista, ...)). Se consultan en Configuración →
+Métricas o en formato de texto de Prometheus:
+
+  - exportar_prometheus() devuelve el texto.
+  - Con QMS_METRICS_FILE definido, un hilo escribe ese texto al archivo cada
+    QMS_METRICS_INTERVAL segundos (15 por defecto), para el textfile collector de
+    node_exporter u otro lector local. Admite {pid} en la ruta, uno por worker.
+
+QMS_METRICS=0 desactiva la instrumentación: los métodos quedan sin envolver.
+
+Logging
+-------
+Los mensajes van al logger 'qms' (logging.getLogger('qms.<módulo>')). El nivel se
+toma de QMS_LOG_LEVEL (WARNING por defecto), así los mensajes de depuración no
+cuestan nada en producción: logger.debug con argumentos %s no formatea el texto si
+el nivel no está habilitado. QMS_LOG_SAMPLE (0 a 1) registra solo esa fracción de
+los mensajes DEBUG cuando se activan en un servidor con mucho tráfico.
+"""
+import bisect
+import functools
+import inspect
+import logging
+import os
+import random
+import threading
+import time
+
+HABILITADO = os.environ.get('QMS_METRICS', '1') != '0'
+
+# Límites superiores de los buckets, en segundos
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+NOMBRES_METRICAS = {
+    'db': ('qms_db', 'Métodos de FMREDatabase', 'method'),
+    'pagina': ('qms_page', 'Páginas de la aplicación', 'page'),
+}
+
+
+class Serie:
+    """Histograma de duraciones, errores y filas de una función"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.suma = 0.0
+        self.llamadas = 0
+        self.errores = 0
+        self.filas = 0
+        self.maximo = 0.0
+
+    def observar(self, duracion, error=False, filas=None):
+        with self.lock:
+            self.buckets[bisect.bisect_left(BUCKETS, duracion)] += 1
+            self.suma += duracion
+            self.llamadas += 1
+            self.maximo = max(self.maximo, duracion)
+            if error:
+                self.errores += 1
+            if filas:
+                self.filas += filas
+
+    def percentil(self, p):
+        """Percentil aproximado (interpolación lineal dentro del bucket, sin pasar del máximo observado), en segundos"""
+        with self.lock:
+            objetivo = self.llamadas * p
+            acumulado = 0
+            for i, cantidad in enumerate(self.buckets):
+                if cantidad and acumulado + cantidad >= objetivo:
+                    inferior = BUCKETS[i - 1] if i > 0 else 0.0
+                    superior = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1] * 2
+                    return min(inferior + (superior - inferior) * (objetivo - acumulado) / cantidad, self.maximo)
+                acumulado += cantidad
+            return 0.0
+
+
+_series = {}
+_series_lock = threading.Lock()
+
+
+def _serie(tipo, nombre):
+    clave = (tipo, nombre)
+    serie = _series.get(clave)
+    if serie is None:
+        with _series_lock:
+            serie = _series.setdefault(clave, Serie())
+    return serie
+
+
+def _contar_filas(resultado):
+    if isinstance(resultado, list):
+        return len(resultado)
+    if isinstance(resultado, tuple) and resultado and isinstance(resultado[0], list):
+        return len(resultado[0])
+    return None
+
+
+def medir(tipo, nombre=None):
+    """
+    Decorador que mide una función
+
+    Args:
+        tipo (str): 'db' o 'pagina'
+        nombre (str, optional): Nombre de la serie; por defecto, el de la función
+    """
+    def decorador(funcion):
+        if not HABILITADO:
+            return funcion
+        serie = _serie(tipo, nombre or funcion.__name__)
+
+        if inspect.isgeneratorfunction(funcion):
+            # Los generadores se miden hasta agotarse o cerrarse, contando lo entregado
+            @functools.wraps(funcion)
+            def envoltura_generador(*args, **kwargs):
+                inicio = time.perf_counter()
+                filas = 0
+                error = False
+                try:
+                    for elemento in funcion(*args, **kwargs):
+                        filas += 1
+                        yield elemento
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    serie.observar(time.perf_counter() - inicio, error, filas)
+            return envoltura_generador
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception:
+                serie.observar(time.perf_counter() - inicio, error=True)
+                raise
+            except BaseException:
+                # st.rerun()/st.stop() son control de flujo de Streamlit, no errores
+                serie.observar(time.perf_counter() - inicio)
+                raise
+            serie.observar(time.perf_counter() - inicio, filas=_contar_filas(resultado))
+            return resultado
+        return envoltura
+    return decorador
+
+
+def instrumentar_clase(cls, tipo='db'):
+    """Envuelve con medir() todos los métodos públicos definidos en la clase"""
+    if not HABILITADO:
+        return cls
+    for nombre, atributo in list(vars(cls).items()):
+        if nombre.startswith('_') or not inspect.isfunction(atributo):
+            continue
+        setattr(cls, nombre, medir(tipo, nombre)(atributo))
+    return cls
+
+
+def resumen():
+    """
+    Resumen por función para la página de administración
+
+    Returns:
+        list: dicts con tipo, nombre, llamadas, errores, filas, promedio_ms, p50_ms,
+        p95_ms y total_s, de mayor a menor tiempo total
+    """
+    with _series_lock:
+        series = list(_series.items())
+    filas = []
+    for (tipo, nombre), serie in series:
+        if not serie.llamadas:
+            continue
+        filas.append({
+            'tipo': tipo,
+            'nombre': nombre,
+            'llamadas': serie.llamadas,
+            'errores': serie.errores,
+            'filas': serie.filas,
+            'promedio_ms': round(serie.suma / serie.llamadas * 1000, 2),
+            'p50_ms': round(serie.percentil(0.5) * 1000, 2),
+            'p95_ms': round(serie.percentil(0.95) * 1000, 2),
+            'total_s': round(serie.suma, 3),
+        })
+    return sorted(filas, key=lambda f: f['total_s'], reverse=True)
+
+
+def exportar_prometheus():
+    """Devuelve las métricas en formato de texto de Prometheus (versión 0.0.4)"""
+    with _series_lock:
+        series = sorted(_series.items())
+    lineas = []
+    for tipo, (prefijo, descripcion, etiqueta) in NOMBRES_METRICAS.items():
+        del_tipo = [(nombre, serie) for (t, nombre), serie in series if t == tipo]
+        if not del_tipo:
+            continue
+        lineas.append(f"# HELP {prefijo}_duration_seconds Duración de las llamadas. {descripcion}.")
+        lineas.append(f"# TYPE {prefijo}_duration_seconds histogram")
+        for nombre, serie in del_tipo:
+            with serie.lock:
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS + (float('inf'),), serie.buckets):
+                    acumulado += cantidad
+                    le = '+Inf' if limite == float('inf') else repr(limite)
+                    lineas.append(f'{prefijo}_duration_seconds_bucket{{{etiqueta}="{nombre}",le="{le}"}} {acumulado}')
+                lineas.append(f'{prefijo}_duration_seconds_sum{{{etiqueta}="{nombre}"}} {serie.suma:.6f}')
+                lineas.append(f'{prefijo}_duration_seconds_count{{{etiqueta}="{nombre}"}} {serie.llamadas}')
+        for sufijo, campo, ayuda in (('errors_total', 'errores', 'Llamadas que terminaron con excepción'),
+                                     ('rows_total', 'filas', 'Filas devueltas')):
+            lineas.append(f"# HELP {prefijo}_{sufijo} {ayuda}. {descripcion}.")
+            lineas.append(f"# TYPE {prefijo}_{sufijo} counter")
+            for nombre, serie in del_tipo:
+                lineas.append(f'{prefijo}_{sufijo}{{{etiqueta}="{nombre}"}} {getattr(serie, campo)}')
+    return '\n'.join(lineas) + '\n'
+
+
+def escribir_textfile(ruta):
+    """Escribe las métricas a un archivo de forma atómica (para lectores locales)"""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(exportar_prometheus())
+    os.replace(temporal, ruta)
+
+
+_exportador = None
+
+
+def iniciar_exportador():
+    """Inicia (una vez por proceso) el hilo que escribe QMS_METRICS_FILE"""
+    global _exportador
+    ruta = os.environ.get('QMS_METRICS_FILE')
+    if not ruta or not HABILITADO:
+        return
+    with _series_lock:
+        if _exportador is not None:
+            return
+        ruta = ruta.replace('{pid}', str(os.getpid()))
+        intervalo = float(os.environ.get('QMS_METRICS_INTERVAL', '15'))
+
+        def _escribir_periodicamente():
+            while True:
+                try:
+                    escribir_textfile(ruta)
+                except OSError as e:
+                    logging.getLogger('qms.metrics').warning("No se pudieron escribir las métricas en %s: %s", ruta, e)
+                time.sleep(intervalo)
+
+        _exportador = threading.Thread(target=_escribir_periodicamente, name="qms-metrics", daemon=True)
+        _exportador.start()
+
+
+class _MuestreoDebug(logging.Filter):
+    """Deja pasar solo una fracción de los mensajes DEBUG"""
+
+    def __init__(self, fraccion):
+        super().__init__()
+        self.fraccion = fraccion
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.fraccion
+
+
+def configurar_logging():
+    """Configura el logger 'qms' a partir de QMS_LOG_LEVEL y QMS_LOG_SAMPLE (idempotente)"""
+    logger = logging.getLogger('qms')
+    if getattr(logger, '_qms_configurado', False):
+        return logger
+    logger.setLevel(os.environ.get('QMS_LOG_LEVEL', 'WARNING').upper())
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    fraccion = float(os.environ.get('QMS_LOG_SAMPLE', '1'))
+    if fraccion < 1:
+        handler.addFilter(_MuestreoDebug(fraccion))
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger._qms_configurado = True
+    return logger
@@ -0,0 +1,131 @@
+"""
+Hash de contraseñas con parámetros ajustables, fuera del hilo de la página.
+
+Los hashes se guardan como 'pbkdf2_sha256$<iteraciones>$<sal>$<hash>', así cada
+contraseña lleva los parámetros con los que se generó. Las iteraciones se toman de
+QMS_PBKDF2_ITERATIONS (100 000 por defecto). Cuando un usuario inicia sesión con un
+hash de otros parámetros o de un formato anterior, FMREDatabase.verify_user lo
+vuelve a generar con los actuales (necesita_rehash).
+
+Formato anterior que se sigue aceptando: '<sal>$<hash>', PBKDF2-SHA256 con 100 000
+iteraciones. Los hashes SHA-256 sin sal ya no se aceptan.
+
+PBKDF2 ocupa el CPU por decenas o cientos de milisegundos. hashear y verificar corren
+en un pool de QMS_HASH_WORKERS hilos (hashlib libera el GIL mientras calcula), así un
+grupo de inicios de sesión al abrir la red no detiene a las demás sesiones. Si ya
+hay QMS_HASH_MAX_PENDIENTES cálculos en espera, se lanza PoolSaturado en lugar de
+seguir acumulándolos.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITMO = 'pbkdf2_sha256'
+ITERACIONES = int(os.environ.get('QMS_PBKDF2_ITERATIONS', '100000'))
+
+# Parámetros del formato '<sal>$<hash>' anterior a los hashes con prefijo
+ITERACIONES_ANTERIORES = 100000
+
+TRABAJADORES = int(os.environ.get('QMS_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+MAX_PENDIENTES = int(os.environ.get('QMS_HASH_MAX_PENDIENTES', str(TRABAJADORES * 8)))
+# Segundos que se espera un lugar en el pool antes de lanzar PoolSaturado
+ESPERA_LUGAR = 5.0
+
+
+class PoolSaturado(RuntimeError):
+    """Hay demasiados cálculos de hash pendientes"""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_lugares = threading.BoundedSemaphore(MAX_PENDIENTES)
+
+
+def _pbkdf2(password, sal, iteraciones):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), sal.encode('utf-8'), iteraciones).hex()
+
+
+def _hashear(password, iteraciones):
+    sal = secrets.token_hex(16)
+    return f"{ALGORITMO}${iteraciones}${sal}${_pbkdf2(password, sal, iteraciones)}"
+
+
+def _verificar(password, almacenado):
+    if not almacenado:
+        return False
+    partes = almacenado.split('$')
+    if len(partes) == 4 and partes[0] == ALGORITMO:
+        _, iteraciones, sal, esperado = partes
+        try:
+            iteraciones = int(iteraciones)
+        except ValueError:
+            return False
+        return hmac.compare_digest(_pbkdf2(password, sal, iteraciones), esperado)
+    if len(partes) == 2:
+        sal, esperado = partes
+        return hmac.compare_digest(_pbkdf2(password, sal, ITERACIONES_ANTERIORES), esperado)
+    return False
+
+
+def _en_pool(funcion, *args):
+    """Ejecuta funcion en el pool y espera el resultado"""
+    global _pool
+    if not _lugares.acquire(timeout=ESPERA_LUGAR):
+        raise PoolSaturado("Demasiados inicios de sesión simultáneos, intenta de nuevo en unos segundos")
+    try:
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = ThreadPoolExecutor(max_workers=TRABAJADORES, thread_name_prefix="qms-hash")
+        return _pool.submit(funcion, *args).result()
+    finally:
+        _lugares.release()
+
+
+def hashear(password, iteraciones=None):
+    """
+    Genera el hash de una contraseña con los parámetros actuales
+
+    Args:
+        password (str): Contraseña en texto plano
+        iteraciones (int, optional): Iteraciones de PBKDF2; por defecto ITERACIONES
+
+    Returns:
+        str: 'pbkdf2_sha256$<iteraciones>$<sal>$<hash>'
+    """
+    return _en_pool(_hashear, password, iteraciones or ITERACIONES)
+
+
+def hashear_lote(passwords, iteraciones=None):
+    """
+    Genera los hashes de varias contraseñas (p. ej. un alta masiva de usuarios)
+
+    Se calculan a lo más TRABAJADORES a la vez, así el lote no acapara los lugares del
+    pool que necesitan los inicios de sesión.
+
+    Returns:
+        list: Hashes en el mismo orden que passwords
+    """
+    if not passwords:
+        return []
+    with ThreadPoolExecutor(max_workers=TRABAJADORES, thread_name_prefix="qms-hash-lote") as lote:
+        return list(lote.map(lambda password: hashear(password, iteraciones), passwords))
+
+
+def verificar(password, almacenado):
+    """
+    Verifica una contraseña contra un hash de cualquiera de los formatos aceptados
+
+    Returns:
+        bool: True si la contraseña coincide
+    """
+    return _en_pool(_verificar, password, almacenado)
+
+
+def necesita_rehash(almacenado):
+    """True si el hash no usa el algoritmo y las iteraciones actuales"""
+    partes = (almacenado or '').split('$')
+    return not (len(partes) == 4 and partes[0] == ALGORITMO and partes[1] == str(ITERACIONES))
@@ -0,0 +1,744 @@
+"""
+Cálculos de las páginas de reportes, separados de los widgets de Streamlit.
+
+Cada función datos_* recibe la base de datos y el rango de fechas y devuelve un
+dict con los DataFrames y valores que la página muestra; las funciones figura_*
+construyen las figuras de Plotly a partir de esos datos y devuelven (figura o None,
+avisos), el formato de figure_cache.obtener_figura. Así se pueden medir sin una
+sesión de Streamlit (benchmarks/bench_reportes.py).
+
+pandas se importa con el módulo: app.py lo importa solo dentro de las páginas de
+reportes.
+"""
+import json
+import re
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Los centroides de los estados vienen de data/mexico_states_index.json
+# (simplificar_geojson.py); aquí solo los lugares que no tienen geometría
+COORDENADAS_SIN_GEOMETRIA = {
+    "extranjero": (21.0, -89.0),
+}
+
+
+GEOJSON_STATE_ALIASES = {
+    "cdmx": "ciudad de mexico",
+    "ciudad de mexico": "ciudad de mexico",
+    "distrito federal": "ciudad de mexico",
+    "coahuila": "coahuila de zaragoza",
+    "coahuila de zaragoza": "coahuila de zaragoza",
+    "estado de mexico": "mexico",
+    "mexico": "mexico",
+    "michoacan": "michoacan",
+    "michoacan de ocampo": "michoacan",
+    "veracruz": "veracruz de ignacio de la llave",
+    "veracruz de ignacio de la llave": "veracruz de ignacio de la llave",
+}
+
+
+def normalizar_estado_nombre(nombre_estado: str) -> str:
+    if not nombre_estado:
+        return ""
+
+    texto = unicodedata.normalize('NFKD', str(nombre_estado))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.strip().lower()
+
+
+def cargar_mapa_estados(nivel="media"):
+    """GeoJSON simplificado del nivel pedido y su índice de estados (ver simplificar_geojson.py)
+
+    Returns:
+        tuple: (geojson, {nombre normalizado: {'id', 'lat', 'lon'}}) o None si no hay GeoJSON
+    """
+    indice_path = Path("data/mexico_states_index.json")
+    if indice_path.exists():
+        indice = json.loads(indice_path.read_text(encoding="utf-8"))
+        info_nivel = indice["niveles"].get(nivel) or indice["niveles"][indice["nivel_por_defecto"]]
+        geojson_path = Path("data") / info_nivel["archivo"]
+        if geojson_path.exists():
+            return json.loads(geojson_path.read_text(encoding="utf-8")), indice["estados"]
+
+    # Sin los archivos generados se usa el GeoJSON original a resolución completa
+    geojson_path = Path("data/mexico_states.geojson")
+    if not geojson_path.exists():
+        return None
+    import simplificar_geojson
+    geojson_data = json.loads(geojson_path.read_text(encoding="utf-8"))
+    return geojson_data, simplificar_geojson.construir_indice(geojson_data)
+
+
+def figura_mapa_estados(df_geografico, mapa_estados):
+    """Construye el mapa de reportes por estado
+
+    Args:
+        df_geografico (DataFrame): Reportes con la columna 'Estado' (datos_geografico)
+        mapa_estados (tuple): (geojson, índice de estados) de cargar_mapa_estados, o None
+
+    Returns:
+        tuple: (figura o None, avisos [(tipo, texto)]) para figure_cache.obtener_figura
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    df_geografico = df_geografico.assign(estado_norm=df_geografico['Estado'].apply(normalizar_estado_nombre))
+    fig = None
+    avisos = []
+
+    estado_label_map = {}
+    for norm, original in zip(df_geografico['estado_norm'], df_geografico['Estado']):
+        if norm and norm not in estado_label_map:
+            estado_label_map[norm] = original
+
+    df_estados_validos = df_geografico[df_geografico['estado_norm'] != '']
+
+    conteo_por_estado = (
+        df_estados_validos
+        .groupby('estado_norm')
+        .size()
+        .reset_index(name='reportes')
+    )
+
+    if conteo_por_estado.empty:
+        return None, [('info', "No hay estados válidos para graficar en el mapa.")]
+    else:
+        conteo_por_estado['Estado'] = conteo_por_estado['estado_norm'].apply(
+            lambda s: estado_label_map.get(s, 'Desconocido')
+        )
+        geojson_data, indice_estados = mapa_estados if mapa_estados else (None, {})
+
+        def _coordenadas(estado_norm):
+            info = indice_estados.get(GEOJSON_STATE_ALIASES.get(estado_norm, estado_norm))
+            if info:
+                return info['lat'], info['lon']
+            return COORDENADAS_SIN_GEOMETRIA.get(estado_norm, (None, None))
+
+        coordenadas = conteo_por_estado['estado_norm'].map(_coordenadas)
+        conteo_por_estado['lat'] = coordenadas.str[0]
+        conteo_por_estado['lon'] = coordenadas.str[1]
+
+        conteo_valido = conteo_por_estado.dropna(subset=['lat', 'lon'])
+
+        render_fallback_scatter = True
+
+        if geojson_data and go is not None:
+            # Índice precalculado: nombre normalizado -> id de la feature
+            geojson_name_map = {norm: info['id'] for norm, info in indice_estados.items()}
+
+            if not geojson_name_map:
+                avisos.append(('warning', "El archivo GeoJSON no contiene estados válidos para graficar."))
+            else:
+                conteo_por_estado = conteo_por_estado.copy()
+                conteo_por_estado['geo_norm'] = conteo_por_estado['estado_norm'].map(
+                    lambda s: GEOJSON_STATE_ALIASES.get(s, s)
+                )
+
+                conteo_por_estado['geo_norm'] = conteo_por_estado['geo_norm'].where(
+                    conteo_por_estado['geo_norm'].isin(geojson_name_map.keys())
+                )
+
+                unmatched_states = (
+                    conteo_por_estado[conteo_por_estado['geo_norm'].isna()][['Estado']]
+                    .drop_duplicates()
+                )
+
+                geo_df = (
+                    pd.DataFrame(
+                        [
+                            {
+                                'geo_norm': norm,
+                                'feature_name': original,
+                            }
+                            for norm, original in geojson_name_map.items()
+                        ]
+                    )
+                    .drop_duplicates(subset='geo_norm')
+                )
+
+                choropleth_df = geo_df.merge(
+                    conteo_por_estado[['geo_norm', 'Estado', 'reportes']],
+                    on='geo_norm',
+                    how='left'
+                )
+                choropleth_df['reportes'] = choropleth_df['reportes'].fillna(0)
+                choropleth_df['Estado'] = choropleth_df['Estado'].fillna(choropleth_df['feature_name'])
+
+                render_fallback_scatter = False
+                fig = go.Figure()
+
+                fig.add_trace(go.Choropleth(
+                    geojson=geojson_data,
+                    featureidkey="properties.state_name",
+                    locations=choropleth_df['feature_name'],
+                    z=choropleth_df['reportes'],
+                    zmin=0,
+                    colorscale=[
+                        [0.0, "#f2f2f2"],   # very low -> light gray
+                        [0.15, "#e0e0e0"],
+                        [0.35, "#c8e6c9"],  # light green tint
+                        [0.6, "#81c784"],   # medium green
+                        [0.8, "#43a047"],   # darker green
+                        [1.0, "#1b5e20"]    # highest -> deep green
+                    ],
+                    colorbar_title="Reportes",
+                    marker_line_color="rgb(120, 120, 120)",
+                    marker_line_width=0.8,
+                    hovertext=[
+                        f"{row.Estado}<br>Reportes: {int(row.reportes)}"
+                        for row in choropleth_df.itertuples()
+                    ],
+                    hoverinfo="text"
+                ))
+
+                if not conteo_valido.empty:
+                    tamaño_base = 12
+                    fig.add_trace(go.Scattergeo(
+                        lat=conteo_valido['lat'],
+                        lon=conteo_valido['lon'],
+                        text=[
+                            f"{row.Estado}<br>Reportes: {row.reportes}"
+                            for row in conteo_valido.itertuples()
+                        ],
+                        hoverinfo="text",
+                        mode="markers",
+                        marker=dict(
+                            size=conteo_valido['reportes'].clip(lower=1) * 2 + tamaño_base,
+                            color="rgba(33, 76, 229, 0.65)",
+                            line=dict(color="rgba(15, 40, 160, 0.8)", width=1.5)
+                        ),
+                        name="Reportes"
+                    ))
+
+                fig.update_geos(
+                    fitbounds="locations",
+                    visible=False,
+                    showcountries=True,
+                    countrycolor="rgb(90, 90, 90)",
+                    showland=True,
+                    landcolor="rgb(235, 235, 235)",
+                    showsubunits=True,
+                    subunitcolor="rgb(150, 150, 150)",
+                    subunitwidth=0.8,
+                    showcoastlines=True,
+                    coastlinecolor="rgb(120, 120, 120)"
+                )
+                fig.update_layout(
+                    margin=dict(l=0, r=0, t=0, b=0),
+                    height=600
+                )
+
+                if not unmatched_states.empty:
+                    avisos.append((
+                        'caption',
+                        "⚠️ Estados sin coincidencia en el GeoJSON: "
+                        + ", ".join(sorted(unmatched_states['Estado'].unique()))
+                    ))
+
+        if render_fallback_scatter:
+            if conteo_valido.empty:
+                avisos.append(('warning', "No se pudieron ubicar coordenadas para los estados reportados."))
+            else:
+                fig = px.scatter_geo(
+                    conteo_valido,
+                    lat='lat',
+                    lon='lon',
+                    size='reportes',
+                    size_max=40,
+                    color='reportes',
+                    hover_name='Estado',
+                    hover_data={'reportes': True, 'lat': False, 'lon': False},
+                    projection='natural earth'
+                )
+
+                fig.update_geos(
+                    scope='north america',
+                    center=dict(lat=23.0, lon=-102.0),
+                    projection_scale=5.0,
+                    showland=True,
+                    landcolor='rgb(235, 235, 235)',
+                    showcountries=True,
+                    countrycolor='rgb(204, 204, 204)',
+                    showsubunits=True,
+                    subunitcolor='rgb(160, 160, 160)',
+                    subunitwidth=1,
+                    showcoastlines=True,
+                    coastlinecolor='rgb(150, 150, 150)'
+                )
+                fig.update_layout(
+                    coloraxis_colorbar=dict(title='Reportes'),
+                    margin=dict(l=0, r=0, t=0, b=0)
+                )
+
+    estados_sin_coordenadas = conteo_por_estado[conteo_por_estado[['lat', 'lon']].isna().any(axis=1)]
+    if not estados_sin_coordenadas.empty:
+        avisos.append((
+            'caption',
+            "⚠️ Estados sin coordenadas mapeadas: "
+            + ", ".join(sorted(estados_sin_coordenadas['Estado'].unique()))
+        ))
+
+    return fig, avisos
+
+
+def figura_reportes_por_zona(zonas_count):
+    """Gráfica de barras de reportes por zona"""
+    import plotly.express as px
+
+    # Crear un DataFrame con los datos
+    df_zonas = zonas_count.reset_index()
+    df_zonas.columns = ['Zona', 'Cantidad']
+
+    # Generar colores únicos para cada barra
+    n_colors = len(df_zonas)
+    colors = px.colors.qualitative.Plotly[:n_colors]
+
+    # Crear el gráfico con colores personalizados
+    fig = px.bar(
+        df_zonas,
+        x='Zona',
+        y='Cantidad',
+        color='Zona',
+        color_discrete_sequence=colors,
+        title='Reportes por Zona'
+    )
+
+    # Mejorar el diseño
+    fig.update_layout(
+        showlegend=False,
+        xaxis_title='Zona',
+        yaxis_title='Cantidad de Reportes',
+        xaxis_tickangle=-45
+    )
+    return fig, []
+
+
+def figura_reportes_por_estado(df_geografico):
+    """Gráfica de barras de los 10 estados con más reportes"""
+    import plotly.express as px
+
+    estados_count = df_geografico['Estado'].value_counts().head(10)  # Tomar solo los 10 primeros
+    if estados_count.empty:
+        return None, [('info', "No hay datos de estados para mostrar")]
+
+    # Crear un DataFrame con los datos
+    df_estados = estados_count.reset_index()
+    df_estados.columns = ['Estado', 'Cantidad']
+
+    # Generar colores únicos para cada barra
+    n_colors = len(df_estados)
+    colors = px.colors.qualitative.Dark24[:n_colors]  # Usar una paleta diferente
+
+    # Crear el gráfico con colores personalizados
+    fig = px.bar(
+        df_estados,
+        x='Estado',
+        y='Cantidad',
+        color='Estado',
+        color_discrete_sequence=colors,
+        title='Top 10 Estados con más Reportes',
+        text='Cantidad'
+    )
+
+    # Mejorar el diseño
+    fig.update_layout(
+        showlegend=False,
+        xaxis_title='Estado',
+        yaxis_title='Cantidad de Reportes',
+        xaxis_tickangle=-45,
+        height=500  # Altura fija para mejor visualización
+    )
+
+    # Mostrar los valores en las barras
+    fig.update_traces(
+        textposition='outside',
+        textfont_size=12
+    )
+    return fig, []
+
+
+def figura_uso_sistemas(sistemas_count):
+    """Gráfica de barras de reportes por sistema"""
+    import plotly.express as px
+
+    # Crear gráfico de barras
+    fig1 = px.bar(
+        sistemas_count,
+        x='Sistema',
+        y='Reportes',
+        color='Sistema',
+        title='Reportes por Sistema',
+        labels={'Reportes': 'Número de Reportes', 'Sistema': 'Sistema'},
+        text='Reportes',
+        color_discrete_sequence=px.colors.qualitative.Plotly
+    )
+
+    # Mejorar el diseño del gráfico
+    fig1.update_traces(
+        textposition='outside',
+        marker_line_color='rgb(8,48,107)',
+        marker_line_width=1.5,
+        opacity=0.8
+    )
+
+    fig1.update_layout(
+        showlegend=False,
+        xaxis_tickangle=-45,
+        margin=dict(l=0, r=0, t=40, b=60),
+        height=400
+    )
+
+    return fig1, []
+
+
+def figura_senal_sistemas(senal_por_sistema):
+    """Gráfica de barras del promedio de señal por sistema"""
+    import plotly.express as px
+
+    # Crear gráfico de barras para la señal
+    fig2 = px.bar(
+        senal_por_sistema,
+        x='Sistema',
+        y='Promedio Señal',
+        color='Sistema',
+        title='Promedio de Calidad de Señal',
+        labels={'Promedio Señal': 'Señal Promedio (0-10)', 'Sistema': 'Sistema'},
+        text_auto='.1f',
+        color_discrete_sequence=px.colors.qualitative.Pastel1
+    )
+
+    # Mejorar el diseño del gráfico
+    fig2.update_traces(
+        textposition='outside',
+        marker_line_color='rgb(8,48,107)',
+        marker_line_width=1.5,
+        opacity=0.8
+    )
+
+    fig2.update_layout(
+        showlegend=False,
+        xaxis_tickangle=-45,
+        yaxis_range=[0, 10],  # Asumiendo que la señal va de 0 a 10
+        margin=dict(l=0, r=0, t=40, b=60),
+        height=400
+    )
+
+    return fig2, []
+
+
+def _fecha_str(fecha):
+    return fecha.strftime('%Y-%m-%d')
+
+
+def _parse_fecha(valor):
+    """Convierte una fecha de la BD en cualquiera de los formatos usados, o None"""
+    if not valor:
+        return None
+
+    valor = str(valor).strip()
+
+    formatos = [
+        '%d/%m/%Y %H:%M:%S',
+        '%d/%m/%Y',
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d',
+    ]
+
+    for fmt in formatos:
+        try:
+            return datetime.strptime(valor, fmt)
+        except ValueError:
+            continue
+
+    return None
+
+
+def _parse_fechas(valores):
+    """_parse_fecha sobre una columna: el formato de la BD en bloque y los demás uno por uno"""
+    fechas = pd.to_datetime(valores, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    faltantes = fechas.isna() & valores.astype(bool)
+    if faltantes.any():
+        fechas = fechas.astype(object)
+        fechas[faltantes] = valores[faltantes].map(_parse_fecha)
+        fechas = pd.to_datetime(fechas)
+    return fechas
+
+
+def datos_actividad_general(db, fecha_inicio, fecha_fin):
+    """
+    Actividad diaria de un periodo
+
+    Returns:
+        dict: num_reportes, estadisticas, actividad_por_fecha (DataFrame Dia/Reportes o
+        None), resumen_sistemas (Series o None), dia_mas_activo y dia_menos_activo
+        ((etiqueta, delta) para st.metric)
+    """
+    reportes, estadisticas = db.get_reportes_por_fecha_rango(_fecha_str(fecha_inicio), _fecha_str(fecha_fin))
+    datos = {
+        'num_reportes': len(reportes),
+        'estadisticas': estadisticas,
+        'actividad_por_fecha': None,
+        'resumen_sistemas': None,
+        'dia_mas_activo': ("Sin datos", None),
+        'dia_menos_activo': ("Sin datos", None),
+    }
+    if not reportes:
+        return datos
+
+    df_actividad = pd.DataFrame([{
+        'Fecha': r.get('fecha_reporte', ''),
+        'Indicativo': r.get('indicativo', ''),
+        'Sistema': r.get('sistema', ''),
+        'Zona': r.get('zona', ''),
+        'Estado': r.get('estado', '')
+    } for r in reportes])
+
+    df_actividad['Fecha'] = _parse_fechas(df_actividad['Fecha'].fillna(''))
+    df_actividad = df_actividad.dropna(subset=['Fecha'])
+    df_actividad['Dia'] = df_actividad['Fecha'].dt.strftime('%Y-%m-%d')
+
+    # Agrupar por día usando fecha_reporte
+    actividad_por_fecha = (
+        df_actividad
+        .groupby('Dia')
+        .size()
+        .reset_index(name='Reportes')
+        .sort_values('Dia')
+    )
+
+    if not actividad_por_fecha.empty:
+        dia_mas_activo = actividad_por_fecha.loc[actividad_por_fecha['Reportes'].idxmax()]
+        datos['dia_mas_activo'] = (dia_mas_activo['Dia'], f"{int(dia_mas_activo['Reportes'])} reportes")
+
+        dia_menos_activo = actividad_por_fecha.loc[actividad_por_fecha['Reportes'].idxmin()]
+        datos['dia_menos_activo'] = (dia_menos_activo['Dia'], f"{int(dia_menos_activo['Reportes'])} reportes")
+
+    datos['actividad_por_fecha'] = actividad_por_fecha
+    datos['resumen_sistemas'] = df_actividad['Sistema'].value_counts()
+    return datos
+
+
+# Mapeo de nombres alternativos de estados
+MAPEO_ESTADOS = {
+    'México': 'Estado de México',
+    'MEXICO': 'Estado de México',
+    'MEX': 'Estado de México',
+    'mexico': 'Estado de México',
+    'mex': 'Estado de México'
+}
+
+
+# Zonas en el orden de la distribución detallada
+ZONAS_ORDEN = ['XE1', 'XE2', 'XE3', 'EXT']
+
+
+def datos_geografico(db, fecha_inicio, fecha_fin):
+    """
+    Reportes por estado y zona de un periodo
+
+    Returns:
+        dict: num_reportes, estadisticas y, si hay reportes: df_geografico (un reporte
+        por fila, con el estado estandarizado y su zona), estados_sin_zona,
+        registros_problematicos, zonas_count, por_zona (lista de (zona, título, total,
+        conteo por estado o None)) y df_top_zonas
+    """
+    reportes, estadisticas = db.get_reportes_por_fecha_rango(_fecha_str(fecha_inicio), _fecha_str(fecha_fin))
+    datos = {'num_reportes': len(reportes), 'estadisticas': estadisticas}
+    if not reportes:
+        return datos
+
+    df_geografico = pd.DataFrame([{
+        'Indicativo': r.get('indicativo', ''),
+        'Estado': r.get('estado', ''),
+        'Ciudad': r.get('ciudad', ''),
+        'Zona': r.get('zona', ''),
+        'Sistema': r.get('sistema', '')
+    } for r in reportes])
+
+    # Estandarizar los nombres de los estados antes de cualquier procesamiento
+    df_geografico['Estado'] = df_geografico['Estado'].fillna('Desconocido').str.strip().replace(MAPEO_ESTADOS)
+
+    # Obtener el mapeo de estados a zonas desde la base de datos
+    estados_zonas = db.get_estados_zonas()
+
+    # Estados que no tienen zona asignada (se muestran para depuración)
+    estados_unicos = df_geografico['Estado'].unique()
+    estados_sin_zona = [e for e in estados_unicos if e not in estados_zonas and pd.notna(e) and e != '']
+
+    # Agregar la zona a cada reporte basado en el estado
+    df_geografico['Zona'] = df_geografico['Estado'].map(estados_zonas).fillna('DESCONOCIDA')
+
+    # Calcular conteo de zonas para la sección de zonas más activas
+    zonas_count = df_geografico['Zona'].value_counts()
+
+    por_zona = []
+    for zona in ZONAS_ORDEN:
+        if zona == 'EXT':
+            # Para EXT, incluir también 'Extranjero' si existe
+            total = int(df_geografico['Zona'].isin(['EXT', 'Extranjero']).sum())
+            por_zona.append((zona, 'Zona Extranjera', total, None))
+            continue
+        total = int((df_geografico['Zona'] == zona).sum())
+        # Solo los estados que pertenecen a esta zona según la tabla qth
+        estados_en_zona = [estado for estado, z in estados_zonas.items() if z == zona]
+        df_zona_filtrado = df_geografico[df_geografico['Estado'].isin(estados_en_zona)]
+        conteo_estados = df_zona_filtrado['Estado'].value_counts() if not df_zona_filtrado.empty else None
+        por_zona.append((zona, f'Zona {zona}', total, conteo_estados))
+
+    top_zonas = zonas_count.head(5)
+    df_top_zonas = pd.DataFrame({
+        'Zona': top_zonas.index,
+        'Reportes': top_zonas.values,
+        'Porcentaje': (top_zonas.values / len(df_geografico) * 100).round(1).astype(str) + '%'
+    })
+
+    datos.update({
+        'df_geografico': df_geografico,
+        'estados_sin_zona': estados_sin_zona,
+        'registros_problematicos': df_geografico[df_geografico['Estado'].isin(estados_sin_zona)],
+        'zonas_count': zonas_count,
+        'por_zona': por_zona,
+        'df_top_zonas': df_top_zonas,
+    })
+    return datos
+
+
+# Los reportes de HF guardan "Frecuencia: ..., Modo: ..., Potencia: ..." en observaciones
+_RE_MODO_HF = re.compile(r'Modo:\s*([^,]*)')
+_RE_POTENCIA_HF = re.compile(r'Potencia:\s*(.*)$')
+
+
+def datos_sistemas(db, fecha_inicio, fecha_fin):
+    """
+    Uso de sistemas y calidad de señal de un periodo
+
+    Returns:
+        dict: num_reportes, estadisticas y, si hay reportes: sistemas_count (Sistema,
+        Reportes, Porcentaje), senal_por_sistema (Sistema, Promedio Señal, Muestras),
+        hay_hf, modos_hf y potencias_hf (Series, vacías si no hay datos)
+    """
+    reportes, estadisticas = db.get_reportes_por_fecha_rango(_fecha_str(fecha_inicio), _fecha_str(fecha_fin))
+    datos = {'num_reportes': len(reportes), 'estadisticas': estadisticas}
+    if not reportes:
+        return datos
+
+    df_sistemas = pd.DataFrame([{
+        'Indicativo': r.get('indicativo', ''),
+        'Sistema': r.get('sistema', ''),
+        'Zona': r.get('zona', ''),
+        'Estado': r.get('estado', ''),
+        'Señal': r.get('senal', 0),
+        'Observaciones': r.get('observaciones') or ''
+    } for r in reportes])
+
+    sistemas_count = df_sistemas['Sistema'].value_counts().reset_index()
+    sistemas_count.columns = ['Sistema', 'Reportes']
+
+    # Calcular porcentajes
+    total = sistemas_count['Reportes'].sum()
+    sistemas_count['Porcentaje'] = (sistemas_count['Reportes'] / total * 100).round(1).astype(str) + '%'
+
+    # Ordenar por cantidad de reportes
+    sistemas_count = sistemas_count.sort_values('Reportes', ascending=False)
+
+    # Calcular promedio de señal por sistema
+    senal_por_sistema = df_sistemas.groupby('Sistema')['Señal'].agg(['mean', 'count']).reset_index()
+    senal_por_sistema.columns = ['Sistema', 'Promedio Señal', 'Muestras']
+    senal_por_sistema = senal_por_sistema.sort_values('Promedio Señal', ascending=False)
+
+    df_hf = df_sistemas[df_sistemas['Sistema'] == 'HF']
+    modos_hf = df_hf['Observaciones'].str.extract(_RE_MODO_HF, expand=False).str.strip()
+    potencias_hf = df_hf['Observaciones'].str.extract(_RE_POTENCIA_HF, expand=False).str.strip()
+
+    datos.update({
+        'sistemas_count': sistemas_count,
+        'senal_por_sistema': senal_por_sistema,
+        'hay_hf': not df_hf.empty,
+        'modos_hf': modos_hf[modos_hf.astype(bool) & modos_hf.notna()].value_counts(),
+        'potencias_hf': potencias_hf[potencias_hf.astype(bool) & potencias_hf.notna()].value_counts(),
+    })
+    return datos
+
+
+def datos_tendencias(db, fecha_inicio, fecha_fin):
+    """
+    Tendencia semanal y estaciones más activas de un periodo
+
+    Returns:
+        dict: num_reportes, estadisticas y, si hay reportes: tendencia_semanal (Semana,
+        Reportes), crecimiento_promedio y crecimiento_total (porcentajes, None con una
+        sola semana) y top_estaciones (Series de las 10 más activas)
+    """
+    reportes, estadisticas = db.get_reportes_por_fecha_rango(_fecha_str(fecha_inicio), _fecha_str(fecha_fin))
+    datos = {'num_reportes': len(reportes), 'estadisticas': estadisticas}
+    if not reportes:
+        return datos
+
+    df_tendencias = pd.DataFrame([{
+        'Fecha': r.get('fecha_reporte', ''),
+        'Indicativo': r.get('indicativo', ''),
+        'Sistema': r.get('sistema', ''),
+        'Zona': r.get('zona', '')
+    } for r in reportes])
+
+    # Las fechas vienen de la BD en formato datetime completo, no dd/mm/yyyy
+    df_tendencias['Fecha'] = _parse_fechas(df_tendencias['Fecha'].fillna(''))
+    df_tendencias = df_tendencias.dropna(subset=['Fecha'])
+
+    # Agrupar por semana
+    df_tendencias['Semana'] = df_tendencias['Fecha'].dt.to_period('W').astype(str)
+    tendencia_semanal = df_tendencias.groupby('Semana').size().reset_index(name='Reportes')
+
+    crecimiento_promedio = crecimiento_total = None
+    if len(tendencia_semanal) > 1:
+        crecimiento_promedio = (tendencia_semanal['Reportes'].pct_change() * 100).mean()
+        crecimiento_total = (tendencia_semanal['Reportes'].iloc[-1] / tendencia_semanal['Reportes'].iloc[0] - 1) * 100
+
+    datos.update({
+        'tendencia_semanal': tendencia_semanal,
+        'crecimiento_promedio': crecimiento_promedio,
+        'crecimiento_total': crecimiento_total,
+        'top_estaciones': df_tendencias['Indicativo'].value_counts().head(10),
+    })
+    return datos
+
+
+def datos_comparativos(db, p1_inicio, p1_fin, p2_inicio, p2_fin):
+    """
+    Comparación de dos periodos
+
+    Returns:
+        dict o None (si alguno de los periodos no tiene reportes): totales y estaciones
+        únicas de cada periodo, sus variaciones (%), df_comparativo (reportes por
+        sistema en cada periodo), nuevas y perdidas (conjuntos de indicativos)
+    """
+    p1_reportes, p1_estadisticas = db.get_reportes_por_fecha_rango(_fecha_str(p1_inicio), _fecha_str(p1_fin))
+    p2_reportes, p2_estadisticas = db.get_reportes_por_fecha_rango(_fecha_str(p2_inicio), _fecha_str(p2_fin))
+    if not (p1_reportes and p2_reportes):
+        return None
+
+    p1_total = p1_estadisticas.get('total_reportes', 0)
+    p2_total = p2_estadisticas.get('total_reportes', 0)
+    p1_estaciones = p1_estadisticas.get('estaciones_unicas', 0)
+    p2_estaciones = p2_estadisticas.get('estaciones_unicas', 0)
+
+    p1_sistemas = pd.Series([r.get('sistema', '') for r in p1_reportes]).value_counts()
+    p2_sistemas = pd.Series([r.get('sistema', '') for r in p2_reportes]).value_counts()
+
+    estaciones_p1 = {r.get('indicativo', '') for r in p1_reportes}
+    estaciones_p2 = {r.get('indicativo', '') for r in p2_reportes}
+
+    return {
+        'p1_total': p1_total,
+        'p2_total': p2_total,
+        'p1_estaciones': p1_estaciones,
+        'p2_estaciones': p2_estaciones,
+        'variacion_reportes': ((p2_total - p1_total) / max(p1_total, 1)) * 100,
+        'variacion_estaciones': ((p2_estaciones - p1_estaciones) / max(p1_estaciones, 1)) * 100,
+        'df_comparativo': pd.DataFrame({'Período 1': p1_sistemas, 'Período 2': p2_sistemas}).fillna(0),
+        'nuevas': estaciones_p2 - estaciones_p1,
+        'perdidas': estaciones_p1 - estaciones_p2,
+    }
@@ -0,0 +1,439 @@
+"""
+Generación en segundo plano del PDF del reporte por evento.
+
+El PDF se arma en un pool de procesos (no bloquea el script de Streamlit ni el GIL
+de las demás sesiones) a partir de datos simples (dict/listas), y el resultado se
+guarda en una caché LRU del proceso con clave (evento, fecha, versión de datos,
+usuario). Solicitar el mismo PDF otra vez devuelve el trabajo existente o el
+archivo ya generado.
+"""
+import io
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+# Filas de la tabla de actividad por bloque: tablas enormes hacen que ReportLab
+# vuelva a dividir el resto de la tabla en cada página
+FILAS_POR_BLOQUE = 200
+
+MAX_PDFS_EN_CACHE = 32
+
+_lock = threading.Lock()
+_executor = None
+_cache = OrderedDict()
+_trabajos = {}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn: el proceso de Streamlit tiene hilos; no es seguro hacer fork de él
+        _executor = ProcessPoolExecutor(
+            max_workers=int(os.environ.get('QMS_PDF_WORKERS', '2')),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def solicitar_pdf_evento(clave, datos):
+    """
+    Solicita el PDF de un evento y devuelve su trabajo
+
+    Args:
+        clave (tuple): (evento, fecha, versión de datos, usuario)
+        datos (dict): Datos del reporte (ver construir_pdf_evento)
+
+    Returns:
+        Future: Se resuelve con los bytes del PDF (ya resuelto si estaba en caché)
+    """
+    with _lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            future = Future()
+            future.set_result(_cache[clave])
+            return future
+
+        future = _trabajos.get(clave)
+        # Un trabajo fallido se conserva para mostrar el error; pedirlo de nuevo lo reintenta
+        if future is None or (future.done() and future.exception() is not None):
+            future = _get_executor().submit(construir_pdf_evento, datos)
+            _trabajos[clave] = future
+            future.add_done_callback(lambda f: _guardar_resultado(clave, f))
+        return future
+
+
+def obtener_trabajo(clave):
+    """Devuelve el trabajo en curso o terminado para una clave, o None si no existe"""
+    with _lock:
+        if clave in _cache:
+            future = Future()
+            future.set_result(_cache[clave])
+            return future
+        return _trabajos.get(clave)
+
+
+def _guardar_resultado(clave, future):
+    with _lock:
+        if future.cancelled() or future.exception() is not None:
+            return
+        if _trabajos.get(clave) is future:
+            del _trabajos[clave]
+        _cache[clave] = future.result()
+        _cache.move_to_end(clave)
+        while len(_cache) > MAX_PDFS_EN_CACHE:
+            _cache.popitem(last=False)
+
+
+def _mas_frecuentes(valores):
+    """Cuenta valores no nulos: [(valor, cantidad)] de mayor a menor, empates en orden de aparición"""
+    return Counter(v for v in valores if v is not None).most_common()
+
+
+def datos_evento(evento, fecha, reportes, generado_por, fecha_generacion=None):
+    """
+    Calcula las estadísticas del reporte por evento a partir de sus reportes
+
+    Lo usan la página de reportes por evento y el generador por lotes, así ambos
+    producen los mismos números sin depender de pandas.
+
+    Args:
+        evento (str): Tipo de reporte del evento
+        fecha (str): Fecha del evento 'YYYY-MM-DD'
+        reportes (list): Reportes del evento (dicts de la tabla reportes)
+        generado_por (str): Texto "indicativo - nombre" de quien genera el reporte
+        fecha_generacion (str, optional): Por defecto, la hora actual
+
+    Returns:
+        dict: Datos listos para construir_pdf_evento
+    """
+    from datetime import datetime
+
+    total = len(reportes)
+    zonas = _mas_frecuentes(r.get('zona', '') for r in reportes)
+    sistemas = _mas_frecuentes(r.get('sistema', '') for r in reportes)
+    estados = _mas_frecuentes(r.get('estado', '') for r in reportes)
+
+    def moda(conteo):
+        # Igual que Series.mode(): entre empates, el menor valor
+        if not conteo:
+            return "N/A"
+        maximo = conteo[0][1]
+        return str(min(valor for valor, cantidad in conteo if cantidad == maximo))
+
+    return {
+        'evento': evento,
+        'fecha': fecha,
+        'generado_por': generado_por,
+        'fecha_generacion': fecha_generacion or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_reportes': total,
+        'estaciones_unicas': len({r.get('indicativo', '') for r in reportes} - {None}),
+        'zona_mas_reportada': moda(zonas),
+        'sistema_mas_usado': moda(sistemas),
+        'estados_cubiertos': len(estados),
+        'zonas': [(zona, cantidad, round(cantidad / total * 100, 1)) for zona, cantidad in zonas],
+        'sistemas': [(sistema, cantidad, round(cantidad / total * 100, 1)) for sistema, cantidad in sistemas],
+        'top_estados': [(str(estado), cantidad) for estado, cantidad in estados[:3]],
+        'reportes': [
+            (r.get('indicativo', ''), r.get('estado', ''), r.get('ciudad', ''), r.get('zona', ''),
+             r.get('sistema', ''), r.get('frecuencia', ''), r.get('modo', ''))
+            for r in reportes
+        ]
+    }
+
+
+def construir_pdf_evento(datos):
+    """
+    Construye el PDF del reporte por evento
+
+    Args:
+        datos (dict): evento, fecha ('YYYY-MM-DD'), generado_por, fecha_generacion,
+            total_reportes, estaciones_unicas, zona_mas_reportada, sistema_mas_usado,
+            estados_cubiertos, zonas [(zona, cantidad, porcentaje)],
+            sistemas [(sistema, cantidad, porcentaje)], top_estados [(estado, cantidad)]
+            y reportes [(indicativo, estado, ciudad, zona, sistema, frecuencia, modo)]
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    from datetime import datetime
+    from functools import partial
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.platypus import (BaseDocTemplate, Frame, PageTemplate, NextPageTemplate, Table, TableStyle,
+                                    Paragraph, Spacer, PageBreak, Image, HRFlowable)
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_CENTER
+
+    buffer = io.BytesIO()
+    directorio = os.path.dirname(os.path.abspath(__file__))
+
+    # Encabezado compacto en cada página: Evento | Fecha | Página, con logo pequeño
+    def create_header(canvas, doc, pagesize):
+        canvas.saveState()
+
+        logo_size = 0.2 * inch  # Logo muy pequeño
+        ancho, alto = pagesize
+
+        canvas.setFont('Helvetica', 4)
+        canvas.setFillColor(colors.HexColor('#333333'))
+
+        fecha_formateada = datetime.strptime(datos['fecha'], '%Y-%m-%d').strftime('%d/%m/%y')
+        # Acortar el nombre del evento a 15 caracteres máximo
+        evento = (datos['evento'][:12] + '...') if len(datos['evento']) > 15 else datos['evento']
+        header_text = f"{evento} | {fecha_formateada} | {canvas.getPageNumber()}"
+
+        text_x = doc.leftMargin
+        text_y = alto - 0.15 * inch  # Muy pegado al borde superior
+
+        logo_path = os.path.join(directorio, 'assets', 'LogoFMRE_small.png')
+        if os.path.exists(logo_path):
+            logo = Image(logo_path, width=logo_size, height=logo_size)
+            logo.drawOn(canvas, ancho - doc.rightMargin - logo_size, alto - logo_size)
+
+        canvas.drawString(text_x, text_y, header_text)
+
+        # Línea divisoria muy fina
+        line_y = text_y - 0.1 * inch
+        canvas.setStrokeColor(colors.HexColor('#CCCCCC'))
+        canvas.setLineWidth(0.1)
+        canvas.line(doc.leftMargin, line_y, ancho - doc.rightMargin, line_y)
+
+        canvas.restoreState()
+
+    doc = BaseDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=72,
+        leftMargin=72,
+        topMargin=36,  # Espacio para el encabezado
+        bottomMargin=36
+    )
+    horizontal = landscape(letter)
+    doc.addPageTemplates([
+        PageTemplate(
+            id='Portrait',
+            frames=[Frame(doc.leftMargin, doc.bottomMargin, letter[0] - 144, letter[1] - 72, id='portrait')],
+            onPage=partial(create_header, pagesize=letter),
+            pagesize=letter
+        ),
+        PageTemplate(
+            id='Landscape',
+            frames=[Frame(doc.leftMargin, doc.bottomMargin, horizontal[0] - 144, horizontal[1] - 72, id='landscape')],
+            onPage=partial(create_header, pagesize=horizontal),
+            pagesize=horizontal
+        ),
+    ])
+
+    # Estilos personalizados
+    styles = getSampleStyleSheet()
+
+    # Estilo para información general (más compacto)
+    info_style = ParagraphStyle(
+        'InfoStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=4,
+        textColor=colors.HexColor('#333333'),
+        alignment=1,  # Centrado
+        leading=12    # Interlineado reducido
+    )
+
+    # Estilo para secciones con formato de oración
+    section_style = ParagraphStyle(
+        'SectionStyle',
+        parent=styles['Normal'],
+        fontSize=12,
+        fontName='Helvetica-Bold',
+        spaceBefore=0,
+        spaceAfter=0,   # Controlamos el espacio con Spacer
+        leading=12,     # Mismo que el tamaño de fuente
+        textColor=colors.HexColor('#1f4e79'),
+        leftIndent=0,
+        rightIndent=0,
+        textTransform='none'  # Asegura que no se aplique mayúsculas
+    )
+
+    # Estilo de párrafo para el encabezado
+    header_style = ParagraphStyle(
+        'HeaderStyle',
+        fontName='Helvetica-Bold',
+        fontSize=11,
+        leading=13,
+        spaceBefore=0,
+        spaceAfter=0,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor('#006400'),
+        leftIndent=0,
+        rightIndent=0
+    )
+
+    footer_style = ParagraphStyle(
+        'FooterStyle',
+        parent=info_style,
+        alignment=TA_CENTER,
+        spaceAfter=0,
+        spaceBefore=0
+    )
+
+    def estilo_tabla(color_encabezado, color_fondo, color_texto, color_rejilla, tamano_filas=8, padding_filas=3):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(color_encabezado)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+            ('TOPPADDING', (0, 0), (-1, 0), 4),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor(color_fondo)),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor(color_texto)),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), tamano_filas),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor(color_rejilla)),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), padding_filas)
+        ])
+
+    story = [NextPageTemplate('Portrait')]
+
+    # Encabezado compacto con logo y título
+    logo_path = os.path.join(directorio, 'assets', 'LogoFMRE_medium.png')
+    if os.path.exists(logo_path):
+        header_table = Table(
+            [[
+                Image(logo_path, width=0.8 * inch, height=0.8 * inch, kind='proportional'),
+                Paragraph("FEDERACIÓN MEXICANA DE RADIOEXPERIMENTADORES", header_style)
+            ]],
+            colWidths=[1.0 * inch, 5 * inch],
+            rowHeights=[0.7 * inch]
+        )
+        header_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('LEFTPADDING', (0, 0), (-1, -1), 4),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+            ('TEXTCOLOR', (1, 0), (1, 0), colors.HexColor('#2c3e50')),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            # Borde sutil alrededor del encabezado
+            ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#DDDDDD')),
+            # Línea vertical entre el logo y el texto
+            ('LINEAFTER', (0, 0), (0, 0), 0.5, colors.HexColor('#DDDDDD')),
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#F8F9FA'))
+        ]))
+        story.extend([Spacer(1, 6), header_table, Spacer(1, 6)])
+    else:
+        # Si no hay logo, solo el título centrado
+        story.append(Paragraph("FEDERACIÓN MEXICANA DE RADIOEXPERIMENTADORES",
+                               style=ParagraphStyle('HeaderNoLogo', fontName='Helvetica-Bold', fontSize=8,
+                                                    alignment=TA_CENTER, spaceAfter=2)))
+        story.append(Spacer(1, 2))
+
+    # Información del evento
+    story.append(Paragraph(f"<b>Evento:</b> {datos['evento']}", info_style))
+    story.append(Paragraph(f"<b>Fecha del Evento:</b> {datos['fecha']}", info_style))
+    story.append(Paragraph(f"<b>Fecha de Generación:</b> {datos['fecha_generacion']}", info_style))
+    story.append(Paragraph(f"<b>Generado por:</b> {datos['generado_por']}", info_style))
+    story.append(Spacer(1, 2))
+    story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#CCCCCC')))
+
+    # Estadísticas principales
+    story.append(Paragraph("Estadísticas del evento", section_style))
+    story.append(Spacer(1, 8))
+    stats_table = Table([
+        ['Métrica', 'Valor', 'Detalles'],
+        ['Total de Reportes', str(datos['total_reportes']), f"Participantes activos: {datos['total_reportes']}"],
+        ['Estaciones Únicas', str(datos['estaciones_unicas']), "Diferentes estaciones que reportaron"],
+        ['Zona Más Reportada', datos['zona_mas_reportada'], "Concentración geográfica principal"],
+        ['Sistema Más Usado', datos['sistema_mas_usado'], "Tecnología de radio predominante"],
+        ['Cobertura Geográfica', f"{datos['estados_cubiertos']} estados", "Alcance territorial del evento"]
+    ])
+    stats_table.setStyle(estilo_tabla('#1f4e79', '#f8f9fa', '#333333', '#dee2e6'))
+    story.extend([stats_table, Spacer(1, 25)])
+
+    # Distribución por zona
+    story.append(Paragraph("Distribución por zona geográfica", section_style))
+    story.append(Spacer(1, 8))
+    zonas_data = [['Zona', 'Cantidad', 'Porcentaje', 'Participación']]
+    for zona, cantidad, porcentaje in datos['zonas']:
+        zonas_data.append([str(zona), str(int(cantidad)), f"{porcentaje:.1f}%", "●" * min(int(cantidad), 10)])
+    zonas_table = Table(zonas_data)
+    zonas_table.setStyle(estilo_tabla('#2c5f2d', '#f0f8f0', '#2c5f2d', '#90EE90'))
+    story.extend([zonas_table, Spacer(1, 20)])
+
+    # Principales estados participantes (los 3 con más reportes)
+    story.append(Paragraph("Principales estados participantes", section_style))
+    story.append(Spacer(1, 8))
+    estados_data = [['Estado', 'Reportes', 'Porcentaje', 'Participación']]
+    for estado, cantidad in datos['top_estados']:
+        if estado and estado.strip():
+            porcentaje = cantidad / datos['total_reportes'] * 100
+            estados_data.append([str(estado), str(int(cantidad)), f"{porcentaje:.1f}%", "●" * min(int(cantidad), 12)])
+    if len(estados_data) > 1:
+        estados_table = Table(estados_data)
+        estados_table.setStyle(estilo_tabla('#DC143C', '#FFF0F0', '#DC143C', '#FFB6C1', tamano_filas=9, padding_filas=4))
+        story.extend([estados_table, Spacer(1, 20)])
+
+    # Distribución por sistema
+    story.append(Paragraph("Distribución por sistema de radio", section_style))
+    story.append(Spacer(1, 8))
+    sistemas_data = [['Sistema', 'Cantidad', 'Porcentaje', 'Uso']]
+    for sistema, cantidad, porcentaje in datos['sistemas']:
+        sistemas_data.append([str(sistema), str(int(cantidad)), f"{porcentaje:.1f}%", "●" * min(int(cantidad), 8)])
+    sistemas_table = Table(sistemas_data)
+    sistemas_table.setStyle(estilo_tabla('#8B4513', '#FFF8DC', '#8B4513', '#DEB887', tamano_filas=9, padding_filas=4))
+    story.append(sistemas_table)
+
+    # Pie de página
+    story.append(Spacer(1, 30))
+    line_table = Table([[None]], colWidths=[letter[0] - doc.leftMargin - doc.rightMargin])
+    line_table.setStyle(TableStyle([
+        ('LINEBELOW', (0, 0), (0, 0), 0.5, colors.HexColor('#CCCCCC')),
+        ('BOTTOMPADDING', (0, 0), (0, 0), 10)
+    ]))
+    story.extend([line_table, Spacer(1, 5)])
+    story.append(Paragraph("Federación Mexicana de Radioexperimentadores, A.C.", footer_style))
+    story.append(Paragraph("Reporte generado automáticamente por el Sistema QMS", footer_style))
+    story.append(Paragraph(f"© {datos['fecha_generacion'][:4]} FMRE - Todos los derechos reservados", footer_style))
+
+    # Reporte de actividad en páginas horizontales, por bloques de filas
+    story.append(NextPageTemplate('Landscape'))
+    story.append(PageBreak())
+    story.append(Paragraph("Reporte de Actividad", section_style))
+    story.append(Spacer(1, 12))
+
+    encabezado = ['Indicativo', 'Estado', 'Ciudad', 'Zona', 'Sistema', 'Frecuencia', 'Modo']
+    anchos = [1.5 * inch, 1.5 * inch, 1.5 * inch, 0.8 * inch, 1.2 * inch, 0.8 * inch, 0.8 * inch]
+    estilo_actividad = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#333333')),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 7),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6')),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 3)
+    ])
+    reportes = datos['reportes']
+    for inicio in range(0, len(reportes), FILAS_POR_BLOQUE):
+        bloque = [['' if v is None else str(v) for v in fila] for fila in reportes[inicio:inicio + FILAS_POR_BLOQUE]]
+        tabla = Table([encabezado] + bloque, colWidths=anchos, repeatRows=1)
+        tabla.setStyle(estilo_actividad)
+        story.append(tabla)
+
+    story.append(Spacer(1, 10))
+    story.append(HRFlowable(width="100%", thickness=0.5, color=colors.HexColor('#CCCCCC')))
+    story.append(Spacer(1, 5))
+    story.append(Paragraph("Federación Mexicana de Radioexperimentadores, A.C. - Reporte de Actividad", footer_style))
+
+    doc.build(story)
+    return buffer.getvalue()
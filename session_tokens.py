@@ -0,0 +1,174 @@
+"""
+Tokens de sesión firmados (JWT HS256 con python-jose).
+
+Al iniciar sesión, AuthManager guarda un token en la cookie NOMBRE_COOKIE (nunca en
+la URL, que queda en historiales, bitácoras del servidor y el encabezado Referer). Si
+la conexión se pierde o se abre otra pestaña, la sesión se recupera con la cookie
+(st.context.cookies): se verifica la firma y se lee al usuario (sigue activo, su rol
+actual y que sus sesiones no se hayan revocado, users.sesiones_desde), sin
+verify_user y sin escribir last_login.
+
+Streamlit no puede enviar encabezados Set-Cookie desde la página, así que la cookie
+la escribe el navegador (AuthManager.escribir_cookie) y no puede ser HttpOnly; se
+limita con SameSite=Strict, Secure bajo HTTPS y la ruta de la aplicación.
+
+Cada token lleva:
+  - auth: el momento del inicio de sesión con contraseña; se conserva al renovar y es
+    el que se compara con users.sesiones_desde.
+  - exp: QMS_SESION_MINUTOS (30) minutos; al acercarse se emite un token nuevo.
+  - rexp: QMS_SESION_RENOVACION_HORAS (12) horas desde el inicio de sesión; tampoco
+    cambia al renovar, así que es el límite para volver a escribir la contraseña.
+
+Una sesión abierta vuelve a leer al usuario cada QMS_SESION_REVISION_SEGUNDOS (60),
+así cerrar sesión (o cambiar la contraseña) la termina también en los demás workers.
+
+La clave de firma se toma de QMS_SESSION_SECRET o, si no está definida, de un archivo
+(QMS_SESION_CLAVE_ARCHIVO, .qms_session_key) que se crea la primera vez, así todos
+los workers del servidor comparten la misma clave.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from jose import JWTError, jwt
+
+ALGORITMO = 'HS256'
+NOMBRE_COOKIE = 'qms_sesion'
+# Parámetro de la URL donde se guardaba el token; solo se borra, ya no se acepta
+PARAMETRO_URL_ANTERIOR = 'sesion'
+DURACION = int(float(os.environ.get('QMS_SESION_MINUTOS', '30')) * 60)
+DURACION_RENOVACION = int(float(os.environ.get('QMS_SESION_RENOVACION_HORAS', '12')) * 3600)
+REVISION = float(os.environ.get('QMS_SESION_REVISION_SEGUNDOS', '60'))
+RUTA_CLAVE = os.environ.get('QMS_SESION_CLAVE_ARCHIVO', '.qms_session_key')
+
+# Tokens ya verificados (firma correcta), para no volver a decodificarlos en cada rerun
+MAX_VERIFICADOS = 1024
+
+_lock = threading.Lock()
+_clave = None
+_verificados = OrderedDict()
+_revocados = set()
+
+
+def _clave_firma():
+    global _clave
+    if _clave is None:
+        with _lock:
+            if _clave is None:
+                clave = os.environ.get('QMS_SESSION_SECRET')
+                if not clave:
+                    try:
+                        descriptor = os.open(RUTA_CLAVE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                    except FileExistsError:
+                        with open(RUTA_CLAVE, encoding='utf-8') as f:
+                            clave = f.read().strip()
+                    else:
+                        clave = secrets.token_hex(32)
+                        with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                            f.write(clave)
+                _clave = clave
+    return _clave
+
+
+def emitir(usuario, anterior=None):
+    """
+    Emite un token para un usuario autenticado
+
+    Args:
+        usuario (dict): Usuario de verify_user o get_usuario_sesion
+        anterior (dict, optional): Claims del token que se renueva; se conservan su
+            momento de inicio de sesión (auth) y su rexp
+
+    Returns:
+        str: Token firmado
+    """
+    ahora = int(time.time())
+    if anterior:
+        autenticado = anterior.get('auth', anterior.get('iat', ahora))
+        rexp = anterior['rexp']
+    else:
+        autenticado = ahora
+        rexp = ahora + DURACION_RENOVACION
+    claims = {
+        'sub': str(usuario['id']),
+        'usr': usuario['username'],
+        'nom': usuario.get('full_name') or '',
+        'rol': usuario.get('role') or 'operator',
+        'sis': usuario.get('sistema_preferido') or '',
+        'qrz': usuario.get('qrz_station') or '',
+        'iat': ahora,
+        'auth': autenticado,
+        'exp': min(ahora + DURACION, rexp),
+        'rexp': rexp,
+        'jti': secrets.token_hex(8),
+    }
+    return jwt.encode(claims, _clave_firma(), algorithm=ALGORITMO)
+
+
+def verificar(token):
+    """
+    Verifica la firma y los vencimientos de un token (sin acceder a la base de datos)
+
+    Returns:
+        tuple: (claims, estado) con estado 'valido' (antes de exp), 'renovar' (entre
+        exp y rexp) o (None, None) si el token no es válido, venció o fue revocado
+    """
+    if not token:
+        return None, None
+    with _lock:
+        claims = _verificados.get(token)
+        if claims is not None:
+            _verificados.move_to_end(token)
+    if claims is None:
+        try:
+            # exp se revisa aquí para distinguir un token por renovar de uno inválido
+            claims = jwt.decode(token, _clave_firma(), algorithms=[ALGORITMO], options={'verify_exp': False})
+        except JWTError:
+            return None, None
+        with _lock:
+            _verificados[token] = claims
+            while len(_verificados) > MAX_VERIFICADOS:
+                _verificados.popitem(last=False)
+
+    ahora = time.time()
+    if claims.get('jti') in _revocados or ahora >= claims.get('rexp', 0):
+        return None, None
+    return claims, ('valido' if ahora < claims.get('exp', 0) else 'renovar')
+
+
+def por_vencer(claims):
+    """True si al token le queda menos de un tercio de su duración y aún se puede renovar"""
+    return claims.get('exp', 0) < claims.get('rexp', 0) and time.time() >= claims.get('exp', 0) - DURACION / 3
+
+
+def vencido(claims):
+    """True si ya pasó el límite de renovación (rexp): hay que volver a iniciar sesión"""
+    return time.time() >= claims.get('rexp', 0)
+
+
+def segundos_restantes(claims):
+    """Segundos hasta rexp, para la vigencia de la cookie"""
+    return max(0, int(claims.get('rexp', 0) - time.time()))
+
+
+def emitido_despues_de(claims, sesiones_desde):
+    """
+    True si el inicio de sesión del token es posterior a la última revocación de
+    sesiones del usuario
+
+    Args:
+        sesiones_desde (str): users.sesiones_desde ('YYYY-MM-DD HH:MM:SS' en UTC) o None
+    """
+    if not sesiones_desde:
+        return True
+    desde = datetime.strptime(sesiones_desde, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return claims.get('auth', claims.get('iat', 0)) >= desde.timestamp()
+
+
+def revocar(claims):
+    """Invalida un token en este proceso (los demás lo rechazan con users.sesiones_desde)"""
+    with _lock:
+        _revocados.add(claims.get('jti'))
@@ -0,0 +1,275 @@
+"""
+Preparación del GeoJSON de estados para el mapa del análisis geográfico.
+
+A partir de data/mexico_states.geojson genera:
+
+  - data/mexico_states_<nivel>.geojson: la geometría simplificada a varias
+    tolerancias, en JSON compacto y con coordenadas redondeadas. La simplificación
+    respeta la topología: las fronteras compartidas se dividen en arcos entre
+    vértices de unión y cada arco se simplifica una sola vez (Douglas-Peucker), así
+    dos estados vecinos siguen compartiendo exactamente la misma línea y no aparecen
+    huecos ni traslapes.
+  - data/mexico_states_index.json: el índice nombre normalizado -> id de la
+    feature, el centroide de cada estado y los niveles disponibles, para que la app
+    no recorra las features en cada render.
+
+Uso (volver a ejecutarlo si cambia el GeoJSON de origen):
+    python simplificar_geojson.py [--origen data/mexico_states.geojson] [--destino data]
+"""
+import argparse
+import json
+import os
+import unicodedata
+
+# Tolerancia en grados (~1.1 km por cada 0.01). En el mapa de 600 px de alto cada
+# píxel equivale a unos 5 km, así que 'media' no se distingue del original
+NIVELES = {
+    'alta': 0.005,
+    'media': 0.02,
+    'baja': 0.05,
+}
+
+NIVEL_POR_DEFECTO = 'media'
+
+DECIMALES = 4
+
+ARCHIVO_INDICE = 'mexico_states_index.json'
+
+
+def normalizar_nombre(nombre):
+    """Minúsculas y sin acentos, igual que _normalizar_estado_nombre de la app"""
+    if not nombre:
+        return ""
+    texto = unicodedata.normalize('NFKD', str(nombre))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.strip().lower()
+
+
+def _poligonos(geometria):
+    if geometria['type'] == 'MultiPolygon':
+        return geometria['coordinates']
+    return [geometria['coordinates']]
+
+
+def _anillos(geojson):
+    for feature in geojson['features']:
+        for poligono in _poligonos(feature['geometry']):
+            for anillo in poligono:
+                yield [tuple(punto[:2]) for punto in anillo]
+
+
+def _uniones(geojson):
+    """Vértices donde se encuentran tres o más fronteras, o donde una frontera deja de ser compartida
+
+    Un vértice es de unión si sus vecinos (anterior, siguiente) no son los mismos en
+    todos los anillos que lo usan. El primer vértice de cada anillo también se fija,
+    para que todos los anillos corten sus arcos en los mismos puntos.
+    """
+    vecinos = {}
+    uniones = set()
+    for anillo in _anillos(geojson):
+        puntos = anillo[:-1] if anillo[0] == anillo[-1] else anillo
+        n = len(puntos)
+        if n == 0:
+            continue
+        uniones.add(puntos[0])
+        for i, punto in enumerate(puntos):
+            par = frozenset((puntos[i - 1], puntos[(i + 1) % n]))
+            anterior = vecinos.setdefault(punto, par)
+            if anterior != par:
+                uniones.add(punto)
+    return uniones
+
+
+def _distancia_segmento(p, a, b):
+    (x, y), (x1, y1), (x2, y2) = p, a, b
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+    t = max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / (dx * dx + dy * dy)))
+    return ((x - x1 - t * dx) ** 2 + (y - y1 - t * dy) ** 2) ** 0.5
+
+
+def _douglas_peucker(puntos, tolerancia):
+    """Simplifica una línea abierta conservando sus extremos (versión iterativa)"""
+    if len(puntos) < 3:
+        return list(puntos)
+    conservar = [False] * len(puntos)
+    conservar[0] = conservar[-1] = True
+    pendientes = [(0, len(puntos) - 1)]
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        maxima, indice = 0.0, None
+        for i in range(inicio + 1, fin):
+            distancia = _distancia_segmento(puntos[i], puntos[inicio], puntos[fin])
+            if distancia > maxima:
+                maxima, indice = distancia, i
+        if indice is not None and maxima > tolerancia:
+            conservar[indice] = True
+            pendientes.append((inicio, indice))
+            pendientes.append((indice, fin))
+    return [p for p, c in zip(puntos, conservar) if c]
+
+
+def _simplificar_arco(arco, tolerancia, cache):
+    """Simplifica un arco; el mismo arco recorrido en sentido contrario da el mismo resultado"""
+    invertido = arco[::-1]
+    canonico = min(tuple(arco), tuple(invertido))
+    resultado = cache.get(canonico)
+    if resultado is None:
+        if canonico[0] == canonico[-1]:
+            # Anillo sin uniones (p. ej. una isla): se corta en el punto más lejano al inicio
+            lejano = max(range(len(canonico)), key=lambda i: _distancia_segmento(canonico[i], canonico[0], canonico[0]))
+            resultado = (_douglas_peucker(canonico[:lejano + 1], tolerancia)[:-1]
+                         + _douglas_peucker(canonico[lejano:], tolerancia))
+        else:
+            resultado = _douglas_peucker(canonico, tolerancia)
+        cache[canonico] = resultado
+    return resultado if tuple(arco) == canonico else resultado[::-1]
+
+
+def _simplificar_anillo(anillo, uniones, tolerancia, cache):
+    puntos = [tuple(p[:2]) for p in anillo]
+    if puntos[0] != puntos[-1]:
+        puntos.append(puntos[0])
+
+    cortes = [i for i, p in enumerate(puntos[:-1]) if p in uniones] or [0]
+    if cortes[0] != 0:
+        # Rotar para empezar en una unión; el anillo cerrado se reconstruye abajo
+        puntos = puntos[cortes[0]:-1] + puntos[:cortes[0] + 1]
+        cortes = [i - cortes[0] for i in cortes]
+    cortes.append(len(puntos) - 1)
+
+    resultado = [puntos[0]]
+    for inicio, fin in zip(cortes, cortes[1:]):
+        resultado.extend(_simplificar_arco(puntos[inicio:fin + 1], tolerancia, cache)[1:])
+    return resultado
+
+
+def _redondear(anillo):
+    redondeado = []
+    for x, y in anillo:
+        punto = [round(x, DECIMALES), round(y, DECIMALES)]
+        if not redondeado or redondeado[-1] != punto:
+            redondeado.append(punto)
+    return redondeado
+
+
+def _area(anillo):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(anillo, anillo[1:])) / 2.0
+
+
+def simplificar(geojson, tolerancia):
+    """
+    Simplifica todas las features respetando las fronteras compartidas
+
+    Args:
+        geojson (dict): FeatureCollection de polígonos
+        tolerancia (float): Tolerancia de Douglas-Peucker en grados
+
+    Returns:
+        dict: FeatureCollection con 'id' = state_name en cada feature
+    """
+    uniones = _uniones(geojson)
+    cache = {}
+    features = []
+    for feature in geojson['features']:
+        poligonos = []
+        for poligono in _poligonos(feature['geometry']):
+            anillos = []
+            for i, anillo in enumerate(poligono):
+                simplificado = _redondear(_simplificar_anillo(anillo, uniones, tolerancia, cache))
+                if len(simplificado) >= 4:
+                    anillos.append(simplificado)
+                elif i == 0:
+                    # El contorno exterior colapsó: se descarta el polígono completo (islotes)
+                    break
+            else:
+                poligonos.append(anillos)
+        if not poligonos:
+            # Nunca dejar un estado sin geometría: conservar su polígono más grande sin simplificar
+            mayor = max(_poligonos(feature['geometry']), key=lambda p: abs(_area(p[0])))
+            poligonos = [[_redondear(anillo) for anillo in mayor]]
+
+        nombre = feature['properties'].get('state_name')
+        geometria = ({'type': 'Polygon', 'coordinates': poligonos[0]} if len(poligonos) == 1
+                     else {'type': 'MultiPolygon', 'coordinates': poligonos})
+        features.append({
+            'type': 'Feature',
+            'id': nombre,
+            'properties': {'state_name': nombre, 'state_code': feature['properties'].get('state_code')},
+            'geometry': geometria,
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def _centroide(geometria):
+    """Centroide del polígono de mayor área (queda sobre tierra en estados con islas)"""
+    contorno = max((p[0] for p in _poligonos(geometria)), key=lambda a: abs(_area(a)))
+    area = _area(contorno)
+    if area == 0:
+        xs, ys = zip(*contorno)
+        return sum(ys) / len(ys), sum(xs) / len(xs)
+    cx = cy = 0.0
+    for (x1, y1), (x2, y2) in zip(contorno, contorno[1:]):
+        factor = x1 * y2 - x2 * y1
+        cx += (x1 + x2) * factor
+        cy += (y1 + y2) * factor
+    return cy / (6 * area), cx / (6 * area)
+
+
+def construir_indice(geojson):
+    """
+    Índice de estados del GeoJSON
+
+    Returns:
+        dict: {nombre normalizado: {'id': id de la feature, 'lat': ..., 'lon': ...}}
+    """
+    estados = {}
+    for feature in geojson['features']:
+        nombre = feature.get('properties', {}).get('state_name')
+        if not nombre:
+            continue
+        lat, lon = _centroide(feature['geometry'])
+        estados[normalizar_nombre(nombre)] = {'id': nombre, 'lat': round(lat, 4), 'lon': round(lon, 4)}
+    return estados
+
+
+def _contar_puntos(geojson):
+    return sum(len(anillo) for feature in geojson['features'] for p in _poligonos(feature['geometry']) for anillo in p)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los GeoJSON simplificados y el índice de estados")
+    parser.add_argument('--origen', default=os.path.join('data', 'mexico_states.geojson'))
+    parser.add_argument('--destino', default='data', help="Carpeta donde escribir los archivos")
+    args = parser.parse_args()
+
+    with open(args.origen, encoding='utf-8') as f:
+        original = json.load(f)
+    print(f"Origen: {args.origen} ({_contar_puntos(original)} puntos, {os.path.getsize(args.origen)} bytes)")
+
+    niveles = {}
+    for nivel, tolerancia in NIVELES.items():
+        simplificado = simplificar(original, tolerancia)
+        archivo = f"mexico_states_{nivel}.geojson"
+        ruta = os.path.join(args.destino, archivo)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(simplificado, f, ensure_ascii=False, separators=(',', ':'))
+        niveles[nivel] = {'archivo': archivo, 'tolerancia': tolerancia, 'puntos': _contar_puntos(simplificado),
+                          'bytes': os.path.getsize(ruta)}
+        print(f"  {nivel:<6} tolerancia {tolerancia:<6} {niveles[nivel]['puntos']:>6} puntos  {niveles[nivel]['bytes']:>7} bytes")
+
+    indice = {
+        'origen': os.path.basename(args.origen),
+        'nivel_por_defecto': NIVEL_POR_DEFECTO,
+        'niveles': niveles,
+        'estados': construir_indice(original),
+    }
+    with open(os.path.join(args.destino, ARCHIVO_INDICE), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False, indent=1, sort_keys=True)
+    print(f"Índice: {os.path.join(args.destino, ARCHIVO_INDICE)} ({len(indice['estados'])} estados)")
+
+
+if __name__ == '__main__':
+    main()
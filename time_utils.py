@@ -1,7 +1,22 @@
+"""
+Fechas y horas en la zona horaria de la Ciudad de México.
+
+Las fechas de la base de datos (CURRENT_TIMESTAMP) están en UTC sin zona. Para un
+valor suelto están convert_utc_to_cdmx y format_datetime; para columnas completas
+(tablas de usuarios, reportes, bitácoras) convert_series_to_cdmx y format_series, que
+procesan todos los valores a la vez con pandas y numpy: 10 000 fechas se formatean
+en milisegundos en lugar de cientos.
+"""
 import pytz
 from datetime import datetime
 from typing import Optional, Union, Any
 
+ZONA_CDMX = 'America/Mexico_City'
+_CDMX = pytz.timezone(ZONA_CDMX)
+
+# Formatos anteriores a fromisoformat, para cadenas que este no acepta
+_FORMATOS_FECHA = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
 def get_cdmx_timezone() -> pytz.timezone:
     """
     Devuelve el objeto timezone para la Ciudad de México (CDMX).
@@ -9,7 +24,7 @@ def get_cdmx_timezone() -> pytz.timezone:
     Returns:
         pytz.timezone: Zona horaria de la Ciudad de México
     """
-    return pytz.timezone('America/Mexico_City')
+    return _CDMX
 
 def get_current_cdmx_time() -> datetime:
     """
@@ -20,6 +35,19 @@ def get_current_cdmx_time() -> datetime:
     """
     return datetime.now(get_cdmx_timezone())
 
+def _parse_iso(texto: str) -> Optional[datetime]:
+    """Convierte una fecha ISO (la de SQLite, con 'T', fracciones o zona) a datetime"""
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    for fmt in _FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto.split('.')[0], fmt)
+        except ValueError:
+            continue
+    return None
+
 def convert_utc_to_cdmx(utc_dt: Optional[Union[datetime, str]]) -> Optional[datetime]:
     """
     Convierte una fecha/hora UTC a la zona horaria de CDMX.
@@ -34,20 +62,10 @@ def convert_utc_to_cdmx(utc_dt: Optional[Union[datetime, str]]) -> Optional[date
         return None
         
     try:
-        cdmx_zone = get_cdmx_timezone()
-        
         # Si es un string, convertirlo a datetime
         if isinstance(utc_dt, str):
-            # Intentar diferentes formatos de fecha
-            for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
-                try:
-                    utc_dt = datetime.strptime(utc_dt.split('.')[0], fmt)
-                    # Asumir que la fecha está en UTC
-                    utc_dt = pytz.UTC.localize(utc_dt)
-                    break
-                except (ValueError, AttributeError):
-                    continue
-            else:
+            utc_dt = _parse_iso(utc_dt)
+            if utc_dt is None:
                 return None  # Si no coincide con ningún formato, devolver None
         
         # Si no tiene zona horaria, asumir UTC
@@ -55,7 +73,7 @@ def convert_utc_to_cdmx(utc_dt: Optional[Union[datetime, str]]) -> Optional[date
             utc_dt = pytz.UTC.localize(utc_dt)
         
         # Convertir a CDMX
-        return utc_dt.astimezone(cdmx_zone)
+        return utc_dt.astimezone(_CDMX)
         
     except Exception as e:
         print(f"Error al convertir fecha a CDMX: {e}")
@@ -89,8 +107,7 @@ def format_datetime(dt: Any, include_time: bool = True) -> str:
                 return 'N/A'
         
         # Asegurarse de que la fecha esté en la zona horaria de CDMX
-        if dt.tzinfo != get_cdmx_timezone():
-            dt = dt.astimezone(get_cdmx_timezone())
+        dt = dt.astimezone(_CDMX)
             
         # Formatear según se solicite
         if include_time:
@@ -101,3 +118,80 @@ def format_datetime(dt: Any, include_time: bool = True) -> str:
     except Exception as e:
         print(f"Error al formatear fecha: {e}")
         return 'N/A'
+
+def convert_series_to_cdmx(valores: Any) -> Any:
+    """
+    Convierte una columna de fechas UTC a la zona horaria de CDMX.
+
+    Las cadenas con el formato de SQLite ('YYYY-MM-DD HH:MM:SS') se leen con un
+    formato fijo; las demás (con 'T', fracciones, zona o solo fecha) como ISO 8601.
+    Igual que convert_utc_to_cdmx, los valores sin zona se toman como UTC.
+
+    Args:
+        valores: pandas.Series, lista o arreglo de cadenas, datetimes o None
+
+    Returns:
+        pandas.Series: datetime64 con zona America/Mexico_City (NaT si no se pudo convertir)
+    """
+    import pandas as pd
+
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        fechas = serie
+        if fechas.dt.tz is None:
+            fechas = fechas.dt.tz_localize('UTC')
+    else:
+        # Las dos pasadas pueden resultar en resoluciones distintas (s y us con pandas 3);
+        # se llevan a microsegundos antes de combinarlas
+        fechas = pd.to_datetime(serie, format='%Y-%m-%d %H:%M:%S', errors='coerce', utc=True).dt.as_unit('us')
+        faltantes = fechas.isna() & serie.notna()
+        if faltantes.any():
+            iso = pd.to_datetime(serie[faltantes].astype(str), format='ISO8601', errors='coerce', utc=True)
+            fechas = fechas.combine_first(iso.dt.as_unit('us'))
+    return fechas.dt.tz_convert(ZONA_CDMX)
+
+def format_series(valores: Any, include_time: bool = True) -> Any:
+    """
+    Formatea una columna de fechas como format_datetime, todos los valores a la vez.
+
+    En lugar de strftime por valor, el texto se arma reordenando los bytes de
+    numpy.datetime_as_string; la abreviatura de zona (%Z) se calcula una vez por
+    cada desfase distinto de la columna.
+
+    Args:
+        valores: pandas.Series, lista o arreglo de cadenas, datetimes o None
+        include_time: Si es True, incluye la hora y la zona
+
+    Returns:
+        pandas.Series: Cadenas 'dd/mm/aaaa HH:MM:SS CST' (o 'dd/mm/aaaa'), 'N/A' si no hay fecha
+    """
+    import numpy as np
+    import pandas as pd
+
+    fechas = convert_series_to_cdmx(valores)
+    indice = valores.index if isinstance(valores, pd.Series) else None
+    validas = fechas.notna().to_numpy()
+    resultado = np.full(len(fechas), 'N/A', dtype=object)
+    if validas.any():
+        locales = fechas[validas].dt.tz_localize(None).to_numpy(dtype='datetime64[s]')
+        # 'AAAA-MM-DDTHH:MM:SS' + '/' + ' ' como matriz de bytes, una fila por fecha
+        bytes_fecha = np.datetime_as_string(locales, unit='s').astype('S19').view(np.uint8).reshape(-1, 19)
+        separadores = np.tile(np.frombuffer(b'/ ', dtype=np.uint8), (len(locales), 1))
+        bytes_fecha = np.hstack([bytes_fecha, separadores])
+        orden = _ORDEN_CON_HORA if include_time else _ORDEN_FECHA
+        texto = np.ascontiguousarray(bytes_fecha[:, orden]).view(f'S{len(orden)}').ravel().astype(str).astype(object)
+
+        if include_time:
+            utc = fechas[validas].dt.tz_convert('UTC').dt.tz_localize(None).to_numpy(dtype='datetime64[s]')
+            desfases = (locales - utc).astype(np.int64)
+            zonas = np.empty(len(locales), dtype=object)
+            for desfase in np.unique(desfases):
+                coincide = desfases == desfase
+                zonas[coincide] = ' ' + fechas[validas].iloc[int(np.argmax(coincide))].strftime('%Z')
+            texto = texto + zonas
+        resultado[validas] = texto
+    return pd.Series(resultado, index=indice, dtype=object)
+
+# Posiciones de 'AAAA-MM-DDTHH:MM:SS/ ' que forman 'DD/MM/AAAA HH:MM:SS' y 'DD/MM/AAAA'
+_ORDEN_FECHA = [8, 9, 19, 5, 6, 19, 0, 1, 2, 3]
+_ORDEN_CON_HORA = _ORDEN_FECHA + [20, 11, 12, 13, 14, 15, 16, 17, 18]
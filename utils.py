@@ -4,8 +4,15 @@ from datetime import datetime
 import pytz
 from database import FMREDatabase
 
-# Inicializar la base de datos
-db = FMREDatabase()
+# La base de datos se abre al primer uso: importar este módulo no debe ejecutar el DDL
+_db = None
+
+def get_db():
+    """Obtiene la instancia de FMREDatabase del módulo, creándola al primer uso"""
+    global _db
+    if _db is None:
+        _db = FMREDatabase()
+    return _db
 
 def format_call_sign(call_sign):
     """Formatea un indicativo de llamada a mayúsculas"""
@@ -21,7 +28,7 @@ def format_qth(qth):
 
 def get_mexican_states():
     """Retorna un diccionario con los estados de México desde la base de datos"""
-    return db.get_estados()
+    return get_db().get_estados()
 
 def get_estados_list():
     """Retorna una lista de tuplas (abreviatura, nombre) de los estados de México"""
@@ -30,12 +37,12 @@ def get_estados_list():
 
 def get_zonas():
     """Retorna las zonas disponibles desde la base de datos"""
-    zonas = db.get_zonas()
+    zonas = get_db().get_zonas()
     return [(codigo, nombre) for codigo, nombre in zonas.items()]
 
 def get_sistemas():
     """Retorna los sistemas disponibles desde la base de datos"""
-    sistemas = db.get_sistemas()
+    sistemas = get_db().get_sistemas()
     return [(codigo, nombre) for codigo, nombre in sistemas.items()]
 
 def validar_call_sign(callsign: str) -> dict:
@@ -222,7 +229,7 @@ def get_radioaficionado_info(indicativo):
         return None
         
     # Buscar en la tabla de radioexperimentadores
-    return db.get_radioexperimentador(indicativo.upper())
+    return get_db().get_radioexperimentador(indicativo.upper())
 
 def calcular_zona_indicativo(indicativo):
     """
@@ -262,7 +269,7 @@ def obtener_datos_para_reporte(indicativo, sistema_preferido):
     zona = calcular_zona_indicativo(indicativo)
     
     # Obtener información del sistema
-    sistema_info = db.get_sistema_info(sistema_preferido) if sistema_preferido else {}
+    sistema_info = get_db().get_sistema_info(sistema_preferido) if sistema_preferido else {}
     
     # Construir el diccionario de datos
     datos = {
@@ -289,7 +296,7 @@ def map_qth_to_estado(qth):
     qth_clean = qth.upper().strip()
     
     # Buscar coincidencias exactas primero
-    estados = db.get_estados()
+    estados = get_db().get_estados()
     for abbr, nombre in estados.items():
         if qth_clean == abbr or qth_clean == nombre.upper():
             return abbr
@@ -312,7 +319,7 @@ def get_estaciones():
     Obtiene todas las estaciones de la base de datos.
     Retorna una lista de diccionarios con los datos de cada estación.
     """
-    cursor = db.get_connection().cursor()
+    cursor = get_db().get_connection().cursor()
     cursor.execute('''
         SELECT id, qrz, descripcion, is_active, 
                strftime('%Y-%m-%d %H:%M', created_at) as created_at
@@ -328,7 +335,7 @@ def get_estacion_por_id(estacion_id):
     Obtiene una estación por su ID.
     Retorna un diccionario con los datos de la estación o None si no se encuentra.
     """
-    cursor = db.get_connection().cursor()
+    cursor = get_db().get_connection().cursor()
     cursor.execute('''
         SELECT id, qrz, descripcion, is_active, 
                strftime('%Y-%m-%d %H:%M', created_at) as created_at
@@ -344,12 +351,12 @@ def crear_estacion(qrz, descripcion, is_active=True):
     Crea una nueva estación en la base de datos.
     Lanza sqlite3.IntegrityError si ya existe una estación con el mismo QRZ.
     """
-    cursor = db.get_connection().cursor()
+    cursor = get_db().get_connection().cursor()
     cursor.execute('''
         INSERT INTO stations (qrz, descripcion, is_active)
         VALUES (?, ?, ?)
     ''', (qrz.upper(), descripcion.strip(), 1 if is_active else 0))
-    db.get_connection().commit()
+    get_db().get_connection().commit()
     return cursor.lastrowid
 
 def actualizar_estacion(estacion_id, descripcion, is_active):
@@ -362,14 +369,14 @@ def actualizar_estacion(estacion_id, descripcion, is_active):
     tz = pytz.timezone('America/Mexico_City')
     now_utc6 = datetime.now(pytz.utc).astimezone(tz)
     
-    cursor = db.get_connection().cursor()
+    cursor = get_db().get_connection().cursor()
     cursor.execute('''
         UPDATE stations 
         SET descripcion = ?, is_active = ?, updated_at = ?
         WHERE id = ?
     ''', (descripcion.strip(), 1 if is_active else 0, now_utc6.strftime('%Y-%m-%d %H:%M:%S'), estacion_id))
     
-    db.get_connection().commit()
+    get_db().get_connection().commit()
     return cursor.rowcount > 0
 
 def eliminar_estacion(estacion_id):
@@ -377,9 +384,9 @@ def eliminar_estacion(estacion_id):
     Elimina una estación de la base de datos.
     Retorna True si se eliminó correctamente, False si la estación no existe.
     """
-    cursor = db.get_connection().cursor()
+    cursor = get_db().get_connection().cursor()
     cursor.execute('DELETE FROM stations WHERE id = ?', (estacion_id,))
-    db.get_connection().commit()
+    get_db().get_connection().commit()
     return cursor.rowcount > 0
 
 def show_gestion_estaciones():
@@ -0,0 +1,165 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+# Una cola por archivo de base de datos y por proceso. Streamlit vuelve a ejecutar
+# app.py en cada interacción, así que la cola no puede vivir en la instancia.
+_colas = {}
+_colas_lock = threading.Lock()
+
+
+class WriteQueue:
+    """Cola de escritura con un único hilo escritor.
+
+    Las operaciones encoladas se agrupan en transacciones cortas (BEGIN IMMEDIATE
+    ... COMMIT). Cada operación corre dentro de su propio SAVEPOINT, de modo que
+    un error en una no revierte las demás del mismo lote. El resultado de cada
+    operación se entrega mediante un Future una vez confirmada la transacción.
+    """
+
+    def __init__(self, connection_factory, max_lote=100):
+        """
+        Args:
+            connection_factory: Función sin argumentos que devuelve una conexión sqlite3
+            max_lote (int): Máximo de operaciones por transacción
+        """
+        self._connection_factory = connection_factory
+        self._max_lote = max_lote
+        self._cola = queue.Queue()
+        self._conn = None
+        self._cerrada = False
+        self._hilo = threading.Thread(target=self._run, name="qms-write-queue", daemon=True)
+        self._hilo.start()
+
+    def submit(self, operacion):
+        """Encola una operación de escritura
+
+        Args:
+            operacion: Función que recibe un cursor y devuelve el resultado de la escritura
+
+        Returns:
+            Future: Se resuelve con el valor devuelto por la operación
+        """
+        if self._cerrada:
+            raise RuntimeError("La cola de escritura está cerrada")
+        future = Future()
+        self._cola.put((operacion, future))
+        return future
+
+    def execute(self, operacion, timeout=None):
+        """Encola una operación y espera su resultado (propaga sus excepciones)"""
+        return self.submit(operacion).result(timeout=timeout)
+
+    def close(self, timeout=5.0):
+        """Procesa lo pendiente y detiene el hilo escritor"""
+        if self._cerrada:
+            return
+        self._cerrada = True
+        self._cola.put(None)
+        self._hilo.join(timeout)
+
+    def _get_conn(self):
+        if self._conn is None:
+            self._conn = self._connection_factory()
+        return self._conn
+
+    def _run(self):
+        while True:
+            item = self._cola.get()
+            if item is None:
+                break
+
+            # Agrupar lo que ya esté esperando; no se añade latencia si la cola está vacía
+            lote = [item]
+            fin = False
+            while len(lote) < self._max_lote:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    fin = True
+                    break
+                lote.append(siguiente)
+
+            self._procesar_lote(lote)
+            if fin:
+                break
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _procesar_lote(self, lote):
+        lote = [(op, fut) for op, fut in lote if fut.set_running_or_notify_cancel()]
+        if not lote:
+            return
+
+        resultados = []
+        try:
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                for operacion, future in lote:
+                    cursor.execute('SAVEPOINT operacion')
+                    try:
+                        resultados.append((future, operacion(cursor), None))
+                        cursor.execute('RELEASE operacion')
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO operacion')
+                        cursor.execute('RELEASE operacion')
+                        resultados.append((future, None, e))
+                cursor.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+        except Exception as e:
+            # Falló la transacción completa (p. ej. base bloqueada): notificar a todos
+            if isinstance(e, sqlite3.Error) and self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
+            for _, future in lote:
+                future.set_exception(e)
+            return
+
+        for future, resultado, error in resultados:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(resultado)
+
+
+def get_write_queue(db_path, connection_factory):
+    """Obtiene (o crea) la cola de escritura compartida para un archivo de base de datos
+
+    Args:
+        db_path (str): Ruta de la base de datos
+        connection_factory: Función que abre una conexión a esa base de datos
+
+    Returns:
+        WriteQueue: Cola de escritura del proceso para esa base de datos
+    """
+    clave = os.path.abspath(db_path)
+    with _colas_lock:
+        cola = _colas.get(clave)
+        if cola is None:
+            cola = WriteQueue(connection_factory)
+            _colas[clave] = cola
+        return cola
+
+
+@atexit.register
+def _cerrar_colas():
+    with _colas_lock:
+        colas = list(_colas.values())
+        _colas.clear()
+    for cola in colas:
+        cola.close()